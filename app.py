@@ -2,66 +2,308 @@
 Flask Application for NAROON Website
 اپلیکیشن Flask برای سایت نارون
 """
-from flask import Flask, send_from_directory, send_file, request
+from flask import Flask, abort, g, jsonify, request, send_file
+from werkzeug.wsgi import wrap_file
 from pathlib import Path
+from werkzeug.utils import get_content_type, safe_join
+import logging
+import mimetypes
 import os
+import time
+
+from asset_cache import STATS_PATH, AssetCache, CachedAsset, asset_stamp
+from fingerprint_assets import resolve_fingerprinted, split_fingerprint
+from gallery_catalog import GalleryCatalog, InvalidCursor, Shard, clamp_limit
+from http_cache import (
+    ETAG_LENGTH,
+    REVALIDATE_CACHE_CONTROL,
+    cache_control_for,
+    file_digest,
+    file_validator,
+    http_date,
+    is_not_modified,
+    strong_etag,
+)
+from http_range import (
+    MultipartPlan,
+    RangeNotSatisfiable,
+    content_range,
+    if_range_allows,
+    parse_range_header,
+    read_range,
+)
+from precompress_assets import is_compressible, select_precompressed
+from server_metrics import METRICS_PATH, PROMETHEUS_CONTENT_TYPE, ServerMetrics, metrics_allowed
 
 # مسیر دایرکتوری ریشه
 BASE_DIR = Path(__file__).parent
+# فایل‌های ریشه که صفحه‌ها به آن‌ها ارجاع می‌دهند (لینک‌ها، ثبت service worker، fetch مانیفست‌ها)؛
+# بقیه فایل‌های ریشه مثل کدهای پایتون و liara.json سرو نمی‌شوند
+ROOT_FILES = ('index.html', 'pre-production.html', 'sw.js', 'gallery-data.json', 'errorr-media.json')
 
+# پوشه static با مسیر اختصاصی پایین سرو می‌شود تا ETag قوی و URLهای هش‌دار داشته باشد
 app = Flask(__name__,
-            static_folder='static',
-            static_url_path='/static',
+            static_folder=None,
             template_folder=str(BASE_DIR))
 
+# ایندکس مانیفست گالری؛ یک بار ساخته می‌شود و با تغییر gallery-data.json تازه می‌شود
+catalog = GalleryCatalog(BASE_DIR / 'gallery-data.json')
+
+# فایل‌های پرتکرار از حافظه سرو می‌شوند (asset_cache.py)
+ASSETS = AssetCache()
+# متریک‌های هر route (‎/metrics) و لاگ دسترسی JSON
+METRICS = ServerMetrics('app', asset_cache=ASSETS)
+
+
+@app.before_request
+def start_timer():
+    g.started = time.perf_counter()
+
 
 @app.after_request
-def add_cache_headers(response):
-    """اضافه کردن هدرهای کش برای فایل‌های استاتیک"""
-    if response.status_code == 200:
-        # Cache static files (CSS, JS, JSON) for 1 hour
-        if request.path.startswith('/static/'):
-            if request.path.endswith(('.css', '.js', '.json')):
-                response.headers['Cache-Control'] = 'public, max-age=3600'
-            # Cache fonts and other static assets longer
-            elif request.path.endswith(('.woff', '.woff2', '.ttf', '.eot')):
-                response.headers['Cache-Control'] = 'public, max-age=31536000, immutable'
+def record_request(response):
+    """
+    زمان تا آماده شدن پاسخ برای سرور WSGI؛ بدنه‌های stream (Range) بعد از این نقطه ارسال می‌شوند
+    و حجم آن‌ها از Content-Length خوانده می‌شود
+    """
+    started = g.get('started')
+    if started is not None:
+        sent_bytes = 0 if request.method == 'HEAD' else (response.content_length or 0)
+        METRICS.record(request.method, request.path, response.status_code, sent_bytes,
+                       time.perf_counter() - started, cache=g.get('asset_cache'),
+                       remote=request.remote_addr)
+    return response
+
+
+def partial_response(path, stat_result, etag, mimetype):
+    """
+    پاسخ 206 (یک یا چند بازه) یا 416 برای درخواست Range
+    None یعنی پاسخ کامل: Range ندارد، If-Range با نسخه فعلی نمی‌خواند یا پاسخ 304 است
+    """
+    if request.method != 'GET' or 'Range' not in request.headers:
+        return None
+    quoted = strong_etag(etag)
+    if is_not_modified(request.headers, quoted, stat_result.st_mtime):
+        return None
+    if not if_range_allows(request.headers.get('If-Range'), quoted, stat_result.st_mtime):
+        return None
+    size = stat_result.st_size
+    try:
+        ranges = parse_range_header(request.headers.get('Range'), size)
+    except RangeNotSatisfiable:
+        response = app.response_class(status=416)
+        response.headers['Content-Range'] = f'bytes */{size}'
+        return response
+    if ranges is None:
+        return None
+
+    if len(ranges) == 1:
+        start, end = ranges[0]
+        length = end - start + 1
+        if end == size - 1:
+            # seek مرورگر (bytes=N-) تا انتهای فایل است؛ wsgi.file_wrapper (مثلاً gunicorn) آن را با sendfile می‌فرستد
+            f = open(path, 'rb')
+            f.seek(start)
+            body = wrap_file(request.environ, f)
+        else:
+            body = _stream_range(path, start, length)
+        response = app.response_class(body, status=206, mimetype=mimetype, direct_passthrough=True)
+        response.headers['Content-Range'] = content_range(start, end, size)
+        response.content_length = length
+    else:
+        plan = MultipartPlan(ranges, size, mimetype)
+        response = app.response_class(_stream_multipart(path, plan), status=206,
+                                      content_type=plan.content_type, direct_passthrough=True)
+        response.content_length = plan.content_length
+    response.headers['Accept-Ranges'] = 'bytes'
+    response.headers['Last-Modified'] = http_date(stat_result.st_mtime)
+    response.set_etag(etag)
+    return response
+
+
+def _stream_range(path, start, length):
+    with open(path, 'rb') as f:
+        yield from read_range(f, start, length)
+
+
+def _stream_multipart(path, plan):
+    with open(path, 'rb') as f:
+        yield from plan.iter_chunks(f)
+
+
+def cached_response(asset):
+    """پاسخ 200 یا 304 از ASSETS با هدرهای از پیش ساخته‌شده"""
+    if is_not_modified(request.headers, asset.etag, asset.mtime):
+        response = app.response_class(status=304)
+        response.headers['ETag'] = asset.etag
+        response.headers['Last-Modified'] = asset.last_modified
+        if asset.vary:
+            response.vary.add('Accept-Encoding')
+    else:
+        response = app.response_class(asset.body, headers=asset.headers)
+    response.headers['Cache-Control'] = asset.cache_control
+    return response
+
+
+def cache_file(key, body_path, path, stat_result, mimetype, etag, encoding, cache_control):
+    """فایل کوچک را یک بار می‌خواند و در ASSETS ثبت می‌کند؛ None یعنی فایل هنگام خواندن تغییر کرد"""
+    stamp = asset_stamp(body_path, path)
+    with open(body_path, 'rb') as f:
+        body = f.read()
+    if stamp is None or len(body) != stat_result.st_size or stamp[0][1] != stat_result.st_mtime_ns:
+        return None
+    asset = CachedAsset(body=body, content_type=get_content_type(mimetype, 'utf-8'), etag=strong_etag(etag), mtime=stat_result.st_mtime,
+                        last_modified=http_date(stat_result.st_mtime), cache_control=cache_control,
+                        encoding=encoding, vary=is_compressible(path))
+    ASSETS.put(key, asset, stamp)
+    return asset
+
+
+def send_asset(directory, filename):
+    """
+    سرو فایل با ETag قوی (هش محتوا یا stat برای ویدیو و فایل بزرگ)، Last-Modified، پاسخ 304 و نسخه‌های ‎.br/.gz
+    نام‌های هش‌دار (images/a.<hash>.webp) به فایل اصلی نگاشت می‌شوند و اگر هش
+    با محتوای فعلی یکی باشد، پاسخ immutable کش می‌شود. فایل‌های کوچک از ASSETS سرو می‌شوند
+    """
+    # Range همیشه از مسیر فایل سرو می‌شود
+    cache_key = None
+    if ASSETS.enabled and 'Range' not in request.headers:
+        cache_key = ASSETS.key(request.path, request.headers.get('Accept-Encoding'))
+        asset = ASSETS.get(cache_key)
+        g.asset_cache = 'miss' if asset is None else 'hit'
+        if asset is not None:
+            return cached_response(asset)
+
+    if safe_join(str(directory), filename) is None:
+        abort(404)
+    path, fingerprint = resolve_fingerprinted(Path(directory), filename)
+    if path is None:
+        abort(404)
+
+    # نسخه ‎.br/.gz ساخته‌شده توسط precompress_assets.py؛ بدون فشرده‌سازی در زمان درخواست
+    body_path, encoding = select_precompressed(path, request.headers.get('Accept-Encoding'))
+    stat_result = os.stat(body_path)
+    mimetype = mimetypes.guess_type(path.name)[0] or 'application/octet-stream'
+    etag = file_validator(body_path, stat_result)
+    current = fingerprint is not None and file_digest(path).startswith(fingerprint)
+    cache_control = cache_control_for(path, fingerprinted=current)
+    if cache_key is not None and ASSETS.admits(stat_result.st_size):
+        asset = cache_file(cache_key, body_path, path, stat_result, mimetype, etag, encoding, cache_control)
+        if asset is not None:
+            return cached_response(asset)
+
+    response = partial_response(body_path, stat_result, etag, mimetype)
+    if response is None:
+        # werkzeug فقط یک بازه را پشتیبانی می‌کند؛ Range این‌جا یا پاسخ داده شده یا عمداً نادیده گرفته شده است
+        request.environ.pop('HTTP_RANGE', None)
+        # conditional=True: werkzeug پاسخ 304 (If-None-Match / If-Modified-Since) را مدیریت می‌کند
+        response = send_file(body_path,
+                             mimetype=mimetype,
+                             etag=etag,
+                             last_modified=stat_result.st_mtime,
+                             conditional=True)
+    if encoding:
+        response.headers['Content-Encoding'] = encoding
+    if is_compressible(path):
+        response.vary.add('Accept-Encoding')
+    response.headers['Cache-Control'] = cache_control
     return response
 
 
 @app.route('/')
 def index():
     """صفحه اصلی"""
-    response = send_file(BASE_DIR / 'index.html')
-    response.headers['Cache-Control'] = 'public, max-age=3600'
-    return response
+    return send_asset(BASE_DIR, 'index.html')
 
 
 @app.route('/gallery.html')
 def gallery():
     """صفحه گالری"""
-    response = send_file(BASE_DIR / 'gallery.html')
-    response.headers['Cache-Control'] = 'public, max-age=3600'
-    return response
+    return send_asset(BASE_DIR, 'gallery.html')
 
 
 @app.route('/errorr.html')
 def errorr():
     """صفحه محصولات ERRORR"""
-    response = send_file(BASE_DIR / 'errorr.html')
-    response.headers['Cache-Control'] = 'public, max-age=3600'
+    return send_asset(BASE_DIR, 'errorr.html')
+
+
+@app.route('/<filename>')
+def serve_root_file(filename):
+    """فایل‌های ROOT_FILES (و نام‌های هش‌دار آن‌ها) از ریشه پروژه، مثل main.py"""
+    if split_fingerprint(filename)[0] not in ROOT_FILES:
+        abort(404)
+    return send_asset(BASE_DIR, filename)
+
+
+def conditional_json(etag, build_payload):
+    """پاسخ JSON با ETag؛ اگر کلاینت نسخه فعلی را دارد، بدنه ساخته نمی‌شود"""
+    if request.if_none_match.contains(etag):
+        response = app.response_class(status=304)
+    else:
+        response = jsonify(build_payload())
+    response.set_etag(etag)
+    response.headers['Cache-Control'] = REVALIDATE_CACHE_CONTROL
     return response
 
+
+@app.route('/api/gallery')
+def gallery_categories():
+    """فهرست دسته‌ها با تعداد تصاویر"""
+    categories = catalog.categories()
+    return conditional_json(catalog.version[:ETAG_LENGTH], lambda: {'categories': categories})
+
+
+@app.route('/api/gallery/<category>')
+def gallery_page(category):
+    """
+    یک صفحه از تصاویر یک دسته: ?cursor=<next از پاسخ قبلی>&limit=<1..100>
+    دسته all همه دسته‌ها را به ترتیب مانیفست برمی‌گرداند
+    """
+    # دسته ناشناخته یک صفحه خالی است (مثل نمایش صفحه برای دسته بدون تصویر)
+    shard = catalog.shard(category) or Shard(category, [])
+    limit = clamp_limit(request.args.get('limit'))
+    try:
+        start = shard.resolve_cursor(request.args.get('cursor'))
+    except InvalidCursor:
+        abort(400)
+
+    return conditional_json(shard.etag(start, limit), lambda: shard.payload(start, limit))
+
+@app.route(STATS_PATH)
+def asset_cache_stats():
+    """شمارنده‌های کش درون‌حافظه‌ای فایل‌ها (فقط برای metrics_allowed)"""
+    if not metrics_allowed(request.remote_addr, request.headers):
+        abort(404)
+    response = jsonify(ASSETS.stats())
+    response.headers['Cache-Control'] = REVALIDATE_CACHE_CONTROL
+    return response
+
+@app.route(METRICS_PATH)
+def metrics():
+    """متریک‌های سرور در قالب متنی Prometheus (فقط برای metrics_allowed)"""
+    if not metrics_allowed(request.remote_addr, request.headers):
+        abort(404)
+    response = app.response_class(METRICS.render_prometheus(), content_type=PROMETHEUS_CONTENT_TYPE)
+    response.headers['Cache-Control'] = REVALIDATE_CACHE_CONTROL
+    return response
+
+# سرو کردن فایل‌های static (CSS, JS, JSON)
+
+
+@app.route('/static/<path:filename>')
+def serve_static(filename):
+    """سرو کردن فایل‌های static"""
+    return send_asset(BASE_DIR / 'static', filename)
+
 # سرو کردن فایل‌های images
 
 
 @app.route('/images/<path:filename>')
 def serve_images(filename):
     """سرو کردن فایل‌های images"""
-    response = send_from_directory(BASE_DIR / 'images', filename)
-    # Cache images for 1 year (immutable)
-    response.headers['Cache-Control'] = 'public, max-age=31536000, immutable'
-    return response
+    # فقط URLهای هش‌دار immutable هستند؛ بقیه با ETag اعتبارسنجی می‌شوند
+    return send_asset(BASE_DIR / 'images', filename)
 
 # سرو کردن فایل‌های videos
 
@@ -69,10 +311,7 @@ def serve_images(filename):
 @app.route('/videos/<path:filename>')
 def serve_videos(filename):
     """سرو کردن فایل‌های videos"""
-    response = send_from_directory(BASE_DIR / 'videos', filename)
-    # Cache videos for 1 year (immutable)
-    response.headers['Cache-Control'] = 'public, max-age=31536000, immutable'
-    return response
+    return send_asset(BASE_DIR / 'videos', filename)
 
 # سرو کردن favicon و فایل‌های دیگر در root
 
@@ -82,12 +321,12 @@ def favicon():
     """سرو کردن favicon"""
     favicon_path = BASE_DIR / 'favicon.ico'
     if favicon_path.exists():
-        response = send_file(favicon_path)
-        response.headers['Cache-Control'] = 'public, max-age=31536000, immutable'
-        return response
+        return send_asset(BASE_DIR, 'favicon.ico')
     return '', 404
 
 
 if __name__ == '__main__':
+    # لاگ دسترسی متنی سرور توسعه werkzeug تکرار لاگ JSON است
+    logging.getLogger('werkzeug').setLevel(logging.WARNING)
     port = int(os.environ.get('PORT', 8000))
     app.run(host='0.0.0.0', port=port, debug=False)
@@ -0,0 +1,293 @@
+"""
+In-memory cache of hot assets shared by main.py and app.py
+بایت‌های فایل‌های پرتکرار (HTML، CSS، JS، مانیفست‌ها و تصاویر کوچک) را همراه با هدرهای از پیش
+محاسبه‌شده نگه می‌دارد تا پاسخ تکراری بدون resolve مسیر، stat، open و هش سرو شود.
+
+- کلید: مسیر URL + ترتیب Content-Encodingهایی که کلاینت می‌پذیرد (همان ورودی select_precompressed)
+- بودجه کل بایت‌ها ASSET_CACHE_BYTES است و کم‌استفاده‌ترین‌ها (LRU) حذف می‌شوند؛ فایل‌های بزرگ‌تر از
+  ASSET_CACHE_MAX_FILE (ویدیوها) و درخواست‌های Range هرگز از کش نمی‌گذرند
+- ابطال: روی لینوکس inotify روی دایرکتوری فایل‌های کش‌شده؛ در غیر این صورت هر ورودی حداکثر
+  هر ASSET_CACHE_CHECK_INTERVAL ثانیه با stat فایل و دایرکتوری‌اش (برای نسخه‌های ‎.br/.gz تازه) بررسی می‌شود
+
+ASSET_CACHE_BYTES=0 کش را خاموش می‌کند.
+"""
+from __future__ import annotations
+
+import os
+import sys
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Set, Tuple
+
+import inotify_watch
+from precompress_assets import ENCODINGS, is_compressible, parse_accept_encoding
+
+ASSET_CACHE_BYTES = int(os.environ.get('ASSET_CACHE_BYTES', 32 * 1024 * 1024))
+ASSET_CACHE_MAX_FILE = int(os.environ.get('ASSET_CACHE_MAX_FILE', 1024 * 1024))
+# فقط وقتی inotify در دسترس نیست
+ASSET_CACHE_CHECK_INTERVAL = float(os.environ.get('ASSET_CACHE_CHECK_INTERVAL', 1.0))
+
+# شمارنده‌های کش به‌صورت JSON (هر دو سرور)
+STATS_PATH = '/api/asset-cache'
+
+Stamp = Tuple[Tuple[str, int, int, int], ...]
+
+
+def asset_stamp(served_path: str, original_path: str) -> Optional[Stamp]:
+    """
+    فایل سروشده (مثلاً a.css.br)، فایل اصلی و دایرکتوری آن؛ mtime دایرکتوری با ساخته شدن نسخه
+    فشرده جدید تغییر می‌کند. دایرکتوری همیشه آخرین عضو است
+    """
+    paths = [os.fspath(served_path)]
+    original_path = os.fspath(original_path)
+    if original_path not in paths:
+        paths.append(original_path)
+    paths.append(os.path.dirname(original_path))
+    return stat_stamp(paths)
+
+
+def stat_stamp(paths: List[str]) -> Optional[Stamp]:
+    """(مسیر، mtime_ns، size، inode) هر مسیر؛ None اگر یکی وجود نداشته باشد"""
+    stamp = []
+    for path in paths:
+        try:
+            st = os.stat(path)
+        except OSError:
+            return None
+        stamp.append((path, st.st_mtime_ns, st.st_size, st.st_ino))
+    return tuple(stamp)
+
+
+def accepted_encodings(url_path: str, accept_encoding: Optional[str]) -> Tuple[str, ...]:
+    """Content-Encodingهای قابل قبول به ترتیب ترجیح؛ دو هدر با خروجی یکسان یک ورودی کش دارند"""
+    if not accept_encoding or not is_compressible(url_path):
+        return ()
+    accepted = parse_accept_encoding(accept_encoding)
+    wildcard = accepted.get('*', 0.0)
+    ranked = sorted((-accepted.get(coding, wildcard), preference, coding)
+                    for preference, (coding, _) in enumerate(ENCODINGS)
+                    if accepted.get(coding, wildcard) > 0)
+    return tuple(coding for _, _, coding in ranked)
+
+
+@dataclass
+class CachedAsset:
+    """بدنه و هدرهای پاسخ 200 یک فایل"""
+
+    body: bytes
+    content_type: str
+    etag: str
+    mtime: float
+    last_modified: str
+    cache_control: str
+    encoding: Optional[str] = None
+    vary: bool = False
+    # خروجی asset_stamp: فایل سروشده، فایل اصلی (اگر متفاوت است) و دایرکتوری فایل اصلی
+    paths: List[str] = field(default_factory=list)
+    stamp: Optional[Stamp] = None
+    checked_at: float = 0.0
+
+    headers: List[Tuple[str, str]] = field(init=False)
+
+    def __post_init__(self) -> None:
+        # هدرهای پاسخ 200 یک بار ساخته می‌شوند (Cache-Control و Connection را سرور اضافه می‌کند)
+        self.headers = [
+            ('Content-Type', self.content_type),
+            ('Content-Length', str(len(self.body))),
+            ('Accept-Ranges', 'bytes'),
+        ]
+        if self.encoding:
+            self.headers.append(('Content-Encoding', self.encoding))
+        if self.vary:
+            self.headers.append(('Vary', 'Accept-Encoding'))
+        self.headers.append(('Last-Modified', self.last_modified))
+        self.headers.append(('ETag', self.etag))
+
+
+class DirectoryWatcher:
+    """inotify غیربازگشتی روی دایرکتوری فایل‌های کش‌شده (inotify_watch.py، مشترک با watch_assets.py)"""
+
+    MASK = (inotify_watch.IN_MODIFY | inotify_watch.IN_ATTRIB | inotify_watch.IN_CLOSE_WRITE
+            | inotify_watch.IN_MOVED_FROM | inotify_watch.IN_MOVED_TO | inotify_watch.IN_CREATE
+            | inotify_watch.IN_DELETE | inotify_watch.IN_DELETE_SELF)
+
+    def __init__(self, on_change, on_overflow) -> None:
+        # fd مسدودکننده؛ نخ daemon روی read منتظر می‌ماند
+        self._inotify = inotify_watch.Inotify(blocking=True)
+        self._on_change = on_change
+        self._on_overflow = on_overflow
+        self._paths: Dict[int, str] = {}
+        self._watched: Set[str] = set()
+        self._lock = threading.Lock()
+        threading.Thread(target=self._run, name='asset-cache-inotify', daemon=True).start()
+
+    def watch(self, directory: str) -> bool:
+        with self._lock:
+            if directory in self._watched:
+                return True
+            wd = self._inotify.add_watch(directory, self.MASK)
+            if wd < 0:
+                return False
+            self._paths[wd] = directory
+            self._watched.add(directory)
+            return True
+
+    def _run(self) -> None:
+        while True:
+            try:
+                events = self._inotify.read_events()
+            except OSError:
+                return
+            for wd, mask, name in events:
+                if mask & inotify_watch.IN_Q_OVERFLOW:
+                    self._on_overflow()
+                    continue
+                with self._lock:
+                    base = self._paths.get(wd)
+                    if mask & inotify_watch.IN_IGNORED:
+                        self._paths.pop(wd, None)
+                        self._watched.discard(base)
+                if base is None:
+                    continue
+                if mask & (inotify_watch.IN_IGNORED | inotify_watch.IN_DELETE_SELF):
+                    self._on_change(base, directory=True)
+                elif name:
+                    self._on_change(os.path.join(base, name))
+
+
+class AssetCache:
+    """
+    LRU با بودجه بایت
+    get() در حالت inotify هیچ syscallی ندارد؛ در غیر این صورت حداکثر هر check_interval یک بار stat می‌کند
+    """
+
+    def __init__(self, max_bytes: int = ASSET_CACHE_BYTES, max_file_bytes: int = ASSET_CACHE_MAX_FILE,
+                 check_interval: float = ASSET_CACHE_CHECK_INTERVAL, use_inotify: bool = True) -> None:
+        self.max_bytes = max(0, max_bytes)
+        self.max_file_bytes = min(max_file_bytes, self.max_bytes)
+        self.check_interval = check_interval
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+        self.size = 0
+        self._entries: 'OrderedDict[tuple, CachedAsset]' = OrderedDict()
+        # مسیر فایل -> کلیدهایی که به آن وابسته‌اند
+        self._dependents: Dict[str, Set[tuple]] = {}
+        self._lock = threading.Lock()
+        self._watcher: Optional[DirectoryWatcher] = None
+        if self.enabled and use_inotify and sys.platform.startswith('linux'):
+            try:
+                self._watcher = DirectoryWatcher(self._invalidate_path, self.clear)
+            except (OSError, AttributeError):
+                self._watcher = None
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_bytes > 0
+
+    @staticmethod
+    def key(url_path: str, accept_encoding: Optional[str]) -> tuple:
+        return url_path, accepted_encodings(url_path, accept_encoding)
+
+    def get(self, key: tuple) -> Optional[CachedAsset]:
+        if not self.enabled:
+            return None
+        with self._lock:
+            asset = self._entries.get(key)
+            if asset is None:
+                self.misses += 1
+                return None
+        if self._watcher is None:
+            now = time.monotonic()
+            if now - asset.checked_at >= self.check_interval:
+                if stat_stamp(asset.paths) != asset.stamp:
+                    with self._lock:
+                        if self._entries.get(key) is asset:
+                            self._remove(key)
+                            self.invalidations += 1
+                        self.misses += 1
+                    return None
+                asset.checked_at = now
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+            self.hits += 1
+        return asset
+
+    def admits(self, size: int) -> bool:
+        return self.enabled and size <= self.max_file_bytes
+
+    def put(self, key: tuple, asset: CachedAsset, stamp: Optional[Stamp]) -> None:
+        """stamp (asset_stamp) باید پیش از خواندن بدنه گرفته شده باشد تا تغییر هم‌زمان کش کهنه نسازد"""
+        if not self.admits(len(asset.body)) or stamp is None:
+            return
+        asset.stamp = stamp
+        asset.paths = [entry[0] for entry in stamp]
+        asset.checked_at = time.monotonic()
+        if self._watcher is not None and not self._watcher.watch(asset.paths[-1]):
+            return
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = asset
+            self.size += len(asset.body)
+            for path in asset.paths[:-1]:
+                self._dependents.setdefault(path, set()).add(key)
+            while self.size > self.max_bytes and self._entries:
+                self._remove(next(iter(self._entries)))
+                self.evictions += 1
+        if self._watcher is not None and stat_stamp(asset.paths) != stamp:
+            # فایل بین stat و ثبت watch تغییر کرده است
+            self._invalidate_path(asset.paths[-1], directory=True)
+
+    def _remove(self, key: tuple) -> None:
+        asset = self._entries.pop(key)
+        self.size -= len(asset.body)
+        for path in asset.paths[:-1]:
+            keys = self._dependents.get(path)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._dependents[path]
+
+    def _invalidate_path(self, path: str, directory: bool = False) -> None:
+        # ساخته شدن a.css.br ورودی‌های a.css را هم باطل می‌کند
+        candidates = {path}
+        for _, suffix in ENCODINGS:
+            if path.endswith(suffix):
+                candidates.add(path[:-len(suffix)])
+        with self._lock:
+            keys = set()
+            for candidate in candidates:
+                keys.update(self._dependents.get(candidate, ()))
+            if directory:
+                keys.update(key for key, asset in self._entries.items() if asset.paths[-1] == path)
+            for key in keys:
+                if key in self._entries:
+                    self._remove(key)
+                    self.invalidations += 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self.invalidations += len(self._entries)
+            self._entries.clear()
+            self._dependents.clear()
+            self.size = 0
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_ratio': round(self.hits / lookups, 4) if lookups else 0.0,
+                'evictions': self.evictions,
+                'invalidations': self.invalidations,
+                'entries': len(self._entries),
+                'bytes': self.size,
+                'max_bytes': self.max_bytes,
+                'invalidation': 'inotify' if self._watcher is not None else f'stat/{self.check_interval:g}s',
+            }
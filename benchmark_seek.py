@@ -0,0 +1,135 @@
+"""
+Seek latency benchmark for HTTP Range support
+بنچمارک زمان seek ویدیو: با پشتیبانی Range زمان پاسخ یک seek نباید به حجم فایل وابسته باشد.
+
+فایل‌های آزمایشی با حجم‌های مختلف در یک پوشه موقت داخل پروژه ساخته می‌شوند، سرور (main.py یا app.py)
+در یک پروسه جدا اجرا می‌شود و برای هر فایل چند seek تصادفی (Range: bytes=N- و خواندن یک تکه ۲۵۶KB،
+مثل مرورگر) اندازه‌گیری می‌شود. اولین seek هر فایل روی کش سرد سرور است و جداگانه گزارش می‌شود.
+اگر میانه یا اولین seek بزرگ‌ترین فایل بیش از --max-ratio برابر کوچک‌ترین فایل باشد، خروجی با کد 1
+تمام می‌شود. تست‌های خودکار همین رفتار در tests/test_http_range.py هستند.
+
+Usage:
+    python benchmark_seek.py                       # main.py، فایل‌های 1/32/256 مگابایتی
+    python benchmark_seek.py --server app --size 1 --size 512
+"""
+from __future__ import annotations
+
+import argparse
+import http.client
+import json
+import random
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Dict, List
+
+from benchmark_server import BASE_DIR, free_port, percentile, start_server
+
+DEFAULT_SIZES_MB = [1, 32, 256]
+# مقداری که پخش‌کننده ویدیو پس از seek پیش از شروع پخش می‌خواند
+SEEK_READ_BYTES = 256 * 1024
+SERVERS = {"main": "main.py", "app": "app.py"}
+
+
+def make_file(directory: Path, size_mb: int) -> Path:
+    path = directory / f"seek-{size_mb}mb.mp4"
+    chunk = random.randbytes(1024 * 1024)
+    with path.open("wb") as f:
+        for _ in range(size_mb):
+            f.write(chunk)
+    return path
+
+
+def measure_seeks(port: int, url_path: str, size: int, seeks: int) -> Dict[str, float]:
+    conn = http.client.HTTPConnection("127.0.0.1", port, timeout=60)
+    latencies: List[float] = []
+    rng = random.Random(size)
+    try:
+        for _ in range(seeks):
+            offset = rng.randrange(0, max(1, size - SEEK_READ_BYTES))
+            started = time.perf_counter()
+            conn.request("GET", url_path, headers={"Range": f"bytes={offset}-"})
+            response = conn.getresponse()
+            if response.status != 206:
+                raise RuntimeError(f"{url_path}: expected 206, got {response.status}")
+            response.read(SEEK_READ_BYTES)
+            latencies.append(time.perf_counter() - started)
+            # مثل مرورگر، بقیه پاسخ رها می‌شود و اتصال تازه برای seek بعدی باز می‌شود
+            conn.close()
+    finally:
+        conn.close()
+    first = latencies[0]
+    latencies.sort()
+    return {
+        "seeks": seeks,
+        "first_seek_ms": round(first * 1000, 2),
+        "seek_p50_ms": round(percentile(latencies, 0.50) * 1000, 2),
+        "seek_p95_ms": round(percentile(latencies, 0.95) * 1000, 2),
+        "seek_mean_ms": round(statistics.fmean(latencies) * 1000, 2),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Seek latency vs. file size for HTTP Range requests")
+    parser.add_argument("--server", choices=sorted(SERVERS), default="main")
+    parser.add_argument("--size", type=int, action="append", metavar="MB",
+                        help="test file size(s) in MB (default: 1, 32, 256)")
+    parser.add_argument("--seeks", type=int, default=50, help="seeks per file")
+    parser.add_argument("--max-ratio", type=float, default=3.0,
+                        help="fail if the largest file's median seek is this many times slower than the smallest")
+    parser.add_argument("--json", type=Path, help="write results to this JSON file")
+    args = parser.parse_args()
+
+    sizes = sorted(args.size or DEFAULT_SIZES_MB)
+    videos_dir = BASE_DIR / "videos"
+    created_videos_dir = not videos_dir.exists()
+    videos_dir.mkdir(exist_ok=True)
+    # هر دو سرور پوشه videos را سرو می‌کنند
+    workdir = Path(tempfile.mkdtemp(prefix=".seek-bench-", dir=videos_dir))
+    proc = None
+    results: List[Dict[str, float]] = []
+    try:
+        files = [make_file(workdir, size_mb) for size_mb in sizes]
+        port = free_port()
+        proc = start_server("threaded", port, script=SERVERS[args.server])
+        for size_mb, path in zip(sizes, files):
+            url_path = "/" + path.relative_to(BASE_DIR).as_posix()
+            row = {"size_mb": size_mb, **measure_seeks(port, url_path, path.stat().st_size, args.seeks)}
+            results.append(row)
+    finally:
+        if proc is not None:
+            proc.terminate()
+            proc.wait(timeout=10)
+        shutil.rmtree(workdir, ignore_errors=True)
+        if created_videos_dir:
+            videos_dir.rmdir()
+
+    print(f"\n== seek latency ({args.server}) ==")
+    print(f"{'size MB':>8} {'first ms':>9} {'p50 ms':>9} {'p95 ms':>9} {'mean ms':>9}")
+    for row in results:
+        print(f"{row['size_mb']:>8} {row['first_seek_ms']:>9} {row['seek_p50_ms']:>9} "
+              f"{row['seek_p95_ms']:>9} {row['seek_mean_ms']:>9}")
+
+    def size_ratio(key: str) -> float:
+        smallest, largest = results[0][key], results[-1][key]
+        return largest / smallest if smallest else 0.0
+
+    ratio = size_ratio("seek_p50_ms")
+    first_ratio = size_ratio("first_seek_ms")
+    print(f"\nmedian seek ratio {sizes[-1]} MB / {sizes[0]} MB: {ratio:.2f} (limit {args.max_ratio:g})")
+    print(f"first (cold) seek ratio {sizes[-1]} MB / {sizes[0]} MB: {first_ratio:.2f} (limit {args.max_ratio:g})")
+
+    if args.json:
+        args.json.write_text(json.dumps({"server": args.server, "results": results, "ratio": ratio,
+                                         "first_ratio": first_ratio}, indent=2),
+                             encoding="utf-8")
+        print(f"Results written to {args.json}")
+    if max(ratio, first_ratio) > args.max_ratio:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,209 @@
+"""
+Load benchmark for main.py
+بنچمارک بار برای سرور main.py
+
+سرور را در یک پروسه جدا اجرا می‌کند و با N اتصال هم‌زمان keep-alive صفحات گالری را درخواست می‌کند.
+
+Usage:
+    python benchmark_server.py                         # threaded, 50/100/200 connections
+    python benchmark_server.py --mode single --mode threaded
+    python benchmark_server.py --url http://localhost:8000 --concurrency 200
+"""
+from __future__ import annotations
+
+import argparse
+import http.client
+import json
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import threading
+import time
+from pathlib import Path
+from typing import Dict, List, Optional
+from urllib.parse import urlsplit
+
+BASE_DIR = Path(__file__).resolve().parent
+
+DEFAULT_PATHS = [
+    "/gallery.html",
+    "/index.html",
+    "/errorr.html",
+    "/static/js/gallery-page.js",
+    "/static/css/styles.css",
+    "/gallery-data.json",
+]
+DEFAULT_CONCURRENCY = [50, 100, 200]
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def wait_for_port(host: str, port: int, timeout: float = 10.0) -> None:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            with socket.create_connection((host, port), timeout=0.5):
+                return
+        except OSError:
+            time.sleep(0.05)
+    raise RuntimeError(f"server on {host}:{port} did not start within {timeout}s")
+
+
+def start_server(mode: str, port: int, extra_env: Optional[Dict[str, str]] = None,
+                 script: str = "main.py") -> subprocess.Popen:
+    env = dict(os.environ, PORT=str(port), SERVER_MODE=mode)
+    env.update(extra_env or {})
+    proc = subprocess.Popen(
+        [sys.executable, str(BASE_DIR / script)],
+        cwd=BASE_DIR,
+        env=env,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+    wait_for_port("127.0.0.1", port)
+    return proc
+
+
+def _client_worker(host: str, port: int, paths: List[str], stop_at: float,
+                   latencies: List[float], counters: Dict[str, int], lock: threading.Lock) -> None:
+    conn: Optional[http.client.HTTPConnection] = None
+    local_latencies: List[float] = []
+    requests_done = errors = bytes_read = 0
+    index = 0
+    while time.monotonic() < stop_at:
+        path = paths[index % len(paths)]
+        index += 1
+        if conn is None:
+            conn = http.client.HTTPConnection(host, port, timeout=30)
+        started = time.perf_counter()
+        try:
+            conn.request("GET", path, headers={"Accept-Encoding": "identity"})
+            response = conn.getresponse()
+            body = response.read()
+            if response.status >= 400:
+                errors += 1
+            if response.will_close:
+                conn.close()
+                conn = None
+        except (OSError, http.client.HTTPException):
+            errors += 1
+            if conn is not None:
+                conn.close()
+            conn = None
+            continue
+        local_latencies.append(time.perf_counter() - started)
+        requests_done += 1
+        bytes_read += len(body)
+    if conn is not None:
+        conn.close()
+    with lock:
+        latencies.extend(local_latencies)
+        counters["requests"] += requests_done
+        counters["errors"] += errors
+        counters["bytes"] += bytes_read
+
+
+def percentile(sorted_values: List[float], fraction: float) -> float:
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, int(round(fraction * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+
+def run_load(url: str, concurrency: int, duration: float, paths: List[str]) -> Dict[str, float]:
+    """یک دور بار با `concurrency` کلاینت هم‌زمان به مدت `duration` ثانیه"""
+    parts = urlsplit(url)
+    host, port = parts.hostname or "127.0.0.1", parts.port or 80
+    latencies: List[float] = []
+    counters = {"requests": 0, "errors": 0, "bytes": 0}
+    lock = threading.Lock()
+    stop_at = time.monotonic() + duration
+    threads = [
+        threading.Thread(
+            target=_client_worker,
+            args=(host, port, paths, stop_at, latencies, counters, lock),
+            daemon=True,
+        )
+        for _ in range(concurrency)
+    ]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+
+    latencies.sort()
+    return {
+        "concurrency": concurrency,
+        "duration_s": round(elapsed, 3),
+        "requests": counters["requests"],
+        "errors": counters["errors"],
+        "requests_per_s": round(counters["requests"] / elapsed, 1) if elapsed else 0.0,
+        "mb_per_s": round(counters["bytes"] / elapsed / (1024 * 1024), 2) if elapsed else 0.0,
+        "latency_p50_ms": round(percentile(latencies, 0.50) * 1000, 2),
+        "latency_p95_ms": round(percentile(latencies, 0.95) * 1000, 2),
+        "latency_p99_ms": round(percentile(latencies, 0.99) * 1000, 2),
+        "latency_mean_ms": round(statistics.fmean(latencies) * 1000, 2) if latencies else 0.0,
+    }
+
+
+def print_table(mode: str, results: List[Dict[str, float]]) -> None:
+    print(f"\n== mode: {mode} ==")
+    print(f"{'conns':>6} {'req/s':>9} {'MB/s':>8} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'errors':>7}")
+    for row in results:
+        print(
+            f"{row['concurrency']:>6} {row['requests_per_s']:>9} {row['mb_per_s']:>8} "
+            f"{row['latency_p50_ms']:>9} {row['latency_p95_ms']:>9} {row['latency_p99_ms']:>9} "
+            f"{row['errors']:>7}"
+        )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Load benchmark for the NAROON HTTP server")
+    parser.add_argument("--mode", action="append", choices=["threaded", "single"],
+                        help="server mode(s) to start and benchmark (default: threaded)")
+    parser.add_argument("--url", help="benchmark an already running server instead of starting main.py")
+    parser.add_argument("--concurrency", type=int, action="append",
+                        help="concurrent connections per round (default: 50, 100, 200)")
+    parser.add_argument("--duration", type=float, default=10.0, help="seconds per round")
+    parser.add_argument("--path", action="append", help="request path(s) to cycle through")
+    parser.add_argument("--json", type=Path, help="write results to this JSON file")
+    args = parser.parse_args()
+
+    levels = args.concurrency or DEFAULT_CONCURRENCY
+    paths = args.path or DEFAULT_PATHS
+    report: Dict[str, List[Dict[str, float]]] = {}
+
+    if args.url:
+        results = [run_load(args.url, level, args.duration, paths) for level in levels]
+        print_table(args.url, results)
+        report[args.url] = results
+    else:
+        for mode in args.mode or ["threaded"]:
+            port = free_port()
+            proc = start_server(mode, port)
+            try:
+                results = [
+                    run_load(f"http://127.0.0.1:{port}", level, args.duration, paths)
+                    for level in levels
+                ]
+            finally:
+                proc.terminate()
+                proc.wait(timeout=10)
+            print_table(mode, results)
+            report[mode] = results
+
+    if args.json:
+        args.json.write_text(json.dumps(report, indent=2), encoding="utf-8")
+        print(f"\nResults written to {args.json}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,339 @@
+"""
+End-to-end benchmark suite
+بنچمارک مقیاس‌پذیری ابزارهای build و سرورها روی درخت‌های مصنوعی بزرگ
+
+- gather:  gather_images_for_category روی 1k/10k/100k فایل پخش‌شده بین CATEGORIES
+           (cold: ایندکس زمان عکاسی خالی، warm: ایندکس پر)
+- errorr:  gather_errorr_media روی همان تعداد فایل در زیرپوشه‌های errorr-products
+- embed:   embed_manifest_once.embed_manifest روی مانیفستی با همان تعداد تصویر
+- convert: convert_images_to_webp.main با 1 تا cpu_count پروسه؛ تصویر در ثانیه به ازای هر هسته
+- server:  req/s و p50/p99 برای main.py و app.py با بارگذار benchmark_server.py
+
+درخت‌ها در یک پوشه موقت ساخته می‌شوند و مسیرهای ماژول‌ها (IMAGES_DIR، ERRORR_DIR، BASE_DIR) فقط
+در طول اندازه‌گیری به آن اشاره می‌کنند؛ فایل‌های پروژه دست نمی‌خورند. نتیجه همراه با commit فعلی
+در JSON نوشته می‌شود و --compare آن را با اجرای قبلی مقایسه می‌کند.
+
+Usage:
+    python benchmark_suite.py                                  # همه بنچمارک‌ها، 1k/10k/100k
+    python benchmark_suite.py --only gather --only embed --size 10000
+    python benchmark_suite.py --output after.json --compare before.json
+"""
+from __future__ import annotations
+
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import random
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from typing import Callable, Dict, Iterator, List, Optional
+
+from PIL import Image
+
+import convert_images_to_webp
+import embed_manifest_once
+import update_errorr_media
+import update_manifest_from_fs
+from benchmark_server import BASE_DIR, free_port, run_load, start_server
+from capture_dates import CaptureIndex
+
+BENCHMARKS = ["gather", "errorr", "embed", "convert", "server"]
+DEFAULT_SIZES = [1_000, 10_000, 100_000]
+DEFAULT_OUTPUT = Path("benchmark-results.json")
+
+ERRORR_FILES_PER_DIR = 50
+CONVERT_IMAGES = 48
+CONVERT_SIZE = (1600, 1200)
+SERVER_CONCURRENCY = 50
+SERVER_DURATION = 5.0
+# مسیرهایی که هر سرور سرو می‌کند (app.py نه index.html دارد و نه gallery-data.json ریشه)
+SERVER_PATHS = {
+    "main.py": [
+        "/gallery.html",
+        "/index.html",
+        "/static/js/gallery-page.js",
+        "/static/css/styles.css",
+        "/gallery-data.json",
+    ],
+    "app.py": [
+        "/gallery.html",
+        "/",
+        "/static/js/gallery-page.js",
+        "/static/css/styles.css",
+        "/api/gallery/all",
+    ],
+}
+
+
+@contextlib.contextmanager
+def redirected(module, **values) -> Iterator[None]:
+    """مسیرهای سطح ماژول را موقتاً به درخت مصنوعی اشاره می‌دهد"""
+    previous = {name: getattr(module, name) for name in values}
+    for name, value in values.items():
+        setattr(module, name, value)
+    try:
+        yield
+    finally:
+        for name, value in previous.items():
+            setattr(module, name, value)
+
+
+def timed(fn: Callable[[], object], repeat: int = 3) -> float:
+    """میانه زمان اجرا (ثانیه)"""
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - started)
+    return statistics.median(samples)
+
+
+def synthetic_name(i: int, rng: random.Random) -> str:
+    """نام‌ها با همان الگوهای تصاویر واقعی: خروجی تلگرام، دوربین گوشی و نام بدون تاریخ"""
+    taken = datetime(2020, 1, 1) + timedelta(seconds=rng.randrange(6 * 365 * 86400))
+    kind = i % 4
+    if kind < 2:
+        return f"photo_{i % 50 + 1}_{taken:%Y-%m-%d_%H-%M-%S}_{i}.webp"
+    if kind == 2:
+        return f"{taken:%Y%m%d_%H%M%S}_{i}.webp"
+    return f"{rng.getrandbits(64):016x}.webp"
+
+
+def make_gallery_tree(root: Path, count: int, seed: int = 0) -> Dict[str, List[str]]:
+    """فایل‌های خالی زیر images/<category>؛ خروجی: مانیفست با مسیرهای ساخته‌شده"""
+    rng = random.Random(seed)
+    categories = update_manifest_from_fs.CATEGORIES
+    manifest: Dict[str, List[str]] = {category: [] for category in categories}
+    for category in categories:
+        (root / "images" / category).mkdir(parents=True, exist_ok=True)
+    for i in range(count):
+        category = categories[i % len(categories)]
+        rel = f"images/{category}/{synthetic_name(i, rng)}"
+        (root / rel).touch()
+        manifest[category].append(rel)
+    return manifest
+
+
+def make_errorr_tree(root: Path, count: int) -> None:
+    errorr_dir = root / "images" / "errorr-products"
+    for i in range(count):
+        directory = errorr_dir / str(i // ERRORR_FILES_PER_DIR + 1)
+        if i % ERRORR_FILES_PER_DIR == 0:
+            directory.mkdir(parents=True, exist_ok=True)
+        (directory / f"IMG_{i:06d}.webp").touch()
+    videos = root / "videos"
+    videos.mkdir(exist_ok=True)
+    for name in ("IMG_4076_1_1.mp4", "IMG_4076_1_1_optimized.mp4", "errorr-intro.mp4", "hero.mp4"):
+        (videos / name).touch()
+
+
+def bench_gather(root: Path, count: int) -> Dict[str, float]:
+    categories = update_manifest_from_fs.CATEGORIES
+    index_path = root / "images" / ".capture-index.json"
+    with redirected(update_manifest_from_fs, BASE_DIR=root, IMAGES_DIR=root / "images"):
+        def cold():
+            index_path.unlink(missing_ok=True)
+            dates = CaptureIndex(root, index_path)
+            for category in categories:
+                update_manifest_from_fs.gather_images_for_category(category, dates)
+            dates.save()
+
+        cold_s = timed(cold)
+        dates = CaptureIndex(root, index_path)
+        warm_s = timed(lambda: [update_manifest_from_fs.gather_images_for_category(c, dates) for c in categories])
+    return {
+        "files": count,
+        "cold_s": round(cold_s, 4),
+        "warm_s": round(warm_s, 4),
+        "warm_files_per_s": round(count / warm_s) if warm_s else 0,
+    }
+
+
+def bench_errorr(root: Path, count: int) -> Dict[str, float]:
+    make_errorr_tree(root, count)
+    with redirected(update_errorr_media, BASE_DIR=root,
+                    ERRORR_DIR=root / "images" / "errorr-products", VIDEOS_DIR=root / "videos"):
+        found = len(update_errorr_media.gather_errorr_media())
+        seconds = timed(update_errorr_media.gather_errorr_media)
+    return {"files": found, "seconds": round(seconds, 4), "files_per_s": round(found / seconds) if seconds else 0}
+
+
+def bench_embed(root: Path, manifest: Dict[str, List[str]]) -> Dict[str, float]:
+    html_path = root / embed_manifest_once.GALLERY_HTML.name
+    shutil.copyfile(embed_manifest_once.GALLERY_HTML, html_path)
+    data = json.dumps(manifest, ensure_ascii=False, indent=4)
+    seconds = timed(lambda: embed_manifest_once.embed_manifest(data, html_path))
+    return {
+        "items": sum(len(paths) for paths in manifest.values()),
+        "manifest_bytes": len(data.encode("utf-8")),
+        "seconds": round(seconds, 4),
+    }
+
+
+def make_convert_sources(directory: Path, count: int, size=CONVERT_SIZE) -> int:
+    """JPEGهای مصنوعی با گرادیان و نویز (شبیه عکس، نه رنگ تخت)؛ خروجی: مجموع بایت‌ها"""
+    directory.mkdir(parents=True, exist_ok=True)
+    total = 0
+    for i in range(count):
+        gradient = Image.radial_gradient("L").resize(size)
+        noise = Image.effect_noise(size, 24 + i % 16)
+        img = Image.merge("RGB", (gradient, noise, Image.blend(gradient, noise, 0.5)))
+        path = directory / f"{i:04d}.jpg"
+        img.save(path, "JPEG", quality=92)
+        total += path.stat().st_size
+    return total
+
+
+def bench_convert(root: Path, images: int) -> List[Dict[str, float]]:
+    source_dir = root / "images" / "convert"
+    source_bytes = make_convert_sources(source_dir, images)
+    cores = os.cpu_count() or 1
+    workers = sorted({1, *[n for n in (2, 4, 8, 16, 32) if n <= cores], cores})
+    results = []
+    with redirected(convert_images_to_webp, BASE_DIR=root):
+        for count in workers:
+            for output in source_dir.glob("*.webp"):
+                output.unlink()
+            argv = ["--workers", str(count), "--no-cache", "--keep-originals"]
+            started = time.perf_counter()
+            with contextlib.redirect_stdout(io.StringIO()):
+                convert_images_to_webp.main(argv)
+            seconds = time.perf_counter() - started
+            results.append({
+                "workers": count,
+                "images": images,
+                "seconds": round(seconds, 3),
+                "images_per_s": round(images / seconds, 2),
+                "images_per_s_per_core": round(images / seconds / count, 2),
+                "source_mb_per_s": round(source_bytes / seconds / (1024 * 1024), 2),
+            })
+    return results
+
+
+def bench_servers(concurrency: int, duration: float) -> Dict[str, Dict[str, float]]:
+    results = {}
+    for script, paths in SERVER_PATHS.items():
+        port = free_port()
+        proc = start_server("threaded", port, script=script)
+        try:
+            # یک دور کوتاه گرم‌کردن تا کش فایل‌ها و ایندکس گالری پر شوند
+            run_load(f"http://127.0.0.1:{port}", 4, 0.5, paths)
+            results[script] = run_load(f"http://127.0.0.1:{port}", concurrency, duration, paths)
+        finally:
+            proc.terminate()
+            proc.wait(timeout=10)
+    return results
+
+
+def git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=BASE_DIR,
+            capture_output=True, text=True, check=True,
+        ).stdout.strip() or None
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def flatten(value, prefix: str = "") -> Dict[str, float]:
+    """{"gather": {"1000": {"cold_s": ...}}} -> {"gather.1000.cold_s": ...}"""
+    if isinstance(value, dict):
+        items = value.items()
+    elif isinstance(value, list):
+        # ردیف‌های convert با تعداد worker کلید می‌شوند
+        items = ((str(row.get("workers", i)) if isinstance(row, dict) else str(i), row) for i, row in enumerate(value))
+    else:
+        return {prefix: value} if isinstance(value, (int, float)) and not isinstance(value, bool) else {}
+    flat: Dict[str, float] = {}
+    for key, item in items:
+        flat.update(flatten(item, f"{prefix}.{key}" if prefix else str(key)))
+    return flat
+
+
+def compare(baseline: dict, current: dict) -> None:
+    old, new = flatten(baseline.get("results", {})), flatten(current.get("results", {}))
+    print(f"\n== compared with {baseline.get('commit') or 'baseline'} ==")
+    for key in sorted(set(old) & set(new)):
+        if not old[key]:
+            continue
+        change = (new[key] - old[key]) / old[key] * 100
+        print(f"  {key:<48} {old[key]:>12} -> {new[key]:>12}  {change:+7.1f}%")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark the build tooling and servers on large synthetic trees")
+    parser.add_argument("--only", action="append", choices=BENCHMARKS, help="benchmark(s) to run (default: all)")
+    parser.add_argument("--size", type=int, action="append",
+                        help="synthetic tree size in files (default: 1000, 10000, 100000)")
+    parser.add_argument("--convert-images", type=int, default=CONVERT_IMAGES,
+                        help="JPEGs converted per worker count (default: %(default)s)")
+    parser.add_argument("--concurrency", type=int, default=SERVER_CONCURRENCY)
+    parser.add_argument("--duration", type=float, default=SERVER_DURATION, help="seconds per server round")
+    parser.add_argument("--output", type=Path, default=DEFAULT_OUTPUT, help="JSON results file (default: %(default)s)")
+    parser.add_argument("--compare", type=Path, help="earlier results file to print the change against")
+    args = parser.parse_args()
+
+    selected = args.only or BENCHMARKS
+    sizes = args.size or DEFAULT_SIZES
+    results: Dict[str, object] = {}
+
+    with tempfile.TemporaryDirectory(prefix="naroon-bench-") as tmp:
+        for size in sizes if {"gather", "errorr", "embed"} & set(selected) else []:
+            root = Path(tmp) / f"tree-{size}"
+            started = time.perf_counter()
+            manifest = make_gallery_tree(root, size)
+            print(f"[{size} files] tree built in {time.perf_counter() - started:.1f}s")
+            if "gather" in selected:
+                results.setdefault("gather", {})[str(size)] = row = bench_gather(root, size)
+                print(f"  gather_images_for_category: cold {row['cold_s']}s, warm {row['warm_s']}s")
+            if "errorr" in selected:
+                results.setdefault("errorr", {})[str(size)] = row = bench_errorr(root, size)
+                print(f"  gather_errorr_media: {row['seconds']}s ({row['files_per_s']} files/s)")
+            if "embed" in selected:
+                results.setdefault("embed", {})[str(size)] = row = bench_embed(root, manifest)
+                print(f"  embed_manifest: {row['seconds']}s for a {row['manifest_bytes'] / 1048576:.1f} MB manifest")
+            shutil.rmtree(root)
+
+        if "convert" in selected:
+            results["convert"] = bench_convert(Path(tmp) / "convert", args.convert_images)
+            for row in results["convert"]:
+                print(f"[convert] {row['workers']} workers: {row['images_per_s']} images/s "
+                      f"({row['images_per_s_per_core']} per core)")
+
+    if "server" in selected:
+        results["server"] = bench_servers(args.concurrency, args.duration)
+        for script, row in results["server"].items():
+            print(f"[server] {script}: {row['requests_per_s']} req/s, p99 {row['latency_p99_ms']} ms, "
+                  f"{row['errors']} errors")
+
+    report = {
+        "commit": git_commit(),
+        "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "results": results,
+    }
+    args.output.write_text(json.dumps(report, indent=2), encoding="utf-8")
+    print(f"\nResults written to {args.output}")
+
+    if args.compare:
+        try:
+            baseline = json.loads(args.compare.read_text(encoding="utf-8"))
+        except (OSError, ValueError) as exc:
+            print(f"Error: cannot read {args.compare}: {exc}", file=sys.stderr)
+            sys.exit(1)
+        compare(baseline, report)
+
+
+if __name__ == "__main__":
+    main()
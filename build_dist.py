@@ -0,0 +1,420 @@
+"""
+Minimal deploy bundle
+گراف ارجاع دارایی‌ها را از صفحه‌های سایت می‌سازد و فقط فایل‌های قابل دسترس را در dist/ قرار می‌دهد
+
+ریشه‌های گراف:
+    - صفحه‌ها: index.html، gallery.html، errorr.html، pre-production.html
+    - مانیفست‌ها: gallery-data.json، errorr-media.json (و کپی‌های static/data)
+    - سرور: فرمان start در liara.json و app.py، همراه با ماژول‌هایی که import می‌کنند
+
+از هر فایل متنی ارجاع‌ها خوانده می‌شوند: ویژگی‌های src/href/srcset/poster/data-* و اسکریپت و استایل
+درون HTML، url() و ‎@import در CSS، رشته‌های ثابت JS، مقادیر (و کلیدهای) JSON، خطوط playlist در
+m3u8 و vtt. نام‌های هش‌دار fingerprint_assets.py به فایل اصلی نگاشت می‌شوند و نسخه‌های .br/.gz
+کنار هر فایل قابل دسترس هم کپی می‌شوند.
+
+فایل‌ها در dist/ به‌صورت hard link (و در صورت عدم امکان کپی) قرار می‌گیرند؛ اجرای دوباره فقط فایل‌های
+تغییرکرده را جایگزین و فایل‌های اضافی dist/ را حذف می‌کند. در پایان فایل‌های بدون ارجاع با حجمشان
+گزارش می‌شوند.
+
+Usage:
+    python build_dist.py
+    python build_dist.py --dry-run       # فقط گزارش؛ dist/ ساخته نمی‌شود
+    python build_dist.py --all           # فهرست کامل فایل‌های بدون ارجاع
+"""
+from __future__ import annotations
+
+import argparse
+import ast
+import json
+import os
+import re
+import shutil
+import sys
+from collections import deque
+from html.parser import HTMLParser
+from pathlib import Path, PurePosixPath
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+from urllib.parse import unquote, urlsplit
+
+from fingerprint_assets import split_fingerprint
+from precompress_assets import ENCODINGS
+
+BASE_DIR = Path(__file__).resolve().parent
+DIST_DIR = BASE_DIR / "dist"
+
+PAGE_ROOTS = [
+    "index.html",
+    "gallery.html",
+    "errorr.html",
+    "pre-production.html",
+]
+MANIFEST_ROOTS = [
+    "gallery-data.json",
+    "errorr-media.json",
+    "static/data/gallery-data.json",
+    "static/data/errorr-media.json",
+]
+# فایل‌های استقرار که خود سرور آن‌ها را نمی‌خواند
+DEPLOY_FILES = ["liara.json", "requirements.txt"]
+SERVER_ROOTS = ["app.py"]
+LIARA_CONFIG = "liara.json"
+
+# در فهرست فایل‌های بدون ارجاع نمی‌آیند
+SKIP_DIRS = {".git", "__pycache__", ".pytest_cache", ".mypy_cache", ".ruff_cache", ".venv", "venv"}
+
+# پوشه‌های دارایی؛ ارجاع ناموجود به آن‌ها از هر نوع فایلی گزارش می‌شود
+ASSET_DIRS = ("images", "static", "videos")
+# رشته‌های JS/JSON فقط وقتی مسیر حساب می‌شوند که پسوند یکی از این‌ها باشد (یا فایل موجود باشد)
+ASSET_EXTENSIONS = {
+    ".html", ".css", ".js", ".json", ".webmanifest", ".xml", ".txt",
+    ".webp", ".avif", ".jpg", ".jpeg", ".png", ".gif", ".svg", ".ico",
+    ".mp4", ".webm", ".m3u8", ".m4s", ".ts", ".vtt",
+    ".woff", ".woff2", ".ttf",
+}
+
+URL_ATTRIBUTES = {"src", "href", "poster", "action", "data"}
+SRCSET_ATTRIBUTES = {"srcset", "imagesrcset", "data-srcset"}
+CSS_URL_RE = re.compile(r"""url\(\s*(?P<quote>['"]?)(?P<url>[^'")]+?)(?P=quote)\s*\)""")
+CSS_IMPORT_RE = re.compile(r"""@import\s+(?P<quote>['"])(?P<url>[^'"]+)(?P=quote)""")
+# رشته‌های ثابت JS؛ template literalهای دارای ${...} کنار گذاشته می‌شوند
+JS_STRING_RE = re.compile(r"""(?P<quote>['"`])(?P<value>(?:\\.|(?!(?P=quote))[^\\\n])*)(?P=quote)""")
+PLAYLIST_URI_RE = re.compile(r'URI="(?P<url>[^"]+)"')
+START_SCRIPT_RE = re.compile(r"(?P<script>[\w./-]+\.py)\b")
+
+def _posix(path: Path, root: Path) -> str:
+    return path.relative_to(root).as_posix()
+
+
+def resolve_reference(raw: str, base: str, root: Path) -> Tuple[Optional[str], Optional[str]]:
+    """
+    ارجاع داخل فایل base را به مسیر نسبی یک فایل در root تبدیل می‌کند
+    خروجی: (مسیر فایل موجود یا None، مسیر نرمال‌شده برای گزارش ارجاع ناموجود یا None)
+    """
+    raw = raw.strip()
+    if not raw or raw.startswith(("#", "data:", "blob:", "javascript:", "//")):
+        return None, None
+    parts = urlsplit(raw)
+    if parts.scheme or parts.netloc or not parts.path:
+        return None, None
+    path = unquote(parts.path)
+    if path.startswith("/"):
+        candidate = PurePosixPath(path.lstrip("/"))
+    else:
+        candidate = PurePosixPath(base).parent / path
+    # ‎../ داخل CSS؛ مسیرهای خارج از root نادیده گرفته می‌شوند
+    normalized = os.path.normpath(candidate.as_posix()).replace(os.sep, "/")
+    if normalized.startswith("..") or normalized in (".", ""):
+        return None, None
+    for option in (normalized, split_fingerprint(normalized)[0]):
+        try:
+            if (root / option).is_file():
+                return option, None
+        except OSError:
+            return None, None
+    return None, normalized
+
+
+class ReferenceParser(HTMLParser):
+    """ارجاع‌های ویژگی‌ها و متن <script>/<style> یک صفحه"""
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.urls: List[str] = []
+        self.scripts: List[str] = []
+        self.styles: List[str] = []
+        self._raw: Optional[str] = None
+
+    def handle_starttag(self, tag, attrs):
+        for name, value in attrs:
+            if not value:
+                continue
+            if name in SRCSET_ATTRIBUTES:
+                self.urls.extend(entry.split()[0] for entry in value.split(",") if entry.strip())
+            elif name in URL_ATTRIBUTES:
+                self.urls.append(value)
+            elif (name.startswith("data-") or name == "content") and _looks_like_asset(value):
+                # data-image و og:image؛ متن‌های data-fa/data-en مسیر نیستند
+                self.urls.append(value)
+            elif name == "style":
+                self.styles.append(value)
+        if tag in ("script", "style"):
+            self._raw = tag
+
+    def handle_endtag(self, tag):
+        if tag == self._raw:
+            self._raw = None
+
+    def handle_data(self, data):
+        if self._raw == "script":
+            self.scripts.append(data)
+        elif self._raw == "style":
+            self.styles.append(data)
+
+
+def css_references(text: str) -> List[str]:
+    return [m.group("url") for m in CSS_URL_RE.finditer(text)] + [m.group("url") for m in CSS_IMPORT_RE.finditer(text)]
+
+
+def js_references(text: str) -> List[str]:
+    return [m.group("value") for m in JS_STRING_RE.finditer(text) if "${" not in m.group("value")]
+
+
+def json_references(value) -> Iterable[str]:
+    if isinstance(value, str):
+        yield value
+    elif isinstance(value, dict):
+        for key, item in value.items():
+            yield key
+            yield from json_references(item)
+    elif isinstance(value, list):
+        for item in value:
+            yield from json_references(item)
+
+
+def playlist_references(text: str) -> List[str]:
+    """خطوط m3u8 (segment/variant و URI="...") و vtt (تصاویر sprite با ‎#xywh)"""
+    urls = []
+    for line in text.splitlines():
+        line = line.strip()
+        if not line or line.startswith("WEBVTT") or "-->" in line:
+            continue
+        if line.startswith("#"):
+            urls.extend(m.group("url") for m in PLAYLIST_URI_RE.finditer(line))
+        elif "." in line and " " not in line:
+            urls.append(line)
+    return urls
+
+
+def python_imports(path: Path, root: Path) -> List[str]:
+    """ماژول‌های محلی (‎<name>.py در root) که فایل import می‌کند"""
+    try:
+        tree = ast.parse(path.read_text(encoding="utf-8"), filename=str(path))
+    except (OSError, SyntaxError, UnicodeDecodeError):
+        return []
+    names = []
+    for node in ast.walk(tree):
+        if isinstance(node, ast.Import):
+            names.extend(alias.name for alias in node.names)
+        elif isinstance(node, ast.ImportFrom) and node.level == 0 and node.module:
+            names.append(node.module)
+    modules = []
+    for name in names:
+        module = name.split(".")[0] + ".py"
+        if (root / module).is_file():
+            modules.append(module)
+    return modules
+
+
+def extract_references(rel_path: str, root: Path) -> Tuple[List[str], str, bool]:
+    """
+    ارجاع‌های خام یک فایل
+    خروجی: (ارجاع‌ها، فایلی که ارجاع‌های نسبی نسبت به آن حل می‌شوند،
+            آیا هر ارجاع ناموجود گزارش شود یا فقط ارجاع‌های داخل ASSET_DIRS)
+    مسیرهای داخل JS و مانیفست‌ها نسبت به صفحه‌ای که آن‌ها را بارگذاری می‌کند (ریشه سایت) هستند.
+    """
+    path = root / rel_path
+    suffix = path.suffix.lower()
+    if suffix == ".py":
+        return python_imports(path, root), PAGE_ROOTS[0], True
+    if suffix not in (".html", ".css", ".js", ".json", ".webmanifest", ".m3u8", ".vtt"):
+        return [], rel_path, False
+    try:
+        text = path.read_text(encoding="utf-8")
+    except (OSError, UnicodeDecodeError):
+        return [], rel_path, False
+
+    if suffix == ".html":
+        parser = ReferenceParser()
+        parser.feed(text)
+        parser.close()
+        urls = list(parser.urls)
+        for style in parser.styles:
+            urls.extend(css_references(style))
+        for script in parser.scripts:
+            urls.extend(u for u in js_references(script) if _looks_like_asset(u))
+        return urls, rel_path, True
+    if suffix == ".css":
+        return css_references(text), rel_path, True
+    if suffix in (".m3u8", ".vtt"):
+        return playlist_references(text), rel_path, True
+    if suffix == ".js":
+        return [u for u in js_references(text) if _looks_like_asset(u)], PAGE_ROOTS[0], False
+    try:
+        data = json.loads(text)
+    except ValueError:
+        return [], rel_path, False
+    return [u for u in json_references(data) if _looks_like_asset(u)], PAGE_ROOTS[0], False
+
+
+def _looks_like_asset(value: str) -> bool:
+    if not value or len(value) > 1024 or any(c in value for c in "\n<>{} "):
+        return False
+    return PurePosixPath(urlsplit(value).path).suffix.lower() in ASSET_EXTENSIONS
+
+
+def _in_asset_dir(rel_path: str) -> bool:
+    return rel_path.split("/", 1)[0] in ASSET_DIRS
+
+
+def server_roots(root: Path) -> List[str]:
+    """اسکریپت فرمان start در liara.json (پیش‌فرض main.py) و SERVER_ROOTS"""
+    scripts = []
+    try:
+        config = json.loads((root / LIARA_CONFIG).read_text(encoding="utf-8"))
+        match = START_SCRIPT_RE.search(str(config.get("start", "")))
+        if match:
+            scripts.append(match.group("script"))
+    except (OSError, ValueError):
+        pass
+    if not scripts:
+        scripts.append("main.py")
+    return scripts + [s for s in SERVER_ROOTS if s not in scripts]
+
+
+def build_graph(root: Path = BASE_DIR) -> Tuple[Dict[str, Set[str]], Dict[str, Set[str]]]:
+    """
+    پیمایش BFS از ریشه‌ها
+    خروجی: (فایل قابل دسترس -> فایل‌هایی که به آن ارجاع داده‌اند، ارجاع ناموجود -> ارجاع‌دهنده‌ها)
+    """
+    roots = PAGE_ROOTS + MANIFEST_ROOTS + DEPLOY_FILES + server_roots(root)
+    referrers: Dict[str, Set[str]] = {}
+    missing: Dict[str, Set[str]] = {}
+    queue = deque()
+    for rel in roots:
+        if (root / rel).is_file():
+            referrers.setdefault(rel, set())
+            queue.append(rel)
+        else:
+            missing.setdefault(rel, set()).add("(root)")
+
+    while queue:
+        current = queue.popleft()
+        urls, base, report_all = extract_references(current, root)
+        for raw in urls:
+            target, unresolved = resolve_reference(raw, base, root)
+            if target is None:
+                if unresolved and (report_all or _in_asset_dir(unresolved)):
+                    missing.setdefault(unresolved, set()).add(current)
+                continue
+            if target not in referrers:
+                referrers[target] = set()
+                queue.append(target)
+            if target != current:
+                referrers[target].add(current)
+
+    # نسخه‌های از پیش فشرده (precompress_assets.py) همراه فایل اصلی سرو می‌شوند
+    for rel in list(referrers):
+        for _, suffix in ENCODINGS:
+            sibling = rel + suffix
+            if sibling not in referrers and (root / sibling).is_file():
+                referrers[sibling] = {rel}
+    return referrers, missing
+
+
+def inventory(root: Path, skip: Iterable[Path]) -> Dict[str, int]:
+    """همه فایل‌های درخت (به‌جز SKIP_DIRS و خروجی) با حجم"""
+    skip = {p.resolve() for p in skip}
+    files: Dict[str, int] = {}
+    for dirpath, dirnames, filenames in os.walk(root):
+        current = Path(dirpath)
+        dirnames[:] = sorted(d for d in dirnames
+                             if d not in SKIP_DIRS and (current / d).resolve() not in skip)
+        for name in filenames:
+            path = current / name
+            try:
+                files[_posix(path, root)] = path.stat().st_size
+            except OSError:
+                continue
+    return files
+
+
+def _same_file(source: Path, target: Path) -> bool:
+    try:
+        if os.path.samefile(source, target):
+            return True
+        src, dst = source.stat(), target.stat()
+    except OSError:
+        return False
+    return src.st_size == dst.st_size and src.st_mtime_ns == dst.st_mtime_ns
+
+
+def sync_dist(files: Iterable[str], root: Path, out_dir: Path) -> Tuple[int, int]:
+    """
+    out_dir را با فهرست فایل‌ها هم‌گام می‌کند (hard link یا کپی)
+    خروجی: (تعداد فایل‌های نوشته‌شده، تعداد فایل‌های اضافی حذف‌شده)
+    """
+    wanted = set(files)
+    written = 0
+    for rel in sorted(wanted):
+        source, target = root / rel, out_dir / rel
+        if target.exists() and _same_file(source, target):
+            continue
+        target.parent.mkdir(parents=True, exist_ok=True)
+        if target.exists() or target.is_symlink():
+            target.unlink()
+        try:
+            os.link(source, target)
+        except OSError:
+            shutil.copy2(source, target)
+        written += 1
+
+    removed = 0
+    if out_dir.is_dir():
+        for dirpath, dirnames, filenames in os.walk(out_dir, topdown=False):
+            current = Path(dirpath)
+            for name in filenames:
+                if _posix(current / name, out_dir) not in wanted:
+                    (current / name).unlink()
+                    removed += 1
+            if current != out_dir and not any(current.iterdir()):
+                current.rmdir()
+    return written, removed
+
+
+def _size(num_bytes: int) -> str:
+    for unit in ("B", "KB", "MB"):
+        if num_bytes < 1024:
+            return f"{num_bytes:.0f} {unit}" if unit == "B" else f"{num_bytes:.1f} {unit}"
+        num_bytes /= 1024
+    return f"{num_bytes:.1f} GB"
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Copy only the assets reachable from the site pages into dist/")
+    parser.add_argument("--out", type=Path, default=DIST_DIR, help="output directory (default: dist/)")
+    parser.add_argument("--dry-run", action="store_true", help="report only; do not write the output directory")
+    parser.add_argument("--all", action="store_true", help="list every unreferenced file, not just the largest")
+    args = parser.parse_args()
+
+    out_dir = args.out.resolve()
+    if out_dir == BASE_DIR or BASE_DIR.is_relative_to(out_dir):
+        print(f"Error: output directory {out_dir} would contain the source tree")
+        sys.exit(1)
+
+    referrers, missing = build_graph(BASE_DIR)
+    files = inventory(BASE_DIR, skip=[out_dir])
+    reachable = sorted(referrers)
+    unreferenced = sorted((rel for rel in files if rel not in referrers), key=lambda rel: (-files[rel], rel))
+
+    for rel, sources in sorted(missing.items()):
+        print(f"Warning: {rel} not found (referenced from {', '.join(sorted(sources))})")
+
+    if not args.dry_run:
+        written, removed = sync_dist(reachable, BASE_DIR, out_dir)
+        print(f"{out_dir.name}/: {written} files written, {removed} stale files removed")
+
+    reachable_bytes = sum(files.get(rel, 0) for rel in reachable)
+    unreferenced_bytes = sum(files[rel] for rel in unreferenced)
+    shown = unreferenced if args.all else unreferenced[:20]
+    if shown:
+        print("Unreferenced files:")
+        for rel in shown:
+            print(f"  {_size(files[rel]):>10}  {rel}")
+        if len(shown) < len(unreferenced):
+            print(f"  ... {len(unreferenced) - len(shown)} more (--all)")
+    print(f"Bundle: {len(reachable)} files, {_size(reachable_bytes)}; "
+          f"left out: {len(unreferenced)} files, {_size(unreferenced_bytes)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,289 @@
+"""
+HTML build stage: pre-rendered first screen and critical CSS
+برای هر صفحه فقط قواعدی از static/css/styles.css را که روی markup بالای صفحه (قبل از FOLD در PAGES)
+اثر دارند درون‌خطی می‌کند و خود styles.css را بدون مسدود کردن رندر بارگذاری می‌کند:
+
+    <!-- critical-css:start --><style>...</style><!-- critical-css:end -->
+    <link rel="preload" href="static/css/styles.css" as="style" onload="this.onload=null;this.rel='stylesheet'">
+    <noscript><link rel="stylesheet" href="static/css/styles.css"></noscript>
+
+در gallery.html ابتدا embed_manifest_once.py صفحه اول گالری را درون‌خطی و کارت‌هایش را از قبل رندر
+می‌کند تا critical CSS همان کارت‌ها را هم پوشش دهد. اجرای دوباره فقط بلوک‌های بین نشانگرها را به‌روز می‌کند.
+
+ترتیب build: update_manifest_from_fs.py -> build_html.py -> fingerprint_assets.py -> precompress_assets.py
+-> build_sw_precache.py
+
+Usage:
+    python build_html.py
+    python build_html.py --check     # فقط بررسی؛ اگر صفحه‌ای قدیمی است خروجی 1
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import posixpath
+import re
+import sys
+from html.parser import HTMLParser
+from pathlib import Path
+from typing import Dict, List, Optional, Set, Tuple
+
+from embed_manifest_once import GALLERY_HTML, MANIFEST_PATH, embed_first_page, first_page, category_titles
+from fingerprint_assets import split_fingerprint
+from update_manifest_from_fs import write_if_changed
+
+BASE_DIR = Path(__file__).resolve().parent
+
+# صفحه -> ابتدای اولین بخشی که پایین‌تر از صفحه اول است (None: کل body)
+PAGES: Dict[str, Optional[str]] = {
+    "index.html": '<section id="services"',
+    "gallery.html": '<div class="empty-state"',
+    "errorr.html": '<section class="spider-rgb-section"',
+    "pre-production.html": '<div class="video-modal"',
+}
+
+CRITICAL_START = "<!-- critical-css:start -->"
+CRITICAL_END = "<!-- critical-css:end -->"
+STYLESHEET_HREF = r'(?P<href>static/css/styles(?:\.[0-9a-f]{10})?\.css)'
+# لینک render-blocking اصلی یا نسخه‌ای که قبلاً به preload تبدیل شده است
+STYLESHEET_RE = re.compile(
+    r'<link rel="stylesheet" href="%s">'
+    r'|<link rel="preload" href="%s" as="style" onload="[^"]*">\s*<noscript><link rel="stylesheet" href="(?P=href2)"></noscript>'
+    % (STYLESHEET_HREF, STYLESHEET_HREF.replace("<href>", "<href2>"))
+)
+# preload جداگانه styles.css بعد از تبدیل لینک اصلی تکراری است
+DUPLICATE_PRELOAD_RE = re.compile(
+    r'[ \t]*<link rel="preload" href="%s" as="style"(?: fetchpriority="high")?>\n' % STYLESHEET_HREF)
+
+# selectorهایی که فقط با تعامل کاربر فعال می‌شوند در رندر اول لازم نیستند
+INTERACTIVE_PSEUDO_RE = re.compile(r":(?:hover|focus|focus-visible|focus-within|active|visited)\b")
+PSEUDO_RE = re.compile(r"::?[\w-]+(?:\((?:[^()]|\([^()]*\))*\))?")
+ATTRIBUTE_RE = re.compile(r"\[[^\]]*\]")
+CLASS_RE = re.compile(r"\.([\w-]+)")
+ID_RE = re.compile(r"#([\w-]+)")
+TAG_RE = re.compile(r"(?:^|[\s>+~(])([a-zA-Z][\w-]*)")
+ANIMATION_RE = re.compile(r"animation(?:-name)?\s*:\s*([^;]+)")
+URL_RE = re.compile(r"url\(\s*(['\"]?)([^'\")]+)\1\s*\)")
+COMMENT_RE = re.compile(r"/\*.*?\*/", re.S)
+WHITESPACE_RE = re.compile(r"\s+")
+# ‎@media و ‎@supports بازگشتی بررسی می‌شوند؛ keyframes فقط در صورت ارجاع نگه داشته می‌شوند
+GROUPING_RULES = ("@media", "@supports")
+KEYFRAMES_RE = re.compile(r"^@(?:-webkit-)?keyframes\s+([\w-]+)")
+
+
+class MarkupTokens(HTMLParser):
+    """تگ‌ها، classها و idهای markup"""
+
+    def __init__(self) -> None:
+        super().__init__(convert_charrefs=True)
+        self.tags: Set[str] = {"html", "body"}
+        self.classes: Set[str] = set()
+        self.ids: Set[str] = set()
+
+    def handle_starttag(self, tag, attrs):
+        self.tags.add(tag)
+        for name, value in attrs:
+            if name == "class" and value:
+                self.classes.update(value.split())
+            elif name == "id" and value:
+                self.ids.add(value)
+
+
+def above_the_fold(html_text: str, fold: Optional[str]) -> str:
+    """markup بدنه تا ابتدای FOLD"""
+    start = html_text.find("<body")
+    start = 0 if start < 0 else start
+    end = html_text.find(fold, start) if fold else -1
+    return html_text[start:end if end >= 0 else len(html_text)]
+
+
+def collect_tokens(markup: str) -> MarkupTokens:
+    tokens = MarkupTokens()
+    tokens.feed(markup)
+    tokens.close()
+    return tokens
+
+
+def split_blocks(css: str) -> List[Tuple[str, str]]:
+    """[(prelude، بدنه)] قواعد سطح بالا؛ دستورهای بدون بلوک (مثل ‎@charset) کنار گذاشته می‌شوند"""
+    blocks = []
+    position, length = 0, len(css)
+    while position < length:
+        open_brace = css.find("{", position)
+        if open_brace < 0:
+            break
+        prelude = css[position:open_brace]
+        # ‎@import و ‎@charset پیش از این بلوک
+        prelude = prelude[prelude.rfind(";") + 1:].strip()
+        depth, index, quote = 1, open_brace + 1, None
+        while index < length and depth:
+            char = css[index]
+            if quote:
+                if char == "\\":
+                    index += 1
+                elif char == quote:
+                    quote = None
+            elif char in "\"'":
+                quote = char
+            elif char == "{":
+                depth += 1
+            elif char == "}":
+                depth -= 1
+            index += 1
+        blocks.append((prelude, css[open_brace + 1:index - 1]))
+        position = index
+    return blocks
+
+
+def split_selectors(prelude: str) -> List[str]:
+    """selectorها با ویرگول سطح بالا جدا می‌شوند (ویرگول داخل :is() و :not() نه)"""
+    selectors, depth, current = [], 0, []
+    for char in prelude:
+        if char == "(":
+            depth += 1
+        elif char == ")":
+            depth -= 1
+        elif char == "," and depth == 0:
+            selectors.append("".join(current).strip())
+            current = []
+            continue
+        current.append(char)
+    selectors.append("".join(current).strip())
+    return [s for s in selectors if s]
+
+
+def selector_matches(selector: str, tokens: MarkupTokens) -> bool:
+    if INTERACTIVE_PSEUDO_RE.search(selector):
+        return False
+    simple = ATTRIBUTE_RE.sub("", PSEUDO_RE.sub("", selector))
+    return (set(CLASS_RE.findall(simple)) <= tokens.classes
+            and set(ID_RE.findall(simple)) <= tokens.ids
+            and {tag.lower() for tag in TAG_RE.findall(simple)} <= tokens.tags)
+
+
+def minify(text: str) -> str:
+    """فقط برای بدنه قواعد؛ در selector فاصله قبل از : یا > معنا دارد"""
+    text = WHITESPACE_RE.sub(" ", text).strip()
+    return re.sub(r"\s*([{};:,])\s*", r"\1", text).replace(";}", "}").rstrip(";")
+
+
+def collapse(text: str) -> str:
+    return WHITESPACE_RE.sub(" ", text).strip()
+
+
+def rebase_urls(css: str, css_rel: str) -> str:
+    """url نسبی CSS نسبت به static/css/ است؛ در HTML نسبت به ریشه سایت"""
+    base = posixpath.dirname(css_rel)
+
+    def replace(match: re.Match) -> str:
+        url = match.group(2).strip()
+        if re.match(r"^(?:[a-z][\w+.-]*:|/|#)", url, re.I):
+            return match.group(0)
+        return f'url("{posixpath.normpath(posixpath.join(base, url))}")'
+
+    return URL_RE.sub(replace, css)
+
+
+def select_rules(blocks: List[Tuple[str, str]], tokens: MarkupTokens, keyframes: Dict[str, str]) -> List[str]:
+    kept = []
+    for prelude, body in blocks:
+        keyframes_match = KEYFRAMES_RE.match(prelude)
+        if keyframes_match:
+            keyframes[keyframes_match.group(1)] = f"{collapse(prelude)}{{{minify(body)}}}"
+        elif prelude.startswith(GROUPING_RULES):
+            inner = select_rules(split_blocks(body), tokens, keyframes)
+            if inner:
+                kept.append(f"{collapse(prelude)}{{{''.join(inner)}}}")
+        elif prelude.startswith("@font-face"):
+            kept.append(f"@font-face{{{minify(body)}}}")
+        elif not prelude.startswith("@"):
+            selectors = [s for s in split_selectors(prelude) if selector_matches(s, tokens)]
+            if selectors and body.strip():
+                kept.append(f"{','.join(collapse(s) for s in selectors)}{{{minify(body)}}}")
+    return kept
+
+
+def critical_css(css: str, tokens: MarkupTokens) -> str:
+    keyframes: Dict[str, str] = {}
+    rules = select_rules(split_blocks(COMMENT_RE.sub("", css)), tokens, keyframes)
+    used = set()
+    for rule in rules:
+        for value in ANIMATION_RE.findall(rule):
+            used.update(re.findall(r"[\w-]+", value))
+    rules.extend(keyframes[name] for name in sorted(used & set(keyframes)))
+    return "".join(rules)
+
+
+def defer_stylesheet(html_text: str) -> Tuple[str, Optional[str]]:
+    """لینک styles.css را به preload غیرمسدودکننده تبدیل می‌کند؛ خروجی: (HTML، href)"""
+    match = STYLESHEET_RE.search(html_text)
+    if not match:
+        return html_text, None
+    href = match.group("href") or match.group("href2")
+    deferred = (f'<link rel="preload" href="{href}" as="style" onload="this.onload=null;this.rel=\'stylesheet\'">'
+                f'\n    <noscript><link rel="stylesheet" href="{href}"></noscript>')
+    html_text = html_text[:match.start()] + deferred + html_text[match.end():]
+    return DUPLICATE_PRELOAD_RE.sub("", html_text), href
+
+
+def inline_critical(html_text: str, css: str) -> str:
+    block = f"{CRITICAL_START}<style>{css}</style>{CRITICAL_END}"
+    start = html_text.find(CRITICAL_START)
+    end = html_text.find(CRITICAL_END, start + 1)
+    if start >= 0 and end >= 0:
+        return html_text[:start] + block + html_text[end + len(CRITICAL_END):]
+    # اولین بار: درست قبل از لینک styles.css تا ترتیب cascade تغییر نکند
+    match = STYLESHEET_RE.search(html_text)
+    line_start = html_text.rfind("\n", 0, match.start()) + 1
+    indent = html_text[line_start:match.start()]
+    return html_text[:match.start()] + block + "\n" + indent + html_text[match.start():]
+
+
+def build_page(name: str, fold: Optional[str], root: Path = BASE_DIR) -> Tuple[str, bool, int]:
+    """خروجی: (محتوای جدید، آیا تغییر کرده، حجم critical CSS)"""
+    path = root / name
+    original = path.read_text(encoding="utf-8")
+    html_text = original
+    if path.resolve() == GALLERY_HTML and MANIFEST_PATH.exists():
+        page = first_page(json.loads(MANIFEST_PATH.read_text(encoding="utf-8")))
+        html_text = embed_first_page(html_text, page, category_titles())
+
+    html_text, href = defer_stylesheet(html_text)
+    if href is None:
+        raise ValueError(f"{name} does not link static/css/styles.css")
+    css_rel, _ = split_fingerprint(href)
+    css = rebase_urls((root / css_rel).read_text(encoding="utf-8"), css_rel)
+    critical = critical_css(css, collect_tokens(above_the_fold(html_text, fold)))
+    html_text = inline_critical(html_text, critical.replace("</", "<\\/"))
+    return html_text, html_text != original, len(critical.encode("utf-8"))
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Pre-render the first screen and inline critical CSS into the pages")
+    parser.add_argument("--check", action="store_true", help="exit with 1 if a page is out of date")
+    args = parser.parse_args()
+
+    stale = []
+    for name, fold in PAGES.items():
+        path = BASE_DIR / name
+        if not path.exists():
+            print(f"Warning: {name} not found")
+            continue
+        try:
+            content, changed, critical_size = build_page(name, fold)
+        except (OSError, ValueError) as exc:
+            print(f"Error ({name}): {exc}")
+            sys.exit(1)
+        if changed:
+            stale.append(name)
+            if not args.check:
+                write_if_changed(path, content)
+        state = ("out of date" if args.check else "updated") if changed else "unchanged"
+        print(f"  {name}: critical CSS {critical_size / 1024:.1f} KB ({state})")
+
+    if args.check:
+        sys.exit(1 if stale else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,106 @@
+"""
+Service worker precache manifest
+فهرست فایل‌های precache در sw.js را همراه با revision هر فایل (هش محتوا) از روی فایل‌های فعلی
+می‌سازد. مرورگر با تغییر هر بایت sw.js نسخه جدید worker را نصب می‌کند و worker فقط
+ورودی‌هایی را دوباره دانلود می‌کند که revision آن‌ها عوض شده است؛ کش تصاویر دست نمی‌خورد.
+
+این مرحله باید بعد از fingerprint_assets.py و precompress_assets.py اجرا شود تا revision صفحه‌ها
+همان بایت‌هایی باشد که سرو می‌شوند.
+
+Usage:
+    python build_sw_precache.py
+    python build_sw_precache.py --check     # فقط بررسی؛ اگر sw.js قدیمی است خروجی 1
+"""
+from __future__ import annotations
+
+import argparse
+import re
+import sys
+from pathlib import Path
+from typing import List, Tuple
+
+from http_cache import file_digest
+from update_manifest_from_fs import write_if_changed
+
+BASE_DIR = Path(__file__).resolve().parent
+SW_PATH = BASE_DIR / "sw.js"
+
+# فایل‌های پوسته سایت که برای نمایش آفلاین لازم‌اند (ترتیب همان ترتیب sw.js)
+# مانیفست‌های JSON این‌جا نیستند: watch_assets.py آن‌ها را بدون ساختن دوباره sw.js بازنویسی می‌کند،
+# پس service worker آن‌ها را network-first سرو می‌کند
+PRECACHE_FILES = [
+    "index.html",
+    "gallery.html",
+    "errorr.html",
+    "pre-production.html",
+    "static/css/styles.css",
+    "static/js/script.js",
+    "static/js/gallery-page.js",
+    "static/js/ERRORR.js",
+    "favicon.ico",
+]
+
+REVISION_LENGTH = 10
+
+BLOCK_RE = re.compile(
+    r"(?P<start>^// precache:start[^\n]*\n)(?P<body>.*?)(?P<end>^// precache:end)",
+    re.MULTILINE | re.DOTALL,
+)
+
+
+def precache_entries(root: Path = BASE_DIR, files: List[str] = PRECACHE_FILES) -> Tuple[List[Tuple[str, str]], List[str]]:
+    """(url، revision) فایل‌های موجود و فهرست فایل‌های ناموجود"""
+    entries, missing = [], []
+    for rel in files:
+        path = root / rel
+        if not path.is_file():
+            missing.append(rel)
+            continue
+        entries.append(("/" + rel, file_digest(path)[:REVISION_LENGTH]))
+    return entries, missing
+
+
+def render_block(entries: List[Tuple[str, str]]) -> str:
+    lines = [f"    {{ url: '{url}', revision: '{revision}' }}" for url, revision in entries]
+    return "const PRECACHE_MANIFEST = [\n" + ",\n".join(lines) + "\n];\n"
+
+
+def update_service_worker(entries: List[Tuple[str, str]], sw_path: Path = SW_PATH) -> Tuple[str, bool]:
+    """
+    بلوک بین ‎// precache:start و ‎// precache:end را جایگزین می‌کند
+    خروجی: (محتوای جدید، آیا با محتوای فعلی فرق دارد)
+    """
+    source = sw_path.read_text(encoding="utf-8")
+    match = BLOCK_RE.search(source)
+    if not match:
+        raise ValueError(f"{sw_path.name} has no '// precache:start' ... '// precache:end' block")
+    updated = source[:match.start("body")] + render_block(entries) + source[match.start("end"):]
+    return updated, updated != source
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Write the precache list with per-file revisions into sw.js")
+    parser.add_argument("--check", action="store_true", help="exit with 1 if sw.js is out of date")
+    args = parser.parse_args()
+
+    entries, missing = precache_entries()
+    for rel in missing:
+        print(f"Warning: {rel} not found; left out of the precache list")
+    try:
+        content, changed = update_service_worker(entries)
+    except ValueError as exc:
+        print(f"Error: {exc}")
+        sys.exit(1)
+
+    if args.check:
+        print("sw.js is out of date" if changed else "sw.js is up to date")
+        sys.exit(1 if changed else 0)
+    if changed:
+        write_if_changed(SW_PATH, content)
+    for url, revision in entries:
+        print(f"  {revision}  {url}")
+    print(f"{SW_PATH.name}: {len(entries)} precache entries ({'updated' if changed else 'unchanged'})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,178 @@
+"""
+Capture-date index for the gallery
+زمان عکاسی هر تصویر را یک بار پیدا می‌کند و در images/.capture-index.json نگه می‌دارد تا
+update_manifest_from_fs.py تصاویر را بر اساس آن (جدیدترین اول) مرتب کند، نه st_mtime که با هر
+کپی یا تبدیل دوباره فایل عوض می‌شود.
+
+منبع زمان به ترتیب:
+    1. EXIF (DateTimeOriginal، DateTimeDigitized، DateTime)
+    2. الگوی نام فایل: photo_N_YYYY-MM-DD_HH-MM-SS و video_... (خروجی تلگرام)، YYYYMMDD_HHMMSS
+       (دوربین گوشی)، IMG-YYYYMMDD-WA0001 (واتساپ)، vlcsnap-YYYY-MM-DD-HHhMMmSSs (فریم VLC)
+    3. mtime فایل در اولین باری که دیده می‌شود
+
+ورودی‌ها با مسیر فایل کلید می‌شوند و (mtime_ns، size) فایل را هم نگه می‌دارند؛ اجرای بعدی فایلی را
+باز نمی‌کند مگر این‌که با همان نام جایگزین شده باشد. convert_images_to_webp.py زمان EXIF را پیش از
+حذف metadata برای فایل WebP خروجی ثبت می‌کند.
+"""
+from __future__ import annotations
+
+import json
+import os
+import re
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, Iterable, Optional, Tuple
+
+from PIL import Image, UnidentifiedImageError
+
+BASE_DIR = Path(__file__).resolve().parent
+INDEX_PATH = BASE_DIR / "images" / ".capture-index.json"
+INDEX_VERSION = 1
+
+# زمان‌ها به‌صورت رشته ISO محلی (بدون منطقه زمانی) نگه داشته می‌شوند تا مقایسه رشته‌ای همان ترتیب زمانی باشد
+TIMESTAMP_FORMAT = "%Y-%m-%dT%H:%M:%S"
+
+EXIF_IFD = 0x8769
+EXIF_DATETIME_ORIGINAL = 0x9003
+EXIF_DATETIME_DIGITIZED = 0x9004
+EXIF_DATETIME = 0x0132
+EXIF_DATETIME_FORMAT = "%Y:%m:%d %H:%M:%S"
+
+# (الگو، قالب تاریخ)؛ گروه n ترتیب فایل‌های هم‌زمان را نگه می‌دارد
+FILENAME_PATTERNS: Tuple[Tuple[re.Pattern, str], ...] = (
+    (re.compile(r"^(?:photo|video)_(?:(?P<n>\d+)_)?(?P<stamp>\d{4}-\d{2}-\d{2}_\d{2}-\d{2}-\d{2})"), "%Y-%m-%d_%H-%M-%S"),
+    (re.compile(r"^(?:IMG_|VID_|PXL_)?(?P<stamp>\d{8}_\d{6})"), "%Y%m%d_%H%M%S"),
+    (re.compile(r"^(?:IMG|VID)-(?P<stamp>\d{8})-WA(?P<n>\d+)"), "%Y%m%d"),
+    (re.compile(r"^vlcsnap-(?P<stamp>\d{4}-\d{2}-\d{2}-\d{2}h\d{2}m\d{2}s)"), "%Y-%m-%d-%Hh%Mm%Ss"),
+)
+
+
+def file_stamp(path: Path) -> Optional[list]:
+    """[mtime_ns، size] فایل؛ جایگزینی درجا با همان نام آن را عوض می‌کند"""
+    try:
+        st = path.stat()
+    except OSError:
+        return None
+    return [st.st_mtime_ns, st.st_size]
+
+
+def exif_capture_time(exif: Image.Exif) -> Optional[str]:
+    values = exif.get_ifd(EXIF_IFD)
+    for value in (values.get(EXIF_DATETIME_ORIGINAL), values.get(EXIF_DATETIME_DIGITIZED), exif.get(EXIF_DATETIME)):
+        if not isinstance(value, str):
+            continue
+        try:
+            return datetime.strptime(value.strip("\x00 "), EXIF_DATETIME_FORMAT).strftime(TIMESTAMP_FORMAT)
+        except ValueError:
+            continue
+    return None
+
+
+def image_capture_time(path: Path) -> Optional[str]:
+    """زمان EXIF؛ فقط هدر فایل خوانده می‌شود"""
+    try:
+        with Image.open(path) as img:
+            return exif_capture_time(img.getexif())
+    except (OSError, UnidentifiedImageError, SyntaxError, ValueError):
+        return None
+
+
+def filename_capture_time(name: str) -> Optional[Tuple[str, int]]:
+    """(زمان، شماره ترتیب) از روی نام فایل یا None"""
+    for pattern, date_format in FILENAME_PATTERNS:
+        match = pattern.match(name)
+        if not match:
+            continue
+        try:
+            taken = datetime.strptime(match.group("stamp"), date_format)
+        except ValueError:
+            continue
+        n = match.groupdict().get("n")
+        return taken.strftime(TIMESTAMP_FORMAT), int(n) if n else 0
+    return None
+
+
+class CaptureIndex:
+    """
+    مسیر نسبی -> [زمان، شماره ترتیب، منبع، mtime_ns، size]
+    منبع یکی از exif، filename یا mtime است؛ ورودی‌های قدیمی سه‌تایی (بدون stamp) هم پذیرفته می‌شوند
+    """
+
+    def __init__(self, root: Path = BASE_DIR, path: Path = INDEX_PATH) -> None:
+        self.root = root
+        self.path = path
+        self.entries: Dict[str, list] = {}
+        self._dirty = False
+        try:
+            data = json.loads(path.read_text(encoding="utf-8"))
+            if data.get("version") == INDEX_VERSION:
+                self.entries = data.get("files", {})
+        except (OSError, ValueError):
+            self.entries = {}
+
+    def lookup(self, rel_path: str, stamp: Optional[list] = None) -> list:
+        """
+        stamp همان file_stamp فایل است؛ اگر با stamp ثبت‌شده فرق کند، فایل دوباره بررسی می‌شود
+        بدون stamp ورودی موجود بی‌قیدوشرط معتبر است
+        """
+        cached = self.entries.get(rel_path)
+        if cached and (stamp is None or cached[3:] == stamp):
+            return cached
+        if cached and stamp is not None and len(cached) == 3:
+            # ورودی نسخه قبل؛ فایل همان است که بررسی شده بود، فقط stamp آن ثبت می‌شود
+            self.entries[rel_path] = cached = cached + stamp
+            self._dirty = True
+            return cached
+        path = self.root / rel_path
+        taken = image_capture_time(path)
+        from_name = filename_capture_time(path.name)
+        if taken:
+            entry = [taken, from_name[1] if from_name else 0, "exif"]
+        elif from_name:
+            entry = [from_name[0], from_name[1], "filename"]
+        else:
+            try:
+                mtime = path.stat().st_mtime
+            except OSError:
+                mtime = 0
+            entry = [datetime.fromtimestamp(mtime).strftime(TIMESTAMP_FORMAT), 0, "mtime"]
+        stamp = stamp if stamp is not None else file_stamp(path)
+        if stamp is not None:
+            entry += stamp
+        self.entries[rel_path] = entry
+        self._dirty = True
+        return entry
+
+    def sort_key(self, rel_path: str, stamp: Optional[list] = None) -> Tuple[str, int, str]:
+        taken, n = self.lookup(rel_path, stamp)[:2]
+        return taken, n, rel_path.rsplit("/", 1)[-1].lower()
+
+    def record(self, rel_path: str, taken: str, source: str = "exif") -> None:
+        """زمانی که بیرون از ایندکس پیدا شده (مثلاً EXIF منبع پیش از تبدیل به WebP)"""
+        from_name = filename_capture_time(rel_path.rsplit("/", 1)[-1])
+        entry = [taken, from_name[1] if from_name else 0, source]
+        # stamp فایل نوشته‌شده هم ثبت می‌شود تا lookup این زمان را با بررسی دوباره فایل دور نریزد
+        stamp = file_stamp(self.root / rel_path)
+        if stamp is not None:
+            entry += stamp
+        if self.entries.get(rel_path) != entry:
+            self.entries[rel_path] = entry
+            self._dirty = True
+
+    def prune(self, prefix: str, keep: Iterable[str]) -> None:
+        """ورودی‌های زیر prefix (یک دسته) که دیگر وجود ندارند حذف می‌شوند"""
+        keep = set(keep)
+        stale = [rel for rel in self.entries if rel.startswith(prefix) and rel not in keep]
+        for rel in stale:
+            del self.entries[rel]
+        self._dirty = self._dirty or bool(stale)
+
+    def save(self) -> None:
+        if not self._dirty:
+            return
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = self.path.with_name(self.path.name + ".tmp")
+        payload = {"version": INDEX_VERSION, "files": self.entries}
+        tmp.write_text(json.dumps(payload, ensure_ascii=False, sort_keys=True), encoding="utf-8")
+        os.replace(tmp, self.path)
+        self._dirty = False
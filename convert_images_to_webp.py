@@ -1,14 +1,33 @@
 from __future__ import annotations
 
+import argparse
+import hashlib
+import io
+import json
+import os
+import re
 import sys
+from concurrent.futures import ProcessPoolExecutor, as_completed
 from pathlib import Path
-from typing import Dict, List, Tuple
+from typing import Dict, List, Optional, Tuple
 
-from PIL import Image, UnidentifiedImageError
+from PIL import Image, ImageMath, ImageOps, UnidentifiedImageError
 
+from capture_dates import CaptureIndex, exif_capture_time
+
+try:
+    from PIL import ImageCms
+except ImportError:  # Pillow built without littlecms
+    ImageCms = None
+
+
+BASE_DIR = Path(__file__).resolve().parent
 
 IMAGE_EXTENSIONS = {".jpg", ".jpeg", ".png", ".JPG", ".JPEG", ".PNG"}
-TEXT_EXTENSIONS = {".html", ".css", ".js", ".json", ".md", ".py", ".txt"}
+TEXT_EXTENSIONS = {".html", ".css", ".js", ".json"}
+# Root-level files are scanned non-recursively; these directories recursively
+SITE_TEXT_DIRS = ["static"]
+EXCLUDED_TEXT_FILES = {"liara.json"}
 REFERENCE_PREFIXES = [
     "",
     "./",
@@ -20,46 +39,348 @@ REFERENCE_PREFIXES = [
     "http://www.naroonsignmaker.com/",
 ]
 
+# method=6 is several times slower than 4 for a few percent smaller files
+DEFAULT_ENCODER_SETTINGS = {"quality": 85, "method": 4}
+CACHE_FILE_NAME = ".webp-build-cache.json"
+CACHE_VERSION = 1
+# Cache key suffix of WebP files that existed before the cache; their encoder settings are unknown
+ADOPTED_KEY = "adopted"
+# image_derivatives.py output (images/responsive/...); regenerated from the originals, never re-encoded here
+RESPONSIVE_DIR_NAME = "responsive"
+
+# Perceptual mode (--target-ssim): the lowest quality in [--min-quality, --quality]
+# whose luma SSIM against the source reaches the target is used for each image
+DEFAULT_TARGET_SSIM = 0.985
+DEFAULT_MIN_QUALITY = 50
+SSIM_BLOCK = 8
+# Larger images are compared at this size; the site never displays more pixels than that
+SSIM_MAX_SIDE = 2048
+SSIM_C1 = (0.01 * 255) ** 2
+SSIM_C2 = (0.03 * 255) ** 2
+# ImageMath.unsafe_eval replaced ImageMath.eval in Pillow 11
+_image_math = getattr(ImageMath, "unsafe_eval", None) or ImageMath.eval
+
 
 def normalize_path(path: Path, root: Path) -> str:
     return path.relative_to(root).as_posix()
 
 
-def convert_image(source: Path, destination: Path) -> None:
+def color_profile(img: Image.Image) -> Optional[bytes]:
+    """
+    ICC profile worth keeping: wide-gamut profiles (Display P3, Adobe RGB) change
+    how the pixels are shown, an sRGB profile only restates the browser default.
+    """
+    profile = img.info.get("icc_profile")
+    if not profile or ImageCms is None:
+        return profile or None
+    try:
+        description = ImageCms.getProfileDescription(ImageCms.ImageCmsProfile(io.BytesIO(profile)))
+    except (OSError, ImageCms.PyCMSError):
+        return profile
+    return None if description.strip().lower().startswith("srgb") else profile
+
+
+def prepare_image(img: Image.Image) -> Image.Image:
+    if img.mode not in ("RGB", "RGBA"):
+        if "transparency" in img.info or img.mode in ("P", "LA"):
+            return img.convert("RGBA")
+        return img.convert("RGB")
+    return img
+
+
+def _luma(img: Image.Image) -> Image.Image:
+    """Float luma plane, downscaled to SSIM_MAX_SIDE and cropped to whole blocks."""
+    scale = SSIM_MAX_SIDE / max(img.size)
+    if scale < 1:
+        img = img.resize((max(1, round(img.width * scale)), max(1, round(img.height * scale))), Image.BOX)
+    width = max(SSIM_BLOCK, img.width - img.width % SSIM_BLOCK)
+    height = max(SSIM_BLOCK, img.height - img.height % SSIM_BLOCK)
+    return img.convert("L").crop((0, 0, width, height)).convert("F")
+
+
+def ssim(reference: Image.Image, candidate: Image.Image) -> float:
+    """
+    Mean SSIM over non-overlapping SSIM_BLOCK x SSIM_BLOCK luma windows.
+
+    Block statistics come from Image.reduce, so the comparison runs in Pillow's
+    C code without numpy.
+    """
+    x, y = _luma(reference), _luma(candidate)
+
+    def mean(expression: str, **planes: Image.Image) -> Image.Image:
+        return _image_math(expression, **planes).reduce(SSIM_BLOCK)
+
+    mu_x, mu_y = x.reduce(SSIM_BLOCK), y.reduce(SSIM_BLOCK)
+    xx, yy, xy = mean("a * a", a=x), mean("b * b", b=y), mean("a * b", a=x, b=y)
+    score = _image_math(
+        "((2 * mx * my + c1) * (2 * (xy - mx * my) + c2))"
+        " / ((mx * mx + my * my + c1) * ((xx - mx * mx) + (yy - my * my) + c2))",
+        mx=mu_x, my=mu_y, xx=xx, yy=yy, xy=xy, c1=SSIM_C1, c2=SSIM_C2,
+    )
+    # A 1x1 box resize is the exact mean (ImageStat bins "F" images into a 256-entry histogram)
+    return score.resize((1, 1), Image.BOX).getpixel((0, 0))
+
+
+def encode_webp(img: Image.Image, settings: Dict[str, int]) -> bytes:
+    buffer = io.BytesIO()
+    img.save(buffer, "WEBP", icc_profile=img.info.get("icc_profile"), **settings)
+    return buffer.getvalue()
+
+
+def search_quality(
+    img: Image.Image, target_ssim: float, low: int, high: int, method: int
+) -> Tuple[int, bytes, float]:
+    """
+    Bisects quality in [low, high] for the smallest setting whose SSIM reaches
+    target_ssim; falls back to high when no setting does.
+    Returns (quality, encoded bytes, SSIM).
+    """
+    best: Optional[Tuple[int, bytes, float]] = None
+    tried: Dict[int, Tuple[bytes, float]] = {}
+
+    def trial(quality: int) -> Tuple[bytes, float]:
+        if quality not in tried:
+            data = encode_webp(img, {"quality": quality, "method": method})
+            with Image.open(io.BytesIO(data)) as decoded:
+                tried[quality] = (data, ssim(img, decoded))
+        return tried[quality]
+
+    lo, hi = low, high
+    while lo <= hi:
+        mid = (lo + hi) // 2
+        data, score = trial(mid)
+        if score >= target_ssim:
+            best = (mid, data, score)
+            hi = mid - 1
+        else:
+            lo = mid + 1
+    if best is None:
+        data, score = trial(high)
+        best = (high, data, score)
+    return best
+
+
+def convert_image(
+    source: Path, destination: Path, settings: Optional[Dict[str, float]] = None
+) -> Dict[str, float]:
+    """
+    Encodes source as WebP at destination.
+
+    The EXIF orientation is applied to the pixels, since the output carries no
+    EXIF (and so no embedded thumbnail or XMP) for the browser to rotate by; only
+    a non-sRGB colour profile is kept. The EXIF capture time, if any, is returned
+    as "taken" so the caller can keep it in the capture-date index.
+
+    With "target_ssim" in settings the quality is searched per image (see
+    search_quality) between "min_quality" and "quality". Returns the encoder
+    settings used, plus "ssim" and "bytes" in perceptual mode. When source is
+    destination (re-encoding an existing WebP) the file is only replaced if the
+    result is smaller; "kept" is set otherwise.
+    """
+    settings = dict(settings or DEFAULT_ENCODER_SETTINGS)
     destination.parent.mkdir(parents=True, exist_ok=True)
+    target_ssim = settings.pop("target_ssim", None)
+    low = int(settings.pop("min_quality", DEFAULT_MIN_QUALITY))
     with Image.open(source) as img:
-        if img.mode not in ("RGB", "RGBA"):
-            if "transparency" in img.info or img.mode in ("P", "LA"):
-                img = img.convert("RGBA")
-            else:
-                img = img.convert("RGB")
-        img.save(destination, "WEBP", quality=85, method=6)
+        taken = exif_capture_time(img.getexif())
+        img = prepare_image(ImageOps.exif_transpose(img))
+        profile = color_profile(img)
+        img.info.pop("icc_profile", None)
+        if profile:
+            img.info["icc_profile"] = profile
+        if target_ssim is None:
+            img.save(destination, "WEBP", icc_profile=profile, **settings)
+            return dict(settings, taken=taken) if taken else settings
+        quality, data, score = search_quality(
+            img, target_ssim, min(low, settings["quality"]), settings["quality"], settings["method"]
+        )
+    result = {"quality": quality, "method": settings["method"], "ssim": round(score, 5), "bytes": len(data)}
+    if taken:
+        result["taken"] = taken
+    if source == destination and len(data) >= source.stat().st_size:
+        result["kept"] = True
+        return result
+    # Written through a temporary file so an in-place re-encode never leaves a truncated image
+    tmp = destination.with_name(destination.name + ".tmp")
+    tmp.write_bytes(data)
+    os.replace(tmp, destination)
+    return result
+
+
+def file_sha256(path: Path) -> str:
+    hasher = hashlib.sha256()
+    with path.open("rb") as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b""):
+            hasher.update(chunk)
+    return hasher.hexdigest()
+
+
+def settings_key(settings: Dict[str, int]) -> str:
+    return json.dumps(settings, sort_keys=True, separators=(",", ":"))
+
+
+class BuildCache:
+    """
+    Persistent conversion cache.
+
+    ``sources`` maps a source path to its last seen (size, mtime_ns, sha256) so
+    unchanged files are not re-hashed; ``outputs`` maps "<sha256>|<settings>" to
+    the WebP written for that content with those encoder settings; ``qualities``
+    maps the same key to the quality chosen by the perceptual search, so a lost
+    output is re-encoded without searching again. A WebP that predates the cache
+    is recorded as "<sha256>|adopted" together with the settings of the run that
+    adopted it, and is re-encoded from its source once the settings change.
+    """
+
+    def __init__(self, path: Path, enabled: bool = True) -> None:
+        self.path = path
+        self.enabled = enabled
+        self.sources: Dict[str, list] = {}
+        self.outputs: Dict[str, dict] = {}
+        self.qualities: Dict[str, dict] = {}
+        if enabled and path.exists():
+            try:
+                data = json.loads(path.read_text(encoding="utf-8"))
+            except (OSError, ValueError):
+                data = {}
+            if data.get("version") == CACHE_VERSION:
+                self.sources = data.get("sources", {})
+                self.outputs = data.get("outputs", {})
+                self.qualities = data.get("qualities", {})
+
+    def source_hash(self, rel_path: str, path: Path) -> str:
+        st = path.stat()
+        cached = self.sources.get(rel_path)
+        if cached and cached[0] == st.st_size and cached[1] == st.st_mtime_ns:
+            return cached[2]
+        digest = file_sha256(path)
+        self.sources[rel_path] = [st.st_size, st.st_mtime_ns, digest]
+        return digest
+
+    def is_current(self, key: str, root: Path, output_rel: str) -> bool:
+        entry = self.outputs.get(key)
+        if not entry or entry.get("output") != output_rel:
+            return False
+        output = root / output_rel
+        try:
+            st = output.stat()
+        except OSError:
+            return False
+        return st.st_size == entry.get("size") and st.st_mtime_ns == entry.get("mtime_ns")
+
+    def record(self, key: str, root: Path, output_rel: str) -> None:
+        st = (root / output_rel).stat()
+        self.outputs[key] = {"output": output_rel, "size": st.st_size, "mtime_ns": st.st_mtime_ns}
+
+    def adopt(self, digest: str, root: Path, output_rel: str, key_suffix: str) -> None:
+        self.record(f"{digest}|{ADOPTED_KEY}", root, output_rel)
+        self.outputs[f"{digest}|{ADOPTED_KEY}"]["settings"] = key_suffix
+
+    def is_adopted(self, digest: str, root: Path, output_rel: str, key_suffix: str) -> bool:
+        """An adopted WebP stands in only for the settings it was adopted under."""
+        key = f"{digest}|{ADOPTED_KEY}"
+        entry = self.outputs.get(key)
+        return bool(entry) and entry.get("settings") == key_suffix and self.is_current(key, root, output_rel)
+
+    def chosen_settings(self, key: str, settings: Dict[str, float]) -> Dict[str, float]:
+        """Fixed encoder settings when the perceptual search already ran for this key."""
+        chosen = self.qualities.get(key)
+        if "target_ssim" not in settings or not chosen:
+            return settings
+        return {"quality": chosen["quality"], "method": settings["method"]}
+
+    def remember_quality(self, key: str, result: Dict[str, float]) -> None:
+        if "ssim" in result:
+            self.qualities[key] = {"quality": result["quality"], "ssim": result["ssim"]}
+
+    def forget_source(self, rel_path: str) -> None:
+        self.sources.pop(rel_path, None)
+
+    def save(self) -> None:
+        if not self.enabled:
+            return
+        data = {
+            "version": CACHE_VERSION,
+            "sources": self.sources,
+            "outputs": self.outputs,
+            "qualities": self.qualities,
+        }
+        tmp = self.path.with_name(self.path.name + ".tmp")
+        tmp.write_text(json.dumps(data, ensure_ascii=False, indent=1, sort_keys=True), encoding="utf-8")
+        os.replace(tmp, self.path)
+
+
+Job = Tuple[Path, Path, str, Dict[str, float]]  # (source, destination, cache key, settings)
+JobResult = Tuple[Optional[str], Optional[Dict[str, float]]]  # (error, settings used)
+
+
+def _convert_job(source: str, destination: str, settings: Dict[str, float]) -> Tuple[str, JobResult]:
+    """Runs in a worker process; returns (source, (error message or None, settings used))."""
+    try:
+        result = convert_image(Path(source), Path(destination), settings)
+    except (UnidentifiedImageError, OSError) as exc:
+        return source, (str(exc), None)
+    return source, (None, result)
 
 
 def gather_text_files(root: Path) -> List[Path]:
+    """Site files that can reference images: root pages/scripts/manifests and everything in static/."""
     text_files: List[Path] = []
-    for path in root.rglob("*"):
-        if path.is_file() and path.suffix in TEXT_EXTENSIONS:
+    for path in sorted(root.iterdir()):
+        if path.is_file() and path.suffix in TEXT_EXTENSIONS and path.name not in EXCLUDED_TEXT_FILES:
             text_files.append(path)
+    for directory in SITE_TEXT_DIRS:
+        site_dir = root / directory
+        if not site_dir.is_dir():
+            continue
+        for path in sorted(site_dir.rglob("*")):
+            if path.is_file() and path.suffix in TEXT_EXTENSIONS:
+                text_files.append(path)
     return text_files
 
 
-def update_references(text_files: List[Path], replacements: Dict[str, str]) -> int:
-    total_updates = 0
+def _trie_pattern(node: Dict[str, dict]) -> str:
+    # "" marks the end of a variant; it is made optional so longer variants win
+    terminal = "" in node
+    branches = [re.escape(char) + _trie_pattern(child) for char, child in sorted(node.items()) if char]
+    if not branches:
+        return ""
+    body = branches[0] if len(branches) == 1 and len(branches[0]) == 1 else "(?:" + "|".join(branches) + ")"
+    return f"(?:{body})?" if terminal else body
+
+
+def build_reference_pattern(replacements: Dict[str, str]) -> re.Pattern:
+    """
+    Compiles every variant into one trie-shaped regex so each file is scanned
+    once, with shared prefixes ("images/...", "https://...") matched only once.
+    """
+    trie: Dict[str, dict] = {}
+    for variant in replacements:
+        node = trie
+        for char in variant:
+            node = node.setdefault(char, {})
+        node[""] = {}
+    return re.compile(_trie_pattern(trie))
+
+
+def update_references(text_files: List[Path], replacements: Dict[str, str]) -> Dict[Path, int]:
+    """Rewrites references in one pass per file; returns match counts for changed files."""
+    if not replacements:
+        return {}
+    pattern = build_reference_pattern(replacements)
+    updated_files: Dict[Path, int] = {}
     for file_path in text_files:
         try:
             original_content = file_path.read_text(encoding="utf-8")
         except UnicodeDecodeError:
             continue
 
-        updated_content = original_content
-        for old, new in replacements.items():
-            updated_content = updated_content.replace(old, new)
+        updated_content, match_count = pattern.subn(lambda m: replacements[m.group(0)], original_content)
 
         if updated_content != original_content:
             file_path.write_text(updated_content, encoding="utf-8")
-            total_updates += 1
-    return total_updates
+            updated_files[file_path] = match_count
+    return updated_files
 
 
 def build_replacement_map(converted_pairs: List[Tuple[str, str]]) -> Dict[str, str]:
@@ -78,43 +399,192 @@ def build_replacement_map(converted_pairs: List[Tuple[str, str]]) -> Dict[str, s
     return replacements
 
 
-def main() -> None:
-    root = Path(__file__).parent
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Convert images under images/ to WebP")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1,
+                        help="worker processes (default: all cores)")
+    parser.add_argument("--quality", type=int, default=DEFAULT_ENCODER_SETTINGS["quality"],
+                        help="WebP quality; the upper bound of the search with --target-ssim (default: %(default)s)")
+    parser.add_argument("--method", type=int, default=DEFAULT_ENCODER_SETTINGS["method"],
+                        help="WebP encoder effort 0-6 (default: %(default)s)")
+    originals = parser.add_mutually_exclusive_group()
+    originals.add_argument("--keep-originals", action="store_true",
+                           help="keep JPEG/PNG sources (the default unless --no-cache is given)")
+    originals.add_argument("--delete-originals", action="store_true",
+                           help="delete JPEG/PNG sources after converting; later setting changes can then "
+                                "no longer re-encode those images")
+    parser.add_argument("--no-cache", action="store_true", help="ignore and do not write the build cache")
+    parser.add_argument("--target-ssim", type=float, nargs="?", const=DEFAULT_TARGET_SSIM,
+                        help="search each image for the lowest quality whose SSIM against the source "
+                             f"reaches this value (default when given without a value: {DEFAULT_TARGET_SSIM})")
+    parser.add_argument("--min-quality", type=int, default=DEFAULT_MIN_QUALITY,
+                        help="lower bound of the quality search (default: %(default)s)")
+    parser.add_argument("--recompress-webp", action="store_true",
+                        help="with --target-ssim, also re-encode existing WebP files in place when that makes them smaller")
+    args = parser.parse_args(argv)
+    if args.recompress_webp and (args.target_ssim is None or args.no_cache):
+        parser.error("--recompress-webp needs --target-ssim and the build cache")
+    # The cache re-encodes from the sources when settings change, so it keeps them;
+    # without the cache the old behaviour (replace the source with its WebP) stays
+    args.keep_originals = not args.delete_originals and (args.keep_originals or not args.no_cache)
+    return args
+
+
+def plan_conversions(
+    images_dir: Path, root: Path, cache: BuildCache, settings: Dict[str, float], recompress_webp: bool = False
+) -> Tuple[List[Job], List[Tuple[str, str]]]:
+    """Returns (jobs to run as (source, destination, cache key, settings), errors)."""
+    jobs: List[Job] = []
+    errors: List[Tuple[str, str]] = []
+    key_suffix = settings_key(settings)
+    cached_outputs = {entry.get("output") for entry in cache.outputs.values()}
+    derivatives_dir = images_dir / RESPONSIVE_DIR_NAME
+    for image_path in images_dir.rglob("*"):
+        if not image_path.is_file():
+            continue
+        if recompress_webp and image_path.suffix == ".webp" and derivatives_dir not in image_path.parents:
+            if any(image_path.with_suffix(ext).exists() for ext in IMAGE_EXTENSIONS):
+                # Output of a kept original: re-encoded from that source instead
+                continue
+            try:
+                key = f"{cache.source_hash(normalize_path(image_path, root), image_path)}|{key_suffix}"
+            except OSError as exc:
+                errors.append((str(image_path), str(exc)))
+                continue
+            if not cache.is_current(key, root, normalize_path(image_path, root)):
+                jobs.append((image_path, image_path, key, settings))
+            continue
+        if image_path.suffix not in IMAGE_EXTENSIONS:
+            continue
+        webp_path = image_path.with_suffix(".webp")
+        if not cache.enabled:
+            # Legacy behaviour: an existing sibling means "already converted"
+            if not webp_path.exists():
+                jobs.append((image_path, webp_path, "", settings))
+            continue
+        source_rel = normalize_path(image_path, root)
+        output_rel = normalize_path(webp_path, root)
+        try:
+            digest = cache.source_hash(source_rel, image_path)
+        except OSError as exc:
+            errors.append((str(image_path), str(exc)))
+            continue
+        key = f"{digest}|{key_suffix}"
+        if cache.is_current(key, root, output_rel) or cache.is_adopted(digest, root, output_rel, key_suffix):
+            continue
+        if webp_path.exists() and output_rel not in cached_outputs:
+            # WebP from before the cache existed: adopt it instead of re-encoding the whole library.
+            # Its settings are unknown, so it is not recorded under this run's settings key
+            cache.adopt(digest, root, output_rel, key_suffix)
+            continue
+        jobs.append((image_path, webp_path, key, cache.chosen_settings(key, settings)))
+    return jobs, errors
+
+
+def _describe(result: JobResult) -> str:
+    error, used = result
+    if error:
+        return f" FAILED: {error}"
+    if used and "ssim" in used:
+        return f" quality={used['quality']} ssim={used['ssim']:.4f}" + (" (kept)" if used.get("kept") else "")
+    return ""
+
+
+def run_conversions(jobs: List[Job], workers: int) -> Dict[str, JobResult]:
+    """Converts in a process pool; returns {source: (error or None, settings used)}."""
+    results: Dict[str, JobResult] = {}
+    if not jobs:
+        return results
+    if workers <= 1 or len(jobs) == 1:
+        for done, (source, destination, _, settings) in enumerate(jobs, 1):
+            results[str(source)] = _convert_job(str(source), str(destination), settings)[1]
+            if len(jobs) > 1:
+                print(f"[{done}/{len(jobs)}] {source}" + _describe(results[str(source)]))
+        return results
+    with ProcessPoolExecutor(max_workers=min(workers, len(jobs))) as pool:
+        futures = [
+            pool.submit(_convert_job, str(source), str(destination), settings)
+            for source, destination, _, settings in jobs
+        ]
+        for done, future in enumerate(as_completed(futures), 1):
+            source, result = future.result()
+            results[source] = result
+            print(f"[{done}/{len(jobs)}] {source}" + _describe(result))
+    return results
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    args = parse_args(argv)
+    root = BASE_DIR
     images_dir = root / "images"
     if not images_dir.exists():
         print("images directory not found", file=sys.stderr)
         sys.exit(1)
 
+    settings: Dict[str, float] = {"quality": args.quality, "method": args.method}
+    if args.target_ssim is not None:
+        settings.update(target_ssim=args.target_ssim, min_quality=args.min_quality)
+    cache = BuildCache(images_dir / CACHE_FILE_NAME, enabled=not args.no_cache)
+    dates = CaptureIndex(root)
+
     converted_pairs: List[Tuple[str, str]] = []
-    errors: List[Tuple[str, str]] = []
+    bytes_before = bytes_after = recompressed = 0
+    key_suffix = settings_key(settings)
+    jobs, errors = plan_conversions(images_dir, root, cache, settings, args.recompress_webp)
+    sizes_before = {str(source): source.stat().st_size for source, destination, _, _ in jobs if source == destination}
+    results = run_conversions(jobs, args.workers)
 
-    for image_path in images_dir.rglob("*"):
-        if image_path.is_file() and image_path.suffix in IMAGE_EXTENSIONS:
-            webp_path = image_path.with_suffix(".webp")
-            if webp_path.exists():
-                continue
-            try:
-                convert_image(image_path, webp_path)
-                converted_pairs.append(
-                    (
-                        normalize_path(image_path, root),
-                        normalize_path(webp_path, root),
-                    )
-                )
-                image_path.unlink()
-            except (UnidentifiedImageError, OSError) as exc:
-                errors.append((str(image_path), str(exc)))
+    for image_path, webp_path, key, _ in jobs:
+        error, used = results.get(str(image_path), ("not converted", None))
+        if error is not None:
+            errors.append((str(image_path), error))
+            continue
+        if cache.enabled:
+            cache.remember_quality(key, used)
+        if used.get("taken"):
+            # The WebP has no EXIF; its capture time lives on in the index the manifest sorts by
+            dates.record(normalize_path(webp_path, root), used["taken"])
+        if image_path == webp_path:
+            # Re-encoded in place: the new bytes are this key's output, and their own
+            # hash is recorded too so the next run does not re-encode the result again
+            bytes_before += sizes_before[str(image_path)]
+            output_rel = normalize_path(webp_path, root)
+            cache.record(key, root, output_rel)
+            if not used.get("kept"):
+                recompressed += 1
+                new_key = f"{cache.source_hash(output_rel, webp_path)}|{key_suffix}"
+                cache.record(new_key, root, output_rel)
+            bytes_after += webp_path.stat().st_size
+            continue
+        if cache.enabled:
+            cache.record(key, root, normalize_path(webp_path, root))
+        converted_pairs.append(
+            (
+                normalize_path(image_path, root),
+                normalize_path(webp_path, root),
+            )
+        )
+        if not args.keep_originals:
+            image_path.unlink()
+            cache.forget_source(normalize_path(image_path, root))
 
-    if not converted_pairs:
-        print("No new images were converted. Exiting.")
-        return
+    cache.save()
+    dates.save()
 
-    replacements = build_replacement_map(converted_pairs)
-    text_files = gather_text_files(root)
-    updated_files_count = update_references(text_files, replacements)
+    if converted_pairs:
+        replacements = build_replacement_map(converted_pairs)
+        text_files = gather_text_files(root)
+        updated_files = update_references(text_files, replacements)
 
-    print(f"Converted {len(converted_pairs)} images to WebP.")
-    print(f"Updated references in {updated_files_count} text files.")
+        print(f"Converted {len(converted_pairs)} images to WebP using {args.workers} workers.")
+        print(f"Updated references in {len(updated_files)} of {len(text_files)} text files.")
+        for file_path, match_count in updated_files.items():
+            print(f"  {normalize_path(file_path, root)}: {match_count} references")
+    elif not jobs:
+        print("No new images were converted.")
+    if sizes_before:
+        print(f"Re-encoded {recompressed} of {len(sizes_before)} WebP files in place: "
+              f"{bytes_before / 1048576:.1f} MB -> {bytes_after / 1048576:.1f} MB.")
 
     if errors:
         print("The following images could not be processed:", file=sys.stderr)
@@ -0,0 +1,272 @@
+"""
+Content-addressed deduplication for the images tree
+فایل‌های تکراری (محتوای یکسان با نام/پوشه متفاوت) را به یک URL مرجع نگاشت می‌کند تا مرورگر و
+service worker یک محتوا را فقط یک بار دانلود و کش کنند.
+
+حالت‌ها:
+    url       فقط مسیرهای مانیفست به نسخه مرجع اشاره می‌کنند (پیش‌فرض)
+    hardlink  علاوه بر آن، نسخه‌های تکراری روی دیسک به hardlink فایل مرجع تبدیل می‌شوند
+    blob      محتوا یک بار در images/blobs/<hash>.<ext> ذخیره می‌شود، URL مرجع همان blob است
+              و همه نسخه‌ها hardlink آن می‌شوند
+
+update_manifest_from_fs.py و update_errorr_media.py از این ماژول استفاده می‌کنند؛ اجرای مستقیم
+فقط گزارش تکراری‌ها را چاپ می‌کند.
+"""
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional
+
+BASE_DIR = Path(__file__).resolve().parent
+IMAGES_DIR = BASE_DIR / "images"
+INDEX_PATH = IMAGES_DIR / ".content-index.json"
+BLOBS_DIR = "images/blobs"
+
+DEDUP_MODES = ("off", "url", "hardlink", "blob")
+MEDIA_EXTENSIONS = {
+    ".jpg", ".jpeg", ".png", ".webp", ".gif", ".bmp", ".svg", ".avif",
+    ".mp4", ".webm", ".ogg", ".mov", ".avi",
+}
+# خروجی‌های ساخته‌شده که نباید مرجع تکراری‌ها شوند
+SKIPPED_DIRS = {"responsive", "blobs"}
+
+
+def _sha256(path: Path) -> str:
+    hasher = hashlib.sha256()
+    with path.open("rb") as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b""):
+            hasher.update(chunk)
+    return hasher.hexdigest()
+
+
+class ContentIndex:
+    """
+    هش sha256 فایل‌های images بر اساس (size, mtime_ns) در images/.content-index.json نگه داشته می‌شود
+    تا اجرای بعدی فقط فایل‌های جدید یا تغییرکرده را بخواند
+    """
+
+    def __init__(self, root: Path = BASE_DIR, path: Path = INDEX_PATH) -> None:
+        self.root = root
+        self.path = path
+        self.entries: Dict[str, list] = {}
+        self._dirty = False
+        if path.exists():
+            try:
+                self.entries = json.loads(path.read_text(encoding="utf-8")).get("files", {})
+            except (OSError, ValueError):
+                self.entries = {}
+
+    def digest(self, rel_path: str) -> str:
+        path = self.root / rel_path
+        st = path.stat()
+        cached = self.entries.get(rel_path)
+        if cached and cached[0] == st.st_size and cached[1] == st.st_mtime_ns:
+            return cached[2]
+        digest = _sha256(path)
+        self.entries[rel_path] = [st.st_size, st.st_mtime_ns, digest]
+        self._dirty = True
+        return digest
+
+    def size(self, rel_path: str) -> int:
+        entry = self.entries.get(rel_path)
+        return entry[0] if entry else (self.root / rel_path).stat().st_size
+
+    def prune(self, keep: Iterable[str]) -> None:
+        keep = set(keep)
+        stale = [rel for rel in self.entries if rel not in keep]
+        for rel in stale:
+            del self.entries[rel]
+        self._dirty = self._dirty or bool(stale)
+
+    def save(self) -> None:
+        if not self._dirty:
+            return
+        tmp = self.path.with_name(self.path.name + ".tmp")
+        tmp.write_text(json.dumps({"files": self.entries}, ensure_ascii=False, sort_keys=True), encoding="utf-8")
+        os.replace(tmp, self.path)
+        self._dirty = False
+
+
+def iter_media_files(root: Path = BASE_DIR) -> List[str]:
+    images_dir = root / "images"
+    if not images_dir.exists():
+        return []
+    found = []
+    for path in images_dir.rglob("*"):
+        rel = path.relative_to(images_dir)
+        if rel.parts and rel.parts[0] in SKIPPED_DIRS:
+            continue
+        if path.is_file() and path.suffix.lower() in MEDIA_EXTENSIONS:
+            found.append(path.relative_to(root).as_posix())
+    return sorted(found)
+
+
+class Deduplicator:
+    """نگاشت هر فایل به URL مرجع محتوایش"""
+
+    def __init__(self, mode: str = "url", root: Path = BASE_DIR, index: Optional[ContentIndex] = None) -> None:
+        if mode not in DEDUP_MODES:
+            raise ValueError(f"Unknown dedup mode: {mode!r} (expected one of {', '.join(DEDUP_MODES)})")
+        self.mode = mode
+        self.root = root
+        self.index = index or ContentIndex(root, root / "images" / INDEX_PATH.name)
+        self.by_hash: Dict[str, List[str]] = {}
+        self.digest_of: Dict[str, str] = {}
+        self.canonical: Dict[str, str] = {}
+        self.disk_bytes_saved = 0
+        self.reset_counters()
+        if mode != "off":
+            self._build()
+
+    def reset_counters(self) -> None:
+        """شمارنده صرفه‌جویی روی سیم برای یک دور ساخت مانیفست"""
+        self.wire_bytes_saved = 0
+        self._referenced_targets = set()
+        self._referenced_paths = set()
+
+    def _build(self) -> None:
+        files = iter_media_files(self.root)
+        for rel in files:
+            digest = self.index.digest(rel)
+            self.by_hash.setdefault(digest, []).append(rel)
+            self.digest_of[rel] = digest
+        self.index.prune(files)
+        for digest in list(self.by_hash):
+            self._assign(digest)
+
+    def _assign(self, digest: str) -> None:
+        paths = self.by_hash.get(digest)
+        if not paths:
+            self.by_hash.pop(digest, None)
+            return
+        # مرتب‌سازی ثابت: کوتاه‌ترین و سپس الفبایی، تا URL مرجع بین اجراها تغییر نکند
+        paths.sort(key=lambda p: (len(p), p))
+        target = paths[0]
+        if self.mode == "blob" and len(paths) > 1:
+            target = self._store_blob(digest, paths[0])
+        for rel in paths:
+            self.canonical[rel] = target
+        if self.mode in ("hardlink", "blob") and len(paths) > 1:
+            self._link_all(target, paths)
+
+    def known_paths(self) -> List[str]:
+        return list(self.digest_of)
+
+    def refresh(self, rel_paths: Iterable[str]) -> None:
+        """
+        فقط فایل‌های داده‌شده دوباره بررسی می‌شوند (افزوده، حذف یا تغییر کرده)
+        watch_assets.py به‌جای ساختن دوباره کل ایندکس از این متد استفاده می‌کند
+        """
+        if self.mode == "off":
+            return
+        affected = set()
+        for rel in rel_paths:
+            previous = self.digest_of.pop(rel, None)
+            if previous is not None:
+                group = self.by_hash.get(previous, [])
+                if rel in group:
+                    group.remove(rel)
+                self.canonical.pop(rel, None)
+                affected.add(previous)
+            path = self.root / rel
+            parts = Path(rel).parts
+            skipped = len(parts) > 1 and parts[1] in SKIPPED_DIRS
+            if not skipped and path.is_file() and path.suffix.lower() in MEDIA_EXTENSIONS:
+                digest = self.index.digest(rel)
+                self.by_hash.setdefault(digest, []).append(rel)
+                self.digest_of[rel] = digest
+                affected.add(digest)
+        self.index.prune(self.digest_of)
+        for digest in affected:
+            self._assign(digest)
+
+    def _store_blob(self, digest: str, source_rel: str) -> str:
+        suffix = Path(source_rel).suffix.lower()
+        blob_rel = f"{BLOBS_DIR}/{digest[:2]}/{digest}{suffix}"
+        blob = self.root / blob_rel
+        if not blob.exists():
+            blob.parent.mkdir(parents=True, exist_ok=True)
+            try:
+                os.link(self.root / source_rel, blob)
+            except OSError:
+                blob.write_bytes((self.root / source_rel).read_bytes())
+        return blob_rel
+
+    def _link_all(self, target_rel: str, paths: List[str]) -> None:
+        """همه نسخه‌ها hardlink یک inode می‌شوند (tar و rsync -H هر محتوا را یک بار منتقل می‌کنند)"""
+        target = self.root / target_rel
+        for rel in paths:
+            duplicate = self.root / rel
+            if os.path.samefile(target, duplicate):
+                continue
+            tmp = duplicate.with_name(duplicate.name + ".dedup-tmp")
+            try:
+                os.link(target, tmp)
+            except OSError:
+                # فایل‌سیستم بدون hardlink: فقط نگاشت URL اعمال می‌شود
+                return
+            os.replace(tmp, duplicate)
+            self.disk_bytes_saved += target.stat().st_size
+
+    def canonical_path(self, rel_path: str) -> str:
+        if self.mode == "off":
+            return rel_path
+        return self.canonical.get(rel_path, rel_path)
+
+    def map_paths(self, paths: Iterable[str]) -> List[str]:
+        """مسیرها را به URL مرجع نگاشت می‌کند و تکراری‌های همان لیست را حذف می‌کند"""
+        result: List[str] = []
+        seen = set()
+        for rel in paths:
+            target = self.canonical_path(rel)
+            if target in self._referenced_targets and rel not in self._referenced_paths:
+                # این محتوا قبلاً با URL دیگری در مانیفست آمده؛ دانلود دوباره حذف شد
+                self.wire_bytes_saved += self.index.size(rel)
+            self._referenced_targets.add(target)
+            self._referenced_paths.add(rel)
+            if target in seen:
+                continue
+            seen.add(target)
+            result.append(target)
+        return result
+
+    def duplicate_groups(self) -> List[List[str]]:
+        return [paths for paths in self.by_hash.values() if len(paths) > 1]
+
+    def report(self) -> str:
+        groups = self.duplicate_groups()
+        duplicate_files = sum(len(paths) - 1 for paths in groups)
+        duplicate_bytes = sum(self.index.size(paths[0]) * (len(paths) - 1) for paths in groups)
+        # بایت‌های تکراری که اکنون (در این اجرا یا قبلاً) با hardlink مشترک‌اند
+        linked_bytes = 0
+        for paths in groups:
+            first = self.root / paths[0]
+            linked = sum(1 for rel in paths[1:] if os.path.samefile(first, self.root / rel))
+            linked_bytes += self.index.size(paths[0]) * linked
+        mb = 1024 * 1024
+        return (
+            f"Dedup ({self.mode}): {len(groups)} duplicated contents, {duplicate_files} redundant copies "
+            f"({duplicate_bytes / mb:.1f} MB). "
+            f"Saved in deploy: {linked_bytes / mb:.1f} MB ({self.disk_bytes_saved / mb:.1f} MB linked this run), "
+            f"on the wire: {self.wire_bytes_saved / mb:.1f} MB."
+        )
+
+    def save(self) -> None:
+        self.index.save()
+
+
+def main() -> None:
+    dedup = Deduplicator("url")
+    dedup.save()
+    for paths in dedup.duplicate_groups():
+        print(f"{paths[0]}")
+        for rel in paths[1:]:
+            print(f"    = {rel}")
+    print(dedup.report())
+
+
+if __name__ == "__main__":
+    main()
@@ -1,23 +1,151 @@
+"""
+Gallery first page for gallery.html
+به‌جای کل مانیفست فقط صفحه اول دسته all (همان پاسخ ‎/api/gallery/all) را در gallery.html قرار می‌دهد
+و کارت‌های همان صفحه را از قبل به HTML تبدیل می‌کند تا تصاویر بالای صفحه پیش از دانلود و اجرای
+gallery-page.js نمایش داده شوند. صفحه‌های بعدی را gallery-page.js از API (یا در نبود آن از
+gallery-data.json) می‌خواند.
+
+    window.__GALLERY_FIRST_PAGE__ = {...};
+    <!-- gallery-prerender:start --> ... <!-- gallery-prerender:end -->
+
+انتهای مقدار JSON با json.raw_decode پیدا می‌شود، نه با regex؛ مسیرها نسبت به محل همین فایل‌اند.
+build_html.py این مرحله را پیش از ساخت critical CSS اجرا می‌کند.
+"""
+from __future__ import annotations
+
+import html
 import json
 import re
 from pathlib import Path
+from typing import Dict, List, Tuple
+from urllib.parse import quote
 
+from gallery_catalog import ALL_CATEGORY, DEFAULT_PAGE_SIZE, Shard, build_shards
+from update_manifest_from_fs import write_if_changed
 
-def main():
-    data = Path('gallery-data.json').read_text(encoding='utf-8')
-    html_path = Path('gallery.html')
-    html = html_path.read_text(encoding='utf-8')
+BASE_DIR = Path(__file__).resolve().parent
+MANIFEST_PATH = BASE_DIR / "gallery-data.json"
+GALLERY_HTML = BASE_DIR / "gallery.html"
+GALLERY_JS = BASE_DIR / "static" / "js" / "gallery-page.js"
 
-    pattern = r"window\.__GALLERY_MANIFEST__ = \{.*?\};"
-    replacement = f"window.__GALLERY_MANIFEST__ = {data};"
+FIRST_PAGE_VARIABLE = "window.__GALLERY_FIRST_PAGE__"
+PRERENDER_START = "<!-- gallery-prerender:start -->"
+PRERENDER_END = "<!-- gallery-prerender:end -->"
+PRERENDER_INDENT = " " * 16
 
-    new_html, count = re.subn(pattern, replacement, html, flags=re.S)
-    if count == 0:
-        raise SystemExit('Manifest placeholder not found in gallery.html')
+# همان مقادیر renderGalleryItem و GALLERY_IMAGE_SIZES در gallery-page.js
+PRIORITY_IMAGES = 9
+IMAGE_SIZES = "(max-width: 480px) 100vw, (max-width: 768px) 50vw, (max-width: 1200px) 33vw, 400px"
+DEFAULT_TITLE = "نمونه کار"
+PROJECT_LABEL = "پروژه"
 
-    html_path.write_text(new_html, encoding='utf-8')
+# عنوان فارسی دسته‌ها از categoryNames در gallery-page.js خوانده می‌شود تا دو نسخه از آن وجود نداشته باشد
+CATEGORY_TITLE_RE = re.compile(r"'(?P<category>[\w-]+)':\s*\{\s*title:\s*\{\s*fa:\s*'(?P<title>[^']*)'")
+# کاراکترهایی که encodeURI در buildSrcset تغییر نمی‌دهد
+URI_SAFE = "/:@!$&'()*+,;=-._~?#"
 
 
-if __name__ == '__main__':
-    main()
+def category_titles(js_path: Path = GALLERY_JS) -> Dict[str, str]:
+    try:
+        source = js_path.read_text(encoding="utf-8")
+    except OSError:
+        return {}
+    return {m.group("category"): m.group("title") for m in CATEGORY_TITLE_RE.finditer(source)}
+
+
+def first_page(manifest: dict, category: str = ALL_CATEGORY, limit: int = DEFAULT_PAGE_SIZE) -> dict:
+    shard = build_shards(manifest).get(category) or Shard(category, [])
+    return shard.payload(0, limit)
+
+
+def _srcset(variants: List[list]) -> str:
+    return ", ".join(f"{quote(url, safe=URI_SAFE)} {width}w" for url, width in variants)
+
+
+def render_item(item: dict, index: int, titles: Dict[str, str]) -> str:
+    """
+    همان markup تابع renderGalleryItem، با این تفاوت که src و srcset مستقیماً مقدار دارند
+    (بدون JavaScript هم تصویر بارگذاری می‌شود) و تصاویر بعد از PRIORITY_IMAGES از loading="lazy" مرورگر استفاده می‌کنند
+    """
+    title = f"{titles.get(item['category'], DEFAULT_TITLE)} - {PROJECT_LABEL} {item['n']}"
+    image = html.escape(item["image"])
+    attrs = [f'class="gallery-image" src="{image}"']
+    responsive = item.get("responsive") or {}
+    webp = (responsive.get("sources") or {}).get("webp") or []
+    if webp:
+        attrs.append(f'srcset="{html.escape(_srcset(webp))}" sizes="{IMAGE_SIZES}"')
+        attrs.append(f'width="{responsive["width"]}" height="{responsive["height"]}"')
+    attrs.append(f'alt="{html.escape(title)}"')
+    if index < PRIORITY_IMAGES:
+        attrs.append('loading="eager" decoding="async" fetchpriority="high"')
+    else:
+        attrs.append('loading="lazy" decoding="async"')
+    return (
+        f'<div class="gallery-item" data-category="{html.escape(item["category"])}" data-index="{index}" '
+        f'data-image="{image}" data-title="{html.escape(title)}">'
+        f'<img {" ".join(attrs)}>'
+        f'<div class="gallery-item-overlay"><div class="gallery-item-title">{html.escape(title)}</div></div>'
+        f'</div>'
+    )
+
+
+def render_page(page: dict, titles: Dict[str, str]) -> str:
+    return "".join(f"\n{PRERENDER_INDENT}{render_item(item, index, titles)}"
+                   for index, item in enumerate(page["items"]))
+
 
+def find_assignment(source: str, variable: str) -> Tuple[int, int]:
+    """(شروع، پایان) مقدار JSON جلوی «variable =»؛ پایان با تجزیه خود JSON پیدا می‌شود"""
+    match = re.search(re.escape(variable) + r"\s*=\s*", source)
+    if not match:
+        raise ValueError(f"{variable} placeholder not found")
+    try:
+        _, end = json.JSONDecoder().raw_decode(source, match.end())
+    except ValueError as exc:
+        raise ValueError(f"{variable} is not followed by valid JSON") from exc
+    return match.end(), end
+
+
+def script_json(value) -> str:
+    """JSON امن برای قرار گرفتن در <script>"""
+    return json.dumps(value, ensure_ascii=False, separators=(",", ":")).replace("</", "<\\/")
+
+
+def embed_first_page(html_text: str, page: dict, titles: Dict[str, str]) -> str:
+    start, end = find_assignment(html_text, FIRST_PAGE_VARIABLE)
+    html_text = html_text[:start] + script_json(page) + html_text[end:]
+
+    block_start = html_text.find(PRERENDER_START)
+    block_end = html_text.find(PRERENDER_END, block_start + 1)
+    if block_start < 0 or block_end < 0:
+        raise ValueError(f"'{PRERENDER_START}' ... '{PRERENDER_END}' block not found")
+    # فاصله قبل از نشانگر پایان حفظ می‌شود تا تورفتگی فایل به هم نخورد
+    indent = html_text[html_text.rfind("\n", 0, block_end) + 1:block_end]
+    body = render_page(page, titles) + "\n" + (indent if not indent.strip() else "")
+    return html_text[:block_start + len(PRERENDER_START)] + body + html_text[block_end:]
+
+
+def embed_manifest(data: str, html_path: Path = GALLERY_HTML) -> bool:
+    """
+    صفحه اول مانیفست (متن JSON) را در gallery.html می‌نویسد؛ خروجی: آیا فایل تغییر کرد
+    نبود placeholderها ValueError می‌دهد
+    """
+    page = first_page(json.loads(data))
+    html_text = html_path.read_text(encoding="utf-8")
+    try:
+        new_html = embed_first_page(html_text, page, category_titles())
+    except ValueError as exc:
+        raise ValueError(f"{exc} in {html_path.name}") from None
+    return write_if_changed(html_path, new_html)
+
+
+def main():
+    try:
+        changed = embed_manifest(MANIFEST_PATH.read_text(encoding="utf-8"), GALLERY_HTML)
+    except (OSError, ValueError) as exc:
+        raise SystemExit(str(exc))
+    print(f"{GALLERY_HTML.name}: first gallery page {'embedded' if changed else 'unchanged'}")
+
+
+if __name__ == "__main__":
+    main()
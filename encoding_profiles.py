@@ -0,0 +1,302 @@
+"""
+Declarative video encoding profiles
+پروفایل‌های encode ویدیو به‌صورت داده؛ optimize_video.py، optimize_video_simple.py،
+optimize_spider_rgb.py و transcode_queue.py همه از همین تعریف‌ها استفاده می‌کنند.
+
+- hero:    ویدیوی اصلی صفحه (کیفیت عالی، veryslow)
+- preview: پیش‌نمایش‌ها و ویدیوهای معمولی سایت
+- mobile:  نسخه سبک ۱۲۸۰ پیکسلی برای اینترنت همراه
+
+حالت جستجو (--target-vmaf / --target-ssim / --target-size) به‌جای CRF ثابت، CRF را در بازه
+پروفایل دوبخشی می‌کند تا کوچک‌ترین فایلی که به کیفیت هدف می‌رسد (یا بهترین کیفیتی که در حجم
+هدف جا می‌شود) پیدا شود.
+
+Usage:
+    python encoding_profiles.py videos/3d-preview_1.mp4 --profile hero
+    python encoding_profiles.py videos/3d-preview_1.mp4 --profile preview --target-vmaf 93
+    python encoding_profiles.py videos/intro.mov --profile mobile --target-size 4M -o videos/intro_mobile.mp4
+"""
+import argparse
+import os
+import re
+import shutil
+import subprocess
+import sys
+from pathlib import Path
+from typing import NamedTuple, Optional
+
+from video_encoding import CREATION_FLAGS, build_x264_command
+
+# crf_range: بازه‌ای که حالت جستجو در آن دوبخشی می‌کند
+PROFILES = {
+    'hero': {
+        'crf': 20, 'preset': 'veryslow', 'max_width': 1920, 'audio_bitrate': '192k',
+        'tune': 'film', 'profile': 'high', 'level': '4.0', 'crf_range': (16, 26),
+    },
+    'preview': {
+        'crf': 23, 'preset': 'slow', 'max_width': 1920, 'audio_bitrate': '128k',
+        'crf_range': (18, 30),
+    },
+    'mobile': {
+        'crf': 28, 'preset': 'medium', 'max_width': 1280, 'audio_bitrate': '96k',
+        'crf_range': (22, 34),
+    },
+}
+
+# نام‌های قبلی (transcode_queue.py --profile standard/compact/spider)
+PROFILE_ALIASES = {'spider': 'hero', 'standard': 'preview', 'compact': 'mobile'}
+
+METRICS = ('vmaf', 'ssim')
+
+
+def profile_names():
+    """نام پروفایل‌ها و نام‌های قدیمی برای choices در argparse"""
+    return sorted(PROFILES) + sorted(PROFILE_ALIASES)
+
+
+def resolve_profile(name):
+    name = PROFILE_ALIASES.get(name, name)
+    if name not in PROFILES:
+        raise ValueError(f"Unknown encoding profile: {name!r} (expected one of {sorted(PROFILES)})")
+    return name
+
+
+def encoder_settings(profile, crf=None, preset=None):
+    """
+    آرگومان‌های build_x264_command برای یک پروفایل (قابل ذخیره در JSON)
+    عرض فقط کوچک می‌شود؛ ویدیوی کوچک‌تر از max_width بزرگ نمی‌شود
+    """
+    spec = PROFILES[resolve_profile(profile)]
+    extra_args = []
+    if spec.get('tune'):
+        extra_args += ['-tune', spec['tune']]
+    if spec.get('profile'):
+        extra_args += ['-profile:v', spec['profile']]
+    if spec.get('level'):
+        extra_args += ['-level', spec['level']]
+    return {
+        'crf': str(spec['crf'] if crf is None else crf),
+        'preset': preset or spec['preset'],
+        'scale': f"'min({spec['max_width']},iw)':-2",
+        'audio_bitrate': spec['audio_bitrate'],
+        'extra_args': extra_args,
+    }
+
+
+def build_command(input_file, output_file, profile, crf=None, preset=None, extra_args=(),
+                  ffmpeg_path='ffmpeg'):
+    settings = encoder_settings(profile, crf, preset)
+    settings['extra_args'] = settings['extra_args'] + list(extra_args)
+    return build_x264_command(str(input_file), str(output_file), ffmpeg_path=ffmpeg_path, **settings)
+
+
+def run_ffmpeg(cmd):
+    """stderr کامل برمی‌گردد (فیلترهای ssim/libvmaf نتیجه را آنجا چاپ می‌کنند)"""
+    try:
+        result = subprocess.run(cmd, capture_output=True, text=True, creationflags=CREATION_FLAGS)
+    except FileNotFoundError:
+        raise RuntimeError("ffmpeg not found. Please install ffmpeg first.")
+    if result.returncode != 0:
+        error = result.stderr[-300:] if result.stderr else ''
+        raise RuntimeError(f"ffmpeg failed: {error}")
+    return result.stderr
+
+
+def encode(input_file, output_file, profile, crf=None, preset=None, ffmpeg_path='ffmpeg'):
+    """
+    encode در فایل موقت کنار خروجی و سپس os.replace؛ خروجی نیمه‌کاره هرگز جای فایل قبلی را نمی‌گیرد
+    خروجی: حجم فایل (بایت)
+    """
+    output_file = Path(output_file)
+    partial = output_file.with_name(output_file.stem + '.part' + output_file.suffix)
+    try:
+        run_ffmpeg(build_command(input_file, partial, profile, crf, preset, ffmpeg_path=ffmpeg_path))
+        os.replace(partial, output_file)
+    finally:
+        if partial.exists():
+            partial.unlink()
+    return output_file.stat().st_size
+
+
+def measure_quality(distorted, reference, metric='vmaf', ffmpeg_path='ffmpeg'):
+    """
+    امتیاز VMAF (۰ تا ۱۰۰) یا SSIM (۰ تا ۱) خروجی نسبت به منبع
+    منبع با scale2ref به ابعاد خروجی برده می‌شود تا پروفایل‌های کوچک‌شده هم قابل مقایسه باشند
+    """
+    if metric not in METRICS:
+        raise ValueError(f"Unknown metric: {metric!r} (expected one of {METRICS})")
+    graph = (f"[1:v][0:v]scale2ref=flags=bicubic[ref][dist];"
+             f"[dist]setpts=PTS-STARTPTS[d];[ref]setpts=PTS-STARTPTS[r];"
+             f"[d][r]{'libvmaf' if metric == 'vmaf' else 'ssim'}")
+    cmd = [ffmpeg_path, '-hide_banner', '-nostats', '-i', str(distorted), '-i', str(reference),
+           '-lavfi', graph, '-f', 'null', '-']
+    try:
+        stderr = run_ffmpeg(cmd)
+    except RuntimeError as exc:
+        if metric == 'vmaf' and 'libvmaf' in str(exc):
+            raise RuntimeError("this ffmpeg build has no libvmaf; use --target-ssim instead")
+        raise
+    pattern = r'VMAF score[:=]\s*([\d.]+)' if metric == 'vmaf' else r'All:\s*([\d.]+)'
+    matches = re.findall(pattern, stderr)
+    if not matches:
+        raise RuntimeError(f"could not read the {metric.upper()} score from ffmpeg output")
+    return float(matches[-1])
+
+
+class SearchResult(NamedTuple):
+    crf: int
+    size: int
+    score: Optional[float]
+    met: bool          # آیا هدف در بازه CRF پروفایل قابل دستیابی بود
+    trials: int
+
+
+def search_crf(input_file, output_file, profile, target_vmaf=None, target_ssim=None,
+               target_size=None, crf_range=None, preset=None, ffmpeg_path='ffmpeg', log=print):
+    """
+    CRF را دوبخشی می‌کند؛ فقط یکی از سه هدف:
+    - target_vmaf / target_ssim: بزرگ‌ترین CRF (کوچک‌ترین فایل) که امتیازش حداقل برابر هدف است
+    - target_size (بایت): کوچک‌ترین CRF (بهترین کیفیت) که حجمش از هدف بیشتر نیست
+    هر CRF حداکثر یک بار encode می‌شود و فقط بهترین خروجی نگه داشته می‌شود.
+    اگر هیچ CRF‌ای به هدف نرسد، نزدیک‌ترین سر بازه ذخیره می‌شود (met=False).
+    """
+    targets = [t for t in (target_vmaf, target_ssim, target_size) if t is not None]
+    if len(targets) != 1:
+        raise ValueError("search_crf needs exactly one of target_vmaf, target_ssim, target_size")
+    metric = 'vmaf' if target_vmaf is not None else 'ssim' if target_ssim is not None else None
+    low, high = crf_range or PROFILES[resolve_profile(profile)]['crf_range']
+    output_file = Path(output_file)
+    trials = {}   # crf -> (path, size, score)
+
+    def trial(crf):
+        if crf not in trials:
+            path = output_file.with_name(f"{output_file.stem}.crf{crf}{output_file.suffix}")
+            size = encode(input_file, path, profile, crf, preset, ffmpeg_path)
+            trials[crf] = (path, size, None)
+            score = measure_quality(path, input_file, metric, ffmpeg_path) if metric else None
+            trials[crf] = (path, size, score)
+            shown = f", {metric.upper()} {score:.4g}" if metric else ''
+            log(f"  crf {crf}: {size / (1024 * 1024):.2f} MB{shown}")
+        return trials[crf]
+
+    def meets(crf):
+        _, size, score = trial(crf)
+        if target_size is not None:
+            return size <= target_size
+        return score >= (target_vmaf if metric == 'vmaf' else target_ssim)
+
+    best = None
+    lo, hi = low, high
+    try:
+        while lo <= hi:
+            mid = (lo + hi) // 2
+            if meets(mid):
+                best = mid
+                # کیفیت با CRF بالاتر کم می‌شود، حجم با CRF پایین‌تر زیاد می‌شود
+                if target_size is None:
+                    lo = mid + 1
+                else:
+                    hi = mid - 1
+            elif target_size is None:
+                hi = mid - 1
+            else:
+                lo = mid + 1
+
+        met = best is not None
+        if not met:
+            best = low if target_size is None else high
+            trial(best)
+        path, size, score = trials[best]
+        os.replace(path, output_file)
+    finally:
+        for path, _, _ in trials.values():
+            if path.exists():
+                path.unlink()
+    return SearchResult(best, size, score, met, len(trials))
+
+
+def parse_size(value):
+    """'4M'، '800k' یا تعداد بایت"""
+    match = re.fullmatch(r'\s*([\d.]+)\s*([kKmMgG]?)[bB]?\s*', value)
+    if not match:
+        raise argparse.ArgumentTypeError(f"invalid size: {value!r} (e.g. 4M, 800k)")
+    factor = {'': 1, 'k': 1024, 'm': 1024 ** 2, 'g': 1024 ** 3}[match.group(2).lower()]
+    return int(float(match.group(1)) * factor)
+
+
+def default_output(input_file):
+    name, ext = os.path.splitext(str(input_file))
+    return f"{name}_optimized{ext}"
+
+
+def optimize_file(input_file, output_file=None, profile='preview', crf=None, preset=None,
+                  ffmpeg_path='ffmpeg'):
+    """encode با یک پروفایل و چاپ حجم قبل و بعد؛ همان خروجی اسکریپت‌های قدیمی"""
+    if not os.path.exists(input_file):
+        print(f"Error: File {input_file} not found!")
+        return False
+    output_file = output_file or default_output(input_file)
+    settings = encoder_settings(profile, crf, preset)
+
+    original_size = os.path.getsize(input_file) / (1024 * 1024)
+    print(f"Original file size: {original_size:.2f} MB")
+    print(f"Profile: {resolve_profile(profile)} (CRF {settings['crf']}, preset {settings['preset']})")
+    print("Optimizing video... This may take a few minutes...")
+    try:
+        new_size = encode(input_file, output_file, profile, crf, preset, ffmpeg_path) / (1024 * 1024)
+    except RuntimeError as exc:
+        print(f"Error during optimization: {exc}")
+        return False
+    reduction = ((original_size - new_size) / original_size) * 100 if original_size else 0.0
+    print("SUCCESS: Optimization complete!")
+    print(f"New file size: {new_size:.2f} MB")
+    print(f"Size reduction: {reduction:.1f}%")
+    return True
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Encode a video with a declarative profile")
+    parser.add_argument('input', type=Path)
+    parser.add_argument('-o', '--output', type=Path, help="output file (default: <name>_optimized.<ext>)")
+    parser.add_argument('--profile', choices=profile_names(), default='preview',
+                        help="encoding profile (default: %(default)s)")
+    parser.add_argument('--crf', type=int, help="fixed CRF instead of the profile value")
+    parser.add_argument('--preset', help="override the x264 preset of the profile")
+    target = parser.add_mutually_exclusive_group()
+    target.add_argument('--target-vmaf', type=float, help="smallest file with at least this VMAF (0-100)")
+    target.add_argument('--target-ssim', type=float, help="smallest file with at least this SSIM (0-1)")
+    target.add_argument('--target-size', type=parse_size, help="best quality within this size, e.g. 4M")
+    parser.add_argument('--crf-range', type=int, nargs=2, metavar=('LOW', 'HIGH'),
+                        help="CRF bounds of the search (default: from the profile)")
+    args = parser.parse_args()
+
+    if shutil.which('ffmpeg') is None:
+        print("Error: ffmpeg not found. Please install ffmpeg first.")
+        sys.exit(1)
+    output = args.output or Path(default_output(args.input))
+    searching = any(t is not None for t in (args.target_vmaf, args.target_ssim, args.target_size))
+    if not searching:
+        if not optimize_file(str(args.input), str(output), args.profile, args.crf, args.preset):
+            sys.exit(1)
+        print(f"Saved: {output}")
+        return
+
+    print(f"Searching CRF for {args.input} ({resolve_profile(args.profile)} profile)...")
+    try:
+        result = search_crf(args.input, output, args.profile, args.target_vmaf, args.target_ssim,
+                            args.target_size, args.crf_range, args.preset)
+    except RuntimeError as exc:
+        print(f"Error: {exc}")
+        sys.exit(1)
+    original_size = args.input.stat().st_size
+    reduction = ((original_size - result.size) / original_size) * 100 if original_size else 0.0
+    if not result.met:
+        print("Warning: target not reachable within the CRF range; kept the closest setting")
+    shown = f", score {result.score:.4g}" if result.score is not None else ''
+    print(f"Chose CRF {result.crf} after {result.trials} encodes: "
+          f"{result.size / (1024 * 1024):.2f} MB ({reduction:.1f}% smaller{shown})")
+    print(f"Saved: {output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,181 @@
+"""
+Build-time asset fingerprinting
+ارجاع به تصاویر، ویدیوها، CSS و JS را در صفحات و مانیفست‌ها به نام‌های دارای هش محتوا تبدیل می‌کند
+
+images/about-workshop.webp  ->  images/about-workshop.3f9a0c1b2d.webp
+
+فایل روی دیسک تغییر نام نمی‌کند؛ main.py و app.py نام هش‌دار را به فایل اصلی نگاشت می‌کنند و
+وقتی هش با محتوای فعلی یکی است آن را immutable کش می‌کنند. اجرای دوباره اسکریپت هش‌های قدیمی را به‌روز می‌کند.
+
+سازنده‌های مانیفست (update_manifest_from_fs.py، update_errorr_media.py، image_derivatives.py و
+watch_assets.py) خروجی را از keep_fingerprints می‌گذرانند: مانیفستی که یک بار هش‌دار شده پس از ساخت
+دوباره هم هش‌دار می‌ماند. هش فایل‌ها در images/.fingerprint-index.json کش می‌شود.
+"""
+from __future__ import annotations
+
+import re
+import sys
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Tuple
+from urllib.parse import unquote
+
+from dedup_assets import ContentIndex
+from http_cache import file_digest
+
+BASE_DIR = Path(__file__).resolve().parent
+INDEX_NAME = ".fingerprint-index.json"
+
+# فایل‌هایی که ارجاع‌هایشان بازنویسی می‌شود
+TARGET_FILES = [
+    "index.html",
+    "gallery.html",
+    "errorr.html",
+    "gallery-data.json",
+    "errorr-media.json",
+]
+
+FINGERPRINT_LENGTH = 10
+FINGERPRINTED_EXTENSIONS = (
+    "webp", "avif", "jpg", "jpeg", "png", "gif", "svg", "ico",
+    "mp4", "webm", "css", "js", "woff", "woff2", "ttf",
+)
+
+FINGERPRINT_RE = re.compile(
+    r"^(?P<stem>.+)\.(?P<hash>[0-9a-f]{%d})(?P<suffix>\.[A-Za-z0-9]+)$" % FINGERPRINT_LENGTH
+)
+REFERENCE_RE = re.compile(
+    r"(?<![\w-])(?P<path>(?:images|static|videos)/[^\"'<>\n\r?#]*?\.(?:%s))(?=[\"'?#)\s,\\]|$)"
+    % "|".join(FINGERPRINTED_EXTENSIONS),
+    re.IGNORECASE,
+)
+
+
+def fingerprint_path(rel_path: str, digest: str) -> str:
+    """images/a.webp -> images/a.<hash>.webp"""
+    stem, dot, suffix = rel_path.rpartition(".")
+    if not dot:
+        return f"{rel_path}.{digest[:FINGERPRINT_LENGTH]}"
+    return f"{stem}.{digest[:FINGERPRINT_LENGTH]}.{suffix}"
+
+
+def split_fingerprint(rel_path: str) -> Tuple[str, Optional[str]]:
+    """images/a.<hash>.webp -> ("images/a.webp", "<hash>")"""
+    match = FINGERPRINT_RE.match(rel_path)
+    if not match:
+        return rel_path, None
+    return match.group("stem") + match.group("suffix"), match.group("hash")
+
+
+def resolve_fingerprinted(root: Path, rel_path: str) -> Tuple[Optional[Path], Optional[str]]:
+    """
+    مسیر درخواست را به فایل واقعی نگاشت می‌کند
+    خروجی: (فایل یا None، هش موجود در URL یا None)
+    """
+    candidate = root / rel_path
+    if candidate.is_file():
+        return candidate, None
+    original, fingerprint = split_fingerprint(rel_path)
+    if fingerprint is None:
+        return None, None
+    candidate = root / original
+    if candidate.is_file():
+        return candidate, fingerprint
+    return None, None
+
+
+def fingerprint_is_current(path: Path, fingerprint: Optional[str]) -> bool:
+    return fingerprint is not None and file_digest(path).startswith(fingerprint)
+
+
+def digest_index(root: Path = BASE_DIR) -> ContentIndex:
+    """هش sha256 فایل‌های ارجاع‌شده بر اساس (size, mtime_ns)؛ اجرای بعدی فقط فایل‌های تغییرکرده را می‌خواند"""
+    return ContentIndex(root, root / "images" / INDEX_NAME)
+
+
+def rewrite_references(text: str, root: Path, counts: Dict[str, int],
+                       digest: Optional[Callable[[str], str]] = None) -> str:
+    """
+    تمام ارجاع‌های شناخته‌شده را در یک عبور با نام هش‌دار فعلی جایگزین می‌کند
+    digest: مسیر نسبی -> sha256 (پیش‌فرض file_digest بدون کش پایدار)
+    """
+    digest = digest or (lambda rel: file_digest(root / rel))
+
+    def replace(match: re.Match) -> str:
+        raw = match.group("path")
+        # مسیر خام ممکن است URL-encoded باشد (مثلاً New%20folder%20(8))؛ هش در متن خام درج می‌شود
+        original_raw, _ = split_fingerprint(raw)
+        rel = unquote(original_raw)
+        if not (root / rel).is_file():
+            return raw
+        updated = fingerprint_path(original_raw, digest(rel))
+        if updated != raw:
+            counts[updated] = counts.get(updated, 0) + 1
+        return updated
+
+    return REFERENCE_RE.sub(replace, text)
+
+
+def strip_fingerprints(text: str) -> str:
+    """images/a.<hash>.webp -> images/a.webp در کل متن؛ برای سازنده‌هایی که مسیر فایل روی دیسک لازم دارند"""
+    return REFERENCE_RE.sub(lambda match: split_fingerprint(match.group("path"))[0], text)
+
+
+def has_fingerprints(text: str) -> bool:
+    return any(split_fingerprint(match.group("path"))[1] for match in REFERENCE_RE.finditer(text))
+
+
+def keep_fingerprints(path: Path, content: str, root: Path = BASE_DIR,
+                      index: Optional[ContentIndex] = None) -> str:
+    """
+    اگر نسخه فعلی path هش‌دار است (fingerprint_assets.py روی آن اجرا شده)، content جدید هم با هش‌های
+    فعلی برگردانده می‌شود؛ وگرنه content بدون تغییر. ساخت دوباره مانیفست نام‌های هش‌دار و کش immutable
+    را از بین نمی‌برد
+    """
+    try:
+        current = path.read_text(encoding="utf-8")
+    except (FileNotFoundError, UnicodeDecodeError):
+        return content
+    if not has_fingerprints(current):
+        return content
+    own_index = index is None
+    index = index or digest_index(root)
+    updated = rewrite_references(content, root, {}, index.digest)
+    if own_index:
+        index.save()
+    return updated
+
+
+def fingerprint_files(root: Path, targets: List[str]) -> Dict[str, int]:
+    """ارجاع‌ها را در فایل‌های هدف بازنویسی می‌کند؛ خروجی: تعداد ارجاع‌های تغییرکرده برای هر فایل"""
+    # update_manifest_from_fs خودش keep_fingerprints را از این ماژول import می‌کند
+    from update_manifest_from_fs import write_if_changed
+
+    report: Dict[str, int] = {}
+    index = digest_index(root)
+    for name in targets:
+        path = root / name
+        if not path.is_file():
+            continue
+        original = path.read_text(encoding="utf-8")
+        counts: Dict[str, int] = {}
+        updated = rewrite_references(original, root, counts, index.digest)
+        report[name] = sum(counts.values())
+        if updated != original:
+            write_if_changed(path, updated)
+    index.save()
+    return report
+
+
+def main() -> None:
+    targets = sys.argv[1:] or TARGET_FILES
+    report = fingerprint_files(BASE_DIR, targets)
+    if not report:
+        print("No target files found. Exiting.")
+        return
+    for name, changed in report.items():
+        print(f"{name}: {changed} references updated")
+    print(f"Fingerprinted references in {sum(1 for c in report.values() if c)} of {len(report)} files.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,179 @@
+"""
+In-memory gallery catalog for the paginated manifest API
+ایندکس درون‌حافظه‌ای gallery-data.json که app.py از آن صفحه‌های هر دسته را سرو می‌کند.
+
+ایندکس یک بار هنگام شروع ساخته می‌شود و وقتی gallery-data.json تغییر کند (مثلاً توسط
+watch_assets.py) دوباره بارگذاری می‌شود؛ هر دسته (shard) هش جداگانه دارد تا تغییر یک دسته
+ETag دسته‌های دیگر را باطل نکند.
+"""
+from __future__ import annotations
+
+import base64
+import hashlib
+import json
+import os
+import threading
+import time
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+BASE_DIR = Path(__file__).resolve().parent
+MANIFEST_PATH = BASE_DIR / "gallery-data.json"
+RESPONSIVE_KEY = "_responsive"
+ALL_CATEGORY = "all"
+
+DEFAULT_PAGE_SIZE = 24
+MAX_PAGE_SIZE = 100
+# حداقل فاصله بین دو stat روی gallery-data.json (ثانیه)
+REFRESH_INTERVAL = 1.0
+
+# همان ترتیب نمایشی reorderPolygonProjects در gallery-page.js: پروژه‌های 53 تا 74 اول می‌آیند
+FEATURED_RANGES = {"polygon-3d": (52, 74)}
+
+
+class InvalidCursor(ValueError):
+    pass
+
+
+def _reorder(category: str, items: List[dict]) -> List[dict]:
+    featured = FEATURED_RANGES.get(category)
+    if not featured or len(items) <= featured[0]:
+        return items
+    start, end = featured[0], min(featured[1], len(items))
+    return items[start:end] + items[:start] + items[end:]
+
+
+def encode_cursor(offset: int, item: dict) -> str:
+    raw = json.dumps([offset, item["category"], item["image"]], ensure_ascii=False, separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode("utf-8")).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Tuple[int, str, str]:
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        offset, category, image = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")))
+        return int(offset), str(category), str(image)
+    except (ValueError, TypeError, UnicodeError) as exc:
+        raise InvalidCursor(cursor) from exc
+
+
+class Shard:
+    """آیتم‌های یک دسته به ترتیب نمایش، همراه با هش محتوا برای ETag"""
+
+    def __init__(self, name: str, items: List[dict]) -> None:
+        self.name = name
+        self.items = items
+        self.positions: Dict[Tuple[str, str], int] = {}
+        for position, item in enumerate(items):
+            self.positions.setdefault((item["category"], item["image"]), position)
+        payload = json.dumps(items, ensure_ascii=False, sort_keys=True).encode("utf-8")
+        self.digest = hashlib.sha256(payload).hexdigest()
+
+    def resolve_cursor(self, cursor: Optional[str]) -> int:
+        """
+        موقعیت شروع صفحه بعد؛ اگر پیش از درخواست صفحه بعد تصویری اضافه یا حذف شده باشد،
+        صفحه از بعد از آخرین تصویر دیده‌شده ادامه می‌یابد
+        """
+        if not cursor:
+            return 0
+        offset, category, image = decode_cursor(cursor)
+        if 0 < offset <= len(self.items):
+            anchor = self.items[offset - 1]
+            if anchor["category"] == category and anchor["image"] == image:
+                return offset
+        position = self.positions.get((category, image))
+        if position is not None:
+            return position + 1
+        return max(0, min(offset, len(self.items)))
+
+    def page(self, start: int, limit: int) -> Tuple[List[dict], Optional[str]]:
+        items = self.items[start:start + limit]
+        end = start + len(items)
+        next_cursor = encode_cursor(end, items[-1]) if items and end < len(self.items) else None
+        return items, next_cursor
+
+    def payload(self, start: int, limit: int) -> dict:
+        """بدنه پاسخ ‎/api/gallery/<category>؛ embed_manifest_once.py صفحه اول را با همین شکل در HTML می‌گذارد"""
+        items, next_cursor = self.page(start, limit)
+        return {"category": self.name, "total": len(self.items), "items": items, "next": next_cursor}
+
+    def etag(self, start: int, limit: int) -> str:
+        return f"{self.digest[:20]}-{start}-{limit}"
+
+
+def build_shards(manifest: dict) -> Dict[str, Shard]:
+    """یک shard برای هر دسته مانیفست و یک shard برای all"""
+    responsive = manifest.get(RESPONSIVE_KEY) or {}
+    shards: Dict[str, Shard] = {}
+    every: List[dict] = []
+    for category, images in manifest.items():
+        if category.startswith("_") or not isinstance(images, list):
+            continue
+        items = []
+        for number, image in enumerate(images, start=1):
+            item = {"category": category, "image": image, "n": number}
+            if image in responsive:
+                item["responsive"] = responsive[image]
+            items.append(item)
+        items = _reorder(category, items)
+        shards[category] = Shard(category, items)
+        every.extend(items)
+    shards[ALL_CATEGORY] = Shard(ALL_CATEGORY, every)
+    return shards
+
+
+class GalleryCatalog:
+    """snapshot فعلی shardها؛ جایگزینی snapshot اتمیک است و خواندن قفل نمی‌خواهد"""
+
+    def __init__(self, manifest_path: Path = MANIFEST_PATH, refresh_interval: float = REFRESH_INTERVAL) -> None:
+        self.manifest_path = manifest_path
+        self.refresh_interval = refresh_interval
+        self.shards: Dict[str, Shard] = {}
+        self.version = ""
+        self._stamp: Optional[Tuple[int, int]] = None
+        self._checked_at = 0.0
+        self._lock = threading.Lock()
+        self.reload()
+
+    def reload(self) -> bool:
+        """gallery-data.json را دوباره می‌خواند اگر تغییر کرده باشد؛ خروجی: آیا بارگذاری شد"""
+        with self._lock:
+            self._checked_at = time.monotonic()
+            try:
+                st = os.stat(self.manifest_path)
+            except FileNotFoundError:
+                return False
+            stamp = (st.st_mtime_ns, st.st_size)
+            if stamp == self._stamp:
+                return False
+            try:
+                manifest = json.loads(self.manifest_path.read_text(encoding="utf-8"))
+            except ValueError:
+                # فایل نیمه‌نوشته؛ snapshot قبلی تا تغییر بعدی سرو می‌شود
+                return False
+            self.shards = build_shards(manifest)
+            self.version = hashlib.sha256(
+                "".join(shard.digest for shard in self.shards.values()).encode("ascii")).hexdigest()
+            self._stamp = stamp
+            return True
+
+    def maybe_refresh(self) -> None:
+        if time.monotonic() - self._checked_at >= self.refresh_interval:
+            self.reload()
+
+    def shard(self, category: str) -> Optional[Shard]:
+        self.maybe_refresh()
+        return self.shards.get(category)
+
+    def categories(self) -> Dict[str, dict]:
+        self.maybe_refresh()
+        return {name: {"count": len(shard.items), "etag": shard.digest[:20]}
+                for name, shard in self.shards.items()}
+
+
+def clamp_limit(value: Optional[str]) -> int:
+    try:
+        limit = int(value) if value else DEFAULT_PAGE_SIZE
+    except ValueError:
+        limit = DEFAULT_PAGE_SIZE
+    return max(1, min(limit, MAX_PAGE_SIZE))
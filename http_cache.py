@@ -0,0 +1,161 @@
+"""
+HTTP caching helpers shared by main.py and app.py
+ابزارهای کش HTTP (ETag، Last-Modified، 304) مشترک بین main.py و app.py
+"""
+from __future__ import annotations
+
+import hashlib
+import mimetypes
+import os
+import re
+import threading
+from datetime import timezone
+from email.utils import formatdate, parsedate_to_datetime
+from pathlib import Path
+from typing import Dict, Mapping, Optional, Tuple, Union
+
+PathLike = Union[str, Path]
+
+# URLهای دارای هش محتوا هرگز تغییر نمی‌کنند
+IMMUTABLE_CACHE_CONTROL = 'public, max-age=31536000, immutable'
+# HTML و مانیفست‌ها همیشه اعتبارسنجی می‌شوند تا به هش‌های جدید اشاره کنند؛ پاسخ 304 فقط هدر است
+REVALIDATE_CACHE_CONTROL = 'no-cache'
+# سایر فایل‌ها (URL بدون هش)
+DEFAULT_CACHE_CONTROL = 'public, max-age=3600'
+
+REVALIDATE_EXTENSIONS = {'.html', '.htm', '.json', '.m3u8'}
+# اسکریپت service worker فهرست precache و revisionها را دارد (build_sw_precache.py)
+REVALIDATE_NAMES = {'sw.js'}
+
+# خروجی package_hls.py: همه چیز زیر videos/hls/<name>/<hash>/ از روی محتوای منبع نام‌گذاری شده است
+HLS_VERSIONED_RE = re.compile(r'/hls/[^/]+/[0-9a-f]{10}/')
+# خروجی video_previews.py: videos/previews/<name>-<hash>.webp|mp4
+PREVIEW_VERSIONED_RE = re.compile(r'/previews/[^/]+-[0-9a-f]{10}\.(?:webp|mp4)$')
+
+# mimetypes سیستم ‎.ts را فایل ترجمه Qt می‌شناسد
+mimetypes.add_type('application/vnd.apple.mpegurl', '.m3u8')
+mimetypes.add_type('video/mp2t', '.ts')
+
+# تعداد کاراکترهای hex از sha256 که در ETag می‌آید
+ETAG_LENGTH = 32
+# فقط فایل‌های کوچک‌تر از این حجم (بایت) با هش محتوا ETag می‌گیرند؛ هش روی نخ درخواست زمانی
+# متناسب با حجم فایل دارد و اولین seek یک ویدیوی چندصد مگابایتی را کند می‌کرد
+ETAG_HASH_MAX_SIZE = int(os.environ.get('ETAG_HASH_MAX_SIZE', 2 * 1024 * 1024))
+# ویدیو و صدا با هر حجمی ETag را از stat می‌گیرند
+STAT_ETAG_MIME_PREFIXES = ('video/', 'audio/')
+
+
+class FileDigestCache:
+    """
+    کش sha256 فایل‌ها بر اساس (mtime, size)
+    فایل فقط وقتی دوباره خوانده می‌شود که تغییر کرده باشد
+    """
+
+    def __init__(self) -> None:
+        self._entries: Dict[str, Tuple[Tuple[int, int], str]] = {}
+        self._lock = threading.Lock()
+
+    def digest(self, path: PathLike, stat_result: Optional[os.stat_result] = None) -> str:
+        st = stat_result or os.stat(path)
+        key = os.fspath(path)
+        stamp = (st.st_mtime_ns, st.st_size)
+        with self._lock:
+            entry = self._entries.get(key)
+        if entry is not None and entry[0] == stamp:
+            return entry[1]
+
+        hasher = hashlib.sha256()
+        with open(path, 'rb') as f:
+            for chunk in iter(lambda: f.read(1024 * 1024), b''):
+                hasher.update(chunk)
+        digest = hasher.hexdigest()
+
+        with self._lock:
+            self._entries[key] = (stamp, digest)
+        return digest
+
+
+DIGESTS = FileDigestCache()
+
+
+def file_digest(path: PathLike, stat_result: Optional[os.stat_result] = None) -> str:
+    """sha256 محتوای فایل (hex)"""
+    return DIGESTS.digest(path, stat_result)
+
+
+def stat_validator(stat_result: os.stat_result) -> str:
+    """اعتبارسنج از stat (حجم، mtime_ns، inode)؛ فایل جایگزین‌شده inode یا mtime تازه دارد"""
+    return f'{stat_result.st_size:x}-{stat_result.st_mtime_ns:x}-{stat_result.st_ino:x}'
+
+
+def uses_stat_validator(path: PathLike, size: int) -> bool:
+    if size > ETAG_HASH_MAX_SIZE:
+        return True
+    mimetype = mimetypes.guess_type(os.fspath(path))[0] or ''
+    return mimetype.startswith(STAT_ETAG_MIME_PREFIXES)
+
+
+def file_validator(path: PathLike, stat_result: Optional[os.stat_result] = None) -> str:
+    """
+    مقدار ETag فایل (بدون نقل‌قول)
+    فایل‌های کوچک: ابتدای sha256 محتوا، فایل‌های بزرگ و ویدیوها: stat_validator بدون خواندن فایل
+    """
+    st = stat_result or os.stat(path)
+    if uses_stat_validator(path, st.st_size):
+        return stat_validator(st)
+    return file_digest(path, st)[:ETAG_LENGTH]
+
+
+def strong_etag(validator: str) -> str:
+    """ETag قوی از خروجی file_validator"""
+    return f'"{validator}"'
+
+
+def http_date(timestamp: float) -> str:
+    return formatdate(timestamp, usegmt=True)
+
+
+def etag_matches(if_none_match: str, etag: str) -> bool:
+    """مقایسه ضعیف If-None-Match (RFC 9110 §13.1.2)"""
+    if if_none_match.strip() == '*':
+        return True
+    wanted = etag[2:] if etag.startswith('W/') else etag
+    for candidate in if_none_match.split(','):
+        candidate = candidate.strip()
+        if candidate.startswith('W/'):
+            candidate = candidate[2:]
+        if candidate == wanted:
+            return True
+    return False
+
+
+def is_not_modified(headers: Mapping[str, str], etag: str, mtime: float) -> bool:
+    """
+    آیا درخواست شرطی با نسخه فعلی مطابقت دارد؟
+    If-None-Match بر If-Modified-Since اولویت دارد
+    """
+    if_none_match = headers.get('If-None-Match')
+    if if_none_match is not None:
+        return etag_matches(if_none_match, etag)
+
+    if_modified_since = headers.get('If-Modified-Since')
+    if if_modified_since:
+        try:
+            since = parsedate_to_datetime(if_modified_since)
+        except (TypeError, ValueError, IndexError, OverflowError):
+            return False
+        if since.tzinfo is None:
+            # قالب قدیمی بدون منطقه زمانی؛ مطابق RFC 7231 همان UTC است
+            since = since.replace(tzinfo=timezone.utc)
+        return int(mtime) <= since.timestamp()
+    return False
+
+
+def cache_control_for(path: PathLike, fingerprinted: bool = False) -> str:
+    """سیاست Cache-Control بر اساس نوع فایل و هش‌دار بودن URL"""
+    posix = Path(path).as_posix()
+    if fingerprinted or HLS_VERSIONED_RE.search(posix) or PREVIEW_VERSIONED_RE.search(posix):
+        return IMMUTABLE_CACHE_CONTROL
+    if Path(path).suffix.lower() in REVALIDATE_EXTENSIONS or Path(path).name in REVALIDATE_NAMES:
+        return REVALIDATE_CACHE_CONTROL
+    return DEFAULT_CACHE_CONTROL
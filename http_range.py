@@ -0,0 +1,154 @@
+"""
+HTTP Range requests (RFC 7233) shared by main.py and app.py
+پاسخ 206 برای یک یا چند بازه، اعتبارسنجی If-Range و ارسال zero-copy با sendfile.
+
+مرورگر هنگام seek یا ادامه پخش ویدیو روی موبایل فقط بازه لازم را درخواست می‌کند؛ بدون این ماژول
+کل فایل MP4 دوباره دانلود می‌شد.
+"""
+from __future__ import annotations
+
+import secrets
+import socket
+from typing import BinaryIO, Iterator, List, Optional, Tuple
+
+from http_cache import http_date
+
+# بیشتر از این تعداد بازه در یک درخواست نادیده گرفته می‌شود (پاسخ 200 کامل)
+MAX_RANGES = 16
+# بازه‌هایی که فاصله‌شان کمتر از این مقدار است یکی می‌شوند (سربار هدر هر part از بایت‌های اضافه بیشتر است)
+COALESCE_GAP = 80
+
+# (start, end) با end شامل، مثل Content-Range
+ByteRange = Tuple[int, int]
+
+
+class RangeNotSatisfiable(Exception):
+    """هیچ بازه‌ای در محدوده فایل نیست؛ پاسخ 416 با Content-Range: bytes */size"""
+
+    def __init__(self, size: int) -> None:
+        super().__init__(size)
+        self.size = size
+
+
+def parse_range_header(header: Optional[str], size: int) -> Optional[List[ByteRange]]:
+    """
+    Range: bytes=0-99, 200-, -500 -> [(0, 99), (200, size-1), (size-500, size-1)]
+    خروجی None یعنی هدر نادیده گرفته شود (نحو نامعتبر، واحد ناشناخته، بازه‌های زیاد)
+    """
+    if not header:
+        return None
+    unit, _, spec = header.partition("=")
+    if unit.strip().lower() != "bytes" or not spec.strip():
+        return None
+    specs = [part.strip() for part in spec.split(",") if part.strip()]
+    if not specs or len(specs) > MAX_RANGES:
+        return None
+
+    ranges: List[ByteRange] = []
+    for part in specs:
+        first, dash, last = part.partition("-")
+        if not dash:
+            return None
+        first, last = first.strip(), last.strip()
+        try:
+            if not first:
+                # -N: N بایت آخر
+                suffix = int(last)
+                if suffix < 0:
+                    return None
+                if suffix == 0:
+                    continue
+                ranges.append((max(0, size - suffix), size - 1))
+                continue
+            start = int(first)
+            end = int(last) if last else None
+        except ValueError:
+            return None
+        if start < 0 or (end is not None and end < start):
+            return None
+        if start >= size:
+            continue
+        ranges.append((start, size - 1 if end is None else min(end, size - 1)))
+
+    if not ranges:
+        raise RangeNotSatisfiable(size)
+    return coalesce(ranges)
+
+
+def coalesce(ranges: List[ByteRange]) -> List[ByteRange]:
+    """بازه‌های هم‌پوشان یا نزدیک را ادغام می‌کند تا یک کلاینت نتواند یک بایت را چند بار بخواهد"""
+    merged: List[ByteRange] = []
+    for start, end in sorted(ranges):
+        if merged and start <= merged[-1][1] + 1 + COALESCE_GAP:
+            merged[-1] = (merged[-1][0], max(merged[-1][1], end))
+        else:
+            merged.append((start, end))
+    return merged
+
+
+def if_range_allows(if_range: Optional[str], etag: str, mtime: float) -> bool:
+    """
+    If-Range: اگر نسخه کلاینت همان نسخه فعلی نباشد، Range نادیده گرفته می‌شود و کل فایل ارسال می‌شود
+    ETag باید strong و برابر باشد؛ تاریخ باید دقیقاً برابر Last-Modified باشد
+    """
+    if not if_range:
+        return True
+    value = if_range.strip()
+    if value.startswith('"') or value.startswith("W/"):
+        # مقایسه strong: ETag ضعیف هرگز مطابق نیست
+        return value == etag
+    return value == http_date(mtime)
+
+
+def content_range(start: int, end: int, size: int) -> str:
+    return f"bytes {start}-{end}/{size}"
+
+
+class MultipartPlan:
+    """بدنه multipart/byteranges: هدر هر part، بازه فایل و trailer؛ طول کل از قبل محاسبه می‌شود"""
+
+    def __init__(self, ranges: List[ByteRange], size: int, content_type: str) -> None:
+        self.boundary = secrets.token_hex(16)
+        self.parts: List[Tuple[bytes, int, int]] = []
+        for index, (start, end) in enumerate(ranges):
+            header = (
+                ("\r\n" if index else "")
+                + f"--{self.boundary}\r\n"
+                + f"Content-Type: {content_type}\r\n"
+                + f"Content-Range: {content_range(start, end, size)}\r\n\r\n"
+            ).encode("latin-1")
+            self.parts.append((header, start, end - start + 1))
+        self.trailer = f"\r\n--{self.boundary}--\r\n".encode("latin-1")
+        self.content_length = sum(len(h) + length for h, _, length in self.parts) + len(self.trailer)
+
+    @property
+    def content_type(self) -> str:
+        return f"multipart/byteranges; boundary={self.boundary}"
+
+    def iter_chunks(self, f: BinaryIO, chunk_size: int = 64 * 1024) -> Iterator[bytes]:
+        """برای سرورهای WSGI که sendfile ندارند"""
+        for header, start, length in self.parts:
+            yield header
+            yield from read_range(f, start, length, chunk_size)
+        yield self.trailer
+
+
+def read_range(f: BinaryIO, start: int, length: int, chunk_size: int = 64 * 1024) -> Iterator[bytes]:
+    f.seek(start)
+    remaining = length
+    while remaining > 0:
+        chunk = f.read(min(chunk_size, remaining))
+        if not chunk:
+            break
+        remaining -= len(chunk)
+        yield chunk
+
+
+def sendfile(sock: socket.socket, f: BinaryIO, offset: int, count: int) -> int:
+    """
+    ارسال zero-copy بخشی از فایل روی سوکت (os.sendfile)؛ socket.sendfile اگر sendfile
+    در دسترس نباشد خودش به send معمولی برمی‌گردد
+    """
+    if count <= 0:
+        return 0
+    return sock.sendfile(f, offset, count)
@@ -0,0 +1,207 @@
+"""
+Responsive image derivatives
+برای هر تصویر گالری نسخه‌های کوچک‌تر (320/640/1280/1920 پیکسل) با فرمت WebP و AVIF می‌سازد
+و آن‌ها را با ابعادشان زیر کلید "_responsive" در gallery-data.json ثبت می‌کند تا
+gallery-page.js بتواند از srcset/sizes استفاده کند.
+
+images/lightbox/a.webp  ->  images/responsive/lightbox/a-640w.webp, images/responsive/lightbox/a-640w.avif, ...
+
+نسخه‌ها وقتی دوباره ساخته می‌شوند که هش محتوای منبع یا تنظیمات encoder عوض شده باشد (نه با مقایسه
+mtime)؛ هش هر منبع و تنظیمات نسخه‌هایش در images/responsive/.index.json ثبت می‌شود.
+"""
+from __future__ import annotations
+
+import json
+import os
+import sys
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from PIL import Image, ImageOps, UnidentifiedImageError, features
+
+from dedup_assets import ContentIndex
+from fingerprint_assets import keep_fingerprints, strip_fingerprints
+from update_manifest_from_fs import write_if_changed
+
+
+BASE_DIR = Path(__file__).resolve().parent
+MANIFEST_PATH = BASE_DIR / "gallery-data.json"
+DERIVATIVES_DIR = "images/responsive"
+RESPONSIVE_KEY = "_responsive"
+INDEX_NAME = ".index.json"
+# نسخه 2: چرخش EXIF اعمال می‌شود؛ نسخه‌های ساخته‌شده با نسخه 1 ممکن است خوابیده باشند
+INDEX_VERSION = 2
+
+WIDTHS = (320, 640, 1280, 1920)
+# (فرمت، پسوند، تنظیمات encoder)؛ AVIF فقط اگر Pillow از آن پشتیبانی کند
+FORMATS: List[Tuple[str, str, Dict[str, int]]] = [
+    ("webp", ".webp", {"quality": 80, "method": 4}),
+    ("avif", ".avif", {"quality": 55, "speed": 6}),
+]
+
+
+def available_formats() -> List[Tuple[str, str, Dict[str, int]]]:
+    formats = [FORMATS[0]]
+    if features.check("avif"):
+        formats.append(FORMATS[1])
+    return formats
+
+
+def derivative_path(rel_path: str, width: int, suffix: str) -> str:
+    """images/lightbox/a.webp -> images/responsive/lightbox/a-640w.webp"""
+    rel = Path(rel_path)
+    parts = rel.parts[1:] if rel.parts and rel.parts[0] == "images" else rel.parts
+    sub = Path(*parts).with_suffix("")
+    return f"{DERIVATIVES_DIR}/{sub.as_posix()}-{width}w{suffix}"
+
+
+def target_widths(source_width: int) -> List[int]:
+    """فقط عرض‌های کوچک‌تر از تصویر اصلی؛ تصویر کوچک‌تر از 320 یک نسخه هم‌عرض می‌گیرد"""
+    widths = [w for w in WIDTHS if w < source_width]
+    return widths or [source_width]
+
+
+EXIF_ORIENTATION = 0x0112
+# Orientationهایی که عرض و ارتفاع را جابه‌جا می‌کنند (چرخش 90/270 درجه)
+TRANSPOSED_ORIENTATIONS = {5, 6, 7, 8}
+
+
+def oriented_size(img: Image.Image) -> Tuple[int, int]:
+    """ابعاد تصویر پس از exif_transpose، بدون decode پیکسل‌ها"""
+    width, height = img.size
+    if img.getexif().get(EXIF_ORIENTATION) in TRANSPOSED_ORIENTATIONS:
+        return height, width
+    return width, height
+
+
+def _prepare(img: Image.Image) -> Image.Image:
+    # مثل convert_image در convert_images_to_webp.py: عکس گوشی با تگ Orientation ایستاده می‌ماند
+    img = ImageOps.exif_transpose(img)
+    if img.mode not in ("RGB", "RGBA"):
+        if "transparency" in img.info or img.mode in ("P", "LA"):
+            return img.convert("RGBA")
+        return img.convert("RGB")
+    return img
+
+
+def settings_key() -> str:
+    """عرض‌ها و تنظیمات encoder فرمت‌های در دسترس؛ تغییر آن‌ها همه نسخه‌ها را باطل می‌کند"""
+    formats = [[fmt, options] for fmt, _, options in available_formats()]
+    return json.dumps({"widths": WIDTHS, "formats": formats}, sort_keys=True, separators=(",", ":"))
+
+
+class DerivativeIndex:
+    """
+    مسیر منبع -> هش محتوا و تنظیماتی که نسخه‌های فعلی با آن ساخته شده‌اند
+    هش منبع‌ها بر اساس (size, mtime_ns) کش می‌شود، پس منبع تغییرنکرده دوباره خوانده نمی‌شود
+    """
+
+    def __init__(self, root: Path = BASE_DIR) -> None:
+        self.path = root / DERIVATIVES_DIR / INDEX_NAME
+        self.digests = ContentIndex(root, root / DERIVATIVES_DIR / ".source-hashes.json")
+        self.settings = settings_key()
+        self.entries: Dict[str, dict] = {}
+        try:
+            data = json.loads(self.path.read_text(encoding="utf-8"))
+            if data.get("version") == INDEX_VERSION:
+                self.entries = data.get("files", {})
+        except (OSError, ValueError):
+            self.entries = {}
+
+    def is_fresh(self, root: Path, rel_path: str, digest: str, outputs: List[str]) -> bool:
+        entry = self.entries.get(rel_path)
+        return (bool(entry) and entry.get("source") == digest and entry.get("settings") == self.settings
+                and all((root / rel_output).is_file() for rel_output in outputs))
+
+    def record(self, rel_path: str, digest: str) -> None:
+        self.entries[rel_path] = {"source": digest, "settings": self.settings}
+
+    def save(self, keep: Optional[Iterable[str]] = None) -> None:
+        if keep is not None:
+            keep = set(keep)
+            self.entries = {rel: entry for rel, entry in self.entries.items() if rel in keep}
+            self.digests.prune(keep)
+        self.digests.save()
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        payload = {"version": INDEX_VERSION, "files": self.entries}
+        write_if_changed(self.path, json.dumps(payload, ensure_ascii=False, sort_keys=True))
+
+
+def generate_derivatives(root: Path, rel_path: str, index: Optional[DerivativeIndex] = None) -> Optional[dict]:
+    """
+    نسخه‌های یک تصویر را می‌سازد (نسخه‌های به‌روز دوباره ساخته نمی‌شوند)
+    خروجی: {"width", "height", "sources": {"webp": [[url, w, h], ...], "avif": [...]}}
+    """
+    index = index or DerivativeIndex(root)
+    digest = index.digests.digest(rel_path)
+    source = root / rel_path
+    with Image.open(source) as img:
+        width, height = oriented_size(img)
+        entry = {"width": width, "height": height, "sources": {}}
+        plan = []
+        for fmt, suffix, options in available_formats():
+            variants = []
+            for target in target_widths(width):
+                target_height = max(1, round(height * target / width))
+                variants.append([derivative_path(rel_path, target, suffix), target, target_height])
+                plan.append((fmt, options, variants[-1]))
+            entry["sources"][fmt] = variants
+        if index.is_fresh(root, rel_path, digest, [variant[0] for _, _, variant in plan]):
+            return entry
+        prepared = _prepare(img)
+        for fmt, options, (rel_output, target, target_height) in plan:
+            output = root / rel_output
+            output.parent.mkdir(parents=True, exist_ok=True)
+            # فایل موقت + os.replace تا سرور هیچ‌وقت نسخه نیمه‌نوشته را سرو نکند
+            tmp = output.with_name(output.name + ".tmp")
+            prepared.resize((target, target_height), Image.LANCZOS).save(tmp, fmt.upper(), **options)
+            os.replace(tmp, output)
+    index.record(rel_path, digest)
+    return entry
+
+
+def build_responsive_index(root: Path, manifest: Dict[str, object]) -> Tuple[Dict[str, dict], List[Tuple[str, str]]]:
+    """manifest باید مسیرهای روی دیسک داشته باشد (strip_fingerprints)"""
+    responsive: Dict[str, dict] = {}
+    errors: List[Tuple[str, str]] = []
+    index = DerivativeIndex(root)
+    for key, images in manifest.items():
+        if key.startswith("_") or not isinstance(images, list):
+            continue
+        for rel_path in images:
+            if rel_path in responsive:
+                continue
+            try:
+                entry = generate_derivatives(root, rel_path, index)
+            except (UnidentifiedImageError, OSError) as exc:
+                errors.append((rel_path, str(exc)))
+                continue
+            if entry is not None:
+                responsive[rel_path] = entry
+    index.save(keep=list(responsive))
+    return responsive, errors
+
+
+def main() -> None:
+    manifest_path = Path(sys.argv[1]) if len(sys.argv) > 1 else MANIFEST_PATH
+    if not manifest_path.exists():
+        print(f"{manifest_path} not found; run update_manifest_from_fs.py first", file=sys.stderr)
+        sys.exit(1)
+
+    # مسیرهای هش‌دار (fingerprint_assets.py) به فایل روی دیسک برمی‌گردند و هنگام نوشتن دوباره هش‌دار می‌شوند
+    manifest = json.loads(strip_fingerprints(manifest_path.read_text(encoding="utf-8")))
+    responsive, errors = build_responsive_index(BASE_DIR, manifest)
+    manifest[RESPONSIVE_KEY] = responsive
+    content = keep_fingerprints(manifest_path, json.dumps(manifest, ensure_ascii=False, indent=4))
+    write_if_changed(manifest_path, content)
+
+    formats = ", ".join(fmt for fmt, _, _ in available_formats())
+    print(f"Generated responsive variants ({formats}) for {len(responsive)} images.")
+    if errors:
+        print("The following images could not be processed:", file=sys.stderr)
+        for path_str, error_msg in errors:
+            print(f"- {path_str}: {error_msg}", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
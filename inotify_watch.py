@@ -0,0 +1,71 @@
+"""
+inotify bindings shared by watch_assets.py and asset_cache.py
+فراخوانی inotify_init1 و inotify_add_watch از طریق ctypes (بدون وابستگی اضافه) و تجزیه رویدادهای
+خوانده‌شده از fd. فقط روی لینوکس کار می‌کند؛ در غیر این صورت Inotify() خطای OSError یا
+AttributeError می‌دهد و فراخواننده به polling برمی‌گردد.
+"""
+from __future__ import annotations
+
+import ctypes
+import ctypes.util
+import os
+import struct
+from typing import Iterator, Tuple
+
+IN_MODIFY = 0x00000002
+IN_ATTRIB = 0x00000004
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_DELETE_SELF = 0x00000400
+IN_MOVE_SELF = 0x00000800
+IN_Q_OVERFLOW = 0x00004000
+IN_IGNORED = 0x00008000
+IN_ISDIR = 0x40000000
+
+EVENT_HEADER = struct.Struct("iIII")
+READ_SIZE = 64 * 1024
+
+
+def parse_events(data: bytes) -> Iterator[Tuple[int, int, str]]:
+    """(wd، mask، نام) هر رویداد؛ نام برای رویدادهای خود دایرکتوری خالی است"""
+    offset = 0
+    while offset + EVENT_HEADER.size <= len(data):
+        wd, mask, _cookie, length = EVENT_HEADER.unpack_from(data, offset)
+        offset += EVENT_HEADER.size
+        raw_name = data[offset:offset + length].rstrip(b"\0")
+        offset += length
+        yield wd, mask, os.fsdecode(raw_name)
+
+
+class Inotify:
+    """یک fd از inotify؛ blocking=False برای استفاده با select"""
+
+    def __init__(self, blocking: bool = True) -> None:
+        libc_name = ctypes.util.find_library("c") or "libc.so.6"
+        # روی سیستم بدون inotify یکی از این دو OSError یا AttributeError می‌دهد
+        self._libc = ctypes.CDLL(libc_name, use_errno=True)
+        flags = os.O_CLOEXEC if blocking else os.O_NONBLOCK | os.O_CLOEXEC
+        self.fd = self._libc.inotify_init1(flags)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+
+    def fileno(self) -> int:
+        return self.fd
+
+    def add_watch(self, path: str, mask: int) -> int:
+        """wd یا عدد منفی اگر دایرکتوری وجود نداشته باشد یا watch ممکن نباشد"""
+        return self._libc.inotify_add_watch(self.fd, os.fsencode(path), mask)
+
+    def read_events(self) -> Iterator[Tuple[int, int, str]]:
+        """رویدادهای آماده؛ در حالت blocking تا رسیدن رویداد منتظر می‌ماند"""
+        try:
+            data = os.read(self.fd, READ_SIZE)
+        except BlockingIOError:
+            return iter(())
+        return parse_events(data)
+
+    def close(self) -> None:
+        os.close(self.fd)
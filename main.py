@@ -3,48 +3,422 @@ Simple HTTP Server for NAROON Website
 سرور ساده HTTP برای سایت نارون
 """
 import http.server
+import io
+import json
+import select
 import socketserver
 import os
 import sys
+import threading
+import time
+import urllib.parse
+from concurrent.futures import ThreadPoolExecutor
+from http import HTTPStatus
 from pathlib import Path
 
+from asset_cache import STATS_PATH, AssetCache, CachedAsset, asset_stamp
+from fingerprint_assets import split_fingerprint
+from http_range import (
+    MultipartPlan,
+    RangeNotSatisfiable,
+    content_range,
+    if_range_allows,
+    parse_range_header,
+    sendfile,
+)
+from precompress_assets import is_compressible, select_precompressed
+from server_metrics import METRICS_PATH, PROMETHEUS_CONTENT_TYPE, ServerMetrics, metrics_allowed
+from http_cache import (
+    DEFAULT_CACHE_CONTROL,
+    REVALIDATE_CACHE_CONTROL,
+    cache_control_for,
+    file_digest,
+    file_validator,
+    is_not_modified,
+    strong_etag,
+)
+
 # تنظیم پورت از متغیر محیطی یا استفاده از پورت پیش‌فرض (مطابق liara.json)
 PORT = int(os.environ.get('PORT', 8000))
 
+# حالت سرو: threaded (استخر نخ با تعداد محدود) یا single (رفتار قدیمی TCPServer)
+SERVER_MODE = os.environ.get('SERVER_MODE', 'threaded').strip().lower()
+# تعداد نخ‌های کارگر؛ هر اتصال keep-alive تا پایان عمرش یک نخ را اشغال می‌کند (اتصال بیکار با وجود صف بسته می‌شود)
+SERVER_WORKERS = int(os.environ.get('SERVER_WORKERS', min(128, (os.cpu_count() or 1) * 32)))
+# ثانیه‌هایی که یک اتصال keep-alive بیکار باز می‌ماند تا نخ آزاد شود
+KEEPALIVE_TIMEOUT = float(os.environ.get('KEEPALIVE_TIMEOUT', 5))
+# فاصله بررسی صف در اتصال keep-alive بیکار؛ اگر اتصال دیگری منتظر نخ باشد، اتصال بیکار زودتر بسته می‌شود
+KEEPALIVE_POLL_INTERVAL = float(os.environ.get('KEEPALIVE_POLL_INTERVAL', 0.05))
+# طول صف listen برای اتصال‌هایی که هنوز accept نشده‌اند
+LISTEN_BACKLOG = int(os.environ.get('LISTEN_BACKLOG', 256))
+
 # مسیر اصلی پروژه (فایل index.html در همین مسیر است)
 BASE_DIR = Path(__file__).parent
 # SimpleHTTPRequestHandler کل درخت را سرو می‌کند، بنابراین دارایی‌های داخل static نیز در دسترس‌اند
 DIRECTORY = BASE_DIR
 
+# فایل‌های پرتکرار از حافظه سرو می‌شوند (asset_cache.py)
+ASSETS = AssetCache()
+# متریک‌های هر route (‎/metrics) و لاگ دسترسی JSON
+METRICS = ServerMetrics('main', asset_cache=ASSETS)
+
 class MyHTTPRequestHandler(http.server.SimpleHTTPRequestHandler):
     """Handler سفارشی برای مدیریت درخواست‌ها"""
-    
+
+    # HTTP/1.1 تا مرورگر بتواند اتصال را برای تصاویر بعدی گالری دوباره استفاده کند
+    protocol_version = 'HTTP/1.1'
+    # StreamRequestHandler این مقدار را روی سوکت تنظیم می‌کند؛ اتصال بیکار بسته می‌شود
+    timeout = KEEPALIVE_TIMEOUT
+
+    # وضعیت درخواست جاری برای METRICS
+    _status = None
+    _sent_bytes = 0
+    _cache_result = None
+
     def __init__(self, *args, **kwargs):
         super().__init__(*args, directory=str(DIRECTORY), **kwargs)
-    
+
+    def handle(self):
+        # مثل BaseHTTPRequestHandler.handle، ولی پیش از انتظار برای درخواست بعدی صف را بررسی می‌کند
+        self.close_connection = True
+        self.handle_one_request()
+        while not self.close_connection and self._wait_for_next_request():
+            self.handle_one_request()
+
+    def _wait_for_next_request(self):
+        """
+        تا رسیدن درخواست بعدی روی اتصال keep-alive صبر می‌کند
+        اگر در این فاصله اتصال دیگری منتظر نخ آزاد باشد یا KEEPALIVE_TIMEOUT بگذرد False برمی‌گرداند
+        """
+        if self._has_buffered_request():
+            return True
+        has_waiting = getattr(self.server, 'has_waiting_connections', lambda: False)
+        deadline = time.monotonic() + self.timeout
+        while True:
+            if has_waiting():
+                return False
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return False
+            readable, _, _ = select.select([self.connection], [], [],
+                                           min(KEEPALIVE_POLL_INTERVAL, remaining))
+            if readable:
+                return True
+
+    def _has_buffered_request(self):
+        """آیا بایت‌های درخواست بعدی (pipelining) از قبل در بافر rfile خوانده شده‌اند؟"""
+        self.connection.setblocking(False)
+        try:
+            return bool(self.rfile.peek(1))
+        except OSError:
+            return False
+        finally:
+            self.connection.settimeout(self.timeout)
+
+    def do_GET(self):
+        self._observe(super().do_GET)
+
+    def do_HEAD(self):
+        self._observe(super().do_HEAD)
+
+    def _observe(self, handler):
+        """زمان تولید پاسخ، status و حجم بدنه را پس از ارسال ثبت می‌کند"""
+        started = time.perf_counter()
+        self._status, self._sent_bytes, self._cache_result = None, 0, None
+        try:
+            handler()
+        finally:
+            if self._status is not None:
+                METRICS.record(self.command, self.path, self._status, self._sent_bytes,
+                               time.perf_counter() - started, cache=self._cache_result,
+                               remote=self.client_address[0])
+
+    def send_response(self, code, message=None):
+        self._status = int(code)
+        super().send_response(code, message)
+
+    def send_header(self, keyword, value):
+        if keyword.lower() == 'content-length' and self.command != 'HEAD':
+            self._sent_bytes = int(value)
+        super().send_header(keyword, value)
+
+    def send_head(self):
+        """
+        مثل SimpleHTTPRequestHandler.send_head با ETag قوی، پاسخ 304، نگاشت نام‌های هش‌دار،
+        سرو نسخه‌های از پیش فشرده‌شده و پاسخ 206 برای درخواست‌های Range
+        """
+        self._cache_control = DEFAULT_CACHE_CONTROL
+        # بخش‌هایی از فایل که copyfile باید بفرستد: [(هدر part، شروع، طول)]، trailer
+        self._body_parts = None
+        self._body_trailer = b''
+        url_path = urllib.parse.urlsplit(self.path).path
+        if url_path in (STATS_PATH, METRICS_PATH):
+            # مثل app.py؛ برای بقیه کلاینت‌ها این مسیرها وجود ندارند
+            if not metrics_allowed(self.client_address[0], self.headers):
+                return self.send_error(HTTPStatus.NOT_FOUND, "File not found")
+            if url_path == STATS_PATH:
+                return self._send_body(json.dumps(ASSETS.stats()), "application/json")
+            return self._send_body(METRICS.render_prometheus(), PROMETHEUS_CONTENT_TYPE)
+        # Range همیشه از مسیر فایل سرو می‌شود
+        cache_key = None
+        if ASSETS.enabled and 'Range' not in self.headers:
+            cache_key = ASSETS.key(url_path, self.headers.get('Accept-Encoding'))
+            asset = ASSETS.get(cache_key)
+            self._cache_result = 'miss' if asset is None else 'hit'
+            if asset is not None:
+                return self._send_cached(asset)
+
+        path = self.translate_path(self.path)
+        fingerprint = None
+        if not os.path.exists(path):
+            # images/a.<hash>.webp (خروجی fingerprint_assets.py) -> images/a.webp
+            original, fingerprint = split_fingerprint(path)
+            if fingerprint is not None and os.path.isfile(original):
+                path = original
+            else:
+                fingerprint = None
+        if os.path.isdir(path):
+            index = os.path.join(path, 'index.html')
+            if not self.path.split('?', 1)[0].endswith('/') or not os.path.isfile(index):
+                # ریدایرکت به مسیر دارای / یا لیست دایرکتوری
+                return super().send_head()
+            path = index
+        if path.endswith('/'):
+            self.send_error(HTTPStatus.NOT_FOUND, "File not found")
+            return None
+
+        # نسخه ‎.br/.gz ساخته‌شده توسط precompress_assets.py؛ بدون فشرده‌سازی در زمان درخواست
+        body_path, encoding = select_precompressed(path, self.headers.get('Accept-Encoding'))
+        try:
+            f = open(body_path, 'rb')
+        except OSError:
+            self.send_error(HTTPStatus.NOT_FOUND, "File not found")
+            return None
+
+        try:
+            fs = os.fstat(f.fileno())
+            # ETag هر نسخه (اصلی، br، gzip) از همان نسخه ساخته می‌شود؛ ویدیوها و فایل‌های بزرگ هش نمی‌شوند
+            etag = strong_etag(file_validator(body_path, fs))
+            if fingerprint is not None:
+                current = file_digest(path).startswith(fingerprint)
+            else:
+                current = False
+            self._cache_control = cache_control_for(path, fingerprinted=current)
+            vary = is_compressible(path)
+
+            if is_not_modified(self.headers, etag, fs.st_mtime):
+                self.send_response(HTTPStatus.NOT_MODIFIED)
+                self.send_header("ETag", etag)
+                self.send_header("Last-Modified", self.date_time_string(fs.st_mtime))
+                if vary:
+                    self.send_header("Vary", "Accept-Encoding")
+                self.end_headers()
+                f.close()
+                return None
+
+            content_type = self.guess_type(path)
+            ranges = None
+            if self.command == 'GET' and if_range_allows(self.headers.get('If-Range'), etag, fs.st_mtime):
+                try:
+                    ranges = parse_range_header(self.headers.get('Range'), fs.st_size)
+                except RangeNotSatisfiable:
+                    self.send_response(HTTPStatus.REQUESTED_RANGE_NOT_SATISFIABLE)
+                    self.send_header("Content-Range", f"bytes */{fs.st_size}")
+                    self.send_header("Content-Length", "0")
+                    self.end_headers()
+                    f.close()
+                    return None
+
+            if ranges is None and cache_key is not None and ASSETS.admits(fs.st_size):
+                cached = self._cache_file(cache_key, f, fs, body_path, path, content_type, etag, encoding, vary)
+                if cached is not None:
+                    return self._send_cached(cached)
+
+            if ranges is None:
+                self.send_response(HTTPStatus.OK)
+                self.send_header("Content-type", content_type)
+                self.send_header("Content-Length", str(fs.st_size))
+                self._body_parts = [(b'', 0, fs.st_size)]
+            elif len(ranges) == 1:
+                start, end = ranges[0]
+                self.send_response(HTTPStatus.PARTIAL_CONTENT)
+                self.send_header("Content-type", content_type)
+                self.send_header("Content-Range", content_range(start, end, fs.st_size))
+                self.send_header("Content-Length", str(end - start + 1))
+                self._body_parts = [(b'', start, end - start + 1)]
+            else:
+                plan = MultipartPlan(ranges, fs.st_size, content_type)
+                self.send_response(HTTPStatus.PARTIAL_CONTENT)
+                self.send_header("Content-type", plan.content_type)
+                self.send_header("Content-Length", str(plan.content_length))
+                self._body_parts = plan.parts
+                self._body_trailer = plan.trailer
+            self.send_header("Accept-Ranges", "bytes")
+            if encoding:
+                self.send_header("Content-Encoding", encoding)
+            if vary:
+                self.send_header("Vary", "Accept-Encoding")
+            self.send_header("Last-Modified", self.date_time_string(fs.st_mtime))
+            self.send_header("ETag", etag)
+            self.end_headers()
+            return f
+        except:
+            f.close()
+            raise
+
+    def _cache_file(self, key, f, fs, body_path, path, content_type, etag, encoding, vary):
+        """فایل کوچک را یک بار می‌خواند و در ASSETS ثبت می‌کند؛ None یعنی فایل هنگام خواندن تغییر کرد"""
+        stamp = asset_stamp(body_path, path)
+        body = f.read()
+        if stamp is None or len(body) != fs.st_size or stamp[0][1] != fs.st_mtime_ns:
+            f.seek(0)
+            return None
+        f.close()
+        asset = CachedAsset(body=body, content_type=content_type, etag=etag, mtime=fs.st_mtime,
+                            last_modified=self.date_time_string(fs.st_mtime),
+                            cache_control=self._cache_control, encoding=encoding, vary=vary)
+        ASSETS.put(key, asset, stamp)
+        return asset
+
+    def _send_cached(self, asset):
+        """پاسخ 200 یا 304 با هدرهای از پیش ساخته‌شده؛ بدون stat و open"""
+        self._cache_control = asset.cache_control
+        if is_not_modified(self.headers, asset.etag, asset.mtime):
+            self.send_response(HTTPStatus.NOT_MODIFIED)
+            self.send_header("ETag", asset.etag)
+            self.send_header("Last-Modified", asset.last_modified)
+            if asset.vary:
+                self.send_header("Vary", "Accept-Encoding")
+            self.end_headers()
+            return None
+        self.send_response(HTTPStatus.OK)
+        for name, value in asset.headers:
+            self.send_header(name, value)
+        self.end_headers()
+        return io.BytesIO(asset.body)
+
+    def _send_body(self, text, content_type):
+        body = text.encode('utf-8')
+        self._cache_control = REVALIDATE_CACHE_CONTROL
+        self.send_response(HTTPStatus.OK)
+        self.send_header("Content-type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        return io.BytesIO(body)
+
+    def copyfile(self, source, outputfile):
+        """بدنه پاسخ با sendfile (بدون کپی در فضای کاربر)؛ فقط بازه‌های درخواست‌شده ارسال می‌شوند"""
+        if self._body_parts is None:
+            # پاسخ از حافظه یا لیست دایرکتوری (BytesIO) از SimpleHTTPRequestHandler
+            if isinstance(source, io.BytesIO):
+                outputfile.write(source.getbuffer())
+                return
+            return super().copyfile(source, outputfile)
+        for header, start, length in self._body_parts:
+            if header:
+                outputfile.write(header)
+            sendfile(self.connection, source, start, length)
+        if self._body_trailer:
+            outputfile.write(self._body_trailer)
+
     def end_headers(self):
+        # وقتی اتصال‌های دیگری در صف منتظر نخ هستند، keep-alive را پس از همین پاسخ می‌بندیم تا نخ آزاد شود
+        if (self.protocol_version == 'HTTP/1.1'
+                and getattr(self.server, 'has_waiting_connections', lambda: False)()):
+            self.send_header('Connection', 'close')
         # اضافه کردن هدرهای امنیتی و بهینه‌سازی
-        self.send_header('Cache-Control', 'public, max-age=3600')
+        self.send_header('Cache-Control', getattr(self, '_cache_control', DEFAULT_CACHE_CONTROL))
         self.send_header('X-Content-Type-Options', 'nosniff')
         self.send_header('X-Frame-Options', 'SAMEORIGIN')
         super().end_headers()
-    
+
+    def log_request(self, code='-', size='-'):
+        # لاگ دسترسی پس از ارسال پاسخ توسط _observe نوشته می‌شود
+        pass
+
     def log_message(self, format, *args):
-        # لاگ ساده برای لینارا
-        sys.stderr.write("%s - - [%s] %s\n" %
-                        (self.address_string(),
-                         self.log_date_time_string(),
-                         format % args))
+        # خطاها (log_error) با همان قالب JSON لاگ دسترسی؛ status پاسخ‌های send_error در خود لاگ دسترسی هست
+        if format.startswith('code %d'):
+            return
+        METRICS.log_event('error', format % args, remote=self.client_address[0])
+
+
+class ThreadPoolHTTPServer(http.server.HTTPServer):
+    """
+    سرور HTTP با استخر نخ محدود
+    هر اتصال در یکی از SERVER_WORKERS نخ پردازش می‌شود، پس یک کلاینت کند بقیه را مسدود نمی‌کند
+    """
+
+    request_queue_size = LISTEN_BACKLOG
+
+    def __init__(self, server_address, handler_class, max_workers=SERVER_WORKERS):
+        self.max_workers = max(1, max_workers)
+        self._waiting = 0
+        self._waiting_lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=self.max_workers,
+                                            thread_name_prefix='naroon-http')
+        super().__init__(server_address, handler_class)
+
+    def has_waiting_connections(self):
+        """آیا اتصالی accept شده که هنوز نخ آزاد پیدا نکرده است؟"""
+        return self._waiting > 0
+
+    def process_request(self, request, client_address):
+        with self._waiting_lock:
+            self._waiting += 1
+        self._executor.submit(self._process_request_worker, request, client_address)
+
+    def _process_request_worker(self, request, client_address):
+        with self._waiting_lock:
+            self._waiting -= 1
+        try:
+            self.finish_request(request, client_address)
+        except Exception:
+            self.handle_error(request, client_address)
+        finally:
+            self.shutdown_request(request)
+
+    def server_close(self):
+        super().server_close()
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+
+class SingleThreadRequestHandler(MyHTTPRequestHandler):
+    """در حالت تک‌نخی، اتصال keep-alive بقیه بازدیدکنندگان را معطل می‌کند"""
+
+    protocol_version = 'HTTP/1.0'
+
+
+class SingleThreadHTTPServer(socketserver.TCPServer):
+    """رفتار قدیمی: یک اتصال در هر لحظه"""
+
+    allow_reuse_address = True
+    request_queue_size = LISTEN_BACKLOG
+
+
+def create_server(port=PORT, mode=SERVER_MODE, workers=SERVER_WORKERS):
+    """ساخت سرور مطابق حالت انتخاب‌شده در متغیرهای محیطی"""
+    if mode == 'single':
+        return SingleThreadHTTPServer(("", port), SingleThreadRequestHandler)
+    if mode != 'threaded':
+        raise ValueError(f"Unknown SERVER_MODE: {mode!r} (expected 'threaded' or 'single')")
+    return ThreadPoolHTTPServer(("", port), MyHTTPRequestHandler, max_workers=workers)
+
 
 def main():
     """شروع سرور HTTP"""
     try:
-        with socketserver.TCPServer(("", PORT), MyHTTPRequestHandler) as httpd:
+        with create_server() as httpd:
             print(f"Server starting on port {PORT}")
+            if isinstance(httpd, ThreadPoolHTTPServer):
+                print(f"Mode: threaded ({httpd.max_workers} workers, keep-alive {KEEPALIVE_TIMEOUT:g}s)")
+            else:
+                print("Mode: single")
             print(f"Serving directory: {DIRECTORY}")
             print(f"Access the site at: http://localhost:{PORT}")
             httpd.serve_forever()
     except KeyboardInterrupt:
+        METRICS.access_log.flush()
         print("\nServer stopped by user")
         sys.exit(0)
     except Exception as e:
@@ -53,4 +427,3 @@ def main():
 
 if __name__ == "__main__":
     main()
-
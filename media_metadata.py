@@ -0,0 +1,200 @@
+"""
+Typed metadata for the media manifests
+برای هر فایل مانیفست نوع، ابعاد، حجم، مدت (ویدیو)، هش محتوا و یک placeholder کوچک (LQIP) می‌سازد
+تا صفحه بدون حدس زدن از روی پسوند و بدون درخواست اضافه، جای هر تصویر را از قبل رزرو کند.
+
+- ابعاد تصویر فقط از هدر فایل خوانده می‌شود (Image.open تا load() چیزی را decode نمی‌کند)
+- placeholder فقط وقتی فایل تغییر کرده ساخته می‌شود؛ JPEG با draft در مقیاس ۱/۸ decode می‌شود
+- نتیجه بر اساس (size, mtime_ns) در images/.media-index.json کش می‌شود، پس اسکن‌های بعدی
+  فقط stat می‌کنند
+"""
+from __future__ import annotations
+
+import base64
+import hashlib
+import io
+import json
+import os
+import re
+from pathlib import Path
+from typing import Dict, Iterable, Optional, Tuple
+
+from PIL import Image, UnidentifiedImageError
+
+from video_encoding import probe_video
+
+BASE_DIR = Path(__file__).resolve().parent
+INDEX_PATH = BASE_DIR / "images" / ".media-index.json"
+INDEX_VERSION = 1
+
+IMAGE_EXTENSIONS = {".jpg", ".jpeg", ".png", ".gif", ".webp", ".svg", ".avif", ".bmp"}
+VIDEO_EXTENSIONS = {".mp4", ".webm", ".ogg", ".mov", ".avi"}
+
+# ضلع بزرگ placeholder (پیکسل)؛ مرورگر آن را کشیده و با blur نمایش می‌دهد
+PLACEHOLDER_SIZE = 16
+PLACEHOLDER_QUALITY = 40
+
+SVG_HEAD_BYTES = 4096
+SVG_LENGTH_RE = r'\s{name}\s*=\s*["\']\s*([\d.]+)(?:px)?\s*["\']'
+SVG_VIEWBOX_RE = re.compile(r'\sviewBox\s*=\s*["\']\s*[-\d.]+[\s,]+[-\d.]+[\s,]+([\d.]+)[\s,]+([\d.]+)')
+
+
+def media_type(rel_path: str) -> Optional[str]:
+    suffix = Path(rel_path).suffix.lower()
+    if suffix in IMAGE_EXTENSIONS:
+        return "image"
+    if suffix in VIDEO_EXTENSIONS:
+        return "video"
+    return None
+
+
+def _sha256(path: Path) -> str:
+    hasher = hashlib.sha256()
+    with path.open("rb") as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b""):
+            hasher.update(chunk)
+    return hasher.hexdigest()
+
+
+def svg_dimensions(path: Path) -> Optional[Tuple[int, int]]:
+    """width/height ریشه SVG یا در نبود آن‌ها viewBox"""
+    with path.open("rb") as f:
+        head = f.read(SVG_HEAD_BYTES).decode("utf-8", "replace")
+    start = head.find("<svg")
+    if start < 0:
+        return None
+    tag = head[start:head.find(">", start) + 1 or None]
+    width = re.search(SVG_LENGTH_RE.format(name="width"), tag)
+    height = re.search(SVG_LENGTH_RE.format(name="height"), tag)
+    if width and height:
+        return round(float(width.group(1))), round(float(height.group(1)))
+    viewbox = SVG_VIEWBOX_RE.search(tag)
+    if viewbox:
+        return round(float(viewbox.group(1))), round(float(viewbox.group(2)))
+    return None
+
+
+def image_dimensions(path: Path) -> Optional[Tuple[int, int]]:
+    """فقط هدر خوانده می‌شود"""
+    if path.suffix.lower() == ".svg":
+        return svg_dimensions(path)
+    try:
+        with Image.open(path) as img:
+            return img.size
+    except (OSError, UnidentifiedImageError):
+        return None
+
+
+def image_placeholder(path: Path) -> Optional[str]:
+    """data URI یک WebP چند ده بایتی با ضلع بزرگ PLACEHOLDER_SIZE"""
+    if path.suffix.lower() == ".svg":
+        return None
+    try:
+        with Image.open(path) as img:
+            # JPEG: libjpeg مستقیماً در مقیاس کوچک (تا ۱/۸) decode می‌کند
+            img.draft("RGB", (PLACEHOLDER_SIZE * 2, PLACEHOLDER_SIZE * 2))
+            img.seek(0)
+            small = img.convert("RGBA" if img.mode in ("RGBA", "LA", "P") else "RGB")
+            small.thumbnail((PLACEHOLDER_SIZE, PLACEHOLDER_SIZE), Image.BILINEAR)
+            buffer = io.BytesIO()
+            small.save(buffer, "WEBP", quality=PLACEHOLDER_QUALITY, method=6)
+    except (OSError, UnidentifiedImageError, ValueError):
+        return None
+    return "data:image/webp;base64," + base64.b64encode(buffer.getvalue()).decode("ascii")
+
+
+def describe_file(path: Path, rel_path: str) -> Optional[dict]:
+    """metadata یک فایل بدون کش"""
+    kind = media_type(rel_path)
+    if kind is None:
+        return None
+    st = path.stat()
+    entry: Dict[str, object] = {"type": kind, "bytes": st.st_size, "hash": _sha256(path)}
+    if kind == "image":
+        size = image_dimensions(path)
+        if size:
+            entry["width"], entry["height"] = size
+        placeholder = image_placeholder(path)
+        if placeholder:
+            entry["placeholder"] = placeholder
+    else:
+        info = probe_video(str(path))
+        if info:
+            entry["width"], entry["height"] = info["width"], info["height"]
+            entry["duration"] = round(info["duration"], 3)
+    return entry
+
+
+class MediaIndex:
+    """
+    کش metadata بر اساس (size, mtime_ns)
+    فایل فقط وقتی دوباره خوانده می‌شود که تغییر کرده باشد
+    """
+
+    def __init__(self, root: Path = BASE_DIR, path: Path = INDEX_PATH) -> None:
+        self.root = root
+        self.path = path
+        self.entries: Dict[str, list] = {}
+        self._dirty = False
+        try:
+            data = json.loads(path.read_text(encoding="utf-8"))
+            if data.get("version") == INDEX_VERSION:
+                self.entries = data.get("files", {})
+        except (OSError, ValueError):
+            self.entries = {}
+
+    def describe(self, rel_path: str) -> Optional[dict]:
+        path = self.root / rel_path
+        try:
+            st = path.stat()
+        except OSError:
+            return None
+        cached = self.entries.get(rel_path)
+        if cached and cached[0] == st.st_size and cached[1] == st.st_mtime_ns:
+            return dict(cached[2])
+        entry = describe_file(path, rel_path)
+        if entry is None:
+            return None
+        self.entries[rel_path] = [st.st_size, st.st_mtime_ns, entry]
+        self._dirty = True
+        return dict(entry)
+
+    def describe_all(self, rel_paths: Iterable[str], posters: Optional[Dict[str, str]] = None) -> Dict[str, dict]:
+        """
+        یک اسکن برای کل مانیفست
+        posters: ویدیو -> تصویر poster (video_previews.py)؛ placeholder ویدیو از poster آن ساخته می‌شود
+        """
+        posters = posters or {}
+        described = {}
+        for rel in rel_paths:
+            entry = self.describe(rel)
+            if entry is None:
+                continue
+            poster = posters.get(rel)
+            if entry["type"] == "video" and poster:
+                poster_entry = self.describe(poster)
+                if poster_entry and poster_entry.get("placeholder"):
+                    entry["placeholder"] = poster_entry["placeholder"]
+                if poster_entry and "width" not in entry and "width" in poster_entry:
+                    entry["width"], entry["height"] = poster_entry["width"], poster_entry["height"]
+            described[rel] = entry
+        keep = set(described) | {posters[rel] for rel in described if rel in posters}
+        self.prune(keep)
+        return described
+
+    def prune(self, keep: Iterable[str]) -> None:
+        keep = set(keep)
+        stale = [rel for rel in self.entries if rel not in keep]
+        for rel in stale:
+            del self.entries[rel]
+        self._dirty = self._dirty or bool(stale)
+
+    def save(self) -> None:
+        if not self._dirty:
+            return
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = self.path.with_name(self.path.name + ".tmp")
+        payload = {"version": INDEX_VERSION, "files": self.entries}
+        tmp.write_text(json.dumps(payload, ensure_ascii=False, sort_keys=True), encoding="utf-8")
+        os.replace(tmp, self.path)
+        self._dirty = False
@@ -6,6 +6,8 @@ import os
 import subprocess
 import sys
 
+from encoding_profiles import PROFILES, optimize_file
+
 # Set UTF-8 encoding for console
 if sys.platform == 'win32':
     import codecs
@@ -51,8 +53,8 @@ def check_ffmpeg():
 
 def optimize_spider_rgb(input_file, output_file=None, ffmpeg_path='ffmpeg'):
     """
-    Optimize Spider RGB video with high quality settings
-    Uses CRF 20 for excellent quality with good compression
+    Optimize Spider RGB video with the "hero" profile
+    (CRF 20, veryslow, film tune: excellent quality with good compression)
     """
     if not os.path.exists(input_file):
         print(f"Error: File {input_file} not found!")
@@ -62,59 +64,12 @@ def optimize_spider_rgb(input_file, output_file=None, ffmpeg_path='ffmpeg'):
         name, ext = os.path.splitext(input_file)
         output_file = f"{name}_optimized{ext}"
     
-    original_size = os.path.getsize(input_file) / (1024 * 1024)
     print(f"Original file: {input_file}")
-    print(f"Original size: {original_size:.2f} MB")
     print(f"Optimizing to: {output_file}")
-    print("This may take a few minutes...")
-    
-    # FFmpeg command for high-quality compression (CRF 20 = excellent quality)
-    cmd = [
-        ffmpeg_path,
-        '-i', input_file,
-        '-c:v', 'libx264',           # H.264 codec
-        '-crf', '20',                 # Quality: 20 = excellent (18-28 range, lower = better)
-        '-preset', 'veryslow',        # Slowest = best compression
-        '-tune', 'film',              # Optimize for film/video content
-        '-vf', 'scale=1920:-2',       # Limit width to 1920px, maintain aspect ratio
-        '-c:a', 'aac',                # Audio codec
-        '-b:a', '192k',               # High quality audio bitrate
-        '-movflags', '+faststart',    # Enable web optimization (streaming ready)
-        '-pix_fmt', 'yuv420p',        # Compatibility with all browsers
-        '-profile:v', 'high',         # H.264 high profile
-        '-level', '4.0',              # H.264 level 4.0
-        '-y',                         # Overwrite output
-        output_file
-    ]
-    
-    try:
-        result = subprocess.run(
-            cmd,
-            capture_output=True,
-            text=True,
-            creationflags=subprocess.CREATE_NO_WINDOW if sys.platform == 'win32' else 0
-        )
-        
-        if result.returncode == 0:
-            if os.path.exists(output_file):
-                new_size = os.path.getsize(output_file) / (1024 * 1024)
-                reduction = ((original_size - new_size) / original_size) * 100
-                print(f"\n✓ Optimization complete!")
-                print(f"New size: {new_size:.2f} MB")
-                print(f"Size reduction: {reduction:.1f}%")
-                print(f"Quality: Excellent (CRF 20)")
-                return True
-            else:
-                print("Error: Output file was not created!")
-                return False
-        else:
-            print(f"Error during optimization:")
-            print(result.stderr)
-            return False
-            
-    except Exception as e:
-        print(f"Error: {str(e)}")
+    if not optimize_file(input_file, output_file, 'hero', ffmpeg_path=ffmpeg_path):
         return False
+    print(f"Quality: Excellent (CRF {PROFILES['hero']['crf']})")
+    return True
 
 if __name__ == "__main__":
     # Check for Spider RGB video files
@@ -1,11 +1,14 @@
 """
 Video Optimization Script
 Compresses video file size while maintaining quality using H.264 codec
+(settings come from the profiles in encoding_profiles.py)
 """
 import os
 import subprocess
 import sys
 
+from encoding_profiles import optimize_file
+
 # Set UTF-8 encoding for console
 if sys.platform == 'win32':
     import codecs
@@ -24,100 +27,17 @@ def check_ffmpeg():
 
 def optimize_video_ffmpeg(input_file, output_file, quality='23'):
     """
-    Optimize video using ffmpeg with H.264 codec
+    Optimize video using ffmpeg with H.264 codec ("preview" profile)
     quality: 18-28 (lower = better quality, larger file)
              23 is recommended (good balance)
     """
-    if not os.path.exists(input_file):
-        print(f"Error: File {input_file} not found!")
-        return False
-    
-    original_size = os.path.getsize(input_file) / (1024 * 1024)
-    print(f"Original file size: {original_size:.2f} MB")
-    
-    # FFmpeg command for high-quality compression
-    cmd = [
-        'ffmpeg',
-        '-i', input_file,
-        '-c:v', 'libx264',           # H.264 codec
-        '-crf', quality,              # Quality (18-28, 23 is good)
-        '-preset', 'slow',            # Slower encoding = better compression
-        '-vf', 'scale=1920:-2',       # Limit width to 1920px, maintain aspect ratio
-        '-c:a', 'aac',                # Audio codec
-        '-b:a', '128k',               # Audio bitrate
-        '-movflags', '+faststart',    # Enable web optimization
-        '-pix_fmt', 'yuv420p',        # Compatibility with all browsers
-        '-y',                         # Overwrite output
-        output_file
-    ]
-    
-    try:
-        print("Optimizing video... This may take a few minutes...")
-        result = subprocess.run(cmd, capture_output=True, text=True,
-                              creationflags=subprocess.CREATE_NO_WINDOW if sys.platform == 'win32' else 0)
-        
-        if result.returncode == 0 and os.path.exists(output_file):
-            new_size = os.path.getsize(output_file) / (1024 * 1024)
-            reduction = ((original_size - new_size) / original_size) * 100
-            print(f"SUCCESS: Optimization complete!")
-            print(f"New file size: {new_size:.2f} MB")
-            print(f"Size reduction: {reduction:.1f}%")
-            return True
-        else:
-            print("Error during optimization")
-            if result.stderr:
-                # Print last 300 chars of error
-                error_msg = result.stderr[-300:] if len(result.stderr) > 300 else result.stderr
-                print(error_msg)
-            return False
-    except FileNotFoundError:
-        print("Error: ffmpeg not found. Please install ffmpeg first.")
-        return False
+    return optimize_file(input_file, output_file, 'preview', crf=quality)
 
 def optimize_video_simple(input_file, output_file):
-    """Simpler method with more compression"""
+    """Simpler method with more compression ("mobile" profile: 1280px, CRF 28)"""
     if not check_ffmpeg():
         return False
-    
-    if not os.path.exists(input_file):
-        print(f"Error: File {input_file} not found!")
-        return False
-    
-    original_size = os.path.getsize(input_file) / (1024 * 1024)
-    print(f"Original file size: {original_size:.2f} MB")
-    
-    # Simpler: reduce resolution and bitrate more
-    cmd = [
-        'ffmpeg',
-        '-i', input_file,
-        '-c:v', 'libx264',
-        '-crf', '28',                 # More compression
-        '-preset', 'medium',
-        '-vf', 'scale=1280:-2',       # Reduce resolution to 1280px width
-        '-c:a', 'aac',
-        '-b:a', '96k',
-        '-movflags', '+faststart',
-        '-pix_fmt', 'yuv420p',
-        '-y',
-        output_file
-    ]
-    
-    try:
-        print("Optimizing video (simple method)...")
-        result = subprocess.run(cmd, capture_output=True, text=True,
-                              creationflags=subprocess.CREATE_NO_WINDOW if sys.platform == 'win32' else 0)
-        
-        if result.returncode == 0 and os.path.exists(output_file):
-            new_size = os.path.getsize(output_file) / (1024 * 1024)
-            reduction = ((original_size - new_size) / original_size) * 100
-            print(f"SUCCESS: Optimization complete!")
-            print(f"New file size: {new_size:.2f} MB")
-            print(f"Size reduction: {reduction:.1f}%")
-            return True
-        return False
-    except Exception as e:
-        print(f"Error: {e}")
-        return False
+    return optimize_file(input_file, output_file, 'mobile')
 
 def main():
     video_dir = 'videos'
@@ -1,77 +1,18 @@
 """
-Simple Video Optimization using moviepy
+Simple Video Optimization
+Encodes the newest video in videos/ with the "preview" profile (encoding_profiles.py)
 """
 import os
-import sys
+import shutil
 
-def optimize_with_moviepy(input_file, output_file):
-    """Optimize video using moviepy"""
-    try:
-        from moviepy.editor import VideoFileClip
-        import subprocess
-        
-        if not os.path.exists(input_file):
-            print(f"Error: File {input_file} not found!")
-            return False
-        
-        original_size = os.path.getsize(input_file) / (1024 * 1024)
-        print(f"Original file size: {original_size:.2f} MB")
-        
-        print("Loading video (this may take a moment)...")
-        clip = VideoFileClip(input_file)
-        
-        duration = clip.duration
-        fps = clip.fps
-        w, h = clip.size
-        
-        print(f"Video info: {int(w)}x{int(h)} @ {fps}fps ({duration:.1f}s)")
-        
-        # Resize if too large (max 1920 width for desktop)
-        max_width = 1920
-        if w > max_width:
-            new_height = int((max_width / w) * h)
-            print(f"Resizing to {max_width}x{new_height} for optimization...")
-            clip = clip.resize((max_width, new_height))
-        
-        print("Optimizing and writing video (this will take several minutes)...")
-        print("Please be patient...")
-        
-        # Write with compression
-        clip.write_videofile(
-            output_file,
-            codec='libx264',
-            bitrate='2000k',  # Good quality bitrate
-            audio_codec='aac',
-            audio_bitrate='128k',
-            preset='medium',  # Balance between speed and compression
-            threads=4,
-            verbose=False,
-            logger=None,
-            temp_audiofile='temp-audio.m4a',
-            remove_temp=True
-        )
-        
-        clip.close()
-        
-        if os.path.exists(output_file):
-            new_size = os.path.getsize(output_file) / (1024 * 1024)
-            reduction = ((original_size - new_size) / original_size) * 100
-            print(f"\nSUCCESS: Optimization complete!")
-            print(f"New file size: {new_size:.2f} MB")
-            print(f"Size reduction: {reduction:.1f}%")
-            return True
-        return False
-        
-    except ImportError:
-        print("Installing moviepy...")
-        subprocess.check_call([sys.executable, '-m', 'pip', 'install', 'moviepy', '-q'])
-        # Try again after installation
-        return optimize_with_moviepy(input_file, output_file)
-    except Exception as e:
-        print(f"Error: {e}")
-        import traceback
-        traceback.print_exc()
+from encoding_profiles import optimize_file
+
+def optimize_newest(input_file, output_file, profile='preview'):
+    """CRF encode with the shared profile (replaces the fixed 2000k moviepy bitrate)"""
+    if shutil.which('ffmpeg') is None:
+        print("Error: ffmpeg not found. Please install ffmpeg first.")
         return False
+    return optimize_file(input_file, output_file, profile)
 
 def main():
     video_dir = 'videos'
@@ -103,9 +44,8 @@ def main():
     print(f"Output: {os.path.basename(output_file)}")
     print("-" * 60)
     
-    if optimize_with_moviepy(input_file, output_file):
+    if optimize_newest(input_file, output_file):
         print(f"\nOptimized video saved to: {output_file}")
-        print("\nNow updating script.js with video path...")
         return output_file
     else:
         print("\nFailed to optimize video.")
@@ -0,0 +1,252 @@
+"""
+HLS adaptive bitrate packaging for the site videos
+هر ویدیو را به چند کیفیت (360p/720p/1080p) با قطعه‌های ۴ ثانیه‌ای HLS، یک master playlist و
+تصویر poster برای هر کیفیت تبدیل می‌کند تا گوشی روی اینترنت همراه به‌جای MP4 کامل Full HD،
+کیفیت متناسب با پهنای باند را دریافت کند.
+
+videos/3d-preview_1.mp4 ->
+    videos/hls/3d-preview_1/master.m3u8                      (همیشه اعتبارسنجی می‌شود)
+    videos/hls/3d-preview_1/package.json                     (مسیر master و posterها)
+    videos/hls/3d-preview_1/<hash>/360p/index.m3u8, seg_00000.ts, ...
+    videos/hls/3d-preview_1/<hash>/poster-360p.jpg, ...
+
+<hash> ده کاراکتر اول sha256 فایل منبع است؛ پس هر چیزی زیر آن پوشه هرگز تغییر نمی‌کند و
+سرورها آن را immutable کش می‌کنند (http_cache.cache_control_for).
+
+Usage:
+    python package_hls.py                          # همه ویدیوهای videos/
+    python package_hls.py videos/3d-preview_1.mp4 --preset slow
+"""
+import argparse
+import json
+import os
+import shutil
+import subprocess
+import sys
+from pathlib import Path
+from typing import List, NamedTuple
+
+from http_cache import file_digest
+from video_encoding import CREATION_FLAGS, probe_video, x264_args
+
+BASE_DIR = Path(__file__).resolve().parent
+VIDEOS_DIR = BASE_DIR / "videos"
+HLS_DIR = VIDEOS_DIR / "hls"
+VIDEO_EXTENSIONS = {'.mp4', '.mov', '.mkv', '.webm', '.avi'}
+
+SEGMENT_SECONDS = 4
+HASH_LENGTH = 10
+
+
+class Rendition(NamedTuple):
+    name: str
+    short_side: int       # ارتفاع برای ویدیوی افقی، عرض برای ویدیوی عمودی
+    crf: int
+    maxrate_kbps: int     # سقف نرخ بیت (capped CRF) تا BANDWIDTH در master قابل اتکا باشد
+    audio_bitrate: str
+    profile: str
+    level: str
+    codecs: str
+
+
+LADDER: List[Rendition] = [
+    Rendition('360p', 360, 26, 800, '64k', 'main', '3.0', 'avc1.4d401e,mp4a.40.2'),
+    Rendition('720p', 720, 23, 2800, '128k', 'high', '3.1', 'avc1.64001f,mp4a.40.2'),
+    Rendition('1080p', 1080, 22, 5000, '128k', 'high', '4.0', 'avc1.640028,mp4a.40.2'),
+]
+
+
+def select_ladder(info):
+    """فقط کیفیت‌هایی که از منبع بزرگ‌تر نیستند (حداقل یکی)"""
+    if not info:
+        return list(LADDER)
+    short_side = min(info['width'], info['height'])
+    ladder = [r for r in LADDER if r.short_side <= short_side]
+    return ladder or [LADDER[0]]
+
+
+def output_size(info, rendition):
+    """ابعاد خروجی با حفظ نسبت تصویر (زوج)"""
+    if not info:
+        return None
+    width, height = info['width'], info['height']
+    scale = rendition.short_side / min(width, height)
+    return (max(2, round(width * scale / 2) * 2), max(2, round(height * scale / 2) * 2))
+
+
+def scale_filter(info, rendition):
+    if info and info['height'] > info['width']:
+        return f'{rendition.short_side}:-2'
+    return f'-2:{rendition.short_side}'
+
+
+def build_rendition_command(input_file, output_dir, rendition, info, preset='slow', ffmpeg_path='ffmpeg'):
+    """دستور ffmpeg یک کیفیت؛ keyframeها در مرز قطعه‌ها هم‌تراز می‌شوند تا پخش‌کننده بتواند بین کیفیت‌ها جابه‌جا شود"""
+    maxrate = rendition.maxrate_kbps
+    return ([ffmpeg_path, '-i', str(input_file)]
+            + x264_args(rendition.crf, preset, scale_filter(info, rendition), rendition.audio_bitrate)
+            + ['-profile:v', rendition.profile,
+               '-level', rendition.level,
+               '-maxrate', f'{maxrate}k',
+               '-bufsize', f'{maxrate * 2}k',
+               '-force_key_frames', f'expr:gte(t,n_forced*{SEGMENT_SECONDS})',
+               '-sc_threshold', '0',
+               '-f', 'hls',
+               '-hls_time', str(SEGMENT_SECONDS),
+               '-hls_playlist_type', 'vod',
+               '-hls_flags', 'independent_segments',
+               '-hls_segment_filename', str(output_dir / 'seg_%05d.ts'),
+               '-y', str(output_dir / 'index.m3u8')])
+
+
+def build_poster_command(input_file, output_file, info, rendition, ffmpeg_path='ffmpeg'):
+    """یک فریم از ۱۰٪ ابتدای ویدیو (فریم اول معمولاً سیاه است)"""
+    seek = min(1.0, info['duration'] * 0.1) if info and info['duration'] else 0
+    return [ffmpeg_path, '-ss', f'{seek:.2f}', '-i', str(input_file),
+            '-frames:v', '1', '-vf', f'scale={scale_filter(info, rendition)}',
+            '-q:v', '3', '-y', str(output_file)]
+
+
+def playlist_bandwidth(playlist):
+    """(BANDWIDTH اوج، AVERAGE-BANDWIDTH) بر حسب bit/s از حجم و مدت قطعه‌ها"""
+    peak = total_bits = total_seconds = 0.0
+    duration = None
+    for line in playlist.read_text(encoding='utf-8').splitlines():
+        if line.startswith('#EXTINF:'):
+            duration = float(line[len('#EXTINF:'):].split(',')[0])
+        elif line and not line.startswith('#') and duration:
+            bits = (playlist.parent / line).stat().st_size * 8
+            peak = max(peak, bits / duration)
+            total_bits += bits
+            total_seconds += duration
+            duration = None
+    average = total_bits / total_seconds if total_seconds else 0
+    return int(peak), int(average)
+
+
+def write_master_playlist(package_dir, version, renditions, info):
+    lines = ['#EXTM3U', '#EXT-X-VERSION:3', '#EXT-X-INDEPENDENT-SEGMENTS']
+    for rendition in renditions:
+        playlist = package_dir / version / rendition.name / 'index.m3u8'
+        peak, average = playlist_bandwidth(playlist)
+        attributes = [f'BANDWIDTH={peak}', f'AVERAGE-BANDWIDTH={average}']
+        size = output_size(info, rendition)
+        if size:
+            attributes.append(f'RESOLUTION={size[0]}x{size[1]}')
+        codecs = rendition.codecs if not info or info['has_audio'] else rendition.codecs.split(',')[0]
+        attributes.append(f'CODECS="{codecs}"')
+        if info and info['fps']:
+            attributes.append(f'FRAME-RATE={info["fps"]:.3f}')
+        lines.append('#EXT-X-STREAM-INF:' + ','.join(attributes))
+        lines.append(f'{version}/{rendition.name}/index.m3u8')
+    master = package_dir / 'master.m3u8'
+    tmp = master.with_name(master.name + '.tmp')
+    tmp.write_text('\n'.join(lines) + '\n', encoding='utf-8')
+    os.replace(tmp, master)
+    return master
+
+
+def is_packaged(package_dir, version):
+    info_path = package_dir / 'package.json'
+    if not info_path.exists() or not (package_dir / 'master.m3u8').exists():
+        return False
+    try:
+        return json.loads(info_path.read_text(encoding='utf-8')).get('version') == version
+    except ValueError:
+        return False
+
+
+def run(cmd):
+    result = subprocess.run(cmd, capture_output=True, text=True, creationflags=CREATION_FLAGS)
+    if result.returncode != 0:
+        error = result.stderr[-300:] if result.stderr else ''
+        raise RuntimeError(f"ffmpeg failed: {error}")
+
+
+def package_video(input_file, preset='slow', force=False, ffmpeg_path='ffmpeg', ffprobe_path='ffprobe'):
+    """
+    بسته HLS یک ویدیو را می‌سازد؛ اگر بسته فعلی از همین محتوا ساخته شده باشد کاری نمی‌کند
+    خروجی: مسیر package.json
+    """
+    input_file = Path(input_file).resolve()
+    package_dir = HLS_DIR / input_file.stem
+    version = file_digest(input_file)[:HASH_LENGTH]
+    if not force and is_packaged(package_dir, version):
+        print(f"  up to date: {package_dir.relative_to(BASE_DIR).as_posix()}/master.m3u8")
+        return package_dir / 'package.json'
+
+    info = probe_video(str(input_file), ffprobe_path)
+    renditions = select_ladder(info)
+    version_dir = package_dir / version
+    if version_dir.exists():
+        shutil.rmtree(version_dir)
+
+    posters = {}
+    for rendition in renditions:
+        output_dir = version_dir / rendition.name
+        output_dir.mkdir(parents=True, exist_ok=True)
+        print(f"  {rendition.name}: encoding (crf {rendition.crf}, max {rendition.maxrate_kbps}k)...")
+        run(build_rendition_command(input_file, output_dir, rendition, info, preset, ffmpeg_path))
+        poster = version_dir / f'poster-{rendition.name}.jpg'
+        run(build_poster_command(input_file, poster, info, rendition, ffmpeg_path))
+        posters[rendition.name] = poster.relative_to(BASE_DIR).as_posix()
+
+    master = write_master_playlist(package_dir, version, renditions, info)
+    package_info = {
+        'source': os.path.relpath(input_file, BASE_DIR).replace(os.sep, '/'),
+        'version': version,
+        'master': master.relative_to(BASE_DIR).as_posix(),
+        'renditions': [r.name for r in renditions],
+        'posters': posters,
+    }
+    info_path = package_dir / 'package.json'
+    info_path.write_text(json.dumps(package_info, ensure_ascii=False, indent=2), encoding='utf-8')
+
+    # نسخه‌های قبلی؛ master جدید دیگر به آن‌ها اشاره نمی‌کند
+    for old in package_dir.iterdir():
+        if old.is_dir() and old.name != version:
+            shutil.rmtree(old)
+    return info_path
+
+
+def find_videos():
+    if not VIDEOS_DIR.exists():
+        return []
+    return sorted(p for p in VIDEOS_DIR.iterdir()
+                  if p.is_file() and p.suffix.lower() in VIDEO_EXTENSIONS
+                  and not p.stem.endswith('_optimized'))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Package videos as multi-bitrate HLS")
+    parser.add_argument('videos', nargs='*', type=Path, help="video files (default: every video in videos/)")
+    parser.add_argument('--preset', default='slow', help="x264 preset (default: %(default)s)")
+    parser.add_argument('--force', action='store_true', help="re-encode even if the package is up to date")
+    args = parser.parse_args()
+
+    if shutil.which('ffmpeg') is None:
+        print("Error: ffmpeg not found. Please install ffmpeg first.")
+        sys.exit(1)
+
+    videos = args.videos or find_videos()
+    if not videos:
+        print("No video files found in 'videos' directory!")
+        return
+
+    failed = 0
+    for video in videos:
+        print(f"Packaging {video}")
+        try:
+            info_path = package_video(video, preset=args.preset, force=args.force)
+        except RuntimeError as exc:
+            print(f"  Error: {exc}")
+            failed += 1
+            continue
+        master = json.loads(info_path.read_text(encoding='utf-8'))['master']
+        print(f"  master playlist: {master}")
+    if failed:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
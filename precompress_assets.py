@@ -0,0 +1,183 @@
+"""
+Build-time Brotli/gzip precompression
+برای هر فایل متنی سایت (HTML، CSS، JS، JSON، SVG) نسخه‌های ‎.br و ‎.gz کنار فایل اصلی می‌سازد
+تا main.py و app.py بدون فشرده‌سازی در زمان درخواست، نسخه مناسب Accept-Encoding را سرو کنند.
+
+نسخه فشرده فقط وقتی سرو می‌شود که mtime آن با فایل اصلی یکی باشد؛ پس فایل ویرایش‌شده
+تا اجرای دوباره این اسکریپت بدون فشرده‌سازی (اما درست) سرو می‌شود.
+"""
+from __future__ import annotations
+
+import gzip
+import os
+import sys
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Tuple
+
+try:
+    import brotli
+except ImportError:  # Brotli اختیاری است؛ بدون آن فقط ‎.gz ساخته می‌شود
+    brotli = None
+
+BASE_DIR = Path(__file__).resolve().parent
+
+COMPRESSIBLE_EXTENSIONS = {".html", ".htm", ".css", ".js", ".json", ".svg", ".xml", ".webmanifest"}
+# فایل‌های ریشه که سرو نمی‌شوند یا ابزار build هستند
+EXCLUDED_ROOT_FILES = {"liara.json"}
+# فایل‌های کوچک‌تر از این مقدار فشرده نمی‌شوند (سربار هدر از صرفه‌جویی بیشتر است)
+MIN_SIZE = 1024
+
+# ترتیب ترجیح سرور وقتی کلاینت هر دو را با q برابر می‌پذیرد
+ENCODINGS: List[Tuple[str, str]] = [("br", ".br"), ("gzip", ".gz")]
+
+
+def is_compressible(path: os.PathLike | str) -> bool:
+    return Path(path).suffix.lower() in COMPRESSIBLE_EXTENSIONS
+
+
+def parse_accept_encoding(header: Optional[str]) -> Dict[str, float]:
+    """Accept-Encoding -> {coding: q}"""
+    accepted: Dict[str, float] = {}
+    if not header:
+        return accepted
+    for part in header.split(","):
+        coding, _, params = part.strip().partition(";")
+        coding = coding.strip().lower()
+        if not coding:
+            continue
+        q = 1.0
+        for param in params.split(";"):
+            name, _, value = param.strip().partition("=")
+            if name.strip().lower() == "q":
+                try:
+                    q = float(value)
+                except ValueError:
+                    q = 0.0
+        accepted[coding] = q
+    return accepted
+
+
+def select_precompressed(path: os.PathLike | str, accept_encoding: Optional[str]) -> Tuple[str, Optional[str]]:
+    """
+    بهترین نسخه از پیش فشرده‌شده را برای Accept-Encoding انتخاب می‌کند
+    خروجی: (مسیر فایلی که باید سرو شود، Content-Encoding یا None)
+    """
+    path = os.fspath(path)
+    accepted = parse_accept_encoding(accept_encoding)
+    if not accepted or not is_compressible(path):
+        return path, None
+
+    wildcard = accepted.get("*", 0.0)
+    candidates = []
+    for preference, (coding, suffix) in enumerate(ENCODINGS):
+        q = accepted.get(coding, wildcard)
+        if q > 0:
+            candidates.append((-q, preference, coding, suffix))
+    if not candidates:
+        return path, None
+
+    try:
+        source_mtime = os.stat(path).st_mtime_ns
+    except OSError:
+        return path, None
+    for _, _, coding, suffix in sorted(candidates):
+        variant = path + suffix
+        try:
+            if os.stat(variant).st_mtime_ns == source_mtime:
+                return variant, coding
+        except OSError:
+            continue
+    return path, None
+
+
+def iter_text_assets(root: Path) -> Iterator[Path]:
+    """فایل‌های متنی ریشه (غیربازگشتی) و کل پوشه static"""
+    for path in sorted(root.iterdir()):
+        if path.is_file() and is_compressible(path) and path.name not in EXCLUDED_ROOT_FILES:
+            yield path
+    static_dir = root / "static"
+    if static_dir.exists():
+        for path in sorted(static_dir.rglob("*")):
+            if path.is_file() and is_compressible(path):
+                yield path
+
+
+def _write_variant(source: Path, suffix: str, data: bytes, source_stat: os.stat_result) -> None:
+    variant = source.with_name(source.name + suffix)
+    tmp = variant.with_name(variant.name + ".tmp")
+    tmp.write_bytes(data)
+    os.replace(tmp, variant)
+    # mtime یکسان با فایل اصلی یعنی «نسخه فشرده به‌روز است»
+    os.utime(variant, ns=(source_stat.st_atime_ns, source_stat.st_mtime_ns))
+
+
+def _remove_variant(source: Path, suffix: str) -> None:
+    variant = source.with_name(source.name + suffix)
+    if variant.exists():
+        variant.unlink()
+
+
+def precompress(path: Path) -> Dict[str, int]:
+    """نسخه‌های ‎.gz و ‎.br یک فایل را می‌سازد؛ خروجی: حجم هر نسخه"""
+    source_stat = path.stat()
+    data = path.read_bytes()
+    sizes = {"identity": len(data)}
+    if len(data) < MIN_SIZE:
+        for _, suffix in ENCODINGS:
+            _remove_variant(path, suffix)
+        return sizes
+
+    compressed = {"gzip": gzip.compress(data, compresslevel=9, mtime=0)}
+    if brotli is not None:
+        compressed["br"] = brotli.compress(data, mode=brotli.MODE_TEXT, quality=11)
+
+    for coding, suffix in ENCODINGS:
+        payload = compressed.get(coding)
+        if payload is None or len(payload) >= len(data):
+            _remove_variant(path, suffix)
+            continue
+        _write_variant(path, suffix, payload, source_stat)
+        sizes[coding] = len(payload)
+    return sizes
+
+
+def _format_kb(size: int) -> str:
+    return f"{size / 1024:.1f} KB"
+
+
+def main() -> None:
+    if brotli is None:
+        print("Brotli module not installed (pip install Brotli); writing .gz only.", file=sys.stderr)
+
+    rows = []
+    for path in iter_text_assets(BASE_DIR):
+        sizes = precompress(path)
+        rows.append((path.relative_to(BASE_DIR).as_posix(), sizes))
+
+    if not rows:
+        print("No text assets found. Exiting.")
+        return
+
+    # حجم روی سیم: بهترین نسخه‌ای که یک مرورگر مدرن (br, gzip) دریافت می‌کند
+    total_raw = total_gzip = total_best = 0
+    print(f"{'file':<45} {'raw':>10} {'gzip':>10} {'br':>10} {'saved':>7}")
+    for name, sizes in rows:
+        raw = sizes["identity"]
+        gz = sizes.get("gzip", raw)
+        best = min(sizes.values())
+        total_raw += raw
+        total_gzip += gz
+        total_best += best
+        br_text = _format_kb(sizes["br"]) if "br" in sizes else "-"
+        saved = (1 - best / raw) * 100 if raw else 0.0
+        print(f"{name:<45} {_format_kb(raw):>10} {_format_kb(gz):>10} {br_text:>10} {saved:>6.1f}%")
+
+    print("-" * 86)
+    print(f"Bytes on the wire before: {_format_kb(total_raw)}")
+    print(f"Bytes on the wire after (gzip only): {_format_kb(total_gzip)}")
+    print(f"Bytes on the wire after (best available): {_format_kb(total_best)} "
+          f"({(1 - total_best / total_raw) * 100:.1f}% smaller)")
+
+
+if __name__ == "__main__":
+    main()
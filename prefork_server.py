@@ -0,0 +1,412 @@
+"""
+Prefork production launcher for app.py
+اجرای app.py با چند پروسه کارگر روی یک پورت، به‌جای سرور تک‌پروسه‌ای app.run
+
+- پروسه اصلی (master) سوکت listen را یک بار باز می‌کند و کارگرها آن را از fork به ارث می‌برند؛
+  با PREFORK_REUSEPORT=1 هر کارگر سوکت خودش را با SO_REUSEPORT باز می‌کند و کرنل اتصال‌ها را پخش می‌کند
+- هر کارگر app.py را بعد از fork import می‌کند (نخ‌های inotify و لاگ در fork زنده نمی‌مانند) و با
+  سرور threaded خود werkzeug سرو می‌کند
+- کارگر پس از MAX_REQUESTS درخواست (با کمی jitter تا همه با هم بازنشسته نشوند) دیگر accept نمی‌کند،
+  درخواست‌های در جریان را تمام می‌کند و خارج می‌شود؛ master کارگر تازه جایگزین می‌کند
+- reload بی‌وقفه: با SIGHUP (یا با PREFORK_RELOAD=1 تغییر فایل‌های ‎*.py) نسل جدید کارگرها شروع می‌شود
+  و نسل قبلی فقط وقتی متوقف می‌شود که همه کارگرهای جدید آماده باشند؛ اگر کد جدید بالا نیاید نسل قبلی
+  به سرو ادامه می‌دهد. مانیفست‌ها، صفحه‌ها و static نیازی به reload ندارند: GalleryCatalog و AssetCache
+  تغییرشان را خودشان می‌بینند و reload کش فایل‌ها و هش‌ها را دور می‌ریخت
+- متریک‌ها: کارگرها snapshot شمارنده‌هایشان را در METRICS_DIR (پیش‌فرض یک پوشه موقت) می‌نویسند و
+  ‎/metrics جمع همه کارگرها را نشان می‌دهد؛ master شمارنده‌های کارگر خارج‌شده را نگه می‌دارد
+- SIGTERM/SIGINT: توقف آرام همه کارگرها و پس از GRACEFUL_TIMEOUT ثانیه، SIGKILL
+
+تنظیمات از متغیرهای محیطی: PORT، WEB_CONCURRENCY (تعداد کارگر، پیش‌فرض تعداد هسته‌های در دسترس)،
+MAX_REQUESTS، MAX_REQUESTS_JITTER، GRACEFUL_TIMEOUT، PREFORK_REUSEPORT، PREFORK_RELOAD،
+PREFORK_RELOAD_INTERVAL و METRICS_DIR.
+
+Usage:
+    python prefork_server.py
+    WEB_CONCURRENCY=4 MAX_REQUESTS=5000 python prefork_server.py
+    kill -HUP <master pid>          # reload دستی
+"""
+from __future__ import annotations
+
+import errno
+import logging
+import os
+import random
+import shutil
+import signal
+import socket
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+from server_metrics import retire_all, retire_pid
+
+BASE_DIR = Path(__file__).resolve().parent
+
+HOST = os.environ.get('HOST', '0.0.0.0')
+PORT = int(os.environ.get('PORT', 8000))
+LISTEN_BACKLOG = int(os.environ.get('LISTEN_BACKLOG', 256))
+
+
+def available_cores() -> int:
+    """هسته‌هایی که پروسه اجازه استفاده از آن‌ها را دارد (affinity کانتینر)، نه کل هسته‌های میزبان"""
+    try:
+        return len(os.sched_getaffinity(0)) or 1
+    except AttributeError:
+        return os.cpu_count() or 1
+
+
+WORKERS = max(1, int(os.environ.get('WEB_CONCURRENCY', available_cores())))
+# 0 یعنی بدون بازنشستگی
+MAX_REQUESTS = int(os.environ.get('MAX_REQUESTS', 10000))
+MAX_REQUESTS_JITTER = int(os.environ.get('MAX_REQUESTS_JITTER', MAX_REQUESTS // 10))
+GRACEFUL_TIMEOUT = float(os.environ.get('GRACEFUL_TIMEOUT', 30))
+REUSE_PORT = os.environ.get('PREFORK_REUSEPORT', '0').strip().lower() in ('1', 'true', 'yes')
+# خاموش در production؛ برای توسعه PREFORK_RELOAD=1
+RELOAD_ON_CHANGE = os.environ.get('PREFORK_RELOAD', '0').strip().lower() in ('1', 'true', 'yes')
+RELOAD_INTERVAL = float(os.environ.get('PREFORK_RELOAD_INTERVAL', 1.0))
+
+# کارگری که زودتر از این (ثانیه) بمیرد شکست در شروع حساب می‌شود و جایگزینی آن با تأخیر انجام می‌شود
+MIN_WORKER_LIFETIME = 1.0
+RESPAWN_DELAY = 1.0
+TICK = 0.2
+
+# تغییر این فایل‌ها reload را شروع می‌کند؛ فقط ریشه پروژه، نه کل static/
+WATCHED_GLOBS = ['*.py']
+
+
+def log(message: str) -> None:
+    print(f"[prefork {os.getpid()}] {message}", file=sys.stderr, flush=True)
+
+
+def bind_listener(reuse_port: bool = False) -> socket.socket:
+    sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    if reuse_port:
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEPORT, 1)
+    sock.bind((HOST, PORT))
+    sock.listen(LISTEN_BACKLOG)
+    sock.set_inheritable(True)
+    return sock
+
+
+def watched_signature(root: Path = BASE_DIR) -> Dict[str, Tuple[int, int]]:
+    """(mtime_ns، size) فایل‌های زیر نظر؛ تغییر، افزودن یا حذف هر کدام امضا را عوض می‌کند"""
+    paths = []
+    for pattern in WATCHED_GLOBS:
+        paths.extend(root.glob(pattern))
+    signature = {}
+    for path in paths:
+        try:
+            st = path.stat()
+        except OSError:
+            continue
+        if path.is_file():
+            signature[str(path.relative_to(root))] = (st.st_mtime_ns, st.st_size)
+    return signature
+
+
+class RequestLimiter:
+    """
+    WSGI middleware: درخواست‌ها را می‌شمارد و پس از limit درخواست on_limit را صدا می‌زند
+    درخواست در جریان تا بسته شدن iterable پاسخ (فایل‌های stream‌شده) شمرده می‌شود
+    """
+
+    def __init__(self, app, limit: int, on_limit) -> None:
+        self.app = app
+        self.limit = limit
+        self.on_limit = on_limit
+        self.served = 0
+        self.in_flight = 0
+        self._lock = threading.Lock()
+
+    def __call__(self, environ, start_response):
+        from werkzeug.wsgi import ClosingIterator
+
+        with self._lock:
+            self.served += 1
+            self.in_flight += 1
+            reached = self.limit and self.served == self.limit
+        if reached:
+            self.on_limit()
+        try:
+            return ClosingIterator(self.app(environ, start_response), [self._finished])
+        except BaseException:
+            self._finished()
+            raise
+
+    def _finished(self) -> None:
+        with self._lock:
+            self.in_flight -= 1
+
+    def wait_idle(self, timeout: float) -> bool:
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            with self._lock:
+                if self.in_flight <= 0:
+                    return True
+            time.sleep(0.05)
+        return False
+
+
+def run_worker(listener: Optional[socket.socket], ready_fd: int, max_requests: int) -> None:
+    """بدنه کارگر بعد از fork؛ هرگز برنمی‌گردد"""
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    signal.signal(signal.SIGHUP, signal.SIG_IGN)
+    code = 0
+    try:
+        from werkzeug.serving import make_server
+
+        from app import METRICS, app
+
+        # لاگ متنی werkzeug تکرار لاگ JSON دسترسی است
+        logging.getLogger('werkzeug').setLevel(logging.WARNING)
+        sock = listener if listener is not None else bind_listener(reuse_port=True)
+        server = None
+
+        def stop() -> None:
+            # shutdown منتظر حلقه serve_forever می‌ماند، پس از نخ دیگری صدا زده می‌شود
+            threading.Thread(target=server.shutdown, daemon=True).start()
+
+        limiter = RequestLimiter(app, max_requests, stop)
+        server = make_server(HOST, PORT, limiter, threaded=True, fd=sock.fileno())
+        if listener is None:
+            # make_server سوکت را dup کرده است؛ با SO_REUSEPORT نسخه اضافه نباید صف accept نگه دارد
+            sock.close()
+        signal.signal(signal.SIGTERM, lambda signum, frame: stop())
+        os.write(ready_fd, f"{os.getpid()}\n".encode())
+        os.close(ready_fd)
+
+        server.serve_forever()
+        # اتصال جدیدی accept نمی‌شود؛ درخواست‌های در جریان تمام می‌شوند (اتصال‌های keep-alive بیکار نه)
+        server.socket.close()
+        if not limiter.wait_idle(GRACEFUL_TIMEOUT):
+            log(f"worker exiting with {limiter.in_flight} requests still in flight")
+        METRICS.write_snapshot(force=True)
+        METRICS.access_log.flush()
+    except Exception as exc:  # هر خطای شروع (مثلاً خطای نحوی در کد جدید) کارگر را با کد 1 می‌بندد
+        log(f"worker failed: {exc!r}")
+        code = 1
+    finally:
+        sys.stderr.flush()
+        os._exit(code)
+
+
+class Worker:
+    def __init__(self, pid: int, generation: int) -> None:
+        self.pid = pid
+        self.generation = generation
+        self.started = time.monotonic()
+        self.ready = False
+        self.stopping_since: Optional[float] = None
+
+
+class Master:
+    def __init__(self, workers: int = WORKERS) -> None:
+        self.size = workers
+        self.listener = None if REUSE_PORT else bind_listener()
+        self.workers: Dict[int, Worker] = {}
+        self.generation = 0
+        self.reloading = False
+        self.stopping = False
+        self.reload_requested = False
+        self.respawn_after = 0.0
+        self.ready_r, self.ready_w = os.pipe()
+        os.set_blocking(self.ready_r, False)
+        self._ready_buffer = b""
+        self.signature = watched_signature() if RELOAD_ON_CHANGE else {}
+        # کارگرها METRICS_DIR را هنگام ساخت ServerMetrics (import app بعد از fork) می‌خوانند
+        self.own_metrics_dir = not os.environ.get('METRICS_DIR', '').strip()
+        if self.own_metrics_dir:
+            os.environ['METRICS_DIR'] = tempfile.mkdtemp(prefix='naroon-metrics-')
+        self.metrics_dir = Path(os.environ['METRICS_DIR'])
+        self.metrics_dir.mkdir(parents=True, exist_ok=True)
+        retire_all(self.metrics_dir)
+
+    # --- کارگرها ---
+
+    def spawn(self) -> None:
+        # jitter تا کارگرهای یک نسل هم‌زمان بازنشسته نشوند
+        limit = MAX_REQUESTS + random.randint(0, MAX_REQUESTS_JITTER) if MAX_REQUESTS > 0 else 0
+        pid = os.fork()
+        if pid == 0:
+            os.close(self.ready_r)
+            run_worker(self.listener, self.ready_w, limit)
+        self.workers[pid] = Worker(pid, self.generation)
+
+    def current(self) -> List[Worker]:
+        return [w for w in self.workers.values() if w.generation == self.generation and w.stopping_since is None]
+
+    def stop_worker(self, worker: Worker) -> None:
+        if worker.stopping_since is None:
+            worker.stopping_since = time.monotonic()
+            self._signal(worker.pid, signal.SIGTERM)
+
+    @staticmethod
+    def _signal(pid: int, signum: int) -> None:
+        try:
+            os.kill(pid, signum)
+        except ProcessLookupError:
+            pass
+
+    def read_ready(self) -> None:
+        try:
+            self._ready_buffer += os.read(self.ready_r, 4096)
+        except BlockingIOError:
+            return
+        *lines, self._ready_buffer = self._ready_buffer.split(b"\n")
+        for line in lines:
+            worker = self.workers.get(int(line or 0))
+            if worker:
+                worker.ready = True
+
+    def reap(self) -> None:
+        while True:
+            try:
+                pid, status = os.waitpid(-1, os.WNOHANG)
+            except ChildProcessError:
+                return
+            if pid == 0:
+                return
+            worker = self.workers.pop(pid, None)
+            if worker is None:
+                continue
+            retire_pid(self.metrics_dir, pid)
+            code = os.waitstatus_to_exitcode(status)
+            if worker.stopping_since is not None or self.stopping:
+                continue
+            lifetime = time.monotonic() - worker.started
+            if code == 0:
+                log(f"worker {pid} recycled after {lifetime:.0f}s")
+            else:
+                log(f"worker {pid} exited with code {code}")
+            if not worker.ready and lifetime < MIN_WORKER_LIFETIME:
+                if self.reloading and worker.generation == self.generation:
+                    self.abort_reload()
+                    continue
+                self.respawn_after = time.monotonic() + RESPAWN_DELAY
+
+    # --- reload ---
+
+    def start_reload(self, reason: str) -> None:
+        if self.reloading or self.stopping:
+            return
+        log(f"reloading ({reason})")
+        self.generation += 1
+        self.reloading = True
+        for _ in range(self.size):
+            self.spawn()
+
+    def finish_reload(self) -> None:
+        """نسل قبلی فقط وقتی متوقف می‌شود که همه کارگرهای نسل جدید آماده باشند"""
+        fresh = self.current()
+        if len(fresh) < self.size or not all(w.ready for w in fresh):
+            return
+        for worker in list(self.workers.values()):
+            if worker.generation != self.generation:
+                self.stop_worker(worker)
+        self.reloading = False
+        log(f"reload complete (generation {self.generation})")
+
+    def abort_reload(self) -> None:
+        log("new workers failed to start; keeping the previous generation")
+        for worker in self.current():
+            self.stop_worker(worker)
+        self.generation -= 1
+        self.reloading = False
+
+    def check_files(self) -> None:
+        signature = watched_signature()
+        if signature == self.signature:
+            return
+        changed = sorted(name for name in set(signature) | set(self.signature)
+                         if signature.get(name) != self.signature.get(name))
+        self.signature = signature
+        self.start_reload(f"{changed[0]} changed" + (f" and {len(changed) - 1} more" if len(changed) > 1 else ""))
+
+    # --- حلقه اصلی ---
+
+    def handle_signal(self, signum, frame) -> None:
+        if signum == signal.SIGHUP:
+            self.reload_requested = True
+        else:
+            self.stopping = True
+
+    def run(self) -> None:
+        for signum in (signal.SIGTERM, signal.SIGINT, signal.SIGHUP):
+            signal.signal(signum, self.handle_signal)
+        mode = "SO_REUSEPORT" if REUSE_PORT else "shared listener"
+        log(f"serving app.py on {HOST}:{PORT} with {self.size} workers ({mode}, "
+            f"max requests {MAX_REQUESTS or 'unlimited'})")
+        next_check = time.monotonic() + RELOAD_INTERVAL
+        while not self.stopping:
+            self.read_ready()
+            self.reap()
+            if self.reload_requested:
+                self.reload_requested = False
+                self.start_reload("SIGHUP")
+            if self.reloading:
+                self.finish_reload()
+            elif time.monotonic() >= self.respawn_after:
+                for _ in range(self.size - len(self.current())):
+                    self.spawn()
+            now = time.monotonic()
+            for worker in self.workers.values():
+                if worker.stopping_since is not None and now - worker.stopping_since > GRACEFUL_TIMEOUT:
+                    self._signal(worker.pid, signal.SIGKILL)
+            if RELOAD_ON_CHANGE and now >= next_check:
+                next_check = now + RELOAD_INTERVAL
+                self.check_files()
+            time.sleep(TICK)
+        self.shutdown()
+
+    def shutdown(self) -> None:
+        log("stopping workers")
+        for worker in list(self.workers.values()):
+            self.stop_worker(worker)
+        deadline = time.monotonic() + GRACEFUL_TIMEOUT
+        while self.workers and time.monotonic() < deadline:
+            self.reap_all()
+            time.sleep(TICK)
+        for worker in list(self.workers.values()):
+            self._signal(worker.pid, signal.SIGKILL)
+        self.reap_all()
+        if self.own_metrics_dir:
+            shutil.rmtree(self.metrics_dir, ignore_errors=True)
+        log("stopped")
+
+    def reap_all(self) -> None:
+        while self.workers:
+            try:
+                pid, _ = os.waitpid(-1, os.WNOHANG)
+            except ChildProcessError:
+                self.workers.clear()
+                return
+            if pid == 0:
+                return
+            self.workers.pop(pid, None)
+            retire_pid(self.metrics_dir, pid)
+
+
+def main() -> None:
+    if not hasattr(os, 'fork'):
+        # Windows: بدون fork، همان سرور تک‌پروسه‌ای app.py
+        log("os.fork is not available; running app.py in a single process")
+        from app import app
+        logging.getLogger('werkzeug').setLevel(logging.WARNING)
+        app.run(host=HOST, port=PORT, debug=False, threaded=True)
+        return
+    try:
+        master = Master()
+    except OSError as exc:
+        if exc.errno == errno.EADDRINUSE:
+            log(f"port {PORT} is already in use")
+            sys.exit(1)
+        raise
+    master.run()
+
+
+if __name__ == "__main__":
+    main()
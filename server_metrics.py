@@ -0,0 +1,520 @@
+"""
+Request metrics and structured access logs shared by main.py and app.py
+برای هر route تعداد درخواست‌ها به تفکیک status، بایت‌های ارسالی، نسبت hit کش فایل‌ها و هیستوگرام
+زمان پاسخ (p50/p95/p99) را نگه می‌دارد و آن‌ها را در قالب متنی Prometheus روی ‎/metrics سرو می‌کند.
+
+لاگ دسترسی یک خط JSON برای هر درخواست است که در صف گذاشته می‌شود؛ یک نخ جدا صف را دسته‌ای روی
+stderr می‌نویسد تا نوشتن لاگ زمان پاسخ را افزایش ندهد. اگر صف پر باشد خط لاگ دور ریخته و شمرده می‌شود.
+
+با METRICS_DIR (که prefork_server.py برای کارگرهایش تنظیم می‌کند) هر پروسه شمارنده‌هایش را هر
+METRICS_SYNC_INTERVAL ثانیه در <pid>-<شروع>.json آن پوشه می‌نویسد و ‎/metrics جمع همه پروسه‌ها را
+نشان می‌دهد. شمارنده‌های کارگرهای بازنشسته در retired.json جمع می‌شوند، پس با recycle یا reload صفر نمی‌شوند.
+"""
+from __future__ import annotations
+
+import bisect
+import hmac
+import json
+import os
+import queue
+import sys
+import threading
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple
+
+METRICS_PATH = '/metrics'
+PROMETHEUS_CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+# ‎/metrics و ‎/api/asset-cache عمومی نیستند: فقط درخواست مستقیم از METRICS_ALLOW (بدون X-Forwarded-For،
+# یعنی نه از پشت reverse proxy) یا با هدر Authorization: Bearer <METRICS_TOKEN> پاسخ می‌گیرد؛ بقیه 404
+METRICS_TOKEN = os.environ.get('METRICS_TOKEN', '')
+METRICS_ALLOW = tuple(addr.strip() for addr in os.environ.get('METRICS_ALLOW', '127.0.0.1,::1').split(',')
+                      if addr.strip())
+
+# ACCESS_LOG=0 لاگ دسترسی را خاموش می‌کند (متریک‌ها همچنان جمع می‌شوند)
+ACCESS_LOG = os.environ.get('ACCESS_LOG', '1').strip().lower() not in ('0', 'false', 'no', 'off')
+LOG_QUEUE_SIZE = 10000
+LOG_BATCH_SIZE = 256
+LOG_FLUSH_INTERVAL = 0.5
+
+# مرز bucketهای هیستوگرام زمان پاسخ (ثانیه)
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUANTILES = (0.5, 0.95, 0.99)
+
+METRICS_SYNC_INTERVAL = float(os.environ.get('METRICS_SYNC_INTERVAL', 1.0))
+RETIRED_SNAPSHOT = 'retired.json'
+# شناسه آخرین کارگرهای جمع‌شده در retired.json؛ خواننده‌ای که snapshot آن‌ها را هم خوانده دوباره نمی‌شمارد
+RETIRED_IDS_KEPT = 256
+# شمارنده‌های AssetCache؛ بقیه کلیدهای stats() مقدار لحظه‌ای کارگرهای زنده‌اند
+CACHE_COUNTERS = ('evictions', 'invalidations')
+CACHE_GAUGES = ('entries', 'bytes', 'max_bytes')
+
+# URL -> برچسب route؛ همان قواعد app.py تا برچسب‌های دو سرور یکی باشند و تعدادشان محدود بماند
+ROUTE_PREFIXES = (
+    ('/api/gallery/', '/api/gallery/<category>'),
+    ('/static/', '/static/<path:filename>'),
+    ('/images/', '/images/<path:filename>'),
+    ('/videos/', '/videos/<path:filename>'),
+)
+EXACT_ROUTES = {
+    '/': '/',
+    '/index.html': '/',
+    '/gallery.html': '/gallery.html',
+    '/errorr.html': '/errorr.html',
+    '/pre-production.html': '/pre-production.html',
+    '/favicon.ico': '/favicon.ico',
+    '/sw.js': '/sw.js',
+    '/gallery-data.json': '/gallery-data.json',
+    '/errorr-media.json': '/errorr-media.json',
+    '/api/gallery': '/api/gallery',
+    '/api/asset-cache': '/api/asset-cache',
+    METRICS_PATH: METRICS_PATH,
+}
+OTHER_ROUTE = 'other'
+
+
+def route_label(path: str) -> str:
+    path = path.split('?', 1)[0]
+    route = EXACT_ROUTES.get(path)
+    if route is not None:
+        return route
+    for prefix, label in ROUTE_PREFIXES:
+        if path.startswith(prefix):
+            return label
+    return OTHER_ROUTE
+
+
+def metrics_allowed(remote_addr: Optional[str], headers) -> bool:
+    """آیا درخواست اجازه دیدن ‎/metrics و ‎/api/asset-cache را دارد؟ headers هر شیء با get(name) است"""
+    if METRICS_TOKEN:
+        scheme, _, token = (headers.get('Authorization') or '').partition(' ')
+        if scheme.lower() == 'bearer' and hmac.compare_digest(token.strip().encode(), METRICS_TOKEN.encode()):
+            return True
+    return remote_addr in METRICS_ALLOW and not headers.get('X-Forwarded-For')
+
+
+class LatencyHistogram:
+    """هیستوگرام تجمعی با bucketهای ثابت؛ چندک‌ها مثل histogram_quantile با درون‌یابی خطی"""
+
+    def __init__(self, bounds: Tuple[float, ...] = LATENCY_BUCKETS) -> None:
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)
+        self.total = 0.0
+        self.count = 0
+
+    def observe(self, seconds: float) -> None:
+        self.counts[bisect.bisect_left(self.bounds, seconds)] += 1
+        self.total += seconds
+        self.count += 1
+
+    def merge(self, data: dict) -> None:
+        for index, count in enumerate(data['counts'][:len(self.counts)]):
+            self.counts[index] += count
+        self.total += data['total']
+        self.count += data['count']
+
+    def quantile(self, q: float) -> float:
+        if not self.count:
+            return 0.0
+        rank = q * self.count
+        seen = 0
+        for index, bucket_count in enumerate(self.counts):
+            if seen + bucket_count >= rank and bucket_count:
+                if index == len(self.bounds):
+                    # bucket +Inf: بزرگ‌ترین مرز محدود
+                    return self.bounds[-1]
+                lower = self.bounds[index - 1] if index else 0.0
+                upper = self.bounds[index]
+                return lower + (upper - lower) * (rank - seen) / bucket_count
+            seen += bucket_count
+        return self.bounds[-1]
+
+
+class RouteStats:
+    __slots__ = ('statuses', 'bytes', 'cache_hits', 'cache_misses', 'latency')
+
+    def __init__(self) -> None:
+        self.statuses: Dict[int, int] = {}
+        self.bytes = 0
+        self.cache_hits = 0
+        self.cache_misses = 0
+        self.latency = LatencyHistogram()
+
+    def to_dict(self) -> dict:
+        return {
+            'statuses': {str(status): count for status, count in self.statuses.items()},
+            'bytes': self.bytes,
+            'cache_hits': self.cache_hits,
+            'cache_misses': self.cache_misses,
+            'latency': {'counts': self.latency.counts, 'total': self.latency.total, 'count': self.latency.count},
+        }
+
+    def merge(self, data: dict) -> None:
+        for status, count in data['statuses'].items():
+            self.statuses[int(status)] = self.statuses.get(int(status), 0) + count
+        self.bytes += data['bytes']
+        self.cache_hits += data['cache_hits']
+        self.cache_misses += data['cache_misses']
+        self.latency.merge(data['latency'])
+
+
+def _escape_label(value: str) -> str:
+    return value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _format_value(value: float) -> str:
+    if value == int(value) and abs(value) < 1e15:
+        return str(int(value))
+    return repr(value)
+
+
+class AccessLog:
+    """صف لاگ و نخ نویسنده؛ log() هرگز منتظر I/O نمی‌ماند و JSON هم در نخ نویسنده ساخته می‌شود"""
+
+    def __init__(self, stream=None, enabled: bool = ACCESS_LOG) -> None:
+        self.stream = stream or sys.stderr
+        self.enabled = enabled
+        self.dropped = 0
+        self._queue: 'queue.Queue[dict]' = queue.Queue(maxsize=LOG_QUEUE_SIZE)
+        self._thread: Optional[threading.Thread] = None
+        self._start_lock = threading.Lock()
+
+    def log(self, record: dict) -> None:
+        if not self.enabled:
+            return
+        if self._thread is None:
+            self._start()
+        record.setdefault('ts', time.time())
+        try:
+            self._queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+    def _start(self) -> None:
+        with self._start_lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name='access-log', daemon=True)
+                self._thread.start()
+
+    def _run(self) -> None:
+        while True:
+            records = [self._queue.get()]
+            deadline = time.monotonic() + LOG_FLUSH_INTERVAL
+            while len(records) < LOG_BATCH_SIZE:
+                try:
+                    records.append(self._queue.get(timeout=max(0.0, deadline - time.monotonic())))
+                except queue.Empty:
+                    break
+            self._write(records)
+
+    @staticmethod
+    def _format(record: dict) -> str:
+        record['ts'] = datetime.fromtimestamp(record['ts'], timezone.utc).isoformat(timespec='milliseconds')
+        return json.dumps(record, ensure_ascii=False, separators=(',', ':'))
+
+    def _write(self, records: List[dict]) -> None:
+        try:
+            self.stream.write(''.join(self._format(record) + '\n' for record in records))
+            self.stream.flush()
+        except (OSError, ValueError):
+            pass
+
+    def flush(self) -> None:
+        """خطوط باقی‌مانده صف را همین حالا می‌نویسد (هنگام خاموش شدن)"""
+        records = []
+        while True:
+            try:
+                records.append(self._queue.get_nowait())
+            except queue.Empty:
+                break
+        if records:
+            self._write(records)
+
+
+class ServerMetrics:
+    """شمارنده‌های هر route؛ record() فقط چند جمع زیر یک قفل است"""
+
+    def __init__(self, server: str, asset_cache=None, access_log: Optional[AccessLog] = None,
+                 shared_dir: Optional[str] = None) -> None:
+        self.server = server
+        self.asset_cache = asset_cache
+        self.access_log = access_log or AccessLog()
+        self.started = time.time()
+        self._routes: Dict[str, RouteStats] = {}
+        self._lock = threading.Lock()
+        # پوشه مشترک snapshotهای پروسه‌ها؛ خالی یعنی متریک‌های همین پروسه. هنگام ساخت خوانده می‌شود، چون
+        # prefork_server.py آن را پس از import این ماژول و پیش از fork تنظیم می‌کند
+        if shared_dir is None:
+            shared_dir = os.environ.get('METRICS_DIR', '').strip()
+        self.shared_dir = Path(shared_dir) if shared_dir else None
+        # pid به‌تنهایی یکتا نیست؛ pid کارگر بازنشسته ممکن است دوباره استفاده شود
+        self.worker_id = f'{os.getpid()}-{time.time_ns()}'
+        self._sync_thread: Optional[threading.Thread] = None
+        self._write_lock = threading.Lock()
+        self._synced_version = -1
+        self._version = 0
+
+    def record(self, method: str, path: str, status: int, sent_bytes: int, seconds: float,
+               cache: Optional[str] = None, remote: Optional[str] = None) -> None:
+        """
+        یک درخواست کامل‌شده
+        cache: 'hit' یا 'miss' برای درخواست‌هایی که از AssetCache گذشته‌اند، وگرنه None
+        """
+        route = route_label(path)
+        with self._lock:
+            stats = self._routes.get(route)
+            if stats is None:
+                stats = self._routes[route] = RouteStats()
+            stats.statuses[status] = stats.statuses.get(status, 0) + 1
+            stats.bytes += sent_bytes
+            if cache == 'hit':
+                stats.cache_hits += 1
+            elif cache == 'miss':
+                stats.cache_misses += 1
+            stats.latency.observe(seconds)
+            self._version += 1
+        if self.shared_dir is not None and self._sync_thread is None:
+            self._start_sync()
+
+        record = {
+            'server': self.server,
+            'method': method,
+            'path': path,
+            'route': route,
+            'status': status,
+            'bytes': sent_bytes,
+            'duration_ms': round(seconds * 1000, 3),
+        }
+        if cache:
+            record['cache'] = cache
+        if remote:
+            record['remote'] = remote
+        self.access_log.log(record)
+
+    def log_event(self, level: str, message: str, **fields) -> None:
+        """خطاها و پیام‌های غیر دسترسی با همان قالب JSON"""
+        self.access_log.log(dict(fields, server=self.server, level=level, message=message))
+
+    # --- snapshot مشترک بین پروسه‌ها ---
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            routes = {route: stats.to_dict() for route, stats in self._routes.items()}
+        data = {'id': self.worker_id, 'started': self.started, 'routes': routes,
+                'dropped': self.access_log.dropped}
+        if self.asset_cache is not None:
+            cache = self.asset_cache.stats()
+            data['asset_cache'] = {key: cache[key] for key in CACHE_COUNTERS + CACHE_GAUGES}
+        return data
+
+    def _start_sync(self) -> None:
+        with self._lock:
+            if self._sync_thread is not None:
+                return
+            self._sync_thread = threading.Thread(target=self._sync_loop, name='metrics-sync', daemon=True)
+        self._sync_thread.start()
+
+    def _sync_loop(self) -> None:
+        while True:
+            time.sleep(METRICS_SYNC_INTERVAL)
+            self.write_snapshot()
+
+    def write_snapshot(self, force: bool = False) -> Optional[dict]:
+        """snapshot این پروسه در shared_dir؛ اگر از نوشتن قبلی درخواستی ثبت نشده باشد کاری نمی‌کند"""
+        if self.shared_dir is None:
+            return None
+        with self._write_lock:
+            version = self._version
+            if version == self._synced_version and not force:
+                return None
+            data = self.snapshot()
+            try:
+                _write_json(self.shared_dir / f'{self.worker_id}.json', data)
+            except OSError:
+                return data
+            self._synced_version = version
+            return data
+
+    def _collect(self) -> List[dict]:
+        """
+        snapshot همین پروسه و بقیه پروسه‌ها از shared_dir
+        snapshot خودی پیش از پاسخ نوشته می‌شود تا scrape بعدی از کارگر دیگر عدد کوچک‌تری نبیند
+        """
+        if self.shared_dir is None:
+            return [self.snapshot()]
+        own = self.write_snapshot(force=True)
+        return [own] + read_snapshots(self.shared_dir, skip=self.worker_id)
+
+    def render_prometheus(self) -> str:
+        merged = merge_snapshots(self._collect())
+        return render_prometheus(self.server, merged, self.shared_dir is not None)
+
+
+def _write_json(path: Path, data: dict) -> None:
+    tmp = path.with_name(path.name + '.tmp')
+    tmp.write_text(json.dumps(data, separators=(',', ':')), encoding='utf-8')
+    os.replace(tmp, path)
+
+
+def _read_json(path: Path) -> Optional[dict]:
+    try:
+        return json.loads(path.read_text(encoding='utf-8'))
+    except (OSError, ValueError):
+        return None
+
+
+def read_snapshots(directory: Path, skip: Optional[str] = None) -> List[dict]:
+    """
+    snapshot پروسه‌های زنده و retired.json
+    snapshotهای پروسه‌ها پیش از retired.json خوانده می‌شوند؛ retire_snapshot اول retired.json را می‌نویسد و
+    بعد فایل کارگر را حذف می‌کند، پس هر کارگر دقیقاً یک بار شمرده می‌شود
+    """
+    live = []
+    for path in sorted(directory.glob('*.json')):
+        if path.name == RETIRED_SNAPSHOT or path.stem == skip:
+            continue
+        data = _read_json(path)
+        if data is not None:
+            live.append(data)
+    retired = _read_json(directory / RETIRED_SNAPSHOT)
+    if retired is None:
+        return live
+    absorbed = set(retired.get('ids', ()))
+    return [data for data in live if data.get('id') not in absorbed] + [retired]
+
+
+def retire_snapshot(directory: Path, worker_id: str) -> None:
+    """
+    شمارنده‌های کارگر خارج‌شده به retired.json اضافه می‌شوند (prefork_server.py پس از waitpid)
+    مقادیر لحظه‌ای (اندازه کش) کارگر مرده کنار گذاشته می‌شوند
+    """
+    path = directory / f'{worker_id}.json'
+    data = _read_json(path)
+    if data is None:
+        return
+    retired_path = directory / RETIRED_SNAPSHOT
+    retired = _read_json(retired_path) or {'retired': True, 'ids': [], 'routes': {}, 'dropped': 0, 'asset_cache': {}}
+    if worker_id not in retired['ids']:
+        merged = merge_snapshots([retired, data])
+        retired['routes'] = {route: stats.to_dict() for route, stats in merged['routes'].items()}
+        retired['dropped'] = merged['dropped']
+        retired['asset_cache'] = {key: merged['asset_cache'].get(key, 0) for key in CACHE_COUNTERS}
+        retired['ids'] = (retired['ids'] + [worker_id])[-RETIRED_IDS_KEPT:]
+        _write_json(retired_path, retired)
+    try:
+        path.unlink()
+    except OSError:
+        pass
+
+
+def retire_pid(directory: Path, pid: int) -> None:
+    """snapshot کارگری که waitpid آن را برگرداند؛ تا پیش از waitpid هیچ پروسه دیگری این pid را ندارد"""
+    for path in directory.glob(f'{pid}-*.json'):
+        retire_snapshot(directory, path.stem)
+
+
+def retire_all(directory: Path) -> None:
+    """snapshotهای به‌جامانده از اجرای قبلی (پروسه‌هایی که دیگر وجود ندارند)"""
+    for path in directory.glob('*.json'):
+        if path.name != RETIRED_SNAPSHOT:
+            retire_snapshot(directory, path.stem)
+
+
+def merge_snapshots(snapshots: Iterable[dict]) -> dict:
+    routes: Dict[str, RouteStats] = {}
+    cache: Dict[str, int] = {}
+    dropped = 0
+    started = None
+    workers = 0
+    for data in snapshots:
+        retired = data.get('retired', False)
+        for route, stats in data['routes'].items():
+            routes.setdefault(route, RouteStats()).merge(stats)
+        dropped += data.get('dropped', 0)
+        for key, value in data.get('asset_cache', {}).items():
+            if key in CACHE_COUNTERS or not retired:
+                cache[key] = cache.get(key, 0) + value
+        if not retired:
+            workers += 1
+            started = data['started'] if started is None else min(started, data['started'])
+    return {'routes': routes, 'asset_cache': cache, 'dropped': dropped,
+            'started': started or time.time(), 'workers': workers}
+
+
+def render_prometheus(server_name: str, merged: dict, multiprocess: bool = False) -> str:
+    """متن Prometheus از خروجی merge_snapshots"""
+    lines: List[str] = []
+
+    def family(name: str, kind: str, help_text: str) -> None:
+        lines.append(f'# HELP {name} {help_text}')
+        lines.append(f'# TYPE {name} {kind}')
+
+    def sample(name: str, labels: Dict[str, str], value: float) -> None:
+        rendered = ','.join(f'{key}="{_escape_label(str(val))}"' for key, val in labels.items())
+        lines.append(f'{name}{{{rendered}}} {_format_value(value)}' if rendered
+                     else f'{name} {_format_value(value)}')
+
+    routes = sorted(merged['routes'].items())
+    server = {'server': server_name}
+
+    family('naroon_http_requests_total', 'counter', 'Completed HTTP requests by route and status.')
+    for route, stats in routes:
+        for status, count in sorted(stats.statuses.items()):
+            sample('naroon_http_requests_total', dict(server, route=route, status=str(status)), count)
+
+    family('naroon_http_response_bytes_total', 'counter', 'Response body bytes sent by route.')
+    for route, stats in routes:
+        sample('naroon_http_response_bytes_total', dict(server, route=route), stats.bytes)
+
+    family('naroon_http_request_duration_seconds', 'histogram', 'Time to produce the response.')
+    for route, stats in routes:
+        cumulative = 0
+        histogram = stats.latency
+        for bound, count in zip(histogram.bounds + (float('inf'),), histogram.counts):
+            cumulative += count
+            le = '+Inf' if bound == float('inf') else repr(bound)
+            sample('naroon_http_request_duration_seconds_bucket', dict(server, route=route, le=le), cumulative)
+        sample('naroon_http_request_duration_seconds_sum', dict(server, route=route), histogram.total)
+        sample('naroon_http_request_duration_seconds_count', dict(server, route=route), histogram.count)
+
+    family('naroon_http_request_duration_quantile_seconds', 'gauge',
+           'p50/p95/p99 estimated from the duration histogram.')
+    for route, stats in routes:
+        for q in QUANTILES:
+            sample('naroon_http_request_duration_quantile_seconds',
+                   dict(server, route=route, quantile=str(q)), stats.latency.quantile(q))
+
+    family('naroon_asset_cache_requests_total', 'counter', 'In-memory asset cache lookups by route.')
+    for route, stats in routes:
+        if stats.cache_hits or stats.cache_misses:
+            sample('naroon_asset_cache_requests_total', dict(server, route=route, result='hit'), stats.cache_hits)
+            sample('naroon_asset_cache_requests_total', dict(server, route=route, result='miss'), stats.cache_misses)
+
+    family('naroon_asset_cache_hit_ratio', 'gauge', 'Share of asset cache lookups served from memory.')
+    for route, stats in routes:
+        lookups = stats.cache_hits + stats.cache_misses
+        if lookups:
+            sample('naroon_asset_cache_hit_ratio', dict(server, route=route), stats.cache_hits / lookups)
+
+    cache = merged['asset_cache']
+    if cache:
+        for key, kind, help_text in (
+                ('entries', 'gauge', 'Files held by the asset cache.'),
+                ('bytes', 'gauge', 'Bytes held by the asset cache.'),
+                ('max_bytes', 'gauge', 'Asset cache byte budget.'),
+                ('evictions', 'counter', 'Entries evicted to stay within the byte budget.'),
+                ('invalidations', 'counter', 'Entries dropped because the file changed.')):
+            name = f'naroon_asset_cache_{key}' + ('_total' if kind == 'counter' else '')
+            family(name, kind, help_text)
+            sample(name, server, cache.get(key, 0))
+
+    family('naroon_access_log_dropped_total', 'counter', 'Access log lines dropped because the queue was full.')
+    sample('naroon_access_log_dropped_total', server, merged['dropped'])
+    family('naroon_process_start_time_seconds', 'gauge', 'Unix time the oldest live server process started.')
+    sample('naroon_process_start_time_seconds', server, round(merged['started'], 3))
+    if multiprocess:
+        family('naroon_workers', 'gauge', 'Live worker processes whose counters are included.')
+        sample('naroon_workers', server, merged['workers'])
+    return '\n'.join(lines) + '\n'
@@ -10,9 +10,15 @@ let errorrImageObserver = null;
 // لیست فایل‌های عکس و ویدیو (باید به صورت دستی یا با اسکریپت به‌روزرسانی شود)
 // یا می‌توانید از یک فایل JSON استفاده کنید
 let errorrMediaFiles = [];
+// poster و کلیپ پیش‌نمایش هر ویدیو (خروجی video_previews.py): مسیر ویدیو -> {poster, preview}
+let errorrMediaPreviews = {};
+// metadata هر فایل (update_errorr_media.py): مسیر -> {type, width, height, bytes, duration, hash, placeholder}
+let errorrMediaInfo = {};
 
-// تابع برای تشخیص نوع فایل
+// تابع برای تشخیص نوع فایل (از منیفست؛ پسوند فقط برای منیفست‌های قدیمی)
 function getFileType(filename) {
+    const info = errorrMediaInfo[filename];
+    if (info && info.type) return info.type;
     const ext = filename.toLowerCase().split('.').pop();
     const imageExts = ['jpg', 'jpeg', 'png', 'gif', 'webp', 'svg'];
     const videoExts = ['mp4', 'webm', 'ogg', 'mov', 'avi'];
@@ -30,6 +36,8 @@ async function loadErrorrMediaList() {
         if (response.ok) {
             const data = await response.json();
             errorrMediaFiles = data.files || [];
+            errorrMediaPreviews = data.previews || {};
+            errorrMediaInfo = data.media || {};
             return errorrMediaFiles;
         }
     } catch (error) {
@@ -86,7 +94,7 @@ async function displayErrorrGallery() {
             const item = document.createElement('div');
             item.className = 'errorr-gallery-item errorr-image-item';
             item.innerHTML = `
-                <img class="errorr-gallery-image loading" src="${ERRORR_IMAGE_PLACEHOLDER}" data-src="${filePath}" alt="محصولات ERRORR ${index + 1}" loading="lazy" decoding="async">
+                <img class="errorr-gallery-image loading" src="${errorrPlaceholder(file)}" data-src="${filePath}" alt="محصولات ERRORR ${index + 1}"${errorrSizeAttributes(file)} loading="lazy" decoding="async">
                 <div class="errorr-item-overlay">
                     <i class="fas fa-search-plus"></i>
                 </div>
@@ -96,27 +104,40 @@ async function displayErrorrGallery() {
         } else if (fileType === 'video') {
             const item = document.createElement('div');
             item.className = 'errorr-gallery-item errorr-video-item';
-            item.innerHTML = `
-                <video muted playsinline>
-                    <source src="${filePath}" type="video/${file.split('.').pop()}">
-                </video>
-                <div class="errorr-video-play-button">
-                    <i class="fas fa-play"></i>
-                </div>
-                <div class="errorr-item-overlay"></div>
-            `;
+            const preview = errorrMediaPreviews[file];
+            if (preview) {
+                // فقط poster بارگذاری می‌شود؛ کلیپ کوتاه پیش‌نمایش با اولین hover ساخته می‌شود
+                item.innerHTML = `
+                    <img class="errorr-gallery-image loading" src="${errorrPlaceholder(file)}" data-src="${preview.poster}" alt="ویدیو ERRORR ${index + 1}"${errorrSizeAttributes(file)} loading="lazy" decoding="async">
+                    <div class="errorr-video-play-button">
+                        <i class="fas fa-play"></i>
+                    </div>
+                    <div class="errorr-item-overlay"></div>
+                `;
+                attachErrorrPreviewClip(item, preview.preview);
+            } else {
+                item.innerHTML = `
+                    <video muted playsinline preload="metadata">
+                        <source src="${filePath}" type="video/${file.split('.').pop()}">
+                    </video>
+                    <div class="errorr-video-play-button">
+                        <i class="fas fa-play"></i>
+                    </div>
+                    <div class="errorr-item-overlay"></div>
+                `;
+                
+                // پخش خودکار ویدیو هنگام hover
+                const video = item.querySelector('video');
+                item.addEventListener('mouseenter', () => {
+                    video.play().catch(() => {});
+                });
+                item.addEventListener('mouseleave', () => {
+                    video.pause();
+                    video.currentTime = 0;
+                });
+            }
             item.addEventListener('click', () => openErrorrLightbox(index, mediaFiles));
             
-            // پخش خودکار ویدیو هنگام hover
-            const video = item.querySelector('video');
-            item.addEventListener('mouseenter', () => {
-                video.play().catch(() => {});
-            });
-            item.addEventListener('mouseleave', () => {
-                video.pause();
-                video.currentTime = 0;
-            });
-            
             galleryGrid.appendChild(item);
         }
     });
@@ -128,6 +149,41 @@ async function displayErrorrGallery() {
     initializeErrorrImages(galleryGrid);
 }
 
+// ویژگی‌های width/height برای رزرو جای تصویر پیش از دانلود
+function errorrSizeAttributes(file) {
+    const info = errorrMediaInfo[file];
+    return info && info.width && info.height ? ` width="${info.width}" height="${info.height}"` : '';
+}
+
+// placeholder کوچک (LQIP) منیفست تا تصویر اصلی برسد
+function errorrPlaceholder(file) {
+    const info = errorrMediaInfo[file];
+    return (info && info.placeholder) || ERRORR_IMAGE_PLACEHOLDER;
+}
+
+// کلیپ پیش‌نمایش حلقه‌ای روی poster؛ تا اولین hover هیچ بایتی از ویدیو دانلود نمی‌شود
+function attachErrorrPreviewClip(item, clipSrc) {
+    let clip = null;
+
+    item.addEventListener('mouseenter', () => {
+        if (!clip) {
+            clip = document.createElement('video');
+            clip.className = 'errorr-preview-clip';
+            clip.muted = true;
+            clip.loop = true;
+            clip.playsInline = true;
+            clip.src = clipSrc;
+            item.insertBefore(clip, item.querySelector('.errorr-video-play-button'));
+        }
+        clip.play().catch(() => {});
+    });
+    item.addEventListener('mouseleave', () => {
+        if (clip) {
+            clip.pause();
+        }
+    });
+}
+
 // تابع برای لود کردن عکس‌ها با retry mechanism
 function loadErrorrImageWithRetry(imgElement, src, attempt = 1) {
     if (!imgElement || !src) {
@@ -234,10 +290,12 @@ function openErrorrLightbox(index, mediaFiles) {
         const mediaContainer = lightbox.querySelector('.errorr-lightbox-media');
         
         if (fileType === 'image') {
-            mediaContainer.innerHTML = `<img src="${filePath}" alt="محصولات ERRORR ${idx + 1}">`;
+            mediaContainer.innerHTML = `<img src="${filePath}" alt="محصولات ERRORR ${idx + 1}"${errorrSizeAttributes(file)}>`;
         } else if (fileType === 'video') {
+            const preview = errorrMediaPreviews[file];
+            const poster = preview ? ` poster="${preview.poster}"` : '';
             mediaContainer.innerHTML = `
-                <video controls autoplay>
+                <video controls autoplay${poster}${errorrSizeAttributes(file)}>
                     <source src="${filePath}" type="video/${file.split('.').pop()}">
                 </video>
             `;
@@ -1,6 +1,22 @@
 const galleryManifestUrl = 'gallery-data.json';
+// Paginated, per-category manifest served by app.py; the full manifest above is the fallback (main.py, static hosting)
+const GALLERY_API_URL = '/api/gallery';
+const GALLERY_PAGE_SIZE = 24;
 const GALLERY_IMAGE_PLACEHOLDER = 'data:image/gif;base64,R0lGODlhAQABAIAAAAAAAP///ywAAAAAAQABAAACAUwAOw==';
 const MAX_IMAGE_LOAD_RETRIES = 3;
+// Responsive variants written by image_derivatives.py (keys starting with "_" are not categories)
+const GALLERY_RESPONSIVE_KEY = '_responsive';
+const GALLERY_IMAGE_SIZES = '(max-width: 480px) 100vw, (max-width: 768px) 50vw, (max-width: 1200px) 33vw, 400px';
+const AVIF_PROBE_IMAGE = 'data:image/avif;base64,AAAAIGZ0eXBhdmlmAAAAAGF2aWZtaWYxbWlhZk1BMUIAAADybWV0YQAAAAAAAAAoaGRscgAAAAAAAAAAcGljdAAAAAAAAAAAAAAAAGxpYmF2aWYAAAAADnBpdG0AAAAAAAEAAAAeaWxvYwAAAABEAAABAAEAAAABAAABGgAAAB0AAAAoaWluZgAAAAAAAQAAABppbmZlAgAAAAABAABhdjAxQ29sb3IAAAAAamlwcnAAAABLaXBjbwAAABRpc3BlAAAAAAAAAAIAAAACAAAAEHBpeGkAAAAAAwgICAAAAAxhdjFDgQ0MAAAAABNjb2xybmNseAACAAIAAYAAAAAXaXBtYQAAAAAAAAABAAEEAQKDBAAAACVtZGF0EgAKCBgANogQEAwgMg8f8D///8WfhwB8+ErK42A=';
+
+// null until the probe finishes; WebP variants are used meanwhile
+let avifSupported = null;
+(function detectAvifSupport() {
+    const probe = new Image();
+    probe.onload = () => { avifSupported = probe.width > 0; };
+    probe.onerror = () => { avifSupported = false; };
+    probe.src = AVIF_PROBE_IMAGE;
+})();
 
 const categoryNames = {
     'exhibition': {
@@ -78,6 +94,9 @@ let manifestLoaded = false;
 let galleryImageObserver = null;
 let galleryManifestCache = null;
 let currentGalleryLang = getCurrentLanguage();
+// API mode: raw items of the loaded pages and the cursor of the next one
+let galleryPages = null;
+let galleryPageObserver = null;
 
 function buildGalleryData(manifest) {
     galleryManifestCache = manifest || galleryManifestCache;
@@ -85,9 +104,10 @@ function buildGalleryData(manifest) {
     galleryDataByCategory = {};
     galleryDataAll = [];
 
+    const responsiveIndex = manifest?.[GALLERY_RESPONSIVE_KEY] || {};
     const categories = new Set([
         ...Object.keys(categoryNames),
-        ...(manifest ? Object.keys(manifest) : [])
+        ...(manifest ? Object.keys(manifest).filter((key) => !key.startsWith('_')) : [])
     ]);
 
     categories.forEach((category) => {
@@ -98,7 +118,8 @@ function buildGalleryData(manifest) {
             id: `${category}-${index + 1}`,
             title: `${baseTitle} - ${projectLabel} ${index + 1}`,
             category,
-            image
+            image,
+            responsive: responsiveIndex[image] || null
         }));
 
         if (category === 'polygon-3d') {
@@ -112,6 +133,135 @@ function buildGalleryData(manifest) {
     manifestLoaded = true;
 }
 
+function buildGalleryItem(raw) {
+    const { title: baseTitle } = getCategoryCopy(raw.category, currentGalleryLang);
+    const projectLabel = currentGalleryLang === 'en' ? 'Project' : 'پروژه';
+    return {
+        id: `${raw.category}-${raw.n}`,
+        title: `${baseTitle} - ${projectLabel} ${raw.n}`,
+        category: raw.category,
+        image: raw.image,
+        responsive: raw.responsive || null
+    };
+}
+
+function buildGalleryDataFromPages() {
+    // Items are kept in one array per view so the lightbox keeps working while pages are appended
+    currentGalleryLang = getCurrentLanguage();
+    const items = galleryPages.raw.map(buildGalleryItem);
+    galleryDataByCategory = { [galleryPages.category]: items };
+    galleryDataAll = galleryPages.category === 'all' ? items : [];
+    manifestLoaded = true;
+}
+
+async function fetchGalleryPage(category, cursor) {
+    const params = new URLSearchParams({ limit: String(GALLERY_PAGE_SIZE) });
+    if (cursor) {
+        params.set('cursor', cursor);
+    }
+    // Default HTTP cache: the response carries an ETag and is revalidated with a 304
+    const response = await fetch(`${GALLERY_API_URL}/${encodeURIComponent(category)}?${params}`);
+    if (!response.ok) {
+        throw new Error(`Gallery page request failed (${response.status})`);
+    }
+    return response.json();
+}
+
+async function loadNextGalleryPage() {
+    if (!galleryPages || galleryPages.loading || !galleryPages.next) {
+        return;
+    }
+    galleryPages.loading = true;
+    try {
+        const page = await fetchGalleryPage(galleryPages.category, galleryPages.next);
+        const start = galleryPages.raw.length;
+        galleryPages.raw.push(...page.items);
+        galleryPages.next = page.next;
+        galleryPages.inline = false;
+        const items = getItemsForCategory(galleryPages.category);
+        items.push(...page.items.map(buildGalleryItem));
+        appendGalleryItems(items, start);
+    } catch (error) {
+        if (galleryPages.inline) {
+            // Inline first page without a manifest API (static server): the rest comes from the full manifest
+            await loadRemainingFromManifest();
+        } else {
+            console.error('Gallery page load error:', error);
+        }
+    } finally {
+        if (galleryPages) {
+            galleryPages.loading = false;
+        }
+        updateGalleryPageSentinel();
+    }
+}
+
+async function loadRemainingFromManifest() {
+    const { category, raw } = galleryPages;
+    try {
+        const response = await fetch(galleryManifestUrl);
+        if (!response.ok) {
+            throw new Error('Failed to load gallery manifest');
+        }
+        const manifest = await response.json();
+        const shown = new Set(raw.map((item) => item.image));
+        // The lightbox and the click handlers keep the current array, so the rest is appended to it
+        const items = getItemsForCategory(category);
+        const start = items.length;
+        galleryPages = null;
+        buildGalleryData(manifest);
+        items.push(...getItemsForCategory(category).filter((item) => !shown.has(item.image)));
+        if (category === 'all') {
+            galleryDataAll = items;
+        } else {
+            galleryDataByCategory[category] = items;
+        }
+        window.currentGalleryItems = items;
+        appendGalleryItems(items, start);
+    } catch (error) {
+        console.error('Gallery manifest load error:', error);
+        if (galleryPages) {
+            // No retry loop from the page sentinel
+            galleryPages.next = null;
+        }
+    }
+}
+
+function updateGalleryPageSentinel() {
+    const galleryGrid = document.getElementById('categoryGallery');
+    let sentinel = document.getElementById('galleryPageSentinel');
+    const hasMore = Boolean(galleryPages && galleryPages.next);
+
+    if (!hasMore || !galleryGrid) {
+        if (sentinel) {
+            sentinel.remove();
+        }
+        return;
+    }
+
+    if (!sentinel) {
+        sentinel = document.createElement('div');
+        sentinel.id = 'galleryPageSentinel';
+        sentinel.setAttribute('aria-hidden', 'true');
+        galleryGrid.insertAdjacentElement('afterend', sentinel);
+    }
+
+    if (!('IntersectionObserver' in window)) {
+        loadNextGalleryPage();
+        return;
+    }
+    if (!galleryPageObserver) {
+        galleryPageObserver = new IntersectionObserver((entries) => {
+            if (entries.some((entry) => entry.isIntersecting)) {
+                loadNextGalleryPage();
+            }
+        }, { rootMargin: '800px 0px' });
+    }
+    // Re-observing fires the callback again if the sentinel is still in view after an append
+    galleryPageObserver.unobserve(sentinel);
+    galleryPageObserver.observe(sentinel);
+}
+
 function getItemsForCategory(category) {
     if (category === 'all') {
         return galleryDataAll;
@@ -162,6 +312,17 @@ function showGalleryError() {
 }
 
 async function loadGalleryManifest() {
+    const category = getCategoryFromURL();
+
+    // First page inlined by embed_manifest_once.py: no request before the first render
+    const firstPage = window.__GALLERY_FIRST_PAGE__;
+    if (firstPage && Array.isArray(firstPage.items) && firstPage.category === category) {
+        galleryPages = { category, raw: firstPage.items.slice(), next: firstPage.next, loading: false, inline: true };
+        buildGalleryDataFromPages();
+        displayCategoryGallery();
+        return Promise.resolve();
+    }
+
     setGalleryLoadingState();
 
     // Inline manifest support (for file:// usage)
@@ -173,7 +334,19 @@ async function loadGalleryManifest() {
     }
 
     try {
-        const response = await fetch(`${galleryManifestUrl}?v=${Date.now()}`, { cache: 'no-store' });
+        const page = await fetchGalleryPage(category, null);
+        galleryPages = { category, raw: page.items, next: page.next, loading: false };
+        buildGalleryDataFromPages();
+        displayCategoryGallery();
+        return Promise.resolve();
+    } catch (error) {
+        // No manifest API (static server): fall back to the full manifest
+        galleryPages = null;
+    }
+
+    try {
+        // Default HTTP cache: the server revalidates gallery-data.json with its ETag
+        const response = await fetch(galleryManifestUrl);
         if (!response.ok) {
             throw new Error('Failed to load gallery manifest');
         }
@@ -253,58 +426,93 @@ function displayCategoryGallery() {
 
     if (galleryGrid) {
         galleryGrid.style.display = 'grid';
-        galleryGrid.innerHTML = itemsForCategory.map((item, index) => {
-            // Load first 9 images with high priority to prevent hanging
-            const isPriorityImage = index < 9;
-            return `
+        if (galleryGrid.dataset.prerendered === category && currentGalleryLang === 'fa') {
+            adoptPrerenderedItems(itemsForCategory);
+        } else {
+            galleryGrid.innerHTML = '';
+            appendGalleryItems(itemsForCategory, 0);
+        }
+        delete galleryGrid.dataset.prerendered;
+    }
+
+    if (emptyState) {
+        emptyState.style.display = 'none';
+    }
+
+    window.currentGalleryItems = itemsForCategory;
+    updateGalleryPageSentinel();
+    
+    // Update nav logo background slideshow
+    initNavLogoSlideshow();
+}
+
+function renderGalleryItem(item, index) {
+    // Load first 9 images with high priority to prevent hanging
+    const isPriorityImage = index < 9;
+    const responsiveAttrs = buildResponsiveAttributes(item);
+    return `
             <div class="gallery-item" data-category="${item.category}" data-index="${index}" data-image="${item.image}" data-title="${item.title}">
-                <img class="gallery-image loading" src="${GALLERY_IMAGE_PLACEHOLDER}" data-src="${item.image}" alt="${item.title}" loading="${isPriorityImage ? 'eager' : 'lazy'}" decoding="async" ${isPriorityImage ? 'fetchpriority="high"' : ''}>
+                <img class="gallery-image loading" src="${GALLERY_IMAGE_PLACEHOLDER}" data-src="${item.image}"${responsiveAttrs} alt="${item.title}" loading="${isPriorityImage ? 'eager' : 'lazy'}" decoding="async" ${isPriorityImage ? 'fetchpriority="high"' : ''}>
                 <div class="gallery-item-overlay">
                     <div class="gallery-item-title">${item.title}</div>
                 </div>
             </div>
         `;
-        }).join('');
-
-        const renderedItems = galleryGrid.querySelectorAll('.gallery-item');
-        const isMobile = window.innerWidth <= 768;
-        // Reduce animation delay on mobile for better performance
-        const delay = isMobile ? 15 : 80;
-        const maxItems = isMobile ? 20 : renderedItems.length; // Limit animated items on mobile
-        
-        renderedItems.forEach((item, index) => {
-            if (index < maxItems) {
-                item.style.opacity = '0';
-                item.style.transform = 'translateY(30px)';
-                setTimeout(() => {
-                    item.style.transition = 'all 0.4s ease';
-                    item.style.opacity = '1';
-                    item.style.transform = 'translateY(0)';
-                }, index * delay);
-            } else {
-                // Show remaining items immediately on mobile
-                item.style.opacity = '1';
-                item.style.transform = 'translateY(0)';
-            }
-        });
+}
 
-        renderedItems.forEach((item, index) => {
-            item.addEventListener('click', () => {
-                openLightbox(index, itemsForCategory);
-            });
+function adoptPrerenderedItems(items) {
+    // Cards rendered by embed_manifest_once.py are already painted: keep them and only wire up the lightbox
+    const galleryGrid = document.getElementById('categoryGallery');
+    const renderedItems = Array.from(galleryGrid.querySelectorAll('.gallery-item'));
+    if (renderedItems.length !== items.length) {
+        galleryGrid.innerHTML = '';
+        appendGalleryItems(items, 0);
+        return;
+    }
+    renderedItems.forEach((item, index) => {
+        item.addEventListener('click', () => {
+            openLightbox(index, items);
         });
+    });
+}
 
-        initializeGalleryImages(renderedItems);
+function appendGalleryItems(items, start) {
+    const galleryGrid = document.getElementById('categoryGallery');
+    if (!galleryGrid) {
+        return;
     }
 
-    if (emptyState) {
-        emptyState.style.display = 'none';
-    }
+    galleryGrid.insertAdjacentHTML('beforeend', items.slice(start).map((item, offset) => renderGalleryItem(item, start + offset)).join(''));
 
-    window.currentGalleryItems = itemsForCategory;
+    const renderedItems = Array.from(galleryGrid.querySelectorAll('.gallery-item')).slice(start);
+    const isMobile = window.innerWidth <= 768;
+    // Reduce animation delay on mobile for better performance
+    const delay = isMobile ? 15 : 80;
+    const maxItems = isMobile ? 20 : renderedItems.length; // Limit animated items on mobile
     
-    // Update nav logo background slideshow
-    initNavLogoSlideshow();
+    renderedItems.forEach((item, index) => {
+        if (index < maxItems) {
+            item.style.opacity = '0';
+            item.style.transform = 'translateY(30px)';
+            setTimeout(() => {
+                item.style.transition = 'all 0.4s ease';
+                item.style.opacity = '1';
+                item.style.transform = 'translateY(0)';
+            }, index * delay);
+        } else {
+            // Show remaining items immediately on mobile
+            item.style.opacity = '1';
+            item.style.transform = 'translateY(0)';
+        }
+    });
+
+    renderedItems.forEach((item, index) => {
+        item.addEventListener('click', () => {
+            openLightbox(start + index, items);
+        });
+    });
+
+    initializeGalleryImages(renderedItems);
 }
 
 let currentLightboxIndex = 0;
@@ -508,8 +716,13 @@ function initNavLogoSlideshow() {
     // If category is 'all', use channel-letters as default
     const categoryKey = category === 'all' ? 'channel-letters' : category;
     
-    // Get images for this category
-    const categoryImages = manifest[categoryKey] || [];
+    // Get images for this category (API mode only has the loaded pages of the current view)
+    let categoryImages = manifest[categoryKey] || [];
+    if (!categoryImages.length && galleryPages) {
+        const loaded = getItemsForCategory(category);
+        const preferred = loaded.filter((item) => item.category === categoryKey);
+        categoryImages = (preferred.length ? preferred : loaded).map((item) => item.image);
+    }
     
     if (categoryImages.length === 0) {
         navLogoBg.classList.remove('active');
@@ -642,6 +855,48 @@ function initializeGalleryImages(renderedItems) {
     }
 }
 
+function getResponsiveVariants(item, format) {
+    const sources = item?.responsive?.sources;
+    if (!sources) {
+        return [];
+    }
+    return Array.isArray(sources[format]) ? sources[format] : [];
+}
+
+function buildSrcset(variants) {
+    return variants.map(([url, width]) => `${encodeURI(url)} ${width}w`).join(', ');
+}
+
+function buildResponsiveAttributes(item) {
+    const webp = getResponsiveVariants(item, 'webp');
+    if (!webp.length) {
+        return '';
+    }
+    const avif = getResponsiveVariants(item, 'avif');
+    const { width, height } = item.responsive;
+    // width/height let the browser reserve the box before the image arrives
+    return ` data-srcset="${buildSrcset(webp)}"` +
+        (avif.length ? ` data-srcset-avif="${buildSrcset(avif)}"` : '') +
+        ` sizes="${GALLERY_IMAGE_SIZES}" width="${width}" height="${height}"`;
+}
+
+function getPreferredSrcset(imgElement) {
+    if (avifSupported && imgElement.dataset.srcsetAvif) {
+        return imgElement.dataset.srcsetAvif;
+    }
+    return imgElement.dataset.srcset || '';
+}
+
+function getLightboxSrc(item) {
+    // Largest derivative (max 1920px) instead of the full-resolution original
+    const format = avifSupported && getResponsiveVariants(item, 'avif').length ? 'avif' : 'webp';
+    const variants = getResponsiveVariants(item, format);
+    if (!variants.length) {
+        return item.image;
+    }
+    return variants[variants.length - 1][0];
+}
+
 function buildCacheSafeSrc(src, attempt) {
     if (attempt <= 1) {
         return src;
@@ -656,9 +911,20 @@ function loadImageWithRetry(imgElement, src, attempt = 1) {
     }
 
     const targetSrc = buildCacheSafeSrc(src, attempt);
+    // Retries fall back to the original file without srcset
+    const srcset = attempt <= 1 ? getPreferredSrcset(imgElement) : '';
     const testImage = new Image();
+    if (srcset) {
+        testImage.sizes = imgElement.sizes;
+        testImage.srcset = srcset;
+    }
 
     testImage.onload = () => {
+        if (srcset) {
+            imgElement.srcset = srcset;
+        } else {
+            imgElement.removeAttribute('srcset');
+        }
         imgElement.src = targetSrc;
         imgElement.dataset.loaded = 'true';
         imgElement.classList.remove('loading', 'error');
@@ -684,7 +950,7 @@ function loadLightboxImageWithRetry(item, attempt = 1) {
         return;
     }
 
-    const targetSrc = buildCacheSafeSrc(item.image, attempt);
+    const targetSrc = buildCacheSafeSrc(attempt <= 1 ? getLightboxSrc(item) : item.image, attempt);
     const loader = new Image();
 
     lightboxImage.style.opacity = '0';
@@ -737,7 +1003,9 @@ function getCategoryCopy(category, lang) {
 
 window.addEventListener('languageChanged', (event) => {
     currentGalleryLang = event.detail?.lang || getCurrentLanguage();
-    if (galleryManifestCache) {
+    if (galleryPages) {
+        buildGalleryDataFromPages();
+    } else if (galleryManifestCache) {
         buildGalleryData(galleryManifestCache);
     }
     if (manifestLoaded) {
@@ -406,16 +406,30 @@ document.querySelectorAll('img').forEach(img => {
         return;
     }
     
-    // Set video source
-    const videoSource = errorrPreviewVideo.querySelector('source');
-    if (videoSource) {
+    // Set video source only when the modal is first opened, so the page load does not fetch the video
+    let videoSourceSet = false;
+    function setVideoSource() {
+        const videoSource = errorrPreviewVideo.querySelector('source');
+        if (videoSourceSet || !videoSource) {
+            return;
+        }
+        videoSourceSet = true;
         // Set video path
         videoSource.src = 'videos/3d-preview_1.mp4';
+        // Adaptive HLS ladder from package_hls.py for browsers with native HLS (Safari, iOS, Android);
+        // if the package is missing the browser falls through to the MP4 source
+        if (errorrPreviewVideo.canPlayType('application/vnd.apple.mpegurl')) {
+            const hlsSource = document.createElement('source');
+            hlsSource.src = 'videos/hls/3d-preview_1/master.m3u8';
+            hlsSource.type = 'application/vnd.apple.mpegurl';
+            errorrPreviewVideo.insertBefore(hlsSource, videoSource);
+        }
         errorrPreviewVideo.load();
     }
     
     // Open modal
     errorrVideoBox.addEventListener('click', () => {
+        setVideoSource();
         errorrVideoModal.classList.add('active');
         document.body.style.overflow = 'hidden';
         // Auto-play video when modal opens (optional)
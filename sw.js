@@ -1,59 +1,276 @@
 // Service Worker for NAROON Website
-// Cache strategy: Cache First with Network Fallback
-
-const CACHE_VERSION = 'v44';
-const CACHE_NAME = `naroonsignmaker-static-${CACHE_VERSION}`;
-const RUNTIME_CACHE = `naroonsignmaker-runtime-${CACHE_VERSION}`;
-
-// Resources to cache on install
-const STATIC_CACHE_URLS = [
-    '/',
-    '/index.html',
-    '/gallery.html',
-    '/errorr.html',
-    '/pre-production.html',
-    '/static/css/styles.css',
-    '/static/js/script.js',
-    '/static/js/gallery-page.js',
-    '/static/js/ERRORR.js',
-    '/static/data/gallery-data.json',
-    '/favicon.ico'
+// Cache strategy:
+// - Precache: shell files listed by build_sw_precache.py with a content revision each;
+//   an install only downloads entries whose revision changed
+// - HTML and JSON manifests (static/data/*.json, /api/): Network first, fallback to cache;
+//   watch_assets.py rewrites the manifests without regenerating this file
+// - Content-hashed URLs (immutable): Cache first, never revalidated
+// - /images/: Cache first with a size/entry budget (LRU) and occasional revalidation
+// - Other static assets: Stale-While-Revalidate
+
+// precache:start (generated by build_sw_precache.py - do not edit by hand)
+const PRECACHE_MANIFEST = [
+    { url: '/index.html', revision: 'c40861b8c7' },
+    { url: '/gallery.html', revision: '89a473ac13' },
+    { url: '/errorr.html', revision: '7665ff967d' },
+    { url: '/pre-production.html', revision: 'd7ccc9eecb' },
+    { url: '/static/css/styles.css', revision: 'f109ed36e3' },
+    { url: '/static/js/script.js', revision: 'b39962bba5' },
+    { url: '/static/js/gallery-page.js', revision: '450988e728' },
+    { url: '/static/js/ERRORR.js', revision: '3c6625ca84' }
+];
+// precache:end
+
+// Cache names are no longer versioned: changing one file only replaces that file
+const PRECACHE = 'naroonsignmaker-precache';
+const RUNTIME_CACHE = 'naroonsignmaker-runtime';
+const IMAGE_CACHE = 'naroonsignmaker-images';
+// Caches of the old versioned worker (naroonsignmaker-static-vNN / naroonsignmaker-runtime-vNN)
+const LEGACY_CACHE_PREFIXES = ['naroonsignmaker-static-v', 'naroonsignmaker-runtime-v'];
+
+// Runtime image cache budget; least recently used images are evicted first
+const IMAGE_CACHE_MAX_ENTRIES = 400;
+const IMAGE_CACHE_MAX_BYTES = 150 * 1024 * 1024;
+// Images without a content hash are revalidated in the background at most once per this interval
+const IMAGE_REVALIDATE_MS = 24 * 60 * 60 * 1000;
+// LRU bookkeeping (url -> {used, fetched, size}) is stored in the image cache under this key
+const IMAGE_LRU_KEY = '/__sw/image-lru.json';
+const IMAGE_LRU_SAVE_DELAY_MS = 2000;
+
+// URLs that embed a content hash never change (see http_cache.cache_control_for)
+const IMMUTABLE_URL_PATTERNS = [
+    /\.[0-9a-f]{10}\.[A-Za-z0-9]+$/,                // fingerprint_assets.py: name.<hash>.ext
+    /\/hls\/[^/]+\/[0-9a-f]{10}\//,                 // package_hls.py
+    /\/previews\/[^/]+-[0-9a-f]{10}\.(?:webp|mp4)$/ // video_previews.py
 ];
 
-// Install event - cache static resources
+// Navigation to '/' is served by index.html
+const PRECACHE_ALIASES = { '/': '/index.html' };
+
+function precacheKey(entry) {
+    return new URL(`${entry.url}?__rev=${entry.revision}`, self.location.origin).href;
+}
+
+// pathname -> precache key of the current revision
+const PRECACHE_KEYS = new Map(PRECACHE_MANIFEST.map((entry) => [entry.url, precacheKey(entry)]));
+
+function precacheKeyForPath(pathname) {
+    return PRECACHE_KEYS.get(PRECACHE_ALIASES[pathname] || pathname);
+}
+
+function isImmutableUrl(pathname) {
+    return IMMUTABLE_URL_PATTERNS.some((pattern) => pattern.test(pathname));
+}
+
+function isCacheableResponse(response) {
+    return response && response.status === 200 && response.type === 'basic';
+}
+
+// Install event - download only the precache entries whose revision is not cached yet
 self.addEventListener('install', (event) => {
     console.log('Service Worker installing...');
     event.waitUntil(
-        caches.open(CACHE_NAME)
-            .then((cache) => {
-                console.log('Caching static resources');
-                return cache.addAll(STATIC_CACHE_URLS.map(url => new Request(url, { cache: 'reload' })));
-            })
-            .catch((err) => {
-                console.error('Cache install failed:', err);
+        caches.open(PRECACHE).then((cache) => Promise.all(
+            PRECACHE_MANIFEST.map(async (entry) => {
+                const key = precacheKey(entry);
+                if (await cache.match(key)) {
+                    return;
+                }
+                const response = await fetch(new Request(entry.url, { cache: 'reload' }));
+                if (!response.ok) {
+                    throw new Error(`Precache failed for ${entry.url}: ${response.status}`);
+                }
+                await cache.put(key, response);
             })
+        )).catch((err) => {
+            console.error('Cache install failed:', err);
+        })
     );
     self.skipWaiting(); // Activate immediately
 });
 
-// Activate event - clean up old caches
+// Keep the runtime images of the previous versioned worker instead of downloading them again
+async function migrateLegacyImages(cacheNames) {
+    const legacy = cacheNames.filter((name) => name.startsWith(LEGACY_CACHE_PREFIXES[1]));
+    if (!legacy.length) {
+        return;
+    }
+    const imageCache = await caches.open(IMAGE_CACHE);
+    const lru = await loadImageLru();
+    for (const name of legacy) {
+        const cache = await caches.open(name);
+        for (const request of await cache.keys()) {
+            if (!new URL(request.url).pathname.includes('/images/') || await imageCache.match(request)) {
+                continue;
+            }
+            const response = await cache.match(request);
+            if (response) {
+                await imageCache.put(request, response);
+                lru.set(request.url, { used: 0, fetched: 0, size: responseSize(response) });
+            }
+        }
+    }
+    scheduleImageLruSave();
+    await enforceImageBudget();
+}
+
+// Activate event - remove old precache revisions and old caches
 self.addEventListener('activate', (event) => {
     console.log('Service Worker activating...');
-    event.waitUntil(
-        caches.keys().then((cacheNames) => {
-            return Promise.all(
-                cacheNames.map((cacheName) => {
-                    if (cacheName !== CACHE_NAME && cacheName !== RUNTIME_CACHE) {
-                        console.log('Deleting old cache:', cacheName);
-                        return caches.delete(cacheName);
-                    }
-                })
-            );
-        })
-    );
-    return self.clients.claim(); // Take control immediately
+    event.waitUntil((async () => {
+        const cacheNames = await caches.keys();
+        await migrateLegacyImages(cacheNames);
+        const current = [PRECACHE, RUNTIME_CACHE, IMAGE_CACHE];
+        await Promise.all(cacheNames.map((cacheName) => {
+            if (!current.includes(cacheName)) {
+                console.log('Deleting old cache:', cacheName);
+                return caches.delete(cacheName);
+            }
+            return undefined;
+        }));
+
+        const precache = await caches.open(PRECACHE);
+        const wanted = new Set(PRECACHE_KEYS.values());
+        await Promise.all((await precache.keys()).map((request) => (
+            wanted.has(request.url) ? undefined : precache.delete(request)
+        )));
+        await self.clients.claim(); // Take control immediately
+    })());
 });
 
+// --- Image cache LRU -------------------------------------------------------
+
+let imageLruPromise = null;
+let imageLruSaveTimer = null;
+let imageBudgetRunning = false;
+
+function responseSize(response) {
+    return Number(response.headers.get('content-length')) || 0;
+}
+
+function loadImageLru() {
+    if (!imageLruPromise) {
+        imageLruPromise = caches.open(IMAGE_CACHE)
+            .then((cache) => cache.match(IMAGE_LRU_KEY))
+            .then((response) => (response ? response.json() : {}))
+            .catch(() => ({}))
+            .then((data) => new Map(Object.entries(data)));
+    }
+    return imageLruPromise;
+}
+
+function scheduleImageLruSave() {
+    if (imageLruSaveTimer) {
+        return;
+    }
+    imageLruSaveTimer = setTimeout(async () => {
+        imageLruSaveTimer = null;
+        const lru = await loadImageLru();
+        const cache = await caches.open(IMAGE_CACHE);
+        await cache.put(IMAGE_LRU_KEY, new Response(JSON.stringify(Object.fromEntries(lru)), {
+            headers: { 'Content-Type': 'application/json' }
+        }));
+    }, IMAGE_LRU_SAVE_DELAY_MS);
+}
+
+async function touchImage(url) {
+    const lru = await loadImageLru();
+    const record = lru.get(url) || { used: 0, fetched: 0, size: 0 };
+    record.used = Date.now();
+    lru.set(url, record);
+    scheduleImageLruSave();
+    return record;
+}
+
+// Evict least recently used images until the cache fits the entry and byte budget
+async function enforceImageBudget() {
+    if (imageBudgetRunning) {
+        return;
+    }
+    imageBudgetRunning = true;
+    try {
+        const cache = await caches.open(IMAGE_CACHE);
+        const lru = await loadImageLru();
+        const requests = (await cache.keys()).filter((request) => !request.url.endsWith(IMAGE_LRU_KEY));
+        const present = new Set(requests.map((request) => request.url));
+        for (const url of lru.keys()) {
+            if (!present.has(url)) {
+                lru.delete(url);
+            }
+        }
+        // Entries without a record (cached before bookkeeping existed) count as least recently used
+        const entries = requests.map((request) => ({
+            request,
+            record: lru.get(request.url) || { used: 0, fetched: 0, size: 0 }
+        }));
+        entries.sort((a, b) => a.record.used - b.record.used);
+        let count = entries.length;
+        let bytes = entries.reduce((total, entry) => total + entry.record.size, 0);
+        for (const entry of entries) {
+            if (count <= IMAGE_CACHE_MAX_ENTRIES && bytes <= IMAGE_CACHE_MAX_BYTES) {
+                break;
+            }
+            await cache.delete(entry.request);
+            lru.delete(entry.request.url);
+            count -= 1;
+            bytes -= entry.record.size;
+        }
+        scheduleImageLruSave();
+    } finally {
+        imageBudgetRunning = false;
+    }
+}
+
+async function fetchAndCacheImage(request) {
+    const response = await fetch(request);
+    if (isCacheableResponse(response)) {
+        const cache = await caches.open(IMAGE_CACHE);
+        await cache.put(request, response.clone());
+        const lru = await loadImageLru();
+        const now = Date.now();
+        lru.set(request.url, { used: now, fetched: now, size: responseSize(response) });
+        scheduleImageLruSave();
+        enforceImageBudget();
+    }
+    return response;
+}
+
+// Cache first; an image without a content hash is refreshed in the background once it is old
+async function handleImageRequest(event, immutable) {
+    const { request } = event;
+    const cache = await caches.open(IMAGE_CACHE);
+    const cachedResponse = await cache.match(request);
+    if (!cachedResponse) {
+        return fetchAndCacheImage(request);
+    }
+    const record = await touchImage(request.url);
+    if (!immutable && Date.now() - record.fetched > IMAGE_REVALIDATE_MS) {
+        record.fetched = Date.now();
+        event.waitUntil(fetchAndCacheImage(request).catch(() => undefined));
+    }
+    return cachedResponse;
+}
+
+// --- Fetch -----------------------------------------------------------------
+
+async function matchPrecache(pathname) {
+    const key = precacheKeyForPath(pathname);
+    return key ? caches.match(key, { cacheName: PRECACHE }) : undefined;
+}
+
+// Network first; the last good response is kept for offline use
+function networkFirst(request) {
+    return fetch(request)
+        .then((response) => {
+            if (isCacheableResponse(response)) {
+                const responseToCache = response.clone();
+                caches.open(RUNTIME_CACHE).then((cache) => cache.put(request, responseToCache));
+            }
+            return response;
+        })
+        .catch(() => caches.match(request, { cacheName: RUNTIME_CACHE }));
+}
+
 // Fetch event - optimized for mobile with better cache strategy
 self.addEventListener('fetch', (event) => {
     const { request } = event;
@@ -69,6 +286,11 @@ self.addEventListener('fetch', (event) => {
         return;
     }
 
+    // Range requests (video seeking) go straight to the server
+    if (request.headers.has('range')) {
+        return;
+    }
+
     const isHtmlRequest =
         request.mode === 'navigate' ||
         request.destination === 'document' ||
@@ -80,21 +302,61 @@ self.addEventListener('fetch', (event) => {
             fetch(request)
                 .then((response) => {
                     if (!response || response.status !== 200) {
-                        return caches.match(request) || caches.match('/index.html');
+                        return caches.match(request)
+                            .then((cached) => cached || matchPrecache(url.pathname))
+                            .then((cached) => cached || matchPrecache('/index.html'))
+                            .then((cached) => cached || response);
                     }
                     const responseToCache = response.clone();
                     caches.open(RUNTIME_CACHE).then((cache) => cache.put(request, responseToCache));
                     return response;
                 })
-                .catch(() => caches.match(request) || caches.match('/index.html'))
+                .catch(() => caches.match(request, { cacheName: RUNTIME_CACHE })
+                    .then((cached) => cached || matchPrecache(url.pathname))
+                    .then((cached) => cached || matchPrecache('/index.html')))
+        );
+        return;
+    }
+
+    // Manifests: always the latest version while online
+    if (url.pathname.endsWith('.json') || url.pathname.startsWith('/api/')) {
+        event.respondWith(networkFirst(request));
+        return;
+    }
+
+    // Precached shell files: the revision in PRECACHE_MANIFEST decides freshness
+    if (precacheKeyForPath(url.pathname) && !url.search) {
+        event.respondWith(
+            matchPrecache(url.pathname).then((cachedResponse) => cachedResponse || fetch(request))
+        );
+        return;
+    }
+
+    const immutable = isImmutableUrl(url.pathname);
+
+    // Images: LRU-bounded cache
+    if (url.pathname.includes('/images/')) {
+        event.respondWith(handleImageRequest(event, immutable));
+        return;
+    }
+
+    // Content-hashed assets: Cache first, never revalidated
+    if (immutable) {
+        event.respondWith(
+            caches.match(request).then((cachedResponse) => cachedResponse || fetch(request).then((response) => {
+                if (isCacheableResponse(response)) {
+                    const responseToCache = response.clone();
+                    caches.open(RUNTIME_CACHE).then((cache) => cache.put(request, responseToCache));
+                }
+                return response;
+            }))
         );
         return;
     }
 
-    // Static assets (CSS, JS, images): Stale-While-Revalidate for better performance
-    const isStaticAsset = 
+    // Static assets (CSS, JS): Stale-While-Revalidate for better performance
+    const isStaticAsset =
         url.pathname.includes('/static/') ||
-        url.pathname.includes('/images/') ||
         url.pathname.endsWith('.webp') ||
         url.pathname.endsWith('.css') ||
         url.pathname.endsWith('.js');
@@ -104,7 +366,7 @@ self.addEventListener('fetch', (event) => {
             caches.match(request).then((cachedResponse) => {
                 // Return cached version immediately
                 const fetchPromise = fetch(request).then((response) => {
-                    if (response && response.status === 200 && response.type === 'basic') {
+                    if (isCacheableResponse(response)) {
                         const responseToCache = response.clone();
                         caches.open(RUNTIME_CACHE).then((cache) => {
                             cache.put(request, responseToCache);
@@ -129,7 +391,7 @@ self.addEventListener('fetch', (event) => {
 
             return fetch(request)
                 .then((response) => {
-                    if (!response || response.status !== 200 || response.type !== 'basic') {
+                    if (!isCacheableResponse(response)) {
                         return response;
                     }
 
@@ -156,4 +418,3 @@ function doBackgroundSync() {
     // Implement background sync logic if needed
     return Promise.resolve();
 }
-
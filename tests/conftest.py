@@ -0,0 +1,12 @@
+"""
+تنظیمات مشترک تست‌ها: ماژول‌های ریشه پروژه قابل import هستند و لاگ دسترسی خاموش است
+"""
+import os
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+
+os.environ.setdefault('ACCESS_LOG', '0')
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
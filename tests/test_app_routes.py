@@ -0,0 +1,38 @@
+"""
+app.py (سرور production از طریق prefork_server.py) باید همه فایل‌های ریشه‌ای را که main.py سرو می‌کرد سرو کند
+"""
+import pytest
+
+import app as app_module
+
+
+@pytest.fixture
+def client():
+    return app_module.app.test_client()
+
+
+@pytest.mark.parametrize('path, content_type', [
+    ('/', 'text/html'),
+    ('/index.html', 'text/html'),
+    ('/gallery.html', 'text/html'),
+    ('/errorr.html', 'text/html'),
+    ('/pre-production.html', 'text/html'),
+    ('/sw.js', 'javascript'),
+    ('/gallery-data.json', 'application/json'),
+    ('/errorr-media.json', 'application/json'),
+])
+def test_root_files_are_served(client, path, content_type):
+    response = client.get(path)
+    assert response.status_code == 200
+    assert content_type in response.headers['Content-Type']
+    assert response.data
+
+
+@pytest.mark.parametrize('path', ['/sw.js', '/gallery-data.json', '/errorr-media.json', '/index.html'])
+def test_root_files_revalidate(client, path):
+    assert client.get(path).headers['Cache-Control'] == 'no-cache'
+
+
+@pytest.mark.parametrize('path', ['/app.py', '/liara.json', '/requirements.txt', '/missing.html'])
+def test_other_root_files_are_not_served(client, path):
+    assert client.get(path).status_code == 404
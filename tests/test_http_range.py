@@ -0,0 +1,214 @@
+"""
+Range / 206 / 416 / multipart برای main.py و app.py و زمان اولین seek روی کش سرد
+"""
+import http.client
+import os
+import re
+import threading
+import time
+from pathlib import Path
+
+import pytest
+
+import http_cache
+
+SMALL_SIZE = 1024 * 1024
+# فایل sparse؛ هش کامل آن چند صد میلی‌ثانیه طول می‌کشد ولی ساختنش هزینه‌ای ندارد
+LARGE_SIZE = 512 * 1024 * 1024
+SEEK_READ_BYTES = 256 * 1024
+
+
+def pattern(size):
+    """محتوای قابل پیش‌بینی: بایت i برابر i % 251 است"""
+    block = bytes(i % 251 for i in range(251 * 1024))
+    return (block * (size // len(block) + 1))[:size]
+
+
+@pytest.fixture
+def media_dir(tmp_path):
+    videos = tmp_path / 'videos'
+    videos.mkdir()
+    (videos / 'small.mp4').write_bytes(pattern(SMALL_SIZE))
+    (videos / 'subtitles.vtt').write_bytes(b'WEBVTT\n')
+    with (videos / 'large.mp4').open('wb') as f:
+        f.truncate(LARGE_SIZE)
+    return tmp_path
+
+
+@pytest.fixture
+def hashed(monkeypatch):
+    """مسیر فایل‌هایی که هش کامل محتوایشان خوانده شد؛ کش هش خالی شروع می‌شود"""
+    digests = http_cache.FileDigestCache()
+    seen = []
+    original = digests.digest
+
+    def digest(path, stat_result=None):
+        seen.append(Path(path).name)
+        return original(path, stat_result)
+
+    monkeypatch.setattr(digests, 'digest', digest)
+    monkeypatch.setattr(http_cache, 'DIGESTS', digests)
+    return seen
+
+
+class Response:
+    def __init__(self, status, headers, body):
+        self.status = status
+        self.headers = {name.lower(): value for name, value in headers}
+        self.body = body
+
+
+@pytest.fixture
+def main_server(media_dir, monkeypatch):
+    import main
+
+    monkeypatch.setattr(main, 'DIRECTORY', media_dir)
+    httpd = main.ThreadPoolHTTPServer(('127.0.0.1', 0), main.MyHTTPRequestHandler, max_workers=4)
+    thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+    thread.start()
+    port = httpd.server_address[1]
+
+    def fetch(path, headers=None, read=None):
+        conn = http.client.HTTPConnection('127.0.0.1', port, timeout=30)
+        try:
+            conn.request('GET', path, headers=headers or {})
+            response = conn.getresponse()
+            body = response.read(read) if read else response.read()
+            return Response(response.status, response.getheaders(), body)
+        finally:
+            conn.close()
+
+    yield fetch
+    httpd.shutdown()
+    httpd.server_close()
+
+
+@pytest.fixture
+def app_server(media_dir, monkeypatch):
+    import app as app_module
+
+    monkeypatch.setattr(app_module, 'BASE_DIR', media_dir)
+    client = app_module.app.test_client()
+
+    def fetch(path, headers=None, read=None):
+        response = client.get(path, headers=headers or {}, buffered=read is None)
+        if read is None:
+            body = response.get_data()
+        else:
+            body = b''
+            for chunk in response.response:
+                body += chunk
+                if len(body) >= read:
+                    break
+            body = body[:read]
+            response.close()
+        return Response(response.status_code, response.headers.items(), body)
+
+    return fetch
+
+
+@pytest.fixture(params=['main', 'app'])
+def fetch(request):
+    return request.getfixturevalue(f'{request.param}_server')
+
+
+def parse_multipart(response):
+    boundary = re.search(r'boundary=(\S+)', response.headers['content-type']).group(1)
+    parts = []
+    for chunk in response.body.split(b'--' + boundary.encode())[1:]:
+        if chunk.startswith(b'--'):
+            break
+        head, _, body = chunk.lstrip(b'\r\n').partition(b'\r\n\r\n')
+        headers = dict(line.split(': ', 1) for line in head.decode('latin-1').split('\r\n'))
+        parts.append((headers, body[:-2] if body.endswith(b'\r\n') else body))
+    return parts
+
+
+def test_single_range(fetch):
+    response = fetch('/videos/small.mp4', {'Range': 'bytes=100-199'})
+    assert response.status == 206
+    assert response.headers['content-range'] == f'bytes 100-199/{SMALL_SIZE}'
+    assert response.headers['content-length'] == '100'
+    assert response.headers['accept-ranges'] == 'bytes'
+    assert response.body == pattern(SMALL_SIZE)[100:200]
+
+
+def test_open_and_suffix_ranges(fetch):
+    data = pattern(SMALL_SIZE)
+    response = fetch('/videos/small.mp4', {'Range': f'bytes={SMALL_SIZE - 10}-'})
+    assert response.status == 206
+    assert response.body == data[-10:]
+
+    response = fetch('/videos/small.mp4', {'Range': 'bytes=-500'})
+    assert response.status == 206
+    assert response.headers['content-range'] == f'bytes {SMALL_SIZE - 500}-{SMALL_SIZE - 1}/{SMALL_SIZE}'
+    assert response.body == data[-500:]
+
+
+def test_multipart_ranges(fetch):
+    data = pattern(SMALL_SIZE)
+    response = fetch('/videos/small.mp4', {'Range': 'bytes=0-9, 1000-1099, -20'})
+    assert response.status == 206
+    assert response.headers['content-type'].startswith('multipart/byteranges; boundary=')
+    assert int(response.headers['content-length']) == len(response.body)
+    parts = parse_multipart(response)
+    assert [headers['Content-Range'] for headers, _ in parts] == [
+        f'bytes 0-9/{SMALL_SIZE}',
+        f'bytes 1000-1099/{SMALL_SIZE}',
+        f'bytes {SMALL_SIZE - 20}-{SMALL_SIZE - 1}/{SMALL_SIZE}',
+    ]
+    assert all(headers['Content-Type'] == 'video/mp4' for headers, _ in parts)
+    assert [body for _, body in parts] == [data[0:10], data[1000:1100], data[-20:]]
+
+
+def test_unsatisfiable_range(fetch):
+    response = fetch('/videos/small.mp4', {'Range': f'bytes={SMALL_SIZE}-'})
+    assert response.status == 416
+    assert response.headers['content-range'] == f'bytes */{SMALL_SIZE}'
+    assert response.body == b''
+
+
+def test_if_range(fetch):
+    etag = fetch('/videos/small.mp4').headers['etag']
+    response = fetch('/videos/small.mp4', {'Range': 'bytes=0-9', 'If-Range': etag})
+    assert response.status == 206
+    assert response.body == pattern(SMALL_SIZE)[:10]
+
+    response = fetch('/videos/small.mp4', {'Range': 'bytes=0-9', 'If-Range': '"stale"'})
+    assert response.status == 200
+    assert response.body == pattern(SMALL_SIZE)
+
+
+def test_etag_follows_in_place_replacement(fetch, media_dir):
+    path = media_dir / 'videos' / 'small.mp4'
+    before = fetch('/videos/small.mp4', {'Range': 'bytes=0-0'}).headers['etag']
+    st = path.stat()
+    os.utime(path, ns=(st.st_atime_ns, st.st_mtime_ns + 1_000_000_000))
+    after = fetch('/videos/small.mp4', {'Range': 'bytes=0-0'}).headers['etag']
+    assert before != after
+
+
+def first_seek(fetch, name, size):
+    started = time.perf_counter()
+    response = fetch(f'/videos/{name}', {'Range': f'bytes={size // 2}-'}, read=SEEK_READ_BYTES)
+    elapsed = time.perf_counter() - started
+    assert response.status == 206
+    assert response.headers['content-range'] == f'bytes {size // 2}-{size - 1}/{size}'
+    assert len(response.body) == min(SEEK_READ_BYTES, size - size // 2)
+    return elapsed
+
+
+def test_cold_first_seek_does_not_read_whole_file(fetch, hashed):
+    """اولین seek روی کش سرد (بدون هش قبلی) نباید کل فایل را بخواند"""
+    small = first_seek(fetch, 'small.mp4', SMALL_SIZE)
+    large = first_seek(fetch, 'large.mp4', LARGE_SIZE)
+    assert hashed == []
+    # هش ۵۱۲ مگابایت چند صد میلی‌ثانیه است؛ seek مستقل از حجم در همان حد فایل کوچک می‌ماند
+    assert large < max(small * 10, 0.25), (small, large)
+
+
+def test_small_text_keeps_content_etag(fetch, media_dir, hashed):
+    response = fetch('/videos/subtitles.vtt')
+    digest = http_cache.file_digest(media_dir / 'videos' / 'subtitles.vtt')
+    assert response.headers['etag'] == f'"{digest[:http_cache.ETAG_LENGTH]}"'
+    assert 'subtitles.vtt' in hashed
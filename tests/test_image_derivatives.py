@@ -0,0 +1,25 @@
+"""
+نسخه‌های responsive باید مثل convert_images_to_webp.py چرخش EXIF را اعمال کنند
+"""
+from PIL import Image
+
+import image_derivatives
+
+
+def test_exif_orientation_is_applied(tmp_path):
+    (tmp_path / 'images' / 'led').mkdir(parents=True)
+    img = Image.new('RGB', (800, 400), (255, 0, 0))
+    exif = img.getexif()
+    exif[image_derivatives.EXIF_ORIENTATION] = 6  # 90 درجه؛ عکس ایستاده گوشی
+    img.save(tmp_path / 'images' / 'led' / 'phone.jpg', exif=exif)
+
+    responsive, errors = image_derivatives.build_responsive_index(tmp_path, {'led': ['images/led/phone.jpg']})
+
+    assert errors == []
+    entry = responsive['images/led/phone.jpg']
+    assert (entry['width'], entry['height']) == (400, 800)
+    for variants in entry['sources'].values():
+        for rel_output, width, height in variants:
+            assert height > width
+            with Image.open(tmp_path / rel_output) as output:
+                assert output.size == (width, height)
@@ -0,0 +1,55 @@
+"""
+اتصال keep-alive بیکار در ThreadPoolHTTPServer نباید نخ را تا پایان KEEPALIVE_TIMEOUT نگه دارد
+"""
+import http.client
+import threading
+import time
+
+import pytest
+
+
+@pytest.fixture
+def single_worker_server(tmp_path, monkeypatch):
+    import main
+
+    (tmp_path / 'a.txt').write_text('hello\n')
+    monkeypatch.setattr(main, 'DIRECTORY', tmp_path)
+    monkeypatch.setattr(main.MyHTTPRequestHandler, 'timeout', 10)
+    httpd = main.ThreadPoolHTTPServer(('127.0.0.1', 0), main.MyHTTPRequestHandler, max_workers=1)
+    thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+    thread.start()
+    yield httpd.server_address[1]
+    httpd.shutdown()
+    httpd.server_close()
+
+
+def get(conn, path='/a.txt'):
+    conn.request('GET', path)
+    response = conn.getresponse()
+    return response.status, response.read(), response.getheader('Connection')
+
+
+def test_idle_keepalive_released_for_waiting_connection(single_worker_server):
+    idle = http.client.HTTPConnection('127.0.0.1', single_worker_server, timeout=10)
+    other = http.client.HTTPConnection('127.0.0.1', single_worker_server, timeout=10)
+    try:
+        assert get(idle)[:2] == (200, b'hello\n')
+        started = time.monotonic()
+        assert get(other)[:2] == (200, b'hello\n')
+        # بدون آزادسازی، اتصال دوم تا پایان timeout ده‌ثانیه‌ای منتظر می‌ماند
+        assert time.monotonic() - started < 2
+    finally:
+        idle.close()
+        other.close()
+
+
+def test_keepalive_reused_without_contention(single_worker_server):
+    conn = http.client.HTTPConnection('127.0.0.1', single_worker_server, timeout=10)
+    try:
+        for _ in range(3):
+            status, body, connection = get(conn)
+            assert (status, body) == (200, b'hello\n')
+            assert connection != 'close'
+        assert conn.sock is not None
+    finally:
+        conn.close()
@@ -0,0 +1,83 @@
+"""
+ManifestIndex به امضای دایرکتوری اعتماد می‌کند؛ با verify_files فایل جایگزین‌شده با همان نام هم دوباره بررسی می‌شود
+"""
+import os
+
+import pytest
+from PIL import Image
+
+import capture_dates
+import update_manifest_from_fs
+
+
+def save_image(path, taken):
+    img = Image.new('RGB', (8, 8))
+    exif = img.getexif()
+    exif[capture_dates.EXIF_DATETIME] = taken
+    img.save(path, exif=exif)
+
+
+@pytest.fixture
+def category(tmp_path, monkeypatch):
+    monkeypatch.setattr(update_manifest_from_fs, 'BASE_DIR', tmp_path)
+    monkeypatch.setattr(update_manifest_from_fs, 'IMAGES_DIR', tmp_path / 'images')
+    directory = tmp_path / 'images' / 'led'
+    directory.mkdir(parents=True)
+    save_image(directory / 'a.jpg', '2020:01:01 00:00:00')
+    save_image(directory / 'b.jpg', '2021:01:01 00:00:00')
+    return directory
+
+
+def open_index(root, verify_files=False):
+    dates = capture_dates.CaptureIndex(root, root / 'images' / '.capture-index.json')
+    return update_manifest_from_fs.ManifestIndex(root / 'images' / '.manifest-index.json', dates,
+                                                 verify_files=verify_files)
+
+
+def replace_in_place(directory):
+    st = os.stat(directory)
+    save_image(directory / 'a.jpg', '2022:01:01 00:00:00')
+    # امضای دایرکتوری عمداً ثابت می‌ماند؛ فقط stamp خود فایل عوض شده است
+    os.utime(directory, ns=(st.st_atime_ns, st.st_mtime_ns))
+
+
+def test_unchanged_category_is_not_rescanned(category, tmp_path, monkeypatch):
+    index = open_index(tmp_path)
+    assert index.gather('led') == (['images/led/b.jpg', 'images/led/a.jpg'], True)
+    index.save()
+
+    stamped = []
+    monkeypatch.setattr(update_manifest_from_fs, 'file_stamp', lambda path: stamped.append(path))
+    replace_in_place(category)
+    assert open_index(tmp_path).gather('led') == (['images/led/b.jpg', 'images/led/a.jpg'], False)
+    assert stamped == []
+
+
+def test_forced_rescan_reexamines_file_replaced_in_place(category, tmp_path):
+    # watch_assets.py دسته فایل تغییرکرده را با rescan/force دوباره اسکن می‌کند
+    index = open_index(tmp_path)
+    index.gather('led')
+    index.save()
+    replace_in_place(category)
+
+    index = open_index(tmp_path)
+    assert index.gather('led', force=True) == (['images/led/a.jpg', 'images/led/b.jpg'], True)
+
+
+def test_verify_files_reexamines_file_replaced_in_place(category, tmp_path):
+    index = open_index(tmp_path)
+    index.gather('led')
+    index.save()
+    replace_in_place(category)
+
+    index = open_index(tmp_path, verify_files=True)
+    assert index.gather('led') == (['images/led/a.jpg', 'images/led/b.jpg'], True)
+    assert index.dates.entries['images/led/a.jpg'][0] == '2022-01-01T00:00:00'
+
+
+def test_recorded_capture_time_survives_matching_stamp(category, tmp_path):
+    dates = capture_dates.CaptureIndex(tmp_path, tmp_path / 'images' / '.capture-index.json')
+    # مثل convert_images_to_webp.py: زمان EXIF منبع برای فایلی ثبت می‌شود که خودش EXIF ندارد
+    dates.record('images/led/a.jpg', '2019-05-05T10:00:00')
+    stamp = capture_dates.file_stamp(category / 'a.jpg')
+    assert dates.lookup('images/led/a.jpg', stamp)[:3] == ['2019-05-05T10:00:00', 0, 'exif']
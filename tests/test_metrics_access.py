@@ -0,0 +1,77 @@
+"""
+‎/metrics و ‎/api/asset-cache فقط برای scrape مستقیم از loopback یا با METRICS_TOKEN در دسترس‌اند
+"""
+import http.client
+import threading
+
+import pytest
+
+import server_metrics
+
+PROTECTED = ['/metrics', '/api/asset-cache']
+TOKEN = 's3cret-token'
+
+
+@pytest.fixture
+def app_client():
+    import app
+
+    return app.app.test_client()
+
+
+def app_get(client, path, remote='127.0.0.1', headers=None):
+    return client.get(path, headers=headers or {}, environ_base={'REMOTE_ADDR': remote}).status_code
+
+
+@pytest.mark.parametrize('path', PROTECTED)
+def test_app_loopback_allowed(app_client, path):
+    assert app_get(app_client, path) == 200
+
+
+@pytest.mark.parametrize('path', PROTECTED)
+def test_app_public_or_proxied_hidden(app_client, path):
+    assert app_get(app_client, path, remote='203.0.113.5') == 404
+    # پشت reverse proxy محلی، آدرس loopback متعلق به proxy است نه کلاینت
+    assert app_get(app_client, path, headers={'X-Forwarded-For': '203.0.113.5'}) == 404
+
+
+@pytest.mark.parametrize('path', PROTECTED)
+def test_app_token(app_client, path, monkeypatch):
+    monkeypatch.setattr(server_metrics, 'METRICS_TOKEN', TOKEN)
+    proxied = {'X-Forwarded-For': '203.0.113.5'}
+    assert app_get(app_client, path, remote='203.0.113.5',
+                   headers={'Authorization': f'Bearer {TOKEN}'}) == 200
+    assert app_get(app_client, path, remote='203.0.113.5',
+                   headers={**proxied, 'Authorization': 'Bearer wrong'}) == 404
+
+
+@pytest.fixture
+def main_port(tmp_path, monkeypatch):
+    import main
+
+    monkeypatch.setattr(main, 'DIRECTORY', tmp_path)
+    httpd = main.ThreadPoolHTTPServer(('127.0.0.1', 0), main.MyHTTPRequestHandler, max_workers=2)
+    threading.Thread(target=httpd.serve_forever, daemon=True).start()
+    yield httpd.server_address[1]
+    httpd.shutdown()
+    httpd.server_close()
+
+
+def main_get(port, path, headers=None):
+    conn = http.client.HTTPConnection('127.0.0.1', port, timeout=10)
+    try:
+        conn.request('GET', path, headers=headers or {})
+        response = conn.getresponse()
+        response.read()
+        return response.status
+    finally:
+        conn.close()
+
+
+@pytest.mark.parametrize('path', PROTECTED)
+def test_main_access(main_port, path, monkeypatch):
+    proxied = {'X-Forwarded-For': '203.0.113.5'}
+    assert main_get(main_port, path) == 200
+    assert main_get(main_port, path, proxied) == 404
+    monkeypatch.setattr(server_metrics, 'METRICS_TOKEN', TOKEN)
+    assert main_get(main_port, path, {**proxied, 'Authorization': f'Bearer {TOKEN}'}) == 200
@@ -0,0 +1,344 @@
+"""
+Parallel batch video transcoding
+همه ویدیوهای videos/ و images/errorr-products/ را با یک استخر محدود از کارها encode می‌کند.
+
+- تعداد کارهای هم‌زمان بر اساس تعداد هسته‌ها تعیین می‌شود و نخ‌های ffmpeg بین کارها تقسیم می‌شوند
+- خروجی ‎-progress ffmpeg خوانده می‌شود و درصد، سرعت و زمان باقی‌مانده هر کار چاپ می‌شود
+- کاری که خروجی‌اش از همین محتوای منبع و همین تنظیمات ساخته شده باشد رد می‌شود
+  (کش در ‎.transcode-cache.json)
+- پروفایل encode (encoding_profiles.PROFILES) برای هر کار قابل انتخاب است
+
+Usage:
+    python transcode_queue.py
+    python transcode_queue.py --profile mobile --job-profile "videos/3d-preview*=hero"
+    python transcode_queue.py --jobs 2 --preset medium --dry-run
+"""
+import argparse
+import collections
+import fnmatch
+import hashlib
+import json
+import os
+import subprocess
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from pathlib import Path
+
+from encoding_profiles import encoder_settings, profile_names, resolve_profile
+from video_encoding import CREATION_FLAGS, build_x264_command, probe_video
+
+BASE_DIR = Path(__file__).resolve().parent
+SOURCE_DIRS = [BASE_DIR / "videos", BASE_DIR / "images" / "errorr-products"]
+VIDEO_EXTENSIONS = {'.mp4', '.avi', '.mov', '.mkv', '.webm'}
+OUTPUT_SUFFIX = "_optimized"
+CACHE_PATH = BASE_DIR / ".transcode-cache.json"
+CACHE_VERSION = 1
+
+# حداقل نخ برای هر کار؛ x264 با کمتر از این مقدار از موازی‌سازی داخلی خودش سود کمی می‌برد
+MIN_THREADS_PER_JOB = 4
+# فاصله چاپ پیشرفت هر کار (ثانیه)
+PROGRESS_INTERVAL = 2.0
+
+
+def _sha256(path):
+    hasher = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b''):
+            hasher.update(chunk)
+    return hasher.hexdigest()
+
+
+class TranscodeCache:
+    """
+    sources: rel -> [size, mtime_ns, sha256]   (هش فقط وقتی فایل تغییر کند دوباره محاسبه می‌شود)
+    outputs: rel خروجی -> {"source": sha256, "settings": ..., "size", "mtime_ns"}
+    """
+
+    def __init__(self, path=CACHE_PATH):
+        self.path = path
+        self.sources = {}
+        self.outputs = {}
+        self._lock = threading.Lock()
+        if path.exists():
+            try:
+                data = json.loads(path.read_text(encoding='utf-8'))
+            except (OSError, ValueError):
+                data = {}
+            if data.get('version') == CACHE_VERSION:
+                self.sources = data.get('sources', {})
+                self.outputs = data.get('outputs', {})
+
+    def source_hash(self, rel):
+        st = (BASE_DIR / rel).stat()
+        with self._lock:
+            cached = self.sources.get(rel)
+        if cached and cached[0] == st.st_size and cached[1] == st.st_mtime_ns:
+            return cached[2]
+        digest = _sha256(BASE_DIR / rel)
+        with self._lock:
+            self.sources[rel] = [st.st_size, st.st_mtime_ns, digest]
+        return digest
+
+    def is_current(self, job):
+        entry = self.outputs.get(job.output_rel)
+        output = BASE_DIR / job.output_rel
+        if not entry or not output.exists():
+            return False
+        st = output.stat()
+        return (entry.get('source') == job.source_hash and entry.get('settings') == job.settings_key
+                and entry.get('size') == st.st_size and entry.get('mtime_ns') == st.st_mtime_ns)
+
+    def record(self, job):
+        st = (BASE_DIR / job.output_rel).stat()
+        with self._lock:
+            self.outputs[job.output_rel] = {
+                'source': job.source_hash,
+                'settings': job.settings_key,
+                'size': st.st_size,
+                'mtime_ns': st.st_mtime_ns,
+            }
+
+    def save(self):
+        with self._lock:
+            data = {'version': CACHE_VERSION, 'sources': self.sources, 'outputs': self.outputs}
+        tmp = self.path.with_name(self.path.name + '.tmp')
+        tmp.write_text(json.dumps(data, ensure_ascii=False, indent=1, sort_keys=True), encoding='utf-8')
+        os.replace(tmp, self.path)
+
+
+class Job:
+    def __init__(self, source_rel, profile_name, settings):
+        self.source_rel = source_rel
+        source = Path(source_rel)
+        self.output_rel = source.with_name(f"{source.stem}{OUTPUT_SUFFIX}.mp4").as_posix()
+        self.profile_name = profile_name
+        self.settings = settings
+        self.settings_key = json.dumps(settings, sort_keys=True)
+        self.source_hash = None
+        self.threads = 1
+
+    @property
+    def name(self):
+        return Path(self.source_rel).name
+
+
+def discover_videos():
+    found = []
+    for directory in SOURCE_DIRS:
+        if not directory.exists():
+            continue
+        for path in sorted(directory.rglob('*')):
+            rel = path.relative_to(BASE_DIR)
+            # خروجی‌های قبلی، فایل‌های نیمه‌کاره، بسته‌های HLS و کلیپ‌های پیش‌نمایش منبع نیستند
+            if {'hls', 'previews'} & set(rel.parts[1:-1]) or '.part' in path.suffixes:
+                continue
+            if (path.is_file() and path.suffix.lower() in VIDEO_EXTENSIONS
+                    and not path.stem.endswith(OUTPUT_SUFFIX)):
+                found.append(rel.as_posix())
+    return found
+
+
+def profile_for(rel, default_profile, overrides):
+    """آخرین الگوی --job-profile که با مسیر جور باشد برنده است"""
+    chosen = default_profile
+    for pattern, profile in overrides:
+        if fnmatch.fnmatch(rel, pattern) or fnmatch.fnmatch(Path(rel).name, pattern):
+            chosen = profile
+    return chosen
+
+
+def plan_jobs(sources, default_profile, overrides, preset=None):
+    jobs = []
+    for rel in sources:
+        profile_name = resolve_profile(profile_for(rel, default_profile, overrides))
+        settings = encoder_settings(profile_name, preset=preset)
+        jobs.append(Job(rel, profile_name, settings))
+    return jobs
+
+
+def split_threads(job_count, cores, max_jobs=None):
+    """(تعداد کارهای هم‌زمان، نخ برای هر کار)"""
+    cores = max(1, cores)
+    workers = max_jobs or max(1, cores // MIN_THREADS_PER_JOB)
+    workers = max(1, min(workers, job_count, cores))
+    return workers, max(1, cores // workers)
+
+
+def format_eta(seconds):
+    if seconds is None:
+        return '--:--'
+    seconds = int(seconds)
+    hours, rest = divmod(seconds, 3600)
+    minutes, seconds = divmod(rest, 60)
+    return f"{hours}:{minutes:02d}:{seconds:02d}" if hours else f"{minutes:02d}:{seconds:02d}"
+
+
+class ProgressReporter:
+    """چاپ هم‌زمان پیشرفت چند کار بدون درهم‌ریختن خطوط"""
+
+    def __init__(self, total_jobs):
+        self.total_jobs = total_jobs
+        self._lock = threading.Lock()
+
+    def line(self, index, job, text):
+        with self._lock:
+            print(f"[{index}/{self.total_jobs}] {job.name}: {text}", flush=True)
+
+
+def parse_progress(stream, duration, on_update):
+    """
+    بلوک‌های key=value خروجی ‎-progress pipe:1؛ هر بلوک با progress=continue|end تمام می‌شود
+    on_update(fraction, speed, eta_seconds, finished)
+    """
+    values = {}
+    for raw in stream:
+        key, _, value = raw.strip().partition('=')
+        if not key:
+            continue
+        values[key] = value
+        if key != 'progress':
+            continue
+        out_time_us = values.get('out_time_us') or values.get('out_time_ms')
+        try:
+            position = max(0, int(out_time_us)) / 1_000_000 if out_time_us not in (None, 'N/A') else 0.0
+        except ValueError:
+            position = 0.0
+        try:
+            speed = float(values.get('speed', '0').rstrip('x') or 0)
+        except ValueError:
+            speed = 0.0
+        fraction = min(1.0, position / duration) if duration else None
+        eta = (duration - position) / speed if duration and speed > 0 else None
+        on_update(fraction, speed, eta, value == 'end')
+        values = {}
+
+
+def run_job(index, job, reporter, ffmpeg_path='ffmpeg'):
+    source = BASE_DIR / job.source_rel
+    output = BASE_DIR / job.output_rel
+    partial = output.with_name(output.stem + '.part.mp4')
+    info = probe_video(str(source))
+    duration = info['duration'] if info else 0.0
+
+    settings = dict(job.settings)
+    extra_args = list(settings.pop('extra_args', []))
+    extra_args += ['-threads', str(job.threads), '-progress', 'pipe:1', '-nostats']
+    cmd = build_x264_command(str(source), str(partial), extra_args=extra_args,
+                             ffmpeg_path=ffmpeg_path, **settings)
+    # گزینه سراسری پیش از -i؛ ffmpeg هم‌زمان با بقیه کارها نباید ترمینال را بخواند
+    cmd.insert(1, '-nostdin')
+
+    started = time.monotonic()
+    last_report = [0.0]
+
+    def on_update(fraction, speed, eta, finished):
+        now = time.monotonic()
+        if finished or now - last_report[0] >= PROGRESS_INTERVAL:
+            last_report[0] = now
+            percent = f"{fraction * 100:5.1f}%" if fraction is not None else "  ?  "
+            reporter.line(index, job, f"{percent}  speed {speed:.2f}x  ETA {format_eta(eta)}")
+
+    reporter.line(index, job, f"start ({job.profile_name}, preset {job.settings['preset']}, "
+                              f"{job.threads} threads)")
+    proc = subprocess.Popen(cmd, stdin=subprocess.DEVNULL, stdout=subprocess.PIPE, stderr=subprocess.PIPE,
+                            text=True, creationflags=CREATION_FLAGS)
+    # stderr جدا خوانده می‌شود تا پر شدن pipe آن ffmpeg را متوقف نکند
+    stderr_tail = collections.deque(maxlen=20)
+    drain = threading.Thread(target=lambda: stderr_tail.extend(proc.stderr), daemon=True)
+    drain.start()
+    parse_progress(proc.stdout, duration, on_update)
+    returncode = proc.wait()
+    drain.join()
+
+    if returncode != 0 or not partial.exists():
+        if partial.exists():
+            partial.unlink()
+        raise RuntimeError(''.join(stderr_tail)[-300:] or f"ffmpeg exited with {returncode}")
+    os.replace(partial, output)
+
+    elapsed = time.monotonic() - started
+    original_size = source.stat().st_size / (1024 * 1024)
+    new_size = output.stat().st_size / (1024 * 1024)
+    reduction = ((original_size - new_size) / original_size) * 100 if original_size else 0.0
+    reporter.line(index, job, f"done in {format_eta(elapsed)}: {original_size:.2f} MB -> "
+                              f"{new_size:.2f} MB ({reduction:.1f}% smaller)")
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Transcode every site video in parallel")
+    parser.add_argument('--profile', choices=profile_names(), default='preview',
+                        help="default quality profile (default: %(default)s)")
+    parser.add_argument('--job-profile', action='append', default=[], metavar='PATTERN=PROFILE',
+                        help="profile for videos matching a glob, e.g. 'videos/3d-*=hero'")
+    parser.add_argument('--preset', help="override the x264 preset of every profile")
+    parser.add_argument('--jobs', type=int, help="concurrent ffmpeg processes (default: cores / 4)")
+    parser.add_argument('--force', action='store_true', help="re-encode even if outputs are up to date")
+    parser.add_argument('--dry-run', action='store_true', help="only print the plan")
+    args = parser.parse_args(argv)
+
+    overrides = []
+    for item in args.job_profile:
+        pattern, sep, profile = item.rpartition('=')
+        if not sep or profile not in profile_names():
+            parser.error(f"--job-profile expects PATTERN=PROFILE with PROFILE in {profile_names()}")
+        overrides.append((pattern, profile))
+    args.overrides = overrides
+    return args
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    sources = discover_videos()
+    if not sources:
+        print("No video files found in 'videos' or 'images/errorr-products'!")
+        return
+
+    cache = TranscodeCache()
+    jobs = plan_jobs(sources, args.profile, args.overrides, args.preset)
+    pending = []
+    for job in jobs:
+        job.source_hash = cache.source_hash(job.source_rel)
+        if not args.force and cache.is_current(job):
+            print(f"up to date: {job.output_rel}")
+            continue
+        pending.append(job)
+    cache.save()
+
+    if not pending:
+        print("All outputs are up to date.")
+        return
+
+    workers, threads = split_threads(len(pending), os.cpu_count() or 1, args.jobs)
+    for job in pending:
+        job.threads = threads
+    print(f"{len(pending)} job(s), {workers} at a time, {threads} ffmpeg threads each")
+    if args.dry_run:
+        for job in pending:
+            print(f"  {job.source_rel} -> {job.output_rel} ({job.profile_name}, preset {job.settings['preset']})")
+        return
+
+    reporter = ProgressReporter(len(pending))
+    failed = 0
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        futures = {executor.submit(run_job, index, job, reporter): job
+                   for index, job in enumerate(pending, start=1)}
+        for future in as_completed(futures):
+            job = futures[future]
+            try:
+                future.result()
+            except (RuntimeError, OSError) as exc:
+                failed += 1
+                print(f"Error: {job.source_rel}: {exc}")
+                continue
+            cache.record(job)
+            cache.save()
+
+    print(f"\n{len(pending) - failed} of {len(pending)} video(s) transcoded.")
+    if failed:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -5,9 +5,16 @@
 و لیست آن‌ها را در فایل errorr-media.json ذخیره می‌کند
 """
 
+import argparse
 import json
 from pathlib import Path
 
+from dedup_assets import DEDUP_MODES, Deduplicator
+from fingerprint_assets import keep_fingerprints
+from media_metadata import MediaIndex
+from update_manifest_from_fs import write_if_changed
+from video_previews import load_previews
+
 BASE_DIR = Path(__file__).parent
 ERRORR_DIR = BASE_DIR / "images" / "errorr-products"
 VIDEOS_DIR = BASE_DIR / "videos"
@@ -47,7 +54,45 @@ def gather_errorr_media() -> list[str]:
                         relative_path = str(file_path.relative_to(BASE_DIR)).replace("\\", "/")
                         media_files.append(relative_path)
     
-    return media_files
+    return prefer_optimized(media_files)
+
+def prefer_optimized(media_files: list[str]) -> list[str]:
+    """
+    اگر نسخه بهینه‌شده یک ویدیو (name_optimized.mp4 ساخته‌شده توسط transcode_queue.py) وجود دارد،
+    فقط همان در لیست می‌آید
+    """
+    present = set(media_files)
+    result = []
+    for rel in media_files:
+        path = Path(rel)
+        if path.suffix.lower() in VIDEO_EXTENSIONS:
+            optimized = path.with_name(f"{path.stem}_optimized.mp4").as_posix()
+            if optimized != rel and optimized in present:
+                continue
+        result.append(rel)
+    return result
+
+def write_errorr_manifest(media_files: list[str], output_file: Path = OUTPUT_FILE) -> bool:
+    """
+    ذخیره لیست در errorr-media.json (اتمیک و فقط در صورت تغییر)
+    metadata هر فایل در کلید media و poster و کلیپ پیش‌نمایش ویدیوها (خروجی video_previews.py)
+    در کلید previews کنار همان مسیر می‌آید
+    خروجی: آیا فایل نوشته شد
+    """
+    available = load_previews()
+    previews = {rel: available[rel] for rel in media_files if rel in available}
+    # نوع، ابعاد، حجم، مدت، هش و placeholder هر فایل در یک اسکن (کش در images/.media-index.json)
+    index = MediaIndex()
+    media = index.describe_all(media_files, {rel: entry["poster"] for rel, entry in previews.items()})
+    index.save()
+    output_data = {
+        "files": media_files,
+        "media": media,
+    }
+    if previews:
+        output_data["previews"] = previews
+    content = keep_fingerprints(output_file, json.dumps(output_data, ensure_ascii=False, indent=2))
+    return write_if_changed(output_file, content)
 
 def main():
     import sys
@@ -58,9 +103,17 @@ def main():
         sys.stdout = io.TextIOWrapper(sys.stdout.buffer, encoding='utf-8')
         sys.stderr = io.TextIOWrapper(sys.stderr.buffer, encoding='utf-8')
     
+    parser = argparse.ArgumentParser(description="Rebuild errorr-media.json")
+    parser.add_argument("--dedup", choices=DEDUP_MODES, default="url",
+                        help="map duplicate files to one canonical URL (default: %(default)s)")
+    args = parser.parse_args()
+
     print("در حال اسکن فولدر errorr-products...")
     
-    media_files = gather_errorr_media()
+    # فایل‌های با محتوای یکسان به یک URL مرجع نگاشت می‌شوند
+    dedup = Deduplicator(args.dedup)
+    media_files = dedup.map_paths(gather_errorr_media())
+    dedup.save()
     
     if not media_files:
         print("⚠️  هیچ فایل عکس یا ویدیویی پیدا نشد!")
@@ -71,14 +124,12 @@ def main():
             print(f"  - {file}")
     
     # ذخیره در فایل JSON
-    output_data = {
-        "files": media_files
-    }
-    
-    with open(OUTPUT_FILE, 'w', encoding='utf-8') as f:
-        json.dump(output_data, f, ensure_ascii=False, indent=2)
-    
-    print(f"\n✓ لیست فایل‌ها در {OUTPUT_FILE} ذخیره شد.")
+    if write_errorr_manifest(media_files):
+        print(f"\n✓ لیست فایل‌ها در {OUTPUT_FILE} ذخیره شد.")
+    else:
+        print(f"\n✓ {OUTPUT_FILE} تغییری نکرد.")
+    if args.dedup != "off":
+        print(dedup.report())
 
 if __name__ == "__main__":
     main()
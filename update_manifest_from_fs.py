@@ -1,9 +1,17 @@
+import argparse
 import json
+import os
 from pathlib import Path
 
+from capture_dates import CaptureIndex, file_stamp
+from dedup_assets import DEDUP_MODES, Deduplicator
+from fingerprint_assets import keep_fingerprints, strip_fingerprints
+
 
 BASE_DIR = Path(__file__).resolve().parent
 IMAGES_DIR = BASE_DIR / "images"
+INDEX_PATH = IMAGES_DIR / ".manifest-index.json"
+INDEX_VERSION = 3
 
 CATEGORIES = [
     "exhibition",
@@ -21,34 +29,189 @@ CATEGORIES = [
 ]
 
 IMAGE_EXTENSIONS = {".jpg", ".jpeg", ".png", ".webp", ".gif", ".bmp"}
+# منبع‌هایی که convert_images_to_webp.py نگه می‌دارد؛ اگر WebP هم‌نامشان باشد فقط WebP در مانیفست می‌آید
+CONVERTED_SOURCE_EXTENSIONS = {".jpg", ".jpeg", ".png"}
+
+# کلید نسخه‌های responsive که image_derivatives.py می‌نویسد
+RESPONSIVE_KEY = "_responsive"
 
 
-def gather_images_for_category(category: str) -> list[str]:
+def category_files(category: str) -> dict[str, list]:
+    """مسیر نسبی تصاویر دسته -> [mtime_ns، size]"""
     category_path = IMAGES_DIR / category
     if not category_path.exists():
-        return []
-
-    image_paths = [
-        path for path in category_path.iterdir()
-        if path.is_file() and path.suffix.lower() in IMAGE_EXTENSIONS
-    ]
+        return {}
+
+    # scandir: نوع فایل از d_type خوانده می‌شود؛ stat فقط برای تصاویر لازم است
+    prefix = category_path.relative_to(BASE_DIR).as_posix()
+    entries = {}
+    with os.scandir(category_path) as it:
+        for entry in it:
+            if entry.is_file() and os.path.splitext(entry.name)[1].lower() in IMAGE_EXTENSIONS:
+                st = entry.stat()
+                entries[entry.name] = [st.st_mtime_ns, st.st_size]
+    converted = {os.path.splitext(name)[0] for name in entries if name.endswith(".webp")}
+    return {
+        f"{prefix}/{name}": stamp for name, stamp in entries.items()
+        if not (os.path.splitext(name)[1].lower() in CONVERTED_SOURCE_EXTENSIONS
+                and os.path.splitext(name)[0] in converted)
+    }
+
+
+def gather_images_for_category(category: str, dates: CaptureIndex | None = None,
+                               files: dict[str, list] | None = None) -> list[str]:
+    """
+    تصاویر دسته، جدیدترین عکس اول
+    ترتیب از زمان عکاسی ایندکس capture_dates.py می‌آید، نه st_mtime؛ فقط فایل‌های جدید یا
+    جایگزین‌شده (mtime/size متفاوت) باز می‌شوند و بقیه از ایندکس خوانده می‌شوند
+    """
+    files = files if files is not None else category_files(category)
+    dates = dates if dates is not None else CaptureIndex()
+
+    images = list(files)
+    dates.prune((IMAGES_DIR / category).relative_to(BASE_DIR).as_posix() + "/", images)
+    images.sort(key=lambda rel: dates.sort_key(rel, files[rel]), reverse=True)
+    return images
+
+
+def directory_signature(path: Path) -> list | None:
+    """(inode, mtime_ns) دایرکتوری؛ با افزودن، حذف یا تغییر نام فایل عوض می‌شود"""
+    try:
+        st = path.stat()
+    except FileNotFoundError:
+        return None
+    return [st.st_ino, st.st_mtime_ns]
+
+
+class ManifestIndex:
+    """
+    ایندکس هر دسته در images/.manifest-index.json
+    دسته‌ای که امضای دایرکتوری‌اش تغییر نکرده دوباره اسکن نمی‌شود و هیچ فایلی در آن stat نمی‌شود.
+    امضای دایرکتوری فقط افزودن، حذف و تغییر نام را می‌بیند؛ verify_files (‎--verify-files) جایگزینی
+    درجای یک فایل را هم با (mtime_ns، size) ثبت‌شده هر فایل تشخیص می‌دهد
+    """
+
+    def __init__(self, path: Path = INDEX_PATH, dates: CaptureIndex | None = None,
+                 verify_files: bool = False) -> None:
+        self.path = path
+        self.verify_files = verify_files
+        self.dates = dates if dates is not None else CaptureIndex()
+        self.data = {"version": INDEX_VERSION, "dedup": None, "categories": {}}
+        if path.exists():
+            try:
+                data = json.loads(path.read_text(encoding="utf-8"))
+            except (OSError, ValueError):
+                data = {}
+            if data.get("version") == INDEX_VERSION:
+                self.data = data
+
+    def gather(self, category: str, force: bool = False) -> tuple[list[str], bool]:
+        """خروجی: (مسیرها، آیا دایرکتوری دوباره اسکن شد)"""
+        # امضا قبل از اسکن گرفته می‌شود تا فایلی که وسط اسکن اضافه شود در اجرای بعد دیده شود
+        signature = directory_signature(IMAGES_DIR / category)
+        cached = self.data["categories"].get(category)
+        if not force and cached and cached["signature"] == signature and (
+            not self.verify_files
+            or all(file_stamp(BASE_DIR / rel) == stamp for rel, stamp in cached["files"].items())
+        ):
+            return cached["images"], False
+        files = category_files(category)
+        images = gather_images_for_category(category, self.dates, files)
+        self.data["categories"][category] = {"signature": signature, "images": images, "files": files}
+        return images, True
+
+    def save(self) -> None:
+        self.dates.save()
+        write_if_changed(self.path, json.dumps(self.data, ensure_ascii=False, sort_keys=True))
+
+
+def write_if_changed(path: Path, content: str) -> bool:
+    """نوشتن اتمیک (فایل موقت + os.replace) و فقط وقتی محتوا واقعاً تغییر کرده باشد"""
+    try:
+        if path.read_text(encoding="utf-8") == content:
+            return False
+    except (FileNotFoundError, UnicodeDecodeError):
+        pass
+    tmp = path.with_name(f".{path.name}.tmp")
+    tmp.write_text(content, encoding="utf-8")
+    os.replace(tmp, path)
+    return True
+
+
+def carry_over_responsive(manifest: dict, manifest_path: Path) -> None:
+    """نسخه‌های responsive (image_derivatives.py) تصاویری که هنوز در مانیفست هستند حفظ می‌شوند"""
+    if not manifest_path.exists():
+        return
+    try:
+        # کلیدهای مانیفست هش‌دار با مسیرهای تازه اسکن‌شده مقایسه می‌شوند
+        previous = json.loads(strip_fingerprints(manifest_path.read_text(encoding="utf-8")))
+    except ValueError:
+        return
+    responsive = previous.get(RESPONSIVE_KEY)
+    if not isinstance(responsive, dict):
+        return
+    listed = {path for images in manifest.values() for path in images}
+    manifest[RESPONSIVE_KEY] = {
+        path: entry for path, entry in responsive.items() if path in listed
+    }
+
+
+def build_manifest(index: ManifestIndex, dedup_mode: str = "url", force: bool = False,
+                   dedup: Deduplicator | None = None, verbose: bool = True,
+                   rescan: set[str] | None = None) -> bool:
+    """
+    gallery-data.json را به‌روز می‌کند؛ خروجی: آیا فایل نوشته شد
+    اگر هیچ دسته‌ای تغییر نکرده باشد، نه dedup اجرا می‌شود و نه فایل نوشته می‌شود.
+    watch_assets.py یک Deduplicator زنده پاس می‌دهد که خودش به‌روز نگه داشته می‌شود.
+    """
+    manifest_path = BASE_DIR / "gallery-data.json"
+    raw = {}
+    changed = []
+    for category in CATEGORIES:
+        raw[category], rescanned = index.gather(category, force=force or category in (rescan or ()))
+        if rescanned:
+            changed.append(category)
+
+    if dedup is None:
+        if not changed and index.data.get("dedup") == dedup_mode and manifest_path.exists():
+            if verbose:
+                print("gallery-data.json is up to date.")
+            return False
+        dedup = Deduplicator(dedup_mode)
+    else:
+        dedup_mode = dedup.mode
+        dedup.reset_counters()
+    manifest = {}
+    for category in CATEGORIES:
+        manifest[category] = dedup.map_paths(raw[category])
+    dedup.save()
 
-    image_paths.sort(
-        key=lambda p: (p.stat().st_mtime, p.name.lower()),
-        reverse=True
-    )
+    carry_over_responsive(manifest, manifest_path)
+    manifest_json = keep_fingerprints(manifest_path, json.dumps(manifest, ensure_ascii=False, indent=4))
+    written = write_if_changed(manifest_path, manifest_json)
+    index.data["dedup"] = dedup_mode
+    index.save()
 
-    return [str(path.relative_to(BASE_DIR)).replace("\\", "/") for path in image_paths]
+    if not verbose:
+        return written
+    print(f"Rescanned {len(changed)} of {len(CATEGORIES)} categories"
+          + (f" ({', '.join(changed)})" if changed else "") + ".")
+    print("gallery-data.json " + ("updated." if written else "unchanged."))
+    if dedup_mode != "off":
+        print(dedup.report())
+    return written
 
 
 def main():
-    manifest = {}
-    for category in CATEGORIES:
-        manifest[category] = gather_images_for_category(category)
-
-    manifest_path = BASE_DIR / "gallery-data.json"
-    manifest_json = json.dumps(manifest, ensure_ascii=False, indent=4)
-    manifest_path.write_text(manifest_json, encoding="utf-8")
+    parser = argparse.ArgumentParser(description="Rebuild gallery-data.json from the images tree")
+    parser.add_argument("--dedup", choices=DEDUP_MODES, default="url",
+                        help="map duplicate files to one canonical URL (default: %(default)s)")
+    parser.add_argument("--force", action="store_true", help="rescan every category directory")
+    parser.add_argument("--verify-files", action="store_true",
+                        help="stat every file of unchanged categories to catch files replaced in place")
+    args = parser.parse_args()
+
+    build_manifest(ManifestIndex(verify_files=args.verify_files), args.dedup, force=args.force)
 
 
 if __name__ == "__main__":
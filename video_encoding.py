@@ -0,0 +1,79 @@
+"""
+Shared ffmpeg command builders for the video scripts
+ساخت دستورهای ffmpeg مشترک بین encoding_profiles.py و package_hls.py
+(مقادیر پروفایل‌ها در encoding_profiles.PROFILES تعریف شده‌اند)
+"""
+import json
+import subprocess
+import sys
+
+# روی ویندوز پنجره کنسول جدا برای ffmpeg باز نشود
+CREATION_FLAGS = subprocess.CREATE_NO_WINDOW if sys.platform == 'win32' else 0
+
+
+def x264_args(crf='23', preset='slow', scale='1920:-2', audio_bitrate='128k'):
+    """
+    Encoder arguments shared by every H.264 output (MP4 and HLS renditions)
+    scale: ffmpeg scale filter value, e.g. '1920:-2' (limit width) or '-2:720' (fixed height)
+    """
+    return [
+        '-c:v', 'libx264',            # H.264 codec
+        '-crf', str(crf),             # Quality (18-28, lower = better)
+        '-preset', preset,            # Slower encoding = better compression
+        '-vf', f'scale={scale}',      # Resize, keep aspect ratio (even dimension)
+        '-c:a', 'aac',                # Audio codec
+        '-b:a', audio_bitrate,        # Audio bitrate
+        '-pix_fmt', 'yuv420p',        # Compatibility with all browsers
+    ]
+
+
+def build_x264_command(input_file, output_file, crf='23', preset='slow', scale='1920:-2',
+                       audio_bitrate='128k', extra_args=(), ffmpeg_path='ffmpeg'):
+    """ffmpeg command for a web-ready (faststart) H.264 MP4"""
+    return ([ffmpeg_path, '-i', input_file]
+            + x264_args(crf, preset, scale, audio_bitrate)
+            + list(extra_args)
+            + ['-movflags', '+faststart',  # Enable web optimization
+               '-y',                       # Overwrite output
+               output_file])
+
+
+def probe_video(input_file, ffprobe_path='ffprobe'):
+    """
+    Width, height, duration (s), frame rate and audio presence via ffprobe
+    Returns None if ffprobe is missing or the file is not a video
+    """
+    cmd = [ffprobe_path, '-v', 'error', '-print_format', 'json',
+           '-show_format', '-show_streams', input_file]
+    try:
+        result = subprocess.run(cmd, capture_output=True, text=True, creationflags=CREATION_FLAGS)
+    except FileNotFoundError:
+        return None
+    if result.returncode != 0:
+        return None
+    info = json.loads(result.stdout or '{}')
+    streams = info.get('streams', [])
+    video = next((s for s in streams if s.get('codec_type') == 'video'), None)
+    if video is None:
+        return None
+
+    width, height = int(video.get('width', 0)), int(video.get('height', 0))
+    # ویدیوی موبایل معمولاً افقی ذخیره و با متادیتای چرخش عمودی نمایش داده می‌شود
+    rotation = int(video.get('tags', {}).get('rotate', 0) or 0)
+    for side_data in video.get('side_data_list', []):
+        rotation = int(side_data.get('rotation', rotation) or 0)
+    if rotation % 180:
+        width, height = height, width
+
+    fps = 0.0
+    num, _, den = (video.get('avg_frame_rate') or '0/1').partition('/')
+    if den and float(den):
+        fps = float(num) / float(den)
+    duration = float(info.get('format', {}).get('duration') or video.get('duration') or 0)
+    return {
+        'width': width,
+        'height': height,
+        'duration': duration,
+        'fps': fps,
+        'has_audio': any(s.get('codec_type') == 'audio' for s in streams),
+    }
@@ -0,0 +1,233 @@
+"""
+Poster frames and looping preview clips for the ERRORR videos
+برای هر ویدیوی errorr-media.json یک تصویر poster (WebP) و یک کلیپ کوتاه بی‌صدا و کم‌حجم
+برای پخش حلقه‌ای می‌سازد تا گالری به‌جای بارگذاری کل ویدیو فقط poster را نشان دهد و
+ویدیو تنها با تعامل کاربر (hover یا کلیک) بارگذاری شود.
+
+videos/IMG_4076_1_1.mp4 ->
+    videos/previews/IMG_4076_1_1-<hash>.webp     (poster)
+    videos/previews/IMG_4076_1_1-<hash>.mp4      (کلیپ ۳ ثانیه‌ای)
+    videos/previews/index.json                   (منبع -> sha256 و مسیر خروجی‌ها)
+
+<hash> ده کاراکتر اول sha256 ویدیوی منبع است؛ خروجی‌ها هرگز تغییر نمی‌کنند و سرورها آن‌ها را
+immutable کش می‌کنند. update_errorr_media.py مسیرها را در کلید previews منیفست می‌نویسد.
+
+Usage:
+    python video_previews.py                        # ویدیوهای errorr-media.json
+    python video_previews.py videos/3d-preview_1.mp4 --force
+"""
+import argparse
+import io
+import json
+import os
+import shutil
+import subprocess
+import sys
+from pathlib import Path
+
+from fingerprint_assets import strip_fingerprints
+from http_cache import file_digest
+from video_encoding import CREATION_FLAGS, probe_video
+
+BASE_DIR = Path(__file__).resolve().parent
+PREVIEWS_DIR = BASE_DIR / "videos" / "previews"
+INDEX_PATH = PREVIEWS_DIR / "index.json"
+VIDEO_EXTENSIONS = {'.mp4', '.webm', '.ogg', '.mov', '.avi'}
+HASH_LENGTH = 10
+
+# poster: فیلتر thumbnail از میان این تعداد فریم، فریمی را که به میانگین نزدیک‌تر است انتخاب می‌کند
+POSTER_CANDIDATES = 60
+POSTER_WIDTH = 960
+POSTER_QUALITY = 80
+
+# کلیپ پیش‌نمایش: کوتاه، بی‌صدا، کم‌نرخ فریم و کوچک
+CLIP_SECONDS = 3.0
+CLIP_WIDTH = 480
+CLIP_FPS = 15
+CLIP_CRF = 32
+
+
+def clip_window(duration):
+    """(شروع، طول) کلیپ؛ از ۱۰٪ ابتدای ویدیو تا فریم‌های سیاه ابتدایی حذف شوند"""
+    if not duration:
+        return 0.0, CLIP_SECONDS
+    length = min(CLIP_SECONDS, duration)
+    start = min(duration * 0.1, max(0.0, duration - length))
+    return start, length
+
+
+def build_poster_command(input_file, info, ffmpeg_path='ffmpeg'):
+    """فریم PNG روی stdout؛ تبدیل به WebP با Pillow انجام می‌شود (همه buildهای ffmpeg libwebp ندارند)"""
+    start, _ = clip_window(info['duration'] if info else 0)
+    return [ffmpeg_path, '-v', 'error', '-ss', f'{start:.2f}', '-i', str(input_file),
+            '-vf', f"thumbnail={POSTER_CANDIDATES},scale='min({POSTER_WIDTH},iw)':-2",
+            '-frames:v', '1', '-f', 'image2pipe', '-vcodec', 'png', '-']
+
+
+def build_clip_command(input_file, output_file, info, ffmpeg_path='ffmpeg'):
+    start, length = clip_window(info['duration'] if info else 0)
+    return [ffmpeg_path, '-v', 'error', '-ss', f'{start:.2f}', '-t', f'{length:.2f}',
+            '-i', str(input_file),
+            '-an',
+            '-vf', f"fps={CLIP_FPS},scale='min({CLIP_WIDTH},iw)':-2",
+            '-c:v', 'libx264', '-crf', str(CLIP_CRF), '-preset', 'veryslow',
+            '-profile:v', 'main', '-pix_fmt', 'yuv420p',
+            '-movflags', '+faststart',
+            '-y', str(output_file)]
+
+
+def run(cmd):
+    result = subprocess.run(cmd, capture_output=True, creationflags=CREATION_FLAGS)
+    if result.returncode != 0:
+        error = result.stderr.decode('utf-8', 'replace')[-300:] if result.stderr else ''
+        raise RuntimeError(f"ffmpeg failed: {error}")
+    return result.stdout
+
+
+def write_poster(png_bytes, output_file):
+    from PIL import Image
+
+    tmp = output_file.with_name(output_file.name + '.tmp')
+    with Image.open(io.BytesIO(png_bytes)) as image:
+        image.convert('RGB').save(tmp, 'WEBP', quality=POSTER_QUALITY, method=6)
+    os.replace(tmp, output_file)
+
+
+def load_index(index_path=INDEX_PATH):
+    """منبع (مسیر نسبی) -> {"source": sha256, "poster": مسیر، "preview": مسیر}"""
+    try:
+        data = json.loads(index_path.read_text(encoding='utf-8'))
+    except (OSError, ValueError):
+        return {}
+    return data if isinstance(data, dict) else {}
+
+
+def save_index(index, index_path=INDEX_PATH):
+    index_path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = index_path.with_name(index_path.name + '.tmp')
+    tmp.write_text(json.dumps(index, ensure_ascii=False, indent=2, sort_keys=True), encoding='utf-8')
+    os.replace(tmp, index_path)
+
+
+def load_previews(index_path=INDEX_PATH, base_dir=BASE_DIR):
+    """فقط ورودی‌هایی که هر دو فایل‌شان روی دیسک هست؛ برای errorr-media.json"""
+    previews = {}
+    for source, entry in load_index(index_path).items():
+        poster, preview = entry.get('poster'), entry.get('preview')
+        if poster and preview and (base_dir / poster).is_file() and (base_dir / preview).is_file():
+            previews[source] = {'poster': poster, 'preview': preview}
+    return previews
+
+
+def remove_outputs(entry):
+    for key in ('poster', 'preview'):
+        if entry.get(key):
+            path = BASE_DIR / entry[key]
+            if path.is_file():
+                path.unlink()
+
+
+def generate_preview(source_rel, index, force=False, ffmpeg_path='ffmpeg', ffprobe_path='ffprobe'):
+    """
+    poster و کلیپ یک ویدیو؛ اگر خروجی فعلی از همین محتوا ساخته شده باشد کاری نمی‌کند
+    خروجی: آیا چیزی ساخته شد
+    """
+    source = BASE_DIR / source_rel
+    digest = file_digest(source)
+    entry = index.get(source_rel, {})
+    if (not force and entry.get('source') == digest
+            and all((BASE_DIR / entry.get(key, '')).is_file() for key in ('poster', 'preview'))):
+        return False
+
+    name = f"{Path(source_rel).stem}-{digest[:HASH_LENGTH]}"
+    poster = PREVIEWS_DIR / f"{name}.webp"
+    clip = PREVIEWS_DIR / f"{name}.mp4"
+    partial = PREVIEWS_DIR / f"{name}.part.mp4"
+    PREVIEWS_DIR.mkdir(parents=True, exist_ok=True)
+
+    info = probe_video(str(source), ffprobe_path)
+    write_poster(run(build_poster_command(source, info, ffmpeg_path)), poster)
+    try:
+        run(build_clip_command(source, partial, info, ffmpeg_path))
+        os.replace(partial, clip)
+    finally:
+        if partial.exists():
+            partial.unlink()
+
+    new_entry = {
+        'source': digest,
+        'poster': poster.relative_to(BASE_DIR).as_posix(),
+        'preview': clip.relative_to(BASE_DIR).as_posix(),
+    }
+    if entry and (entry.get('poster'), entry.get('preview')) != (new_entry['poster'], new_entry['preview']):
+        remove_outputs(entry)
+    index[source_rel] = new_entry
+    return True
+
+
+def manifest_files(manifest_path):
+    """مسیر فایل‌های مانیفست روی دیسک (بدون هش fingerprint_assets.py)"""
+    try:
+        files = json.loads(strip_fingerprints(manifest_path.read_text(encoding='utf-8'))).get('files', [])
+    except (OSError, ValueError):
+        return []
+    return [f for f in files if isinstance(f, str)]
+
+
+def manifest_videos(manifest_path):
+    return [f for f in manifest_files(manifest_path) if Path(f).suffix.lower() in VIDEO_EXTENSIONS]
+
+
+def main():
+    from update_errorr_media import OUTPUT_FILE, write_errorr_manifest
+
+    parser = argparse.ArgumentParser(description="Generate poster frames and looping previews for videos")
+    parser.add_argument('videos', nargs='*', type=Path,
+                        help="video files (default: every video listed in errorr-media.json)")
+    parser.add_argument('--force', action='store_true', help="regenerate even if outputs are up to date")
+    args = parser.parse_args()
+
+    if shutil.which('ffmpeg') is None:
+        print("Error: ffmpeg not found. Please install ffmpeg first.")
+        sys.exit(1)
+
+    if args.videos:
+        sources = [os.path.relpath(p.resolve(), BASE_DIR).replace(os.sep, '/') for p in args.videos]
+    else:
+        sources = manifest_videos(OUTPUT_FILE)
+    if not sources:
+        print("No videos found in errorr-media.json!")
+        return
+
+    index = load_index()
+    # ویدیوهایی که دیگر وجود ندارند
+    for source_rel in [s for s in index if not (BASE_DIR / s).is_file()]:
+        remove_outputs(index.pop(source_rel))
+
+    failed = 0
+    for source_rel in sources:
+        if not (BASE_DIR / source_rel).is_file():
+            print(f"  missing: {source_rel}")
+            failed += 1
+            continue
+        try:
+            created = generate_preview(source_rel, index, force=args.force)
+        except (RuntimeError, OSError) as exc:
+            print(f"  Error ({source_rel}): {exc}")
+            failed += 1
+            continue
+        entry = index[source_rel]
+        state = "created" if created else "up to date"
+        print(f"  {state}: {source_rel} -> {entry['poster']}, {entry['preview']}")
+    save_index(index)
+
+    # منیفست با همان فهرست فعلی (و همان نگاشت dedup) دوباره نوشته می‌شود تا previews اضافه شود
+    files = manifest_files(OUTPUT_FILE)
+    if files and write_errorr_manifest(files):
+        print(f"previews recorded in {OUTPUT_FILE.name}")
+    if failed:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,330 @@
+"""
+Filesystem watch daemon for the gallery manifests
+پوشه images (و videos) را زیر نظر می‌گیرد و پس از هر دسته آپلود، این فایل‌ها را به‌صورت افزایشی به‌روز می‌کند:
+
+    gallery-data.json, errorr-media.json, static/data/*.json
+    صفحه اول درون‌خطی و کارت‌های از پیش رندرشده gallery.html (embed_manifest_once.py)
+
+روی لینوکس از inotify (inotify_watch.py از طریق ctypes، بدون وابستگی اضافه) و در غیر این صورت از polling امضای
+دایرکتوری‌ها استفاده می‌کند. رویدادهای پشت‌سرهم debounce می‌شوند تا یک آپلود ۵۰ تایی یک بار پردازش شود.
+
+Usage:
+    python watch_assets.py                 # inotify اگر در دسترس باشد
+    python watch_assets.py --poll 1.0      # polling هر ۱ ثانیه
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import select
+import sys
+import time
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Set
+
+from dedup_assets import DEDUP_MODES, SKIPPED_DIRS, Deduplicator
+from embed_manifest_once import embed_manifest
+import inotify_watch
+from update_errorr_media import (
+    ERRORR_DIR,
+    OUTPUT_FILE as ERRORR_OUTPUT_FILE,
+    VIDEOS_DIR,
+    gather_errorr_media,
+    write_errorr_manifest,
+)
+from update_manifest_from_fs import (
+    BASE_DIR,
+    CATEGORIES,
+    IMAGES_DIR,
+    ManifestIndex,
+    build_manifest,
+    write_if_changed,
+)
+
+GALLERY_MANIFEST = BASE_DIR / "gallery-data.json"
+GALLERY_HTML = BASE_DIR / "gallery.html"
+STATIC_DATA_DIR = BASE_DIR / "static" / "data"
+
+DEBOUNCE_SECONDS = 0.25
+# حداکثر تأخیر حتی وقتی رویدادها قطع نمی‌شوند (آپلود طولانی)
+MAX_DELAY_SECONDS = 1.0
+
+# فایل‌های موقت و ایندکس‌هایی که خود ابزارها می‌نویسند
+IGNORED_SUFFIXES = (".tmp", ".dedup-tmp", ".part", ".crdownload")
+
+
+def _is_ignored(path: str) -> bool:
+    name = os.path.basename(path)
+    return name.startswith(".") or name.endswith(IGNORED_SUFFIXES)
+
+
+def _watched_roots() -> List[Path]:
+    return [IMAGES_DIR, VIDEOS_DIR]
+
+
+def _iter_watch_dirs(root: Path) -> Iterable[str]:
+    if not root.is_dir():
+        return
+    for dirpath, dirnames, _ in os.walk(root):
+        if Path(dirpath) == IMAGES_DIR:
+            dirnames[:] = [d for d in dirnames if d not in SKIPPED_DIRS]
+        yield dirpath
+
+
+class InotifyWatcher:
+    """inotify (inotify_watch.py)؛ روی دایرکتوری‌های جدید هم خودکار watch اضافه می‌کند"""
+
+    MASK = (inotify_watch.IN_CLOSE_WRITE | inotify_watch.IN_ATTRIB | inotify_watch.IN_MOVED_FROM
+            | inotify_watch.IN_MOVED_TO | inotify_watch.IN_CREATE | inotify_watch.IN_DELETE
+            | inotify_watch.IN_DELETE_SELF | inotify_watch.IN_MOVE_SELF)
+
+    def __init__(self) -> None:
+        self._inotify = inotify_watch.Inotify(blocking=False)
+        self._paths: Dict[int, str] = {}
+        self.overflowed = False
+        for root in _watched_roots():
+            self._watch_tree(root)
+        # ساخته شدن پوشه videos پس از شروع
+        self._add_watch(str(BASE_DIR), inotify_watch.IN_CREATE | inotify_watch.IN_MOVED_TO)
+
+    def _add_watch(self, path: str, mask: Optional[int] = None) -> None:
+        wd = self._inotify.add_watch(path, mask or self.MASK)
+        if wd >= 0:
+            self._paths[wd] = path
+
+    def _watch_tree(self, root: Path) -> None:
+        for dirpath in _iter_watch_dirs(root):
+            self._add_watch(dirpath)
+
+    def wait(self, timeout: Optional[float]) -> Set[str]:
+        readable, _, _ = select.select([self._inotify], [], [], timeout)
+        if not readable:
+            return set()
+        changed: Set[str] = set()
+        for wd, mask, name in self._inotify.read_events():
+            if mask & inotify_watch.IN_Q_OVERFLOW:
+                self.overflowed = True
+                continue
+            if mask & inotify_watch.IN_IGNORED:
+                self._paths.pop(wd, None)
+                continue
+            base = self._paths.get(wd)
+            if base is None:
+                continue
+            path = os.path.join(base, name) if name else base
+            if base == str(BASE_DIR):
+                # فقط ساخته شدن images/ یا videos/ در ریشه مهم است
+                if Path(path) in _watched_roots():
+                    self._watch_tree(Path(path))
+                    changed.add(path)
+                continue
+            if mask & inotify_watch.IN_ISDIR and mask & (inotify_watch.IN_CREATE | inotify_watch.IN_MOVED_TO):
+                self._watch_tree(Path(path))
+            if not _is_ignored(path):
+                changed.add(path)
+        return changed
+
+    def close(self) -> None:
+        self._inotify.close()
+
+
+class PollingWatcher:
+    """
+    مقایسه دوره‌ای امضای (mtime, size) فایل‌ها در پوشه‌های رسانه
+    جایگزین inotify روی سیستم‌های غیرلینوکسی
+    """
+
+    def __init__(self, interval: float = 1.0) -> None:
+        self.interval = interval
+        self.overflowed = False
+        self._state = self._snapshot()
+
+    def _snapshot(self) -> Dict[str, tuple]:
+        state: Dict[str, tuple] = {}
+        for root in _watched_roots():
+            for dirpath in _iter_watch_dirs(root):
+                try:
+                    with os.scandir(dirpath) as it:
+                        for entry in it:
+                            if entry.is_file() and not _is_ignored(entry.path):
+                                st = entry.stat()
+                                state[entry.path] = (st.st_mtime_ns, st.st_size)
+                except FileNotFoundError:
+                    continue
+        return state
+
+    def wait(self, timeout: Optional[float]) -> Set[str]:
+        time.sleep(self.interval if timeout is None else min(self.interval, timeout))
+        current = self._snapshot()
+        previous, self._state = self._state, current
+        changed = {path for path, sig in current.items() if previous.get(path) != sig}
+        changed.update(path for path in previous if path not in current)
+        return changed
+
+    def close(self) -> None:
+        pass
+
+
+def create_watcher(poll_interval: Optional[float] = None):
+    if poll_interval is None and sys.platform.startswith("linux"):
+        try:
+            return InotifyWatcher()
+        except (OSError, AttributeError) as exc:
+            print(f"inotify unavailable ({exc}); falling back to polling", file=sys.stderr)
+    return PollingWatcher(poll_interval or 1.0)
+
+
+def sync_static_copy(source: Path, destination: Path) -> bool:
+    """
+    کپی مانیفست در static/data؛ کلیدهایی که فقط در نسخه static هستند
+    (مثلاً دسته‌های دستی) حفظ می‌شوند
+    """
+    data = json.loads(source.read_text(encoding="utf-8"))
+    if destination.exists() and isinstance(data, dict):
+        try:
+            existing = json.loads(destination.read_text(encoding="utf-8"))
+        except ValueError:
+            existing = {}
+        if isinstance(existing, dict):
+            merged = dict(existing)
+            merged.update(data)
+            data = merged
+    indent = 2 if source == ERRORR_OUTPUT_FILE else 4
+    return write_if_changed(destination, json.dumps(data, ensure_ascii=False, indent=indent))
+
+
+class ManifestUpdater:
+    """اعمال افزایشی تغییرات روی مانیفست‌ها"""
+
+    def __init__(self, dedup_mode: str = "url") -> None:
+        self.index = ManifestIndex()
+        self.dedup = Deduplicator(dedup_mode)
+        self.dedup.save()
+        self._placeholder_warned = False
+
+    def _expand(self, paths: Iterable[str]) -> Set[str]:
+        """مسیرهای مطلق -> مسیرهای نسبی فایل‌ها؛ دایرکتوری حذف/جابه‌جا شده به فایل‌های شناخته‌شده‌اش باز می‌شود"""
+        known = self.dedup.known_paths()
+        rels: Set[str] = set()
+        for path in paths:
+            try:
+                rel = Path(path).resolve().relative_to(BASE_DIR).as_posix()
+            except ValueError:
+                continue
+            if os.path.isdir(path):
+                for dirpath, _, filenames in os.walk(path):
+                    for name in filenames:
+                        rels.add(Path(dirpath, name).relative_to(BASE_DIR).as_posix())
+            prefix = rel + "/"
+            rels.update(k for k in known if k.startswith(prefix))
+            rels.add(rel)
+        return rels
+
+    def apply(self, paths: Iterable[str], full: bool = False) -> List[str]:
+        """خروجی: فایل‌هایی که نوشته شدند"""
+        rels = self._expand(paths)
+        self.dedup.refresh(rel for rel in rels if rel.startswith("images/"))
+        self.dedup.save()
+
+        touched_categories = {
+            Path(rel).parts[1] for rel in rels
+            if rel.startswith("images/") and len(Path(rel).parts) >= 3
+        }
+        errorr_prefix = ERRORR_DIR.resolve().relative_to(BASE_DIR).as_posix() + "/"
+        videos_prefix = VIDEOS_DIR.resolve().relative_to(BASE_DIR).as_posix()
+        errorr_changed = full or any(
+            rel.startswith(errorr_prefix) or rel == videos_prefix or rel.startswith(videos_prefix + "/")
+            for rel in rels
+        )
+
+        written: List[str] = []
+        # تغییر URL مرجع یک تکراری می‌تواند هر دسته‌ای را تغییر دهد؛ ساخت مانیفست از ایندکس ارزان است
+        rescan = {c for c in CATEGORIES if c in touched_categories}
+        if build_manifest(self.index, dedup=self.dedup, force=full, rescan=rescan, verbose=False):
+            written.append(GALLERY_MANIFEST.name)
+        if GALLERY_MANIFEST.exists():
+            if sync_static_copy(GALLERY_MANIFEST, STATIC_DATA_DIR / GALLERY_MANIFEST.name):
+                written.append(f"static/data/{GALLERY_MANIFEST.name}")
+            written.extend(self._embed())
+
+        if errorr_changed:
+            if write_errorr_manifest(self.dedup.map_paths(gather_errorr_media())):
+                written.append(ERRORR_OUTPUT_FILE.name)
+            if ERRORR_OUTPUT_FILE.exists() and sync_static_copy(
+                    ERRORR_OUTPUT_FILE, STATIC_DATA_DIR / ERRORR_OUTPUT_FILE.name):
+                written.append(f"static/data/{ERRORR_OUTPUT_FILE.name}")
+        return written
+
+    def _embed(self) -> List[str]:
+        if not GALLERY_HTML.exists():
+            return []
+        try:
+            changed = embed_manifest(GALLERY_MANIFEST.read_text(encoding="utf-8"), GALLERY_HTML)
+        except ValueError as exc:
+            if not self._placeholder_warned:
+                print(f"{exc}; skipping inline first page", file=sys.stderr)
+                self._placeholder_warned = True
+            return []
+        return [GALLERY_HTML.name] if changed else []
+
+
+def run(watcher, updater: ManifestUpdater, debounce: float = DEBOUNCE_SECONDS,
+        max_delay: float = MAX_DELAY_SECONDS) -> None:
+    pending: Set[str] = set()
+    first_event = last_event = 0.0
+    while True:
+        timeout = None
+        if pending:
+            now = time.monotonic()
+            timeout = max(0.0, min(last_event + debounce, first_event + max_delay) - now)
+        changed = watcher.wait(timeout)
+        now = time.monotonic()
+        if changed:
+            if not pending:
+                first_event = now
+            pending.update(changed)
+            last_event = now
+        if not pending:
+            continue
+        if now - last_event < debounce and now - first_event < max_delay:
+            continue
+
+        batch, pending = pending, set()
+        full = watcher.overflowed
+        watcher.overflowed = False
+        started = time.perf_counter()
+        written = updater.apply(batch, full=full)
+        elapsed = (time.perf_counter() - started) * 1000
+        summary = ", ".join(written) if written else "no manifest changes"
+        print(f"[{time.strftime('%H:%M:%S')}] {len(batch)} change(s) -> {summary} ({elapsed:.0f} ms)")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Keep gallery manifests in sync with the images tree")
+    parser.add_argument("--poll", type=float, metavar="SECONDS",
+                        help="use polling with this interval instead of inotify")
+    parser.add_argument("--debounce", type=float, default=DEBOUNCE_SECONDS)
+    parser.add_argument("--dedup", choices=DEDUP_MODES, default="url")
+    parser.add_argument("--once", action="store_true", help="sync once and exit")
+    args = parser.parse_args()
+
+    updater = ManifestUpdater(args.dedup)
+    # همگام‌سازی اولیه؛ از این پس فقط تغییرات پردازش می‌شوند
+    written = updater.apply([], full=True)
+    print("Initial sync: " + (", ".join(written) if written else "up to date"))
+    if args.once:
+        return
+
+    watcher = create_watcher(args.poll)
+    print(f"Watching {IMAGES_DIR} with {type(watcher).__name__} (Ctrl+C to stop)")
+    try:
+        run(watcher, updater, debounce=args.debounce)
+    except KeyboardInterrupt:
+        print("\nWatcher stopped by user")
+    finally:
+        watcher.close()
+
+
+if __name__ == "__main__":
+    main()